@@ -72,6 +72,16 @@ for l in locals().values():
     if issubclass(l, Instruction) or issubclass(l, DispatchInstruction):
       l.active_code = property(__get_active_code)
 
+# Cache dispatch table matches by operand shape
+_dispatch_insts = tuple(inst for inst in locals().values()
+                        if isinstance(inst, type) and
+                           issubclass(inst, DispatchInstruction) and
+                           inst is not DispatchInstruction)
+_dispatch_key = x86DispatchKey(_dispatch_insts)
+for inst in _dispatch_insts:
+  inst.dispatch_key = _dispatch_key
+del inst
+
                                                        
 # ------------------------------
 # Mnemonics
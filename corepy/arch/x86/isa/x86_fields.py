@@ -26,7 +26,8 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
 
-from corepy.spre.spe import InstructionOperand, Label
+import bisect
+from corepy.spre.spe import InstructionOperand, Register, Label
 #import corepy.arch.x86.types.registers as regs
 from corepy.arch.x86.lib.memory import MemoryReference
 
@@ -173,3 +174,82 @@ class Imm8(x86ImmediateOperand): pass
 class Imm16(x86ImmediateOperand): pass
 class Imm32(x86ImmediateOperand): pass
 
+
+# ------------------------------
+# Dispatch keys
+# ------------------------------
+
+class x86DispatchKey(object):
+  """
+  Computes DispatchInstruction cache keys for x86 operands.
+
+  The x86 operand checks only look at a register's type (and name for
+  fixed registers), which range an immediate falls in, a memory
+  reference's data size, and whether an operand is a label.  An
+  instance is built from the dispatch tables of an ISA, collecting the
+  immediate range boundaries and fixed register names used, and is
+  installed as the dispatch_key attribute of the ISA's instructions.
+  Operands of any other type are not keyed and fall back to a scan.
+  """
+
+  def __init__(self, instructions):
+    bounds = set()
+    fixed_names = set()
+
+    for inst in instructions:
+      for machine_inst, params in inst.dispatch:
+        for field in machine_inst.signature:
+          if isinstance(field, x86ImmediateOperand):
+            bounds.update(field.range)
+          elif isinstance(field, x86ConstantOperand):
+            bounds.update((field.const, field.const + 1))
+          elif isinstance(field, FixedRegisterOperand):
+            fixed_names.add(field.name)
+
+    # Two integers of the same type that sort between the same pair of
+    # boundaries fit exactly the same set of immediate ranges.
+    self.bounds = sorted(bounds)
+    self.fixed_names = fixed_names
+
+    # Operand class -> kind of key to build for it
+    self._kinds = {}
+    return
+
+  _IMM, _REG, _MEM, _LABEL = range(4)
+
+  def _classify(self, cls):
+    if issubclass(cls, (int, long)):
+      return self._IMM
+    elif issubclass(cls, Register):
+      return self._REG
+    elif issubclass(cls, MemoryReference):
+      return self._MEM
+    elif issubclass(cls, Label):
+      return self._LABEL
+    return None
+
+  def __call__(self, operands):
+    kinds = self._kinds
+    key = []
+
+    for op in operands:
+      cls = op.__class__
+      try:
+        kind = kinds[cls]
+      except KeyError:
+        kind = kinds[cls] = self._classify(cls)
+
+      if kind == self._REG:
+        if op.name in self.fixed_names:
+          key.append((cls, op.name))
+        else:
+          key.append(cls)
+      elif kind == self._IMM:
+        key.append((cls, bisect.bisect_right(self.bounds, op)))
+      elif kind == self._MEM:
+        key.append((cls, op.data_size))
+      elif kind == self._LABEL:
+        key.append(cls)
+      else:
+        return None
+    return tuple(key)
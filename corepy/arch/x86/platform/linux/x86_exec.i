@@ -42,5 +42,27 @@
 #include "x86_exec.h"
 %}
 
+// ************************************************************
+// GIL Handling
+// ************************************************************
+
+// Synthesized code does not call back into Python, so release the
+// interpreter lock while it runs (and while waiting on async threads).
+// Other Python threads, including ones executing other programs, keep
+// running on other cores.
+
+%define RELEASE_GIL(func)
+%exception func {
+  Py_BEGIN_ALLOW_THREADS
+  $action
+  Py_END_ALLOW_THREADS
+}
+%enddef
+
+RELEASE_GIL(execute_int)
+RELEASE_GIL(execute_fp)
+RELEASE_GIL(join_int)
+RELEASE_GIL(join_fp)
+
 %include "x86_exec.h"
 
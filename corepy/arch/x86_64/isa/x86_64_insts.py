@@ -26,6 +26,8 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
 
+import struct
+
 from corepy.spre.spe import MachineInstruction
 #from corepy.arch.x86_64.lib.memory import MemoryReference
 from x86_64_fields import *
@@ -59,6 +61,7 @@ mem64_t = x86MemoryOperand("mem64", 64)
 mem80_t = x86MemoryOperand("mem80", 80)
 mem128_t = x86MemoryOperand("mem128", 128)
 mem228_t = x86MemoryOperand("mem228", 228)
+mem256_t = x86MemoryOperand("mem256", 256)
 #mem512_t = x86MemoryOperand("mem512", 512)
 mem752_t = x86MemoryOperand("mem752", 752)
 mem4096_t = x86MemoryOperand("mem4096", 4096)
@@ -71,6 +74,7 @@ reg64_t = x86RegisterOperand("reg64", regs.GPRegister64)
 regst_t = x86RegisterOperand("regst", regs.FPRegister)
 mmx_t  = x86RegisterOperand("mmx", regs.MMXRegister)
 xmm_t  = x86RegisterOperand("xmm", regs.XMMRegister)
+ymm_t  = x86RegisterOperand("ymm", regs.YMMRegister)
 
 # Fixed Registers
 al_t = FixedRegisterOperand("al", regs.GPRegister8, 0)
@@ -145,7 +149,7 @@ def common_memref_modrm(opcode, ref, modrm, rex, force_rex):
         if simm8_t.fits(ref.disp):           # [rsp + disp], [r12 + disp]
           return rex + opcode + [0x44 | modrm, 0x24] + w8(ref.disp)
         elif simm32_t.fits(ref.disp):
-          return rex + opcode + [0x80 | modrm, 0x24] + w32(ref.disp)
+          return rex + opcode + [0x84 | modrm, 0x24] + w32(ref.disp)
       elif simm8_t.fits(ref.disp):
         return rex + opcode + [0x40 | modrm | ref.base.reg] + w8(ref.disp)
       elif simm32_t.fits(ref.disp):
@@ -184,6 +188,105 @@ def common_memref(opcode, ref, modrm, rex = 0, force_rex = False):
   return None
 
 
+# Versions of the above for encode(), appending to a bytearray instead of
+# returning lists.  These return False, possibly having appended part of
+# the code, where the above return None.
+
+_pack32 = struct.Struct('<I').pack
+
+# Registers compare by name, which is quicker to check directly
+_ip_names = ('rip', 'eip')
+_bp_names = ('rbp', 'r13', 'ebp')
+_sp_names = ('rsp', 'r12', 'esp')
+
+def e32(buf, n):
+  buf += _pack32(n & 0xFFFFFFFFl)
+
+
+def _rex_into(buf, rex, force_rex):
+  if rex != 0x40 or force_rex:
+    buf.append(rex)
+
+
+def common_memref_modrm_into(buf, opcode, ref, modrm, rex, force_rex):
+  base = ref.base
+  index = ref.index
+  disp = ref.disp
+
+  if disp != None and disp != 0:            # [base + disp]
+    if base.name in _ip_names:
+      _rex_into(buf, 0x40 | rex, force_rex)
+      buf.extend(opcode)
+      buf.append(0x5 | modrm)
+      e32(buf, disp)
+      return True
+
+    if index != None:                       # [base+index*scale+disp]
+      sib = ref.scale_sib | (index.reg << 3) | base.reg
+      rex |= 0x40 | (index.rex << 1) | base.rex
+    elif base.name in _sp_names:
+      sib = 0x24                            # [rsp + disp], [r12 + disp]
+      rex |= 0x40 | base.rex
+    else:
+      sib = None
+      rex |= 0x40 | base.rex
+      modrm |= base.reg
+
+    if simm8_t.fits(disp):
+      mod = 0x40
+    elif simm32_t.fits(disp):
+      mod = 0x80
+    else:
+      return False
+
+    _rex_into(buf, rex, force_rex)
+    buf.extend(opcode)
+    if sib is None:
+      buf.append(mod | modrm)
+    else:
+      buf.extend((mod | 0x04 | modrm, sib))
+    if mod == 0x40:
+      buf.append(disp & 0xFF)
+    else:
+      e32(buf, disp)
+    return True
+
+  if index != None:
+    _rex_into(buf, 0x40 | (index.rex << 1) | base.rex | rex, force_rex)
+    buf.extend(opcode)
+    sib = ref.scale_sib | (index.reg << 3) | base.reg
+    if base.name in _bp_names:
+      buf.extend((0x44 | modrm, sib, 0x00)) # [rbp, index], [r13, index]
+    else:
+      buf.extend((0x04 | modrm, sib))
+    return True
+
+  _rex_into(buf, 0x40 | base.rex | rex, force_rex)
+  buf.extend(opcode)
+  if base.name in _bp_names:
+    buf.extend((0x45 | modrm, 0x00))        # [rbp], [r13]
+  elif base.name in _sp_names:
+    buf.extend((0x04 | modrm, 0x24))        # [rsp], [r12]
+  else:
+    buf.append(modrm | base.reg)            # [base]
+  return True
+
+
+def common_memref_into(buf, opcode, ref, modrm, rex = 0, force_rex = False):
+  if ref.addr != None:  # Absolute address
+    _rex_into(buf, 0x40 | rex, force_rex)
+    buf.extend(opcode)
+    buf.extend((0x04 | modrm, 0x25))
+    e32(buf, ref.addr)
+    return True
+  elif ref.addr_size == 64: # 64bit modRM address, RIP-relative
+    return common_memref_modrm_into(buf, opcode, ref, modrm, rex, force_rex)
+  elif ref.addr_size == 32: # 32bit modRM address, EIP-relative
+    buf.append(0x67)
+    return common_memref_modrm_into(buf, opcode, ref, modrm, rex, force_rex)
+  return False
+
+
 # ------------------------------
 # x86_64 Machine Instructions
 # ------------------------------
@@ -681,6 +784,17 @@ class mem32_reg32(MachineInstruction):
     #return common_memref32(params['opcode'], operands['mem32'], operands['reg32'].reg << 3)
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    reg32 = operands['reg32']
+    start = len(buf)
+    if operands.has_key('lock') and operands['lock'] == True:
+      buf.append(lock_p.value)
+    if not common_memref_into(buf, params['opcode'], operands['mem32'], reg32.reg << 3, reg32.rex << 2):
+      del buf[start:]
+      return None
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class mem32_reg32_cl(MachineInstruction):
   signature = (mem32_t, reg32_t, cl_t)
@@ -826,6 +940,37 @@ class mem64_imm32(MachineInstruction):
       return ret + w32(operands['imm32'])
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    start = len(buf)
+    if not common_memref_into(buf, params['opcode'], operands['mem64'], params['modrm'], 0x08):
+      del buf[start:]
+      return None
+    e32(buf, operands['imm32'])
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
+
+# The immediate is sign-extended to 64 bits, so only signed 32bit values
+# are accepted; mov uses this so larger values get the imm64 form.
+class mem64_simm32(MachineInstruction):
+  signature = (mem64_t, simm32_t)
+  opt_kw = ()
+  
+  def _render(params, operands):
+    ret = common_memref(params['opcode'], operands['mem64'], params['modrm'], 0x08)
+    if ret != None:
+      return ret + w32(operands['simm32'])
+  render = staticmethod(_render)
+
+  def _encode(params, operands, buf):
+    start = len(buf)
+    if not common_memref_into(buf, params['opcode'], operands['mem64'], params['modrm'], 0x08):
+      del buf[start:]
+      return None
+    e32(buf, operands['simm32'])
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class mem64_imm8(MachineInstruction):
   signature = (mem64_t, imm8_t)
@@ -850,6 +995,17 @@ class mem64_reg64(MachineInstruction):
     return ret
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    reg64 = operands['reg64']
+    start = len(buf)
+    if operands.has_key('lock') and operands['lock'] == True:
+      buf.append(lock_p.value)
+    if not common_memref_into(buf, params['opcode'], operands['mem64'], reg64.reg << 3, 0x08 | (reg64.rex << 2)):
+      del buf[start:]
+      return None
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class mem64_reg64_cl(MachineInstruction):
   signature = (mem64_t, reg64_t, cl_t)
@@ -1024,7 +1180,7 @@ class mmx_mem16_imm8(MachineInstruction):
   def _render(params, operands):
     ret =  common_memref(params['opcode'], operands['mem16'], operands['mmx'].reg << 3)
     if ret != None:
-      return ret + [operands['imm8']]
+      return ret + w8(operands['imm8'])
   render = staticmethod(_render)
 
 
@@ -1406,7 +1562,10 @@ class reg16_reg16_rev(MachineInstruction):
     if rex == [0x40]:
       rex = []
 
-    return [0x66] + rex + params['opcode'] + [0xC0 | (rd.reg << 3) | ra.reg]
+    ret = rex + params['opcode'] + [0xC0 | (rd.reg << 3) | ra.reg]
+    if params.has_key('prefix'):
+      return [0x66] + params['prefix'] + ret
+    return [0x66] + ret
   render = staticmethod(_render)
 
   
@@ -1519,6 +1678,22 @@ class reg32_imm32(MachineInstruction):
       return rex + opcode[:-1] + [opcode[-1] + operands['reg32'].reg] + w32(operands['imm32'])
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    opcode = params['opcode']
+    modrm = params['modrm']
+    reg32 = operands['reg32']
+    start = len(buf)
+    _rex_into(buf, 0x40 | reg32.rex, False)
+    if modrm != None:
+      buf.extend(opcode)
+      buf.append(0xC0 | modrm | reg32.reg)
+    else:
+      buf.extend(opcode[:-1])
+      buf.append(opcode[-1] + reg32.reg)
+    e32(buf, operands['imm32'])
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
   
 class reg32_imm8(MachineInstruction):
   signature = (reg32_t, imm8_t)
@@ -1533,6 +1708,15 @@ class reg32_imm8(MachineInstruction):
     return rex + params['opcode'] + [0xC0 | params['modrm'] | operands['reg32'].reg] + w8(operands['imm8'])
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    reg32 = operands['reg32']
+    start = len(buf)
+    _rex_into(buf, 0x40 | reg32.rex, False)
+    buf.extend(params['opcode'])
+    buf.extend((0xC0 | params['modrm'] | reg32.reg, operands['imm8'] & 0xFF))
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
   
 class reg32_mem(MachineInstruction):
   signature = (reg32_t, mem_t)
@@ -1566,6 +1750,17 @@ class reg32_mem32(MachineInstruction):
     return ret
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    reg32 = operands['reg32']
+    start = len(buf)
+    if params.has_key('prefix'):
+      buf.extend(params['prefix'])
+    if not common_memref_into(buf, params['opcode'], operands['mem32'], reg32.reg << 3, reg32.rex << 2):
+      del buf[start:]
+      return None
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class reg32_mem32_imm32(MachineInstruction):
   signature = (reg32_t, mem32_t, imm32_t)
@@ -1689,6 +1884,18 @@ class reg32_reg32(MachineInstruction):
     return ret
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    rd = operands['rd']
+    ra = operands['ra']
+    start = len(buf)
+    if params.has_key('prefix'):
+      buf.extend(params['prefix'])
+    _rex_into(buf, 0x40 | (ra.rex << 2) | rd.rex, False)
+    buf.extend(params['opcode'])
+    buf.append(0xC0 | (ra.reg << 3) | rd.reg)
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
   
 class reg32_reg32_cl(MachineInstruction):
   signature = (reg32_t('rd'), reg32_t('ra'), cl_t)
@@ -1762,7 +1969,10 @@ class reg32_reg32_rev(MachineInstruction):
     if rex == [0x40]:
       rex = []
 
-    return rex + params['opcode'] + [0xC0 | (rd.reg << 3) | ra.reg]
+    ret = rex + params['opcode'] + [0xC0 | (rd.reg << 3) | ra.reg]
+    if params.has_key('prefix'):
+      return params['prefix'] + ret
+    return ret
   render = staticmethod(_render)
 
   
@@ -1917,6 +2127,43 @@ class reg64_imm32(MachineInstruction):
       return [0x48 | reg64.rex] + opcode[:-1] + [opcode[-1] + reg64.reg] + w32(operands['imm32'])
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    opcode = params['opcode']
+    modrm = params['modrm']
+    reg64 = operands['reg64']
+    start = len(buf)
+    buf.append(0x48 | reg64.rex)
+    if modrm != None:
+      buf.extend(opcode)
+      buf.append(0xC0 | modrm | reg64.reg)
+    else:
+      buf.extend(opcode[:-1])
+      buf.append(opcode[-1] + reg64.reg)
+    e32(buf, operands['imm32'])
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
+
+# See mem64_simm32
+class reg64_simm32(MachineInstruction):
+  signature = (reg64_t, simm32_t)
+  opt_kw = ()
+ 
+  def _render(params, operands):
+    reg64 = operands['reg64']
+    return [0x48 | reg64.rex] + params['opcode'] + [0xC0 | params['modrm'] | reg64.reg] + w32(operands['simm32'])
+  render = staticmethod(_render)
+
+  def _encode(params, operands, buf):
+    reg64 = operands['reg64']
+    start = len(buf)
+    buf.append(0x48 | reg64.rex)
+    buf.extend(params['opcode'])
+    buf.append(0xC0 | params['modrm'] | reg64.reg)
+    e32(buf, operands['simm32'])
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
   
 class reg64_imm64(MachineInstruction):
   signature = (reg64_t, imm64_t)
@@ -1939,6 +2186,15 @@ class reg64_imm8(MachineInstruction):
     return [0x48 | reg64.rex] + params['opcode'] + [0xC0 | params['modrm'] | reg64.reg] + w8(operands['imm8'])
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    reg64 = operands['reg64']
+    start = len(buf)
+    buf.append(0x48 | reg64.rex)
+    buf.extend(params['opcode'])
+    buf.extend((0xC0 | params['modrm'] | reg64.reg, operands['imm8'] & 0xFF))
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
   
 class reg64_mem(MachineInstruction):
   signature = (reg64_t, mem_t)
@@ -1984,6 +2240,17 @@ class reg64_mem64(MachineInstruction):
     return ret
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    reg64 = operands['reg64']
+    start = len(buf)
+    if params.has_key('prefix'):
+      buf.extend(params['prefix'])
+    if not common_memref_into(buf, params['opcode'], operands['mem64'], reg64.reg << 3, 0x08 | reg64.rex << 2):
+      del buf[start:]
+      return None
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class reg64_mem64_imm32(MachineInstruction):
   signature = (reg64_t, mem64_t, imm32_t)
@@ -2096,6 +2363,18 @@ class reg64_reg64(MachineInstruction):
     return ret
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    ra = operands['ra']
+    rd = operands['rd']
+    start = len(buf)
+    if params.has_key('prefix'):
+      buf.extend(params['prefix'])
+    buf.append(0x48 | (ra.rex << 2) | rd.rex)
+    buf.extend(params['opcode'])
+    buf.append(0xC0 | (ra.reg << 3) | rd.reg)
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class reg64_reg64_cl(MachineInstruction):
   signature = (reg64_t('rd'), reg64_t('ra'), cl_t)
@@ -2156,7 +2435,10 @@ class reg64_reg64_rev(MachineInstruction):
     ra = operands['ra']
     rd = operands['rd']
 
-    return [0x48 | (rd.rex << 2) | ra.rex] + params['opcode'] + [0xC0 | (rd.reg << 3) | ra.reg]
+    ret = [0x48 | (rd.rex << 2) | ra.rex] + params['opcode'] + [0xC0 | (rd.reg << 3) | ra.reg]
+    if params.has_key('prefix'):
+      return params['prefix'] + ret
+    return ret
   render = staticmethod(_render)
 
 
@@ -2180,6 +2462,15 @@ class reg64_simm8(MachineInstruction):
     return [0x48 | reg64.rex] + params['opcode'] + [0xC0 | params['modrm'] | reg64.reg] + w8(operands['simm8'])
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    reg64 = operands['reg64']
+    start = len(buf)
+    buf.append(0x48 | reg64.rex)
+    buf.extend(params['opcode'])
+    buf.extend((0xC0 | params['modrm'] | reg64.reg, operands['simm8'] & 0xFF))
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
   
 class reg64_xmm(MachineInstruction):
   signature = (reg64_t, xmm_t)
@@ -2446,6 +2737,16 @@ class xmm_mem128(MachineInstruction):
       return params['prefix'] + ret
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    xmm = operands['xmm']
+    start = len(buf)
+    buf.extend(params['prefix'])
+    if not common_memref_into(buf, params['opcode'], operands['mem128'], xmm.reg << 3, xmm.rex << 2):
+      del buf[start:]
+      return None
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class xmm_mem128_imm(MachineInstruction):
   signature = (xmm_t, mem128_t)
@@ -2542,6 +2843,16 @@ class xmm_mem64(MachineInstruction):
       return params['prefix'] + ret
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    xmm = operands['xmm']
+    start = len(buf)
+    buf.extend(params['prefix'])
+    if not common_memref_into(buf, params['opcode'], operands['mem64'], xmm.reg << 3, xmm.rex << 2):
+      del buf[start:]
+      return None
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class xmm_mem64_imm(MachineInstruction):
   signature = (xmm_t, mem64_t)
@@ -2658,6 +2969,17 @@ class xmm_xmm(MachineInstruction):
     return params['prefix'] + rex + params['opcode'] + [0xC0 | (rd.reg << 3) | ra.reg]
   render = staticmethod(_render)
 
+  def _encode(params, operands, buf):
+    rd = operands['rd']
+    ra = operands['ra']
+    start = len(buf)
+    buf.extend(params['prefix'])
+    _rex_into(buf, 0x40 | (rd.rex << 2) | ra.rex, False)
+    buf.extend(params['opcode'])
+    buf.append(0xC0 | (rd.reg << 3) | ra.reg)
+    return len(buf) - start
+  encode = staticmethod(_encode)
+
 
 class xmm_xmm_imm(MachineInstruction):
   signature = (xmm_t('rd'), xmm_t('ra'))
@@ -2704,3 +3026,638 @@ class xmm_xmm_imm8_imm8(MachineInstruction):
   render = staticmethod(_render)
 
 
+
+# ------------------------------
+# VEX Encoding
+# ------------------------------
+
+# AVX/AVX2/FMA instructions replace the legacy prefix, REX prefix and 0F
+# escape bytes with a 2- or 3-byte VEX prefix, which also encodes a second
+# source register (vvvv) and the vector length (L).  Dispatch parameters for
+# the VEX machine instructions are:
+#   'opcode' - the opcode byte following the VEX prefix
+#   'modrm'  - modrm reg field for opcode extensions, or None
+#   'map'    - opcode map: 1 for 0F, 2 for 0F 38, 3 for 0F 3A
+#   'pp'     - implied prefix: 0 for none, 1 for 66, 2 for F3, 3 for F2
+#   'W'      - VEX.W bit
+# The vector length comes from the machine instruction: 256 bits when a YMM
+# register is involved, 128 bits otherwise.
+
+def vex_prefix(params, L, r, x, b, v):
+  # r/x/b are the REX bits, v the full (4-bit) number of the vvvv register.
+  # The R/X/B and vvvv fields are stored inverted.
+  vvvv_l_pp = ((~v & 0xF) << 3) | (L << 2) | params['pp']
+  if x == 0 and b == 0 and params['W'] == 0 and params['map'] == 1:
+    return [0xC5, ((r ^ 1) << 7) | vvvv_l_pp]
+  return [0xC4, ((r ^ 1) << 7) | ((x ^ 1) << 6) | ((b ^ 1) << 5) | params['map'],
+          (params['W'] << 7) | vvvv_l_pp]
+
+
+def vex_num(reg):
+  return (reg.rex << 3) | reg.reg
+
+
+def vex_reg(params, L, r, v, b):
+  # r goes in modrm.reg (or params['modrm'] if r is None), b in modrm.rm
+  if r is None:
+    return vex_prefix(params, L, 0, 0, b.rex, v) + params['opcode'] + [0xC0 | params['modrm'] | b.reg]
+  return vex_prefix(params, L, r.rex, 0, b.rex, v) + params['opcode'] + [0xC0 | (r.reg << 3) | b.reg]
+
+
+def vex_memref(params, L, r, v, ref):
+  # r goes in modrm.reg (or params['modrm'] if r is None).
+  # Render the memory reference with a forced REX prefix to find out which
+  # REX bits it needs; those move into the VEX prefix.
+  if r is None:
+    ret = common_memref([], ref, params['modrm'], 0, True)
+    r = regs.rax   # No R bit
+  else:
+    ret = common_memref([], ref, r.reg << 3, 0, True)
+  if ret is None:
+    return None
+
+  if ret[0] == 0x67:
+    addr = [0x67]
+    rex = ret[1]
+    ret = ret[2:]
+  else:
+    addr = []
+    rex = ret[0]
+    ret = ret[1:]
+  return addr + vex_prefix(params, L, r.rex, (rex >> 1) & 1, rex & 1, v) + params['opcode'] + ret
+
+
+def vex_vsib(params, rd, rv, ref):
+  # Gathers use a vector of indices (VSIB); the vector length is 256 if
+  # either the destination or the index is a YMM register.  params['vsib']
+  # lists the index register widths (128 for XMM, 256 for YMM) each form
+  # accepts.
+  if isinstance(ref.index, regs.YMMRegister):
+    width = 256
+  elif isinstance(ref.index, regs.XMMRegister):
+    width = 128
+  else:
+    raise Exception('Gather memory reference requires an XMM or YMM index register')
+  if width not in params['vsib']:
+    raise Exception('Gather index register %s must be %s' % (ref.index,
+        ' or '.join([{128:'XMM', 256:'YMM'}[w] for w in params['vsib']])))
+  L = int(isinstance(rd, regs.YMMRegister) or width == 256)
+  return vex_memref(params, L, rd, vex_num(rv), ref)
+
+
+# ------------------------------
+# AVX Machine Instructions
+# ------------------------------
+
+class vex_mem128_xmm(MachineInstruction):
+  signature = (mem128_t, xmm_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['xmm'], 0, operands['mem128'])
+  render = staticmethod(_render)
+
+
+class vex_mem128_xmm_xmm(MachineInstruction):
+  signature = (mem128_t, xmm_t('rv'), xmm_t('rs'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['rs'], vex_num(operands['rv']), operands['mem128'])
+  render = staticmethod(_render)
+
+
+class vex_mem128_ymm_imm8(MachineInstruction):
+  signature = (mem128_t, ymm_t, imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    ret = vex_memref(params, 1, operands['ymm'], 0, operands['mem128'])
+    if ret is not None:
+      return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_mem256_ymm(MachineInstruction):
+  signature = (mem256_t, ymm_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 1, operands['ymm'], 0, operands['mem256'])
+  render = staticmethod(_render)
+
+
+class vex_mem256_ymm_ymm(MachineInstruction):
+  signature = (mem256_t, ymm_t('rv'), ymm_t('rs'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 1, operands['rs'], vex_num(operands['rv']), operands['mem256'])
+  render = staticmethod(_render)
+
+
+class vex_mem32_xmm(MachineInstruction):
+  signature = (mem32_t, xmm_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['xmm'], 0, operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_mem64_xmm(MachineInstruction):
+  signature = (mem64_t, xmm_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['xmm'], 0, operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_no_op(MachineInstruction):
+  signature = ()
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_prefix(params, params['L'], 0, 0, 0, 0) + params['opcode']
+  render = staticmethod(_render)
+
+
+class vex_xmm_mem128(MachineInstruction):
+  signature = (xmm_t, mem128_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['xmm'], 0, operands['mem128'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_mem128_imm8(MachineInstruction):
+  signature = (xmm_t, mem128_t, imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    ret = vex_memref(params, 0, operands['xmm'], 0, operands['mem128'])
+    if ret is not None:
+      return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_mem32(MachineInstruction):
+  signature = (xmm_t, mem32_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['xmm'], 0, operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_mem32_xmm(MachineInstruction):
+  signature = (xmm_t('rd'), mem32_t, xmm_t('rv'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_vsib(params, operands['rd'], operands['rv'], operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_mem64(MachineInstruction):
+  signature = (xmm_t, mem64_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['xmm'], 0, operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_mem64_xmm(MachineInstruction):
+  signature = (xmm_t('rd'), mem64_t, xmm_t('rv'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_vsib(params, operands['rd'], operands['rv'], operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_xmm(MachineInstruction):
+  signature = (xmm_t('rd'), xmm_t('ra'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], 0, operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_xmm_imm8(MachineInstruction):
+  signature = (xmm_t('rd'), xmm_t('ra'), imm8_t)
+  opt_kw = ()
+
+  # With an opcode extension in params['modrm'] (the shift instructions),
+  # rd is encoded in VEX.vvvv rather than modrm.reg.
+  def _render(params, operands):
+    if params['modrm'] is None:
+      ret = vex_reg(params, 0, operands['rd'], 0, operands['ra'])
+    else:
+      ret = vex_reg(params, 0, None, vex_num(operands['rd']), operands['ra'])
+    return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_xmm_mem128(MachineInstruction):
+  signature = (xmm_t('rd'), xmm_t('rv'), mem128_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['rd'], vex_num(operands['rv']), operands['mem128'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_xmm_mem128_imm8(MachineInstruction):
+  signature = (xmm_t('rd'), xmm_t('rv'), mem128_t, imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    ret = vex_memref(params, 0, operands['rd'], vex_num(operands['rv']), operands['mem128'])
+    if ret is not None:
+      return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_xmm_mem32(MachineInstruction):
+  signature = (xmm_t('rd'), xmm_t('rv'), mem32_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['rd'], vex_num(operands['rv']), operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_xmm_mem64(MachineInstruction):
+  signature = (xmm_t('rd'), xmm_t('rv'), mem64_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['rd'], vex_num(operands['rv']), operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_xmm_xmm(MachineInstruction):
+  signature = (xmm_t('rd'), xmm_t('rv'), xmm_t('ra'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], vex_num(operands['rv']), operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_xmm_xmm_imm8(MachineInstruction):
+  signature = (xmm_t('rd'), xmm_t('rv'), xmm_t('ra'), imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], vex_num(operands['rv']), operands['ra']) + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_xmm_ymm_imm8(MachineInstruction):
+  signature = (xmm_t, ymm_t, imm8_t)
+  opt_kw = ()
+
+  # Extracts: the YMM source goes in modrm.reg, the XMM destination in rm
+  def _render(params, operands):
+    return vex_reg(params, 1, operands['ymm'], 0, operands['xmm']) + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_mem128(MachineInstruction):
+  signature = (ymm_t, mem128_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 1, operands['ymm'], 0, operands['mem128'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_mem256(MachineInstruction):
+  signature = (ymm_t, mem256_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 1, operands['ymm'], 0, operands['mem256'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_mem256_imm8(MachineInstruction):
+  signature = (ymm_t, mem256_t, imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    ret = vex_memref(params, 1, operands['ymm'], 0, operands['mem256'])
+    if ret is not None:
+      return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_mem32(MachineInstruction):
+  signature = (ymm_t, mem32_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 1, operands['ymm'], 0, operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_mem32_ymm(MachineInstruction):
+  signature = (ymm_t('rd'), mem32_t, ymm_t('rv'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_vsib(params, operands['rd'], operands['rv'], operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_mem64(MachineInstruction):
+  signature = (ymm_t, mem64_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 1, operands['ymm'], 0, operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_mem64_ymm(MachineInstruction):
+  signature = (ymm_t('rd'), mem64_t, ymm_t('rv'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_vsib(params, operands['rd'], operands['rv'], operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_xmm(MachineInstruction):
+  signature = (ymm_t, xmm_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 1, operands['ymm'], 0, operands['xmm'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('ra'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 1, operands['rd'], 0, operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_imm8(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('ra'), imm8_t)
+  opt_kw = ()
+
+  # With an opcode extension in params['modrm'] (the shift instructions),
+  # rd is encoded in VEX.vvvv rather than modrm.reg.
+  def _render(params, operands):
+    if params['modrm'] is None:
+      ret = vex_reg(params, 1, operands['rd'], 0, operands['ra'])
+    else:
+      ret = vex_reg(params, 1, None, vex_num(operands['rd']), operands['ra'])
+    return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_mem128(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('rv'), mem128_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 1, operands['rd'], vex_num(operands['rv']), operands['mem128'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_mem128_imm8(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('rv'), mem128_t, imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    ret = vex_memref(params, 1, operands['rd'], vex_num(operands['rv']), operands['mem128'])
+    if ret is not None:
+      return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_mem256(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('rv'), mem256_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 1, operands['rd'], vex_num(operands['rv']), operands['mem256'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_mem256_imm8(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('rv'), mem256_t, imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    ret = vex_memref(params, 1, operands['rd'], vex_num(operands['rv']), operands['mem256'])
+    if ret is not None:
+      return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_xmm(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('rv'), xmm_t('ra'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 1, operands['rd'], vex_num(operands['rv']), operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_xmm_imm8(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('rv'), xmm_t('ra'), imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 1, operands['rd'], vex_num(operands['rv']), operands['ra']) + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_ymm(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('rv'), ymm_t('ra'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 1, operands['rd'], vex_num(operands['rv']), operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_ymm_ymm_ymm_imm8(MachineInstruction):
+  signature = (ymm_t('rd'), ymm_t('rv'), ymm_t('ra'), imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 1, operands['rd'], vex_num(operands['rv']), operands['ra']) + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+# ------------------------------
+# BMI Machine Instructions
+# ------------------------------
+
+# BMI1/BMI2 instructions are VEX-encoded, operating on general purpose
+# registers; VEX.W selects 64-bit operands (set in the dispatch params).
+
+class vex_reg32_mem32(MachineInstruction):
+  signature = (reg32_t, mem32_t)
+  opt_kw = ()
+
+  # rd is encoded in VEX.vvvv; params['modrm'] has the opcode extension
+  def _render(params, operands):
+    return vex_memref(params, 0, None, vex_num(operands['reg32']), operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_reg32_mem32_imm8(MachineInstruction):
+  signature = (reg32_t, mem32_t, imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    ret = vex_memref(params, 0, operands['reg32'], 0, operands['mem32'])
+    if ret is not None:
+      return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_reg32_mem32_reg32(MachineInstruction):
+  signature = (reg32_t('rd'), mem32_t, reg32_t('rv'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['rd'], vex_num(operands['rv']), operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_reg32_reg32(MachineInstruction):
+  signature = (reg32_t('rd'), reg32_t('ra'))
+  opt_kw = ()
+
+  # rd is encoded in VEX.vvvv; params['modrm'] has the opcode extension
+  def _render(params, operands):
+    return vex_reg(params, 0, None, vex_num(operands['rd']), operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_reg32_reg32_imm8(MachineInstruction):
+  signature = (reg32_t('rd'), reg32_t('ra'), imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], 0, operands['ra']) + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_reg32_reg32_mem32(MachineInstruction):
+  signature = (reg32_t('rd'), reg32_t('rv'), mem32_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['rd'], vex_num(operands['rv']), operands['mem32'])
+  render = staticmethod(_render)
+
+
+class vex_reg32_reg32_reg32(MachineInstruction):
+  signature = (reg32_t('rd'), reg32_t('rv'), reg32_t('ra'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], vex_num(operands['rv']), operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_reg32_reg32_reg32_rev(MachineInstruction):
+  signature = (reg32_t('rd'), reg32_t('ra'), reg32_t('rv'))
+  opt_kw = ()
+
+  # The last operand is encoded in VEX.vvvv, the second in modrm.rm
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], vex_num(operands['rv']), operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_reg64_mem64(MachineInstruction):
+  signature = (reg64_t, mem64_t)
+  opt_kw = ()
+
+  # rd is encoded in VEX.vvvv; params['modrm'] has the opcode extension
+  def _render(params, operands):
+    return vex_memref(params, 0, None, vex_num(operands['reg64']), operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_reg64_mem64_imm8(MachineInstruction):
+  signature = (reg64_t, mem64_t, imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    ret = vex_memref(params, 0, operands['reg64'], 0, operands['mem64'])
+    if ret is not None:
+      return ret + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_reg64_mem64_reg64(MachineInstruction):
+  signature = (reg64_t('rd'), mem64_t, reg64_t('rv'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['rd'], vex_num(operands['rv']), operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_reg64_reg64(MachineInstruction):
+  signature = (reg64_t('rd'), reg64_t('ra'))
+  opt_kw = ()
+
+  # rd is encoded in VEX.vvvv; params['modrm'] has the opcode extension
+  def _render(params, operands):
+    return vex_reg(params, 0, None, vex_num(operands['rd']), operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_reg64_reg64_imm8(MachineInstruction):
+  signature = (reg64_t('rd'), reg64_t('ra'), imm8_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], 0, operands['ra']) + w8(operands['imm8'])
+  render = staticmethod(_render)
+
+
+class vex_reg64_reg64_mem64(MachineInstruction):
+  signature = (reg64_t('rd'), reg64_t('rv'), mem64_t)
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_memref(params, 0, operands['rd'], vex_num(operands['rv']), operands['mem64'])
+  render = staticmethod(_render)
+
+
+class vex_reg64_reg64_reg64(MachineInstruction):
+  signature = (reg64_t('rd'), reg64_t('rv'), reg64_t('ra'))
+  opt_kw = ()
+
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], vex_num(operands['rv']), operands['ra'])
+  render = staticmethod(_render)
+
+
+class vex_reg64_reg64_reg64_rev(MachineInstruction):
+  signature = (reg64_t('rd'), reg64_t('ra'), reg64_t('rv'))
+  opt_kw = ()
+
+  # The last operand is encoded in VEX.vvvv, the second in modrm.rm
+  def _render(params, operands):
+    return vex_reg(params, 0, operands['rd'], vex_num(operands['rv']), operands['ra'])
+  render = staticmethod(_render)
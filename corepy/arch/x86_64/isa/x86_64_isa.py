@@ -112,6 +112,13 @@ class adc(DispatchInstruction):
     (mem8_reg8,           {'opcode':[0x10],             'modrm':None}),
     (reg8_mem8,           {'opcode':[0x12],             'modrm':None}))
   
+class adcx(DispatchInstruction):
+  dispatch = (
+    (reg64_reg64_rev,     {'opcode':[0x0F, 0x38, 0xF6], 'modrm':None, 'prefix':[0x66]}),
+    (reg64_mem64,         {'opcode':[0x0F, 0x38, 0xF6], 'modrm':None, 'prefix':[0x66]}),
+    (reg32_reg32_rev,     {'opcode':[0x0F, 0x38, 0xF6], 'modrm':None, 'prefix':[0x66]}),
+    (reg32_mem32,         {'opcode':[0x0F, 0x38, 0xF6], 'modrm':None, 'prefix':[0x66]}))
+
 class add(DispatchInstruction):
   dispatch = (
     (reg64_simm8,         {'opcode':[0x83],             'modrm':0x00}),
@@ -145,6 +152,13 @@ class add(DispatchInstruction):
     (mem8_reg8,           {'opcode':[0x00],             'modrm':None}),
     (reg8_mem8,           {'opcode':[0x02],             'modrm':None}))
     
+class adox(DispatchInstruction):
+  dispatch = (
+    (reg64_reg64_rev,     {'opcode':[0x0F, 0x38, 0xF6], 'modrm':None, 'prefix':[0xF3]}),
+    (reg64_mem64,         {'opcode':[0x0F, 0x38, 0xF6], 'modrm':None, 'prefix':[0xF3]}),
+    (reg32_reg32_rev,     {'opcode':[0x0F, 0x38, 0xF6], 'modrm':None, 'prefix':[0xF3]}),
+    (reg32_mem32,         {'opcode':[0x0F, 0x38, 0xF6], 'modrm':None, 'prefix':[0xF3]}))
+
 class and_(DispatchInstruction):
   dispatch = (
     (reg64_simm8,         {'opcode':[0x83],             'modrm':0x20}),
@@ -180,20 +194,20 @@ class and_(DispatchInstruction):
 
 class bsf(DispatchInstruction):
   dispatch = (
-    (reg64_reg64,         {'opcode':[0x0F, 0xBC],       'modrm':None}),
+    (reg64_reg64_rev,     {'opcode':[0x0F, 0xBC],       'modrm':None}),
     (reg64_mem64,         {'opcode':[0x0F, 0xBC],       'modrm':None}),
-    (reg32_reg32,         {'opcode':[0x0F, 0xBC],       'modrm':None}),
+    (reg32_reg32_rev,     {'opcode':[0x0F, 0xBC],       'modrm':None}),
     (reg32_mem32,         {'opcode':[0x0F, 0xBC],       'modrm':None}),
-    (reg16_reg16,         {'opcode':[0x0F, 0xBC],       'modrm':None}),
+    (reg16_reg16_rev,     {'opcode':[0x0F, 0xBC],       'modrm':None}),
     (reg16_mem16,         {'opcode':[0x0F, 0xBC],       'modrm':None}))
     
 class bsr(DispatchInstruction):
   dispatch = (
-    (reg64_reg64,         {'opcode':[0x0F, 0xBD],       'modrm':None}),
+    (reg64_reg64_rev,     {'opcode':[0x0F, 0xBD],       'modrm':None}),
     (reg64_mem64,         {'opcode':[0x0F, 0xBD],       'modrm':None}),
-    (reg32_reg32,         {'opcode':[0x0F, 0xBD],       'modrm':None}),
+    (reg32_reg32_rev,     {'opcode':[0x0F, 0xBD],       'modrm':None}),
     (reg32_mem32,         {'opcode':[0x0F, 0xBD],       'modrm':None}),
-    (reg16_reg16,         {'opcode':[0x0F, 0xBD],       'modrm':None}),
+    (reg16_reg16_rev,     {'opcode':[0x0F, 0xBD],       'modrm':None}),
     (reg16_mem16,         {'opcode':[0x0F, 0xBD],       'modrm':None}))
   
 class bswap(DispatchInstruction):
@@ -654,16 +668,16 @@ class cqo(Instruction):
   
 class crc32(DispatchInstruction):
   dispatch = (
-    (reg64_reg64, {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0xF2]}),
-    (reg64_mem64, {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0xF2]}),
-    (reg64_reg8,  {'opcode':[0x0F, 0x38, 0xF0], 'modrm':None, 'prefix':[0xF2]}),
-    (reg64_mem8,  {'opcode':[0x0F, 0x38, 0xF0], 'modrm':None, 'prefix':[0xF2]}),
-    (reg32_reg32, {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0xF2]}),
-    (reg32_mem32, {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0xF2]}),
-    (reg32_reg16, {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0x66, 0xF2]}),
-    (reg32_mem16, {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0x66, 0xF2]}),
-    (reg32_reg8,  {'opcode':[0x0F, 0x38, 0xF0], 'modrm':None, 'prefix':[0xF2]}),
-    (reg32_mem8,  {'opcode':[0x0F, 0x38, 0xF0], 'modrm':None, 'prefix':[0xF2]}))
+    (reg64_reg64_rev, {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0xF2]}),
+    (reg64_mem64,     {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0xF2]}),
+    (reg64_reg8,      {'opcode':[0x0F, 0x38, 0xF0], 'modrm':None, 'prefix':[0xF2]}),
+    (reg64_mem8,      {'opcode':[0x0F, 0x38, 0xF0], 'modrm':None, 'prefix':[0xF2]}),
+    (reg32_reg32_rev, {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0xF2]}),
+    (reg32_mem32,     {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0xF2]}),
+    (reg32_reg16,     {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0x66, 0xF2]}),
+    (reg32_mem16,     {'opcode':[0x0F, 0x38, 0xF1], 'modrm':None, 'prefix':[0x66, 0xF2]}),
+    (reg32_reg8,      {'opcode':[0x0F, 0x38, 0xF0], 'modrm':None, 'prefix':[0xF2]}),
+    (reg32_mem8,      {'opcode':[0x0F, 0x38, 0xF0], 'modrm':None, 'prefix':[0xF2]}))
   
 class cwd(Instruction):
   machine_inst = no_op
@@ -1095,12 +1109,12 @@ class loopz(DispatchInstruction):
 
 class lzcnt(DispatchInstruction):
   dispatch = (
-    (reg64_reg64, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
-    (reg64_mem64, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
-    (reg32_reg32, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
-    (reg32_mem32, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
-    (reg16_reg16, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
-    (reg16_mem16, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}))
+    (reg64_reg64_rev, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
+    (reg64_mem64,     {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
+    (reg32_reg32_rev, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
+    (reg32_mem32,     {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
+    (reg16_reg16_rev, {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}),
+    (reg16_mem16,     {'opcode':[0x0F, 0xBD], 'modrm':None, 'prefix':[0xF3]}))
             
 class mfence(Instruction):
   machine_inst = no_op
@@ -1109,8 +1123,8 @@ class mfence(Instruction):
 class mov(DispatchInstruction):
   dispatch = (
     # TODO - implement moffset* operands!
-    (reg64_imm32,         {'opcode':[0xC7],             'modrm':0x00}),
-    (mem64_imm32,         {'opcode':[0xC7],             'modrm':0x00}),
+    (reg64_simm32,        {'opcode':[0xC7],             'modrm':0x00}),
+    (mem64_simm32,        {'opcode':[0xC7],             'modrm':0x00}),
     (reg64_imm64,         {'opcode':[0xB8],             'modrm':None}),
     (reg64_reg64,         {'opcode':[0x89],             'modrm':None}),
     (mem64_reg64,         {'opcode':[0x89],             'modrm':None}),
@@ -1290,11 +1304,11 @@ class pop(DispatchInstruction):
     
 class popcnt(DispatchInstruction):
   dispatch = (
-    (reg64_reg64,       {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}),
+    (reg64_reg64_rev,   {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}),
     (reg64_mem64,       {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}),
-    (reg32_reg32,       {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}),
+    (reg32_reg32_rev,   {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}),
     (reg32_mem32,       {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}),
-    (reg16_reg16,       {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}),
+    (reg16_reg16_rev,   {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}),
     (reg16_mem16,       {'opcode':[0x0F, 0xB8], 'modrm':None, 'prefix':[0xF3]}))
   
 class popf(Instruction):
@@ -1894,6 +1908,15 @@ class test(DispatchInstruction):
     (reg8_reg8,           {'opcode':[0x84],             'modrm':None}),
     (mem8_reg8,           {'opcode':[0x84],             'modrm':None}))
     
+class tzcnt(DispatchInstruction):
+  dispatch = (
+    (reg64_reg64_rev,     {'opcode':[0x0F, 0xBC], 'modrm':None, 'prefix':[0xF3]}),
+    (reg64_mem64,         {'opcode':[0x0F, 0xBC], 'modrm':None, 'prefix':[0xF3]}),
+    (reg32_reg32_rev,     {'opcode':[0x0F, 0xBC], 'modrm':None, 'prefix':[0xF3]}),
+    (reg32_mem32,         {'opcode':[0x0F, 0xBC], 'modrm':None, 'prefix':[0xF3]}),
+    (reg16_reg16_rev,     {'opcode':[0x0F, 0xBC], 'modrm':None, 'prefix':[0xF3]}),
+    (reg16_mem16,         {'opcode':[0x0F, 0xBC], 'modrm':None, 'prefix':[0xF3]}))
+
 class ud2(Instruction):
   machine_inst = no_op
   params = {'opcode':[0x0F, 0x0B],       'modrm':None}
@@ -1930,6 +1953,10 @@ class xchg(DispatchInstruction):
     (mem8_reg8,           {'opcode':[0x86],             'modrm':None}),
     (reg8_mem8,           {'opcode':[0x86],             'modrm':None}))
     
+class xgetbv(Instruction):
+  machine_inst = no_op
+  params = {'opcode':[0x0F, 0x01, 0xD0], 'modrm':None}
+  
 class xlatb(Instruction):
   machine_inst = no_op
   params = {'opcode':[0xD7],             'modrm':None}
@@ -2784,17 +2811,8 @@ class cvtsd2ss(DispatchInstruction):
 
 class cvtsi2sd(DispatchInstruction):
   dispatch = (
+    # xmm_mem64 does not set REX.W, so there is no 64bit memory form here
     (xmm_reg64,      {'opcode':[0x0F, 0x2A], 'modrm':None, 'prefix':[0xF2]}),
-    (xmm_mem64,      {'opcode':[0x0F, 0x2A], 'modrm':None, 'prefix':[0xF2]}),
-    (xmm_reg32,      {'opcode':[0x0F, 0x2A], 'modrm':None, 'prefix':[0xF2]}),
-    (xmm_mem32,      {'opcode':[0x0F, 0x2A], 'modrm':None, 'prefix':[0xF2]}))
-  arch_ext = 2
-
-class cvtsi2sd(DispatchInstruction):
-  dispatch = (
-    # TODO - reg64 version defined by intel manuals but not AMD
-    #(xmm_reg64,      {'opcode':[0x0F, 0x2A], 'modrm':None, 'prefix':[0xF2]}),
-    #(xmm_mem64,      {'opcode':[0x0F, 0x2A], 'modrm':None, 'prefix':[0xF2]}),
     (xmm_reg32,      {'opcode':[0x0F, 0x2A], 'modrm':None, 'prefix':[0xF2]}),
     (xmm_mem32,      {'opcode':[0x0F, 0x2A], 'modrm':None, 'prefix':[0xF2]}))
   arch_ext = 2
@@ -4309,3 +4327,1658 @@ class xorps(DispatchInstruction):
     (xmm_mem128, {'opcode':[0x0F, 0x57], 'modrm':None, 'prefix':[]}))
   arch_ext = 1
 
+
+# ------------------------------
+# BMI1/BMI2 Instructions
+# ------------------------------
+
+# VEX-encoded bit manipulation on general purpose registers.  tzcnt, adcx
+# and adox use legacy encodings and are with the other general purpose
+# instructions.
+
+class andn(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64, {'opcode':[0xF2], 'modrm':None, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg64_reg64_mem64, {'opcode':[0xF2], 'modrm':None, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg32_reg32_reg32, {'opcode':[0xF2], 'modrm':None, 'map':2, 'pp':0, 'W':0}),
+    (vex_reg32_reg32_mem32, {'opcode':[0xF2], 'modrm':None, 'map':2, 'pp':0, 'W':0}))
+
+class bextr(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64_rev, {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg64_mem64_reg64,     {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg32_reg32_reg32_rev, {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':0, 'W':0}),
+    (vex_reg32_mem32_reg32,     {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':0, 'W':0}))
+
+class blsi(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64, {'opcode':[0xF3], 'modrm':0x18, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg64_mem64, {'opcode':[0xF3], 'modrm':0x18, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg32_reg32, {'opcode':[0xF3], 'modrm':0x18, 'map':2, 'pp':0, 'W':0}),
+    (vex_reg32_mem32, {'opcode':[0xF3], 'modrm':0x18, 'map':2, 'pp':0, 'W':0}))
+
+class blsmsk(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64, {'opcode':[0xF3], 'modrm':0x10, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg64_mem64, {'opcode':[0xF3], 'modrm':0x10, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg32_reg32, {'opcode':[0xF3], 'modrm':0x10, 'map':2, 'pp':0, 'W':0}),
+    (vex_reg32_mem32, {'opcode':[0xF3], 'modrm':0x10, 'map':2, 'pp':0, 'W':0}))
+
+class blsr(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64, {'opcode':[0xF3], 'modrm':0x08, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg64_mem64, {'opcode':[0xF3], 'modrm':0x08, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg32_reg32, {'opcode':[0xF3], 'modrm':0x08, 'map':2, 'pp':0, 'W':0}),
+    (vex_reg32_mem32, {'opcode':[0xF3], 'modrm':0x08, 'map':2, 'pp':0, 'W':0}))
+
+class bzhi(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64_rev, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg64_mem64_reg64,     {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':0, 'W':1}),
+    (vex_reg32_reg32_reg32_rev, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':0, 'W':0}),
+    (vex_reg32_mem32_reg32,     {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':0, 'W':0}))
+
+class mulx(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64, {'opcode':[0xF6], 'modrm':None, 'map':2, 'pp':3, 'W':1}),
+    (vex_reg64_reg64_mem64, {'opcode':[0xF6], 'modrm':None, 'map':2, 'pp':3, 'W':1}),
+    (vex_reg32_reg32_reg32, {'opcode':[0xF6], 'modrm':None, 'map':2, 'pp':3, 'W':0}),
+    (vex_reg32_reg32_mem32, {'opcode':[0xF6], 'modrm':None, 'map':2, 'pp':3, 'W':0}))
+
+class pdep(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':3, 'W':1}),
+    (vex_reg64_reg64_mem64, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':3, 'W':1}),
+    (vex_reg32_reg32_reg32, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':3, 'W':0}),
+    (vex_reg32_reg32_mem32, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':3, 'W':0}))
+
+class pext(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':2, 'W':1}),
+    (vex_reg64_reg64_mem64, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':2, 'W':1}),
+    (vex_reg32_reg32_reg32, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':2, 'W':0}),
+    (vex_reg32_reg32_mem32, {'opcode':[0xF5], 'modrm':None, 'map':2, 'pp':2, 'W':0}))
+
+class rorx(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_imm8, {'opcode':[0xF0], 'modrm':None, 'map':3, 'pp':3, 'W':1}),
+    (vex_reg64_mem64_imm8, {'opcode':[0xF0], 'modrm':None, 'map':3, 'pp':3, 'W':1}),
+    (vex_reg32_reg32_imm8, {'opcode':[0xF0], 'modrm':None, 'map':3, 'pp':3, 'W':0}),
+    (vex_reg32_mem32_imm8, {'opcode':[0xF0], 'modrm':None, 'map':3, 'pp':3, 'W':0}))
+
+class sarx(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64_rev, {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':2, 'W':1}),
+    (vex_reg64_mem64_reg64,     {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':2, 'W':1}),
+    (vex_reg32_reg32_reg32_rev, {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':2, 'W':0}),
+    (vex_reg32_mem32_reg32,     {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':2, 'W':0}))
+
+class shlx(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64_rev, {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_reg64_mem64_reg64,     {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_reg32_reg32_reg32_rev, {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_reg32_mem32_reg32,     {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+
+class shrx(DispatchInstruction):
+  dispatch = (
+    (vex_reg64_reg64_reg64_rev, {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':3, 'W':1}),
+    (vex_reg64_mem64_reg64,     {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':3, 'W':1}),
+    (vex_reg32_reg32_reg32_rev, {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':3, 'W':0}),
+    (vex_reg32_mem32_reg32,     {'opcode':[0xF7], 'modrm':None, 'map':2, 'pp':3, 'W':0}))
+
+
+# ------------------------------
+# AVX/AVX2/FMA Instructions
+# ------------------------------
+
+# VEX-encoded instructions; see the VEX encoding notes in x86_64_insts.
+# arch_ext is 5 for AVX, 6 for AVX2 and 7 for FMA3.
+
+class vaddpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vaddps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vaddsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vaddss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x58], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vaddsubpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xD0], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xD0], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xD0], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xD0], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vaddsubps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xD0], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xD0], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xD0], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xD0], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vandnpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x55], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x55], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x55], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x55], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vandnps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x55], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x55], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x55], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x55], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vandpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x54], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x54], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x54], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x54], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vandps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x54], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x54], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x54], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x54], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vblendpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm_imm8,    {'opcode':[0x0D], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128_imm8, {'opcode':[0x0D], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0x0D], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0x0D], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vblendps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm_imm8,    {'opcode':[0x0C], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128_imm8, {'opcode':[0x0C], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0x0C], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0x0C], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vbroadcastf128(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_mem128, {'opcode':[0x1A], 'modrm':None, 'map':2, 'pp':1, 'W':0}),)
+  arch_ext = 5
+
+class vbroadcasti128(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_mem128, {'opcode':[0x5A], 'modrm':None, 'map':2, 'pp':1, 'W':0}),)
+  arch_ext = 6
+
+class vbroadcastsd(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_mem64, {'opcode':[0x19], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_xmm,   {'opcode':[0x19], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 5 # and 6
+
+class vbroadcastss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem32, {'opcode':[0x18], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_mem32, {'opcode':[0x18], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm,   {'opcode':[0x18], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_xmm,   {'opcode':[0x18], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 5 # and 6
+
+class vcmppd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm_imm8,    {'opcode':[0xC2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128_imm8, {'opcode':[0xC2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0xC2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0xC2], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vcmpps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm_imm8,    {'opcode':[0xC2], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128_imm8, {'opcode':[0xC2], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0xC2], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0xC2], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vcvtdq2ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vcvtps2dq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vcvttps2dq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x5B], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vdivpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vdivps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vdivsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vdivss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x5E], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vdpps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm_imm8,    {'opcode':[0x40], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128_imm8, {'opcode':[0x40], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0x40], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0x40], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vextractf128(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_ymm_imm8,    {'opcode':[0x19], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_mem128_ymm_imm8, {'opcode':[0x19], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vextracti128(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_ymm_imm8,    {'opcode':[0x39], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_mem128_ymm_imm8, {'opcode':[0x39], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vfmadd132pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x98], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x98], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x98], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x98], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmadd132ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x98], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x98], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x98], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x98], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmadd132sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x99], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x99], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmadd132ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x99], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x99], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmadd213pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xA8], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xA8], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xA8], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xA8], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmadd213ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xA8], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xA8], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xA8], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xA8], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmadd213sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xA9], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0xA9], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmadd213ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xA9], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0xA9], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmadd231pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xB8], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xB8], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xB8], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xB8], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmadd231ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xB8], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xB8], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xB8], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xB8], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmadd231sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xB9], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0xB9], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmadd231ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xB9], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0xB9], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmsub132pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x9A], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x9A], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x9A], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x9A], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmsub132ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x9A], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x9A], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x9A], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x9A], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmsub132sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x9B], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x9B], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmsub132ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x9B], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x9B], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmsub213pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xAA], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xAA], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xAA], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xAA], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmsub213ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xAA], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xAA], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xAA], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xAA], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmsub213sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xAB], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0xAB], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmsub213ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xAB], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0xAB], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmsub231pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xBA], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xBA], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xBA], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xBA], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmsub231ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xBA], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xBA], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xBA], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xBA], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfmsub231sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xBB], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0xBB], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfmsub231ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xBB], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0xBB], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmadd132pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x9C], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x9C], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x9C], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x9C], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmadd132ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x9C], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x9C], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x9C], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x9C], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmadd132sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x9D], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x9D], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmadd132ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x9D], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x9D], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmadd213pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xAC], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xAC], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xAC], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xAC], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmadd213ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xAC], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xAC], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xAC], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xAC], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmadd213sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xAD], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0xAD], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmadd213ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xAD], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0xAD], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmadd231pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xBC], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xBC], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xBC], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xBC], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmadd231ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xBC], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xBC], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xBC], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xBC], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmadd231sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xBD], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0xBD], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmadd231ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xBD], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0xBD], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmsub132pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x9E], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x9E], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x9E], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x9E], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmsub132ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x9E], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x9E], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x9E], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x9E], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmsub132sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x9F], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x9F], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmsub132ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x9F], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x9F], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmsub213pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xAE], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xAE], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xAE], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xAE], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmsub213ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xAE], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xAE], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xAE], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xAE], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmsub213sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xAF], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0xAF], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmsub213ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xAF], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0xAF], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmsub231pd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xBE], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xBE], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xBE], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xBE], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmsub231ps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xBE], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xBE], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xBE], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xBE], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vfnmsub231sd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xBF], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem64, {'opcode':[0xBF], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 7
+
+class vfnmsub231ss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0xBF], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0xBF], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 7
+
+class vgatherdpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem64_xmm, {'opcode':[0x92], 'modrm':None, 'map':2, 'pp':1, 'W':1, 'vsib':(128,)}),
+    (vex_ymm_mem64_ymm, {'opcode':[0x92], 'modrm':None, 'map':2, 'pp':1, 'W':1, 'vsib':(128,)}))
+  arch_ext = 6
+
+class vgatherdps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem32_xmm, {'opcode':[0x92], 'modrm':None, 'map':2, 'pp':1, 'W':0, 'vsib':(128,)}),
+    (vex_ymm_mem32_ymm, {'opcode':[0x92], 'modrm':None, 'map':2, 'pp':1, 'W':0, 'vsib':(256,)}))
+  arch_ext = 6
+
+class vgatherqpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem64_xmm, {'opcode':[0x93], 'modrm':None, 'map':2, 'pp':1, 'W':1, 'vsib':(128,)}),
+    (vex_ymm_mem64_ymm, {'opcode':[0x93], 'modrm':None, 'map':2, 'pp':1, 'W':1, 'vsib':(256,)}))
+  arch_ext = 6
+
+class vgatherqps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem32_xmm, {'opcode':[0x93], 'modrm':None, 'map':2, 'pp':1, 'W':0, 'vsib':(128, 256)}),)
+  arch_ext = 6
+
+class vhaddpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x7C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x7C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x7C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x7C], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vhaddps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x7C], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x7C], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x7C], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x7C], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vhsubpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x7D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x7D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x7D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x7D], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vhsubps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x7D], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x7D], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x7D], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x7D], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vinsertf128(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_ymm_xmm_imm8,    {'opcode':[0x18], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128_imm8, {'opcode':[0x18], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vinserti128(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_ymm_xmm_imm8,    {'opcode':[0x38], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128_imm8, {'opcode':[0x38], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vmaskmovpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_mem128, {'opcode':[0x2D], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x2D], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_mem128_xmm_xmm, {'opcode':[0x2F], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_mem256_ymm_ymm, {'opcode':[0x2F], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmaskmovps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_mem128, {'opcode':[0x2C], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x2C], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_mem128_xmm_xmm, {'opcode':[0x2E], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_mem256_ymm_ymm, {'opcode':[0x2E], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmaxpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmaxps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vmaxsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vmaxss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x5F], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vminpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vminps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vminsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vminss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x5D], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vmovapd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x28], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x28], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_mem128_xmm, {'opcode':[0x29], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x28], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x28], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0x29], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmovaps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x28], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x28], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_mem128_xmm, {'opcode':[0x29], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x28], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x28], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0x29], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vmovdqa(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x6F], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x6F], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_mem128_xmm, {'opcode':[0x7F], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x6F], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x6F], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0x7F], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmovdqu(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x6F], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x6F], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_mem128_xmm, {'opcode':[0x7F], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x6F], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x6F], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0x7F], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vmovntdq(DispatchInstruction):
+  dispatch = (
+    (vex_mem128_xmm, {'opcode':[0xE7], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0xE7], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmovntpd(DispatchInstruction):
+  dispatch = (
+    (vex_mem128_xmm, {'opcode':[0x2B], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0x2B], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmovntps(DispatchInstruction):
+  dispatch = (
+    (vex_mem128_xmm, {'opcode':[0x2B], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0x2B], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vmovsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm, {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_mem64,   {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_mem64_xmm,   {'opcode':[0x11], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vmovss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm, {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_mem32,   {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_mem32_xmm,   {'opcode':[0x11], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vmovupd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_mem128_xmm, {'opcode':[0x11], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0x11], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmovups(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_mem128_xmm, {'opcode':[0x11], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x10], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_mem256_ymm, {'opcode':[0x11], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vmulpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vmulps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vmulsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vmulss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x59], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vorpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x56], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x56], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x56], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x56], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vorps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x56], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x56], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x56], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x56], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vpackssdw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x6B], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x6B], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x6B], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x6B], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpackusdw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x2B], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x2B], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x2B], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x2B], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpaddb(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xFC], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xFC], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xFC], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xFC], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpaddd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xFE], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xFE], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xFE], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xFE], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpaddq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xD4], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xD4], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xD4], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xD4], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpaddw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xFD], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xFD], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xFD], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xFD], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpand(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xDB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xDB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xDB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xDB], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpandn(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xDF], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xDF], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xDF], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xDF], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpbroadcastd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,   {'opcode':[0x58], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_mem32, {'opcode':[0x58], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_xmm,   {'opcode':[0x58], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_mem32, {'opcode':[0x58], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vpbroadcastq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,   {'opcode':[0x59], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_mem64, {'opcode':[0x59], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_xmm,   {'opcode':[0x59], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_mem64, {'opcode':[0x59], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vpcmpeqb(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x74], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x74], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x74], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x74], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpcmpeqd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x76], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x76], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x76], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x76], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpcmpeqq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x29], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x29], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x29], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x29], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpcmpeqw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x75], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x75], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x75], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x75], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpcmpgtb(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x64], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x64], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x64], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x64], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpcmpgtd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x66], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x66], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x66], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x66], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpcmpgtq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x37], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x37], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x37], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x37], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpcmpgtw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x65], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x65], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x65], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x65], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vperm2f128(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0x06], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0x06], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vperm2i128(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0x46], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0x46], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vpermd(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_ymm_ymm,    {'opcode':[0x36], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x36], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vpermilpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,    {'opcode':[0x05], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_xmm_mem128_imm8, {'opcode':[0x05], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,    {'opcode':[0x05], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_mem256_imm8, {'opcode':[0x05], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vpermilps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,    {'opcode':[0x04], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_xmm_mem128_imm8, {'opcode':[0x04], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,    {'opcode':[0x04], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_mem256_imm8, {'opcode':[0x04], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vpermpd(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_ymm_imm8,    {'opcode':[0x01], 'modrm':None, 'map':3, 'pp':1, 'W':1}),
+    (vex_ymm_mem256_imm8, {'opcode':[0x01], 'modrm':None, 'map':3, 'pp':1, 'W':1}))
+  arch_ext = 6
+
+class vpermps(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_ymm_ymm,    {'opcode':[0x16], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x16], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vpermq(DispatchInstruction):
+  dispatch = (
+    (vex_ymm_ymm_imm8,    {'opcode':[0x00], 'modrm':None, 'map':3, 'pp':1, 'W':1}),
+    (vex_ymm_mem256_imm8, {'opcode':[0x00], 'modrm':None, 'map':3, 'pp':1, 'W':1}))
+  arch_ext = 6
+
+class vpgatherdd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem32_xmm, {'opcode':[0x90], 'modrm':None, 'map':2, 'pp':1, 'W':0, 'vsib':(128,)}),
+    (vex_ymm_mem32_ymm, {'opcode':[0x90], 'modrm':None, 'map':2, 'pp':1, 'W':0, 'vsib':(256,)}))
+  arch_ext = 6
+
+class vpgatherdq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem64_xmm, {'opcode':[0x90], 'modrm':None, 'map':2, 'pp':1, 'W':1, 'vsib':(128,)}),
+    (vex_ymm_mem64_ymm, {'opcode':[0x90], 'modrm':None, 'map':2, 'pp':1, 'W':1, 'vsib':(128,)}))
+  arch_ext = 6
+
+class vpgatherqd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem32_xmm, {'opcode':[0x91], 'modrm':None, 'map':2, 'pp':1, 'W':0, 'vsib':(128, 256)}),)
+  arch_ext = 6
+
+class vpgatherqq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_mem64_xmm, {'opcode':[0x91], 'modrm':None, 'map':2, 'pp':1, 'W':1, 'vsib':(128,)}),
+    (vex_ymm_mem64_ymm, {'opcode':[0x91], 'modrm':None, 'map':2, 'pp':1, 'W':1, 'vsib':(256,)}))
+  arch_ext = 6
+
+class vpmaxsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x3D], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x3D], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x3D], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x3D], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpmaxud(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x3F], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x3F], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x3F], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x3F], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpminsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x39], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x39], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x39], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x39], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpminud(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x3B], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x3B], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x3B], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x3B], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpmuldq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x28], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x28], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x28], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x28], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpmulld(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x40], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x40], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x40], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x40], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpmullw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xD5], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xD5], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xD5], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xD5], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpmuludq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xF4], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xF4], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xF4], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xF4], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpor(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xEB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xEB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xEB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xEB], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpshufb(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x00], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x00], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x00], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x00], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpshufd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,    {'opcode':[0x70], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_mem128_imm8, {'opcode':[0x70], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,    {'opcode':[0x70], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_mem256_imm8, {'opcode':[0x70], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpslld(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,   {'opcode':[0x72], 'modrm':0x30, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_xmm,    {'opcode':[0xF2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xF2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,   {'opcode':[0x72], 'modrm':0x30, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_xmm,    {'opcode':[0xF2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128, {'opcode':[0xF2], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsllq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,   {'opcode':[0x73], 'modrm':0x30, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_xmm,    {'opcode':[0xF3], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xF3], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,   {'opcode':[0x73], 'modrm':0x30, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_xmm,    {'opcode':[0xF3], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128, {'opcode':[0xF3], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsllvd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x47], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x47], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x47], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x47], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vpsllvq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x47], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x47], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x47], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x47], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 6
+
+class vpsllw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,   {'opcode':[0x71], 'modrm':0x30, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_xmm,    {'opcode':[0xF1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xF1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,   {'opcode':[0x71], 'modrm':0x30, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_xmm,    {'opcode':[0xF1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128, {'opcode':[0xF1], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsrad(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,   {'opcode':[0x72], 'modrm':0x20, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_xmm,    {'opcode':[0xE2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xE2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,   {'opcode':[0x72], 'modrm':0x20, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_xmm,    {'opcode':[0xE2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128, {'opcode':[0xE2], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsravd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x46], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x46], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x46], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x46], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vpsraw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,   {'opcode':[0x71], 'modrm':0x20, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_xmm,    {'opcode':[0xE1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xE1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,   {'opcode':[0x71], 'modrm':0x20, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_xmm,    {'opcode':[0xE1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128, {'opcode':[0xE1], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsrld(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,   {'opcode':[0x72], 'modrm':0x10, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_xmm,    {'opcode':[0xD2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xD2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,   {'opcode':[0x72], 'modrm':0x10, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_xmm,    {'opcode':[0xD2], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128, {'opcode':[0xD2], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsrlq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,   {'opcode':[0x73], 'modrm':0x10, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_xmm,    {'opcode':[0xD3], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xD3], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,   {'opcode':[0x73], 'modrm':0x10, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_xmm,    {'opcode':[0xD3], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128, {'opcode':[0xD3], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsrlvd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x45], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x45], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x45], 'modrm':None, 'map':2, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x45], 'modrm':None, 'map':2, 'pp':1, 'W':0}))
+  arch_ext = 6
+
+class vpsrlvq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x45], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x45], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x45], 'modrm':None, 'map':2, 'pp':1, 'W':1}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x45], 'modrm':None, 'map':2, 'pp':1, 'W':1}))
+  arch_ext = 6
+
+class vpsrlw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,   {'opcode':[0x71], 'modrm':0x10, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_xmm,    {'opcode':[0xD1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xD1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,   {'opcode':[0x71], 'modrm':0x10, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_xmm,    {'opcode':[0xD1], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem128, {'opcode':[0xD1], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsubb(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xF8], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xF8], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xF8], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xF8], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsubd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xFA], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xFA], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xFA], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xFA], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsubq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xFB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xFB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xFB], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xFB], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpsubw(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xF9], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xF9], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xF9], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xF9], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpunpckhdq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x6A], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x6A], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x6A], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x6A], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpunpckhqdq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x6D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x6D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x6D], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x6D], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpunpckldq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x62], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x62], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x62], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x62], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpunpcklqdq(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x6C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x6C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x6C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x6C], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vpxor(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0xEF], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0xEF], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0xEF], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0xEF], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 6 # and 5
+
+class vrcpps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x53], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x53], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x53], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x53], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vroundpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,    {'opcode':[0x09], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_xmm_mem128_imm8, {'opcode':[0x09], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,    {'opcode':[0x09], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_mem256_imm8, {'opcode':[0x09], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vroundps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_imm8,    {'opcode':[0x08], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_xmm_mem128_imm8, {'opcode':[0x08], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_imm8,    {'opcode':[0x08], 'modrm':None, 'map':3, 'pp':1, 'W':0}),
+    (vex_ymm_mem256_imm8, {'opcode':[0x08], 'modrm':None, 'map':3, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vrsqrtps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x52], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x52], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x52], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x52], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vshufpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm_imm8,    {'opcode':[0xC6], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128_imm8, {'opcode':[0xC6], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0xC6], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0xC6], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vshufps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm_imm8,    {'opcode':[0xC6], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128_imm8, {'opcode':[0xC6], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm_imm8,    {'opcode':[0xC6], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256_imm8, {'opcode':[0xC6], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vsqrtpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vsqrtps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm,    {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_mem128, {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm,    {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_mem256, {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vsqrtsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vsqrtss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x51], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vsubpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vsubps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vsubsd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':3, 'W':0}),
+    (vex_xmm_xmm_mem64, {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':3, 'W':0}))
+  arch_ext = 5
+
+class vsubss(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,   {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':2, 'W':0}),
+    (vex_xmm_xmm_mem32, {'opcode':[0x5C], 'modrm':None, 'map':1, 'pp':2, 'W':0}))
+  arch_ext = 5
+
+class vunpckhpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x15], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x15], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x15], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x15], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vunpckhps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x15], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x15], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x15], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x15], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vunpcklpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x14], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x14], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x14], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x14], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vunpcklps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x14], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x14], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x14], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x14], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vxorpd(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x57], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x57], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x57], 'modrm':None, 'map':1, 'pp':1, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x57], 'modrm':None, 'map':1, 'pp':1, 'W':0}))
+  arch_ext = 5
+
+class vxorps(DispatchInstruction):
+  dispatch = (
+    (vex_xmm_xmm_xmm,    {'opcode':[0x57], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_xmm_xmm_mem128, {'opcode':[0x57], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_ymm,    {'opcode':[0x57], 'modrm':None, 'map':1, 'pp':0, 'W':0}),
+    (vex_ymm_ymm_mem256, {'opcode':[0x57], 'modrm':None, 'map':1, 'pp':0, 'W':0}))
+  arch_ext = 5
+
+class vzeroall(Instruction):
+  machine_inst = vex_no_op
+  params = {'opcode':[0x77], 'modrm':None, 'map':1, 'pp':0, 'W':0, 'L':1}
+  arch_ext = 5
+
+class vzeroupper(Instruction):
+  machine_inst = vex_no_op
+  params = {'opcode':[0x77], 'modrm':None, 'map':1, 'pp':0, 'W':0, 'L':0}
+  arch_ext = 5
+
+
+# ------------------------------
+# Latencies
+# ------------------------------
+
+# Every instruction class has a cycles attribute, (latency, reciprocal
+# throughput): the cycles until a result can be used, and the cycles
+# between issuing two of the same instruction.  These are typical of recent
+# Intel and AMD cores, for register operands; a memory source adds the load
+# latency.  The instruction scheduler (corepy.arch.x86_64.lib.isched) uses
+# them to order independent instructions.
+#
+# Instructions listed here without a 'v' also set the VEX version.
+
+_cycles = (
+  (3, 1,    'imul mul popcnt lzcnt tzcnt bsf bsr crc32 pdep pext shld shrd'),
+  (4, 1,    'mulx'),
+  (26, 6,   'div idiv'),
+  (4, 0.5,  'addss addsd addps addpd subss subsd subps subpd mulss mulsd '
+            'mulps mulpd minss minsd minps minpd maxss maxsd maxps maxpd '
+            'cmpss cmpsd cmpps cmppd addsubps addsubpd cvtdq2ps cvtps2dq '
+            'cvttps2dq'),
+  (4, 0.5,  'vfmadd132ps vfmadd213ps vfmadd231ps vfmadd132pd vfmadd213pd '
+            'vfmadd231pd vfmadd132ss vfmadd213ss vfmadd231ss vfmadd132sd '
+            'vfmadd213sd vfmadd231sd vfmsub132ps vfmsub213ps vfmsub231ps '
+            'vfmsub132pd vfmsub213pd vfmsub231pd vfnmadd132ps vfnmadd213ps '
+            'vfnmadd231ps vfnmadd132pd vfnmadd213pd vfnmadd231pd'),
+  (11, 3,   'divss divps'),
+  (13, 4,   'divsd divpd'),
+  (12, 3,   'sqrtss sqrtps'),
+  (16, 6,   'sqrtsd sqrtpd'),
+  (4, 1,    'rcpss rcpps rsqrtss rsqrtps'),
+  (5, 1,    'cvtsi2sd cvtss2si cvtsd2si cvttss2si cvttsd2si '
+            'cvtss2sd cvtsd2ss cvtps2pd cvtpd2ps cvtdq2pd cvtpd2dq '
+            'cvttpd2dq'),
+  (8, 1,    'roundss roundsd roundps roundpd'),
+  (6, 2,    'haddps haddpd hsubps hsubpd phaddw phaddd phsubw phsubd'),
+  (13, 2,   'dpps'),
+  (9, 1,    'dppd'),
+  (5, 0.5,  'pmullw pmulhw pmulhuw pmulhrsw pmuludq pmuldq pmaddwd '
+            'pmaddubsw'),
+  (10, 1,   'pmulld'),
+  (3, 1,    'psadbw mpsadbw ptest pcmpgtq comiss comisd ucomiss ucomisd '
+            'movmskps movmskpd pmovmskb pextrb pextrw pextrd pextrq '
+            'extractps'),
+  (2, 1,    'movd movq pinsrb pinsrw pinsrd pinsrq insertps'),
+  (10, 4,   'pcmpestri pcmpestrm pcmpistri pcmpistrm'),
+  (3, 1,    'vperm2f128 vperm2i128 vpermps vpermd vpermpd vpermq '
+            'vextractf128 vextracti128 vinsertf128 vinserti128 '
+            'vbroadcastss vbroadcastsd vbroadcastf128 vpbroadcastd '
+            'vpbroadcastq'),
+  (20, 5,   'vgatherdps vgatherdpd vgatherqps vgatherqpd vpgatherdd '
+            'vpgatherdq vpgatherqd vpgatherqq'),
+  )
+
+def _set_cycles():
+  isa = globals()
+  for l in isa.values():
+    if (isinstance(l, type) and
+        issubclass(l, (Instruction, DispatchInstruction)) and
+        l not in (Instruction, DispatchInstruction)):
+      l.cycles = (1, 1)
+
+  for (latency, throughput, names) in _cycles:
+    for name in names.split():
+      for n in (name, name + '_', 'v' + name):
+        if isa.has_key(n):
+          isa[n].cycles = (latency, throughput)
+  return
+
+_set_cycles()
@@ -0,0 +1,199 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+__doc__ = """
+Tables of the registers x86_64 instructions read and write, shared by the
+code transformations that need to know an instruction's dependences (the
+synthetic register allocator and the instruction scheduler).
+
+Registers are identified by keys: ('gp', n) for general purpose register n
+(rax = 0 .. r15 = 15) in any size, ('xmm', n) for XMM register n or the
+lower half of YMM register n, and ('ymmhi', n) for the upper half of YMM
+register n.
+
+modes() returns how an instruction accesses each of its explicit operands,
+and IMPLICIT lists the registers instructions use without naming them.
+"""
+
+import corepy.spre.spe as spe
+import corepy.arch.x86_64.lib.memory as memory
+
+
+def inst_name(cls):
+  """Return the mnemonic of an instruction class"""
+  name = cls.__name__
+  if name.endswith('_'):
+    name = name[:-1]
+  return name
+
+
+# ------------------------------
+# Registers
+# ------------------------------
+
+def gp(n):  return ('gp', n)
+def xmm(n): return ('xmm', n)
+
+RAX, RCX, RDX, RBX, RSP, RBP, RSI, RDI = [gp(n) for n in xrange(0, 8)]
+XMM0 = xmm(0)
+
+ALL_XMM = tuple([xmm(n) for n in xrange(0, 16)])
+ALL_YMMHI = tuple([('ymmhi', n) for n in xrange(0, 16)])
+ARG_REGS = (RDI, RSI, RDX, RCX, gp(8), gp(9))
+CALLER_SAVED = (RAX, RCX, RDX, RSI, RDI, gp(8), gp(9), gp(10),
+                gp(11)) + ALL_XMM + ALL_YMMHI
+
+# Registers used and defined implicitly: name -> (uses, defs)
+IMPLICIT = {
+  'div':        ((RAX, RDX), (RAX, RDX)),
+  'idiv':       ((RAX, RDX), (RAX, RDX)),
+  'mul':        ((RAX,), (RAX, RDX)),
+  'cbw':        ((RAX,), (RAX,)),
+  'cwde':       ((RAX,), (RAX,)),
+  'cdqe':       ((RAX,), (RAX,)),
+  'cwd':        ((RAX,), (RDX,)),
+  'cdq':        ((RAX,), (RDX,)),
+  'cqo':        ((RAX,), (RDX,)),
+  'cpuid':      ((RAX, RCX), (RAX, RBX, RCX, RDX)),
+  'rdtsc':      ((), (RAX, RDX)),
+  'rdtscp':     ((), (RAX, RCX, RDX)),
+  'xgetbv':     ((RCX,), (RAX, RDX)),
+  'mulx':       ((RDX,), ()),
+  'cmpxchg':    ((RAX,), (RAX,)),
+  'cmpxchg8b':  ((RAX, RBX, RCX, RDX), (RAX, RDX)),
+  'cmpxchg16b': ((RAX, RBX, RCX, RDX), (RAX, RDX)),
+  'loop':       ((RCX,), (RCX,)),
+  'loope':      ((RCX,), (RCX,)),
+  'loopne':     ((RCX,), (RCX,)),
+  'loopnz':     ((RCX,), (RCX,)),
+  'loopz':      ((RCX,), (RCX,)),
+  'jrcxz':      ((RCX,), ()),
+  'jecxz':      ((RCX,), ()),
+  'xlatb':      ((RAX, RBX), (RAX,)),
+  'maskmovdqu': ((RDI,), ()),
+  'maskmovq':   ((RDI,), ()),
+  'pcmpestri':  ((RAX, RDX), (RCX,)),
+  'pcmpestrm':  ((RAX, RDX), (XMM0,)),
+  'pcmpistri':  ((), (RCX,)),
+  'pcmpistrm':  ((), (XMM0,)),
+  'blendvpd':   ((XMM0,), ()),
+  'blendvps':   ((XMM0,), ()),
+  'pblendvb':   ((XMM0,), ()),
+  'call':       (ARG_REGS, CALLER_SAVED),
+  'ret':        ((RAX, XMM0), ()),
+  'vzeroupper': ((), ALL_YMMHI),
+  'vzeroall':   ((), ALL_XMM + ALL_YMMHI),
+  }
+
+for _n in ('b', 'w', 'd', 'q'):
+  IMPLICIT['lods' + _n] = ((RSI,), (RSI, RAX))
+  IMPLICIT['stos' + _n] = ((RDI, RAX), (RDI,))
+  IMPLICIT['scas' + _n] = ((RDI, RAX), (RDI,))
+  if _n != 'd':
+    # movsd and cmpsd are the SSE instructions
+    IMPLICIT['movs' + _n] = ((RSI, RDI), (RSI, RDI))
+    IMPLICIT['cmps' + _n] = ((RSI, RDI), (RSI, RDI))
+
+
+# ------------------------------
+# Operand access
+# ------------------------------
+
+# Instructions that write their first operand without reading it
+WRITE_FIRST = set((
+  'mov', 'movzx', 'movsx', 'movsxd', 'lea', 'pop', 'bsf', 'bsr', 'lzcnt',
+  'tzcnt', 'popcnt', 'movd', 'movq', 'movaps', 'movapd', 'movups', 'movupd',
+  'movdqa', 'movdqu', 'movntdqa', 'lddqu', 'movddup', 'movshdup',
+  'movsldup', 'movmskps', 'movmskpd', 'pmovmskb', 'movq2dq', 'movdq2q',
+  'pshufd', 'pshufhw', 'pshuflw', 'pshufw', 'sqrtps', 'sqrtpd', 'rcpps',
+  'rsqrtps', 'roundps', 'roundpd', 'pabsb', 'pabsw', 'pabsd',
+  'phminposuw', 'extractps', 'pextrb', 'pextrw', 'pextrd', 'pextrq',
+  'cvtdq2pd', 'cvtdq2ps', 'cvtpd2dq', 'cvtpd2pi', 'cvtpd2ps', 'cvtpi2pd',
+  'cvtps2dq', 'cvtps2pd', 'cvtps2pi', 'cvtsd2si', 'cvtss2si', 'cvttpd2dq',
+  'cvttpd2pi', 'cvttps2dq', 'cvttps2pi', 'cvttsd2si', 'cvttss2si',
+  'andn', 'bextr', 'blsi', 'blsmsk', 'blsr', 'bzhi', 'pdep', 'pext',
+  'rorx', 'sarx', 'shlx', 'shrx'))
+
+for _n in ('bw', 'bd', 'bq', 'wd', 'wq', 'dq'):
+  WRITE_FIRST.add('pmovsx' + _n)
+  WRITE_FIRST.add('pmovzx' + _n)
+
+# Instructions that only read their operands
+READ_ONLY = set((
+  'cmp', 'test', 'bt', 'push', 'comiss', 'comisd', 'ucomiss', 'ucomisd',
+  'ptest', 'vptest', 'div', 'idiv', 'mul', 'call', 'clflush', 'prefetch',
+  'prefetchw', 'prefetchnta', 'prefetcht0', 'prefetcht1', 'prefetcht2',
+  'ldmxcsr', 'maskmovdqu', 'maskmovq', 'pcmpestri', 'pcmpestrm',
+  'pcmpistri', 'pcmpistrm', 'vtestps', 'vtestpd'))
+
+# Zeroing idioms: with all operands the same register, nothing is read
+ZERO_IDIOMS = set((
+  'xor', 'sub', 'pxor', 'xorps', 'xorpd', 'psubb', 'psubw', 'psubd',
+  'psubq', 'vpxor', 'vxorps', 'vxorpd', 'vpsubb', 'vpsubw', 'vpsubd',
+  'vpsubq'))
+
+
+def modes(name, ops):
+  """
+  Return how an instruction accesses each operand: 'r', 'w' or 'rw'.
+  Registers in memory operands are always read.
+  """
+  n = len(ops)
+  if n == 0:
+    return []
+
+  first = 'rw'
+  rest = 'r'
+
+  if name in ('xchg', 'xadd'):
+    rest = 'rw'
+  elif name in READ_ONLY or name[0] == 'j' or name.startswith('loop'):
+    first = 'r'
+  elif name in WRITE_FIRST or name.startswith('set'):
+    first = 'w'
+  elif name == 'imul':
+    first = ('r', 'rw', 'w')[min(n, 3) - 1]
+  elif (name in ('movss', 'movsd') and
+        isinstance(ops[-1], memory.MemoryReference)):
+    # Loads clear the upper elements; register moves merge
+    first = 'w'
+  elif name == 'mulx':
+    return ['w', 'w', 'r']
+  elif name.startswith('vgather') or name.startswith('vpgather'):
+    return ['rw', 'r', 'rw']
+  elif name.startswith('vfm') or name.startswith('vfnm'):
+    first = 'rw'
+  elif name[0] == 'v':
+    first = 'w'
+
+  if (name in ZERO_IDIOMS and n > 1 and isinstance(ops[0], spe.Register) and
+      [op for op in ops if op is not ops[0]] == []):
+    return ['w'] * n
+
+  return [first] + [rest] * (n - 1)
+
@@ -0,0 +1,601 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+__doc__ = """
+Optimization of x86_64 Expressions before they are evaluated.
+
+Expressions built from the x86_64 types are turned into a tree of Nodes,
+and code is emitted from the tree.  An ExprOptimizer rewrites the tree as
+it is built:
+
+  - constant folding: operations on literals are done at synthesis time,
+    and identities such as x + 0, x * 1, x & -1 and x - x are removed
+  - reassociation of constants: (x + 3) - 4 is x - 1, (x * 3) * 4 is x * 12
+  - strength reduction: multiplying by 2^k is a shift, by 3, 5 or 9 a lea,
+    by (3, 5 or 9) * 2^k a lea and a shift, and by -1 a neg; multiplying a
+    float by 2.0 is an add
+  - common subexpressions: identical subtrees are evaluated once, into a
+    temporary register
+
+and evaluates the tree in Sethi-Ullman order: of the two operands of an
+operation, the one needing more registers is evaluated first, so fewer
+registers are live at once.
+
+An x86_64 Expression is evaluated through the optimizer set as its
+class's optimizer attribute, and the x86_64 types have one by default:
+
+  x86_64_types.x86_64Expression.optimizer = expropt.ExprOptimizer()
+
+Without an optimizer, an Expression is evaluated as written.  A single
+Expression can be given its own optimizer:
+
+  c.v = opt.optimize(a * 9 + b)
+"""
+
+import struct
+
+import corepy.spre.spe as spe
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.lib.extarray as extarray
+
+_MASK = (1 << 64) - 1
+
+def _wrap(v):
+  """Wrap an integer to a signed 64 bit value"""
+  v &= _MASK
+  if v >> 63:
+    v -= 1 << 64
+  return v
+
+def _single(v):
+  """Round a float to single precision"""
+  return struct.unpack('f', struct.pack('f', v))[0]
+
+def _imm32(v):
+  return -(1 << 31) <= v < (1 << 31)
+
+
+# Instruction -> (function, commutative) for integer operations
+_int_ops = {
+  x86.add:  (lambda a, b: a + b, True),
+  x86.sub:  (lambda a, b: a - b, False),
+  x86.imul: (lambda a, b: a * b, True),
+  x86.and_: (lambda a, b: a & b, True),
+  x86.or_:  (lambda a, b: a | b, True),
+  x86.xor:  (lambda a, b: a ^ b, True),
+  x86.shl:  (lambda a, b: a << (b & 63), False),
+  x86.shr:  (lambda a, b: (a & _MASK) >> (b & 63), False),
+  x86.sar:  (lambda a, b: a >> (b & 63), False),
+  x86.neg:  (lambda a: -a, False),
+  x86.not_: (lambda a: ~a, False),
+  }
+
+# Instruction -> (function, commutative, size) for floating point operations
+_float_ops = {
+  x86.addsd: (lambda a, b: a + b, True, 64),
+  x86.subsd: (lambda a, b: a - b, False, 64),
+  x86.mulsd: (lambda a, b: a * b, True, 64),
+  x86.divsd: (lambda a, b: a / b, False, 64),
+  x86.addss: (lambda a, b: a + b, True, 32),
+  x86.subss: (lambda a, b: a - b, False, 32),
+  x86.mulss: (lambda a, b: a * b, True, 32),
+  x86.divss: (lambda a, b: a / b, False, 32),
+  }
+
+_float_adds = {x86.mulsd: x86.addsd, x86.mulss: x86.addss}
+
+# Operations whose constant operands are folded together: (x op a) op b
+# is x op (a op b)
+_associative = (x86.add, x86.imul, x86.and_, x86.or_, x86.xor)
+
+_shifts = (x86.shl, x86.shr, x86.sar)
+
+
+def _commutative(op):
+  if op in _int_ops:
+    return _int_ops[op][1]
+  elif op in _float_ops:
+    return _float_ops[op][1]
+  return False
+
+
+# ------------------------------
+# Expression trees
+# ------------------------------
+
+class Node(object):
+  """
+  An operation or a leaf of an expression tree.  Leaves hold a register
+  (reg) or a literal (value); operations hold an instruction (op) and
+  their argument Nodes.  lea nodes compute a + a * scale.  rtype is the
+  register type of the value and size its size in bits.
+  """
+
+  def __init__(self, rtype, size, op = None, args = (), reg = None,
+               value = None, scale = None):
+    self.rtype = rtype
+    self.size = size
+    self.op = op
+    self.args = tuple(args)
+    self.reg = reg
+    self.value = value
+    self.scale = scale
+
+    # Number of references from other nodes, register need, and the
+    # register holding the value of a shared node once evaluated
+    self.uses = 0
+    self.need = None
+    self.temp = None
+    return
+
+  def is_const(self):
+    return self.op is None and self.reg is None
+
+  def is_float(self):
+    return self.rtype == 'xmm'
+
+
+class _Builder(object):
+  """
+  Build the Node tree for an Expression, applying the rewrites enabled in
+  opt (an ExprOptimizer, or None for none).
+  """
+
+  def __init__(self, opt = None):
+    self.opt = opt
+    self.share = opt is not None and opt.cse
+    self.nodes = {}
+    return
+
+  def _node(self, key, *args, **kargs):
+    if not self.share:
+      return Node(*args, **kargs)
+    try:
+      return self.nodes[key]
+    except KeyError:
+      node = self.nodes[key] = Node(*args, **kargs)
+      return node
+
+  def leaf(self, rtype, size, reg):
+    return self._node(('reg', reg.name), rtype, size, reg = reg)
+
+  def const(self, rtype, size, value):
+    if rtype == 'xmm':
+      value = float(value)
+      if size == 32:
+        value = _single(value)
+    return self._node(('const', rtype, size, repr(value)), rtype, size,
+                      value = value)
+
+  def op(self, op, args, rtype, size, scale = None):
+    ids = [id(a) for a in args]
+    if _commutative(op):
+      ids.sort()
+    return self._node((op, scale) + tuple(ids), rtype, size, op, args,
+                      scale = scale)
+
+  def build(self, expr, rtype = 'gp64', size = 64):
+    if isinstance(expr, spe.Expression):
+      op = expr._inst
+      rtype = expr.register_type_id
+      size = 64
+      if op in _float_ops:
+        size = _float_ops[op][2]
+      args = [self.build(a, rtype, size) for a in expr._operands]
+      return self.make(op, args, rtype, size)
+    elif isinstance(expr, spe.Variable):
+      return self.leaf(rtype, size, expr.reg)
+    elif isinstance(expr, spe.Register):
+      return self.leaf(rtype, size, expr)
+    return self.const(rtype, size, expr)
+
+  def make(self, op, args, rtype, size):
+    opt = self.opt
+    if opt is not None:
+      if opt.fold:
+        node = self._fold(op, args, rtype, size)
+        if node is not None:
+          return node
+      if opt.strength and op in (x86.imul, x86.mulsd, x86.mulss):
+        node = self._reduce(op, args, rtype, size)
+        if node is not None:
+          return node
+    return self.op(op, args, rtype, size)
+
+  def _fold(self, op, args, rtype, size):
+    count = self.opt._count
+    consts = [a.is_const() for a in args]
+
+    if op in _float_ops:
+      (f, comm, fsize) = _float_ops[op]
+      (a, b) = args
+      if False not in consts:
+        if op in (x86.divsd, x86.divss) and b.value == 0.0:
+          return None
+        count('folded')
+        return self.const(rtype, size, f(a.value, b.value))
+      if comm and a.is_const():
+        (a, b) = (b, a)
+      if b.is_const() and b.value == 1.0 and op in (x86.mulsd, x86.mulss, x86.divsd, x86.divss):
+        count('folded')
+        return a
+      return None
+
+    if op not in _int_ops:
+      return None
+    (f, comm) = _int_ops[op]
+
+    if False not in consts:
+      count('folded')
+      return self.const(rtype, size, _wrap(f(*[a.value for a in args])))
+
+    if len(args) == 1:
+      # neg(neg(x)) and not(not(x)) are x
+      if args[0].op is op:
+        count('folded')
+        return args[0].args[0]
+      return None
+
+    (a, b) = args
+    if comm and a.is_const():
+      (a, b) = (b, a)
+
+    if b.is_const():
+      c = b.value
+      if c == 0 and op in (x86.add, x86.sub, x86.or_, x86.xor) + _shifts:
+        count('folded')
+        return a
+      if c == 0 and op in (x86.imul, x86.and_):
+        count('folded')
+        return self.const(rtype, size, 0)
+      if (c == 1 and op is x86.imul) or (c == -1 and op is x86.and_):
+        count('folded')
+        return a
+      if op is x86.sub:
+        # x - c is x + -c, so the constant can be folded with others
+        return self.make(x86.add, (a, self.const(rtype, size, _wrap(-c))), rtype, size)
+      if op in _associative and a.op is op and a.args[1].is_const():
+        count('folded')
+        c = _wrap(f(a.args[1].value, c))
+        return self.make(op, (a.args[0], self.const(rtype, size, c)), rtype, size)
+
+    elif a is b:
+      if op in (x86.sub, x86.xor):
+        count('folded')
+        return self.const(rtype, size, 0)
+      if op in (x86.and_, x86.or_):
+        count('folded')
+        return a
+
+    return None
+
+  def _reduce(self, op, args, rtype, size):
+    (a, b) = args
+    if not b.is_const():
+      if not a.is_const():
+        return None
+      (a, b) = (b, a)
+    c = b.value
+    count = self.opt._count
+
+    if op in _float_adds:
+      if c == 2.0:
+        count('reduced')
+        return self.op(_float_adds[op], (a, a), rtype, size)
+      return None
+
+    if c == -1:
+      count('reduced')
+      return self.make(x86.neg, (a,), rtype, size)
+    if c <= 1:
+      return None
+
+    k = 0
+    while c % 2 == 0:
+      c //= 2
+      k += 1
+    if c == 1:
+      node = a
+    elif c in (3, 5, 9):
+      node = self.op(x86.lea, (a,), rtype, size, scale = c - 1)
+    else:
+      return None
+
+    count('reduced')
+    if k > 0:
+      node = self.op(x86.shl, (node, self.const(rtype, size, k)), rtype, size)
+    return node
+
+
+def _count_uses(node):
+  node.uses += 1
+  if node.uses == 1:
+    for a in node.args:
+      _count_uses(a)
+  return
+
+
+def _reads(node, reg):
+  """Return True if evaluating node reads the register reg"""
+  if node.temp is not None:
+    return node.temp == reg
+  if node.reg is not None:
+    return node.reg == reg
+  for a in node.args:
+    if _reads(a, reg):
+      return True
+  return False
+
+
+# ------------------------------
+# Evaluation
+# ------------------------------
+
+class _Emitter(object):
+  """
+  Emit the code for a Node tree.  With reorder, operands are evaluated in
+  Sethi-Ullman order, otherwise left to right.  Shared nodes (used more
+  than once) are evaluated once if share is True.
+  """
+
+  def __init__(self, code, reorder = False, share = False, count = None):
+    self.code = code
+    self.prgm = code.prgm
+    self.reorder = reorder
+    self.share = share
+    self.count = count
+    self.shared = []
+    return
+
+  def emit(self, root, target):
+    _count_uses(root)
+    self.value(root, target)
+    for r in self.shared:
+      self.prgm.release_register(r)
+    self.shared = []
+    return
+
+  def _direct(self, node):
+    """Return True if node can be an operand without a register of its own"""
+    if node.temp is not None or node.reg is not None:
+      return True
+    if node.is_const():
+      return node.is_float() or _imm32(node.value)
+    return False
+
+  def _need(self, node):
+    """Number of registers needed to evaluate node into one"""
+    if node.need is None:
+      if node.op is None:
+        node.need = 1
+      elif len(node.args) == 1:
+        node.need = self._need(node.args[0])
+      else:
+        l = self._need(node.args[0])
+        r = 0
+        if not self._direct(node.args[1]):
+          r = self._need(node.args[1])
+        if l == r:
+          node.need = l + 1
+        else:
+          node.need = max(l, r)
+    return node.need
+
+  def move(self, target, reg, node):
+    if target != reg:
+      if node.is_float():
+        self.code.add(x86.movaps(target, reg))
+      else:
+        self.code.add(x86.mov(target, reg))
+    return
+
+  def _float_ref(self, value, size):
+    """
+    Return a memory reference to a float constant and the register
+    holding its address.
+    """
+    storage = extarray.extarray(('f', 'd')[size == 64], [value], align = 16)
+    self.prgm.add_storage(storage)
+    r_addr = self.prgm.acquire_register()
+    self.code.add(x86.mov(r_addr, storage.buffer_info()[0]))
+    return (MemRef(r_addr, data_size = size), r_addr)
+
+  def value(self, node, target):
+    """Emit code leaving the value of node in target"""
+    if self.share and node.uses > 1 and node.op is not None:
+      self.move(target, self._shared(node), node)
+    else:
+      self._compute(node, target)
+    return
+
+  def _shared(self, node):
+    if node.temp is None:
+      temp = self.prgm.acquire_register(node.rtype)
+      self._compute(node, temp)
+      node.temp = temp
+      self.shared.append(temp)
+    elif self.count is not None:
+      self.count('shared')
+    return node.temp
+
+  def operand(self, node, materialize = False):
+    """
+    Return the second operand of an instruction for node, and a register
+    to release after the instruction, or None.  If materialize is True,
+    the operand is always a register other than those in node.
+    """
+    if self.share and node.uses > 1 and node.op is not None and not materialize:
+      return (self._shared(node), None)
+    if not materialize:
+      if node.reg is not None:
+        return (node.reg, None)
+      if node.is_const() and node.is_float():
+        return self._float_ref(node.value, node.size)
+      if node.is_const() and _imm32(node.value):
+        return (node.value, None)
+
+    temp = self.prgm.acquire_register(node.rtype)
+    self.value(node, temp)
+    return (temp, temp)
+
+  def _compute(self, node, t):
+    code = self.code
+
+    if node.op is None:
+      if node.reg is not None:
+        self.move(t, node.reg, node)
+      elif node.is_float():
+        (ref, r_addr) = self._float_ref(node.value, node.size)
+        code.add((x86.movss, x86.movsd)[node.size == 64](t, ref))
+        self.prgm.release_register(r_addr)
+      elif node.value == 0:
+        code.add(x86.xor(t, t))
+      else:
+        code.add(x86.mov(t, node.value))
+      return
+
+    op = node.op
+    if op is x86.lea:
+      a = node.args[0]
+      if (a.reg is not None or a.temp is not None or
+          (self.share and a.uses > 1)):
+        (r, temp) = self.operand(a)
+      else:
+        self.value(a, t)
+        r = t
+      code.add(x86.lea(t, MemRef(r, index = r, scale = node.scale, data_size = None)))
+      return
+
+    if len(node.args) == 1:
+      self.value(node.args[0], t)
+      code.add(op(t))
+      return
+
+    (a, b) = node.args
+    b_first = False
+    if _reads(b, t):
+      if _commutative(op) and not _reads(a, t):
+        (a, b) = (b, a)
+      else:
+        b_first = True
+    elif self.reorder and not self._direct(b) and self._need(b) > self._need(a):
+      b_first = True
+      if self.count is not None:
+        self.count('reordered')
+
+    if b_first:
+      (rb, temp) = self.operand(b, materialize = _reads(b, t))
+      self.value(a, t)
+    else:
+      self.value(a, t)
+      (rb, temp) = self.operand(b)
+
+    if op is x86.imul and isinstance(rb, (int, long)):
+      code.add(x86.imul(t, t, rb))
+    else:
+      code.add(op(t, rb))
+
+    if temp is not None:
+      self.prgm.release_register(temp)
+    return
+
+
+def evaluate(code, expr, target, optimizer = None):
+  """
+  Emit code leaving the value of expr in the register target, optimized
+  by optimizer if it is not None.
+  """
+  if optimizer is None:
+    root = _Builder().build(expr)
+    _Emitter(code).emit(root, target)
+  else:
+    root = _Builder(optimizer).build(expr)
+    _Emitter(code, optimizer.reorder, optimizer.cse, optimizer._count).emit(root, target)
+  return target
+
+
+# ------------------------------
+# Optimizer
+# ------------------------------
+
+class OptimizedExpression(spe.Expression):
+  """
+  An Expression evaluated through an ExprOptimizer.
+  """
+
+  def __init__(self, expr, optimizer):
+    spe.Expression.__init__(self, None)
+    self.expr = expr
+    self.opt = optimizer
+    self.register_type_id = expr.register_type_id
+    return
+
+  def eval(self, code, reg = None):
+    target = reg
+    if target is None:
+      target = code.prgm.acquire_register(self.register_type_id)
+      self._acquired_register = target
+    return evaluate(code, self.expr, target, self.opt)
+
+
+class ExprOptimizer(object):
+  def __init__(self, fold = True, strength = True, cse = True, reorder = True):
+    """
+    Create an optimizer.  The arguments enable constant folding, strength
+    reduction, common subexpression elimination and Sethi-Ullman ordering.
+    """
+    self.fold = fold
+    self.strength = strength
+    self.cse = cse
+    self.reorder = reorder
+
+    # Rewrite name -> number of times applied
+    self.counts = {}
+    return
+
+  def _count(self, name):
+    self.counts[name] = self.counts.get(name, 0) + 1
+    return
+
+  def optimize(self, expr):
+    """
+    Return an Expression that evaluates expr with the optimizations.
+    """
+    return OptimizedExpression(expr, self)
+
+  def report(self):
+    """Return a string listing how often each rewrite applied"""
+    return '\n'.join(["%-24s %d" % (name, self.counts.get(name, 0))
+                      for name in ('folded', 'reduced', 'shared', 'reordered')])
+
+  def reset(self):
+    """Clear the counts"""
+    self.counts = {}
+    return
+
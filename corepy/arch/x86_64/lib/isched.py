@@ -0,0 +1,404 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+__doc__ = """
+List scheduler for x86_64 instruction streams.
+
+Code written in dependence order, e.g. a load followed by the mulsd that
+uses it and the addsd that uses that, makes the processor wait on every
+long latency result.  The scheduler reorders the instructions of each basic
+block so that independent work fills those waits, keeping every register,
+flags and memory dependence of the original order.
+
+Enable it for a program, alone or with other optimizers, and cache_code
+runs it before rendering:
+
+  import corepy.arch.x86_64.lib.isched as isched
+
+  prgm.optimizer = isched.Scheduler()
+  prgm.optimizer = [peephole.Peephole(x86_rules.RULES), isched.Scheduler()]
+
+Latencies come from the cycles attribute of the instruction classes (see
+x86_64_isa).  Blocks end at labels, jumps and instructions with effects
+the scheduler does not model (calls, stack and string instructions,
+fences, locked and x87 instructions, ...); these stay where they are.
+Memory operands are assumed to alias: loads may pass each other, but not
+a store.
+"""
+
+import corepy.spre.spe as spe
+import corepy.arch.x86_64.lib.memory as memory
+import corepy.arch.x86_64.lib.effects as effects
+import corepy.arch.x86_64.types.registers as regs
+
+# Cycles added to the latency of an instruction that reads memory (an L1
+# cache hit)
+LOAD_LATENCY = 4
+
+# Instructions issued per cycle
+ISSUE_WIDTH = 4
+
+
+# ------------------------------
+# Dependences
+# ------------------------------
+
+# Instructions that are not moved, and split blocks
+_BARRIERS = set((
+  'call', 'ret', 'push', 'pop', 'pushf', 'pushfq', 'popf', 'popfq',
+  'enter', 'leave', 'int', 'int_3', 'hlt', 'cpuid', 'rdtsc', 'rdtscp',
+  'xgetbv', 'lfence', 'mfence', 'sfence', 'pause', 'ldmxcsr', 'stmxcsr',
+  'clflush', 'xchg', 'xadd', 'cmpxchg', 'cmpxchg8b', 'cmpxchg16b',
+  'maskmovdqu', 'maskmovq', 'xlatb', 'vzeroupper', 'vzeroall', 'emms'))
+
+# Flags
+_FLAGS = 'flags'
+
+# Instructions that read the flags, besides jcc, setcc and cmovcc
+_FLAG_READERS = set((
+  'adc', 'sbb', 'rcl', 'rcr', 'cmc', 'lahf', 'adcx', 'adox'))
+
+# Instructions that replace all of the flags (some may be undefined)
+_FLAG_WRITERS = set((
+  'add', 'sub', 'cmp', 'test', 'and', 'or', 'xor', 'neg', 'imul', 'mul',
+  'div', 'idiv', 'popcnt', 'lzcnt', 'tzcnt', 'bsf', 'bsr', 'andn', 'bextr',
+  'blsi', 'blsmsk', 'blsr', 'bzhi', 'sahf', 'comiss', 'comisd', 'ucomiss',
+  'ucomisd', 'ptest', 'vptest', 'vtestps', 'vtestpd', 'pcmpestri',
+  'pcmpestrm', 'pcmpistri', 'pcmpistrm'))
+
+# General purpose instructions that leave the flags alone
+_FLAGS_UNCHANGED = set((
+  'mov', 'movzx', 'movsx', 'movsxd', 'movbe', 'lea', 'not', 'bswap', 'nop',
+  'cbw', 'cwde', 'cdqe', 'cwd', 'cdq', 'cqo', 'mulx', 'pdep', 'pext',
+  'rorx', 'sarx', 'shlx', 'shrx', 'prefetch', 'prefetchw', 'prefetchnta',
+  'prefetcht0', 'prefetcht1', 'prefetcht2'))
+
+
+def _is_branch(name):
+  return name[0] == 'j' or name.startswith('loop')
+
+def _condition(name):
+  return (name.startswith('cmov') or name.startswith('set') or
+          (name[0] == 'j' and name not in ('jmp', 'jecxz', 'jrcxz')))
+
+def _is_string(name):
+  # movsd and cmpsd are the SSE instructions
+  return (name[:4] in ('lods', 'stos', 'movs', 'cmps', 'scas') and
+          name in effects.IMPLICIT)
+
+
+def _reg_keys(reg):
+  """Return the keys for the parts of the register file reg occupies"""
+  if isinstance(reg, regs.GPRegister8) and reg.name in ('ah', 'ch', 'dh', 'bh'):
+    return (effects.gp(reg.reg - 4),)
+  elif isinstance(reg, (regs.GPRegister8, regs.GPRegister16,
+                        regs.GPRegister32, regs.GPRegister64)):
+    return (effects.gp(reg.reg + 8 * reg.rex),)
+  elif isinstance(reg, regs.YMMRegister):
+    n = reg.reg + 8 * reg.rex
+    return (effects.xmm(n), ('ymmhi', n))
+  elif isinstance(reg, regs.XMMRegister):
+    return (effects.xmm(reg.reg + 8 * reg.rex),)
+  return ((reg.__class__.__name__, reg.name),)
+
+
+def _dependences(name, inst):
+  """
+  Return the sets of keys an instruction uses and defines, and a string
+  containing 'r' if it reads memory and 'w' if it writes memory.
+  """
+  ops = inst._supplied_operands
+  uses = set()
+  defs = set()
+  mem = ''
+  vector = False
+
+  for (op, mode) in zip(ops, effects.modes(name, ops)):
+    if isinstance(op, memory.MemoryReference):
+      for r in (op.base, op.index):
+        if isinstance(r, spe.Register):
+          uses.update(_reg_keys(r))
+      if name != 'lea' and not name.startswith('prefetch'):
+        mem += mode
+      continue
+    elif not isinstance(op, spe.Register):
+      continue
+
+    keys = _reg_keys(op)
+    if isinstance(op, (regs.GPRegister8, regs.GPRegister16)):
+      # Byte and word writes keep the rest of the register
+      mode = mode.replace('w', 'rw')
+    elif isinstance(op, (regs.XMMRegister, regs.YMMRegister)):
+      vector = True
+      if name[0] == 'v' and 'w' in mode:
+        # VEX writes of XMM registers clear the upper half
+        defs.add(('ymmhi', keys[0][1]))
+
+    if 'r' in mode:
+      uses.update(keys)
+    if 'w' in mode:
+      defs.update(keys)
+
+  implicit = effects.IMPLICIT.get(name)
+  if name == 'imul' and len(ops) == 1:
+    implicit = effects.IMPLICIT['mul']
+  if implicit is not None:
+    uses.update(implicit[0])
+    defs.update(implicit[1])
+
+  if _condition(name) or name in _FLAG_READERS:
+    uses.add(_FLAGS)
+  if name in _FLAG_WRITERS:
+    defs.add(_FLAGS)
+  elif (not vector and not _condition(name) and
+        name not in _FLAGS_UNCHANGED):
+    # Other general purpose instructions may change some of the flags and
+    # keep the rest (inc, dec, shifts, bit tests, ...)
+    uses.add(_FLAGS)
+    defs.add(_FLAGS)
+
+  return (uses, defs, mem)
+
+
+def _is_barrier(name, inst):
+  return (name in _BARRIERS or _is_string(name) or name[0] == 'f' or
+          inst._supplied_koperands.get('lock', False))
+
+
+# ------------------------------
+# Scheduler
+# ------------------------------
+
+class _Node(object):
+  def __init__(self, index, inst, latency, throughput):
+    self.index = index            # position in the original block
+    self.inst = inst
+    self.latency = latency
+    self.throughput = throughput
+    self.succs = []               # (node, cycles) pairs
+    self.npreds = 0
+    self.preds = []               # (node, cycles) pairs
+    self.critpath = 0             # cycles from issue to the end of the block
+    self.cycle = None             # cycle issued
+    return
+
+
+class Scheduler(object):
+  def __init__(self, width = ISSUE_WIDTH, load_latency = LOAD_LATENCY):
+    """
+    Create a scheduler for a processor issuing width instructions per cycle
+    with loads taking load_latency cycles.
+    """
+    self.width = width
+    self.load_latency = load_latency
+
+    # Statistics, summed over every call to optimize
+    self.blocks = 0       # blocks scheduled
+    self.moved = 0        # instructions placed differently
+    self.cycles = [0, 0]  # estimated cycles before and after scheduling
+    return
+
+
+  def optimize(self, prgm):
+    """Schedule every stream in a program"""
+    for stream in prgm.objects:
+      objs = self.schedule(stream.objects)
+      if [a for (a, b) in zip(objs, stream.objects) if a is not b]:
+        stream.objects = objs
+        # Don't reuse code cache_code rendered before
+        stream._version += 1
+    return
+
+
+  def schedule(self, objs):
+    """
+    Return a list of the objects in objs with the instructions of each
+    basic block reordered.
+    """
+    result = []
+    block = []
+    for obj in objs:
+      if isinstance(obj, spe.Instruction):
+        name = effects.inst_name(obj.__class__)
+        if not _is_branch(name) and not _is_barrier(name, obj):
+          block.append((name, obj))
+          continue
+
+      result.extend(self._schedule_block(block))
+      block = []
+      result.append(obj)
+
+    result.extend(self._schedule_block(block))
+    return result
+
+
+  def _build_dag(self, block):
+    nodes = []
+    writer = {}     # key -> last node to define it
+    readers = {}    # key -> nodes that used it since
+    stores = []     # last store to memory, or nothing
+    loads = []      # nodes that read memory since the last store
+
+    def edge(src, dst, cycles):
+      if src is dst:
+        return
+      src.succs.append((dst, cycles))
+      dst.preds.append((src, cycles))
+      dst.npreds += 1
+      return
+
+    for (i, (name, inst)) in enumerate(block):
+      (uses, defs, mem) = _dependences(name, inst)
+      (latency, throughput) = getattr(inst, 'cycles', (1, 1))
+      if 'r' in mem:
+        latency += self.load_latency
+      node = _Node(i, inst, latency, throughput)
+
+      # Read after write, write after read, write after write
+      for key in uses:
+        if key in writer:
+          edge(writer[key], node, writer[key].latency)
+      for key in defs:
+        for r in readers.get(key, ()):
+          edge(r, node, 0)
+        if key in writer:
+          edge(writer[key], node, 1)
+      for key in uses:
+        readers.setdefault(key, []).append(node)
+      for key in defs:
+        writer[key] = node
+        readers[key] = []
+
+      if 'w' in mem:
+        for n in stores + loads:
+          edge(n, node, 1)
+        stores = [node]
+        loads = []
+      elif 'r' in mem:
+        for n in stores:
+          edge(n, node, 1)
+        loads.append(node)
+
+      nodes.append(node)
+
+    # Longest path to the end of the block, from the last node back
+    for node in reversed(nodes):
+      node.critpath = node.latency
+      for (succ, cycles) in node.succs:
+        node.critpath = max(node.critpath, cycles + succ.critpath)
+    return nodes
+
+
+  def _estimate(self, nodes, order):
+    """Return the cycles taken to issue nodes in order, in order"""
+    ready = {}
+    cycle = 0
+    issued = 0
+    for node in order:
+      t = max([cycle] + [ready[p] + c for (p, c) in node.preds])
+      if t > cycle:
+        (cycle, issued) = (t, 0)
+      ready[node] = cycle
+      issued += 1
+      if issued == self.width:
+        (cycle, issued) = (cycle + 1, 0)
+    return max([cycle] + [ready[n] + n.latency for n in nodes])
+
+
+  def _schedule_block(self, block):
+    if len(block) < 2:
+      return [inst for (name, inst) in block]
+
+    nodes = self._build_dag(block)
+    self.blocks += 1
+
+    ready = [n for n in nodes if n.npreds == 0]
+    busy = {}       # instruction class -> first cycle it can issue again
+    order = []
+    cycle = 0
+    issued = 0
+
+    while len(ready) > 0:
+      # Earliest cycle each ready node can issue; choose the earliest,
+      # then the one with the longest path to the end, then the original
+      # order.
+      best = None
+      for node in ready:
+        t = max([cycle, busy.get(node.inst.__class__, 0)] +
+                [p.cycle + c for (p, c) in node.preds])
+        key = (t, -node.critpath, node.index)
+        if best is None or key < best[0]:
+          best = (key, node)
+
+      node = best[1]
+      t = best[0][0]
+      ready.remove(node)
+
+      if t > cycle:
+        (cycle, issued) = (t, 0)
+      node.cycle = cycle
+      order.append(node)
+      if node.throughput >= 1:
+        busy[node.inst.__class__] = cycle + int(node.throughput)
+
+      issued += 1
+      if issued == self.width:
+        (cycle, issued) = (cycle + 1, 0)
+
+      for (succ, c) in node.succs:
+        succ.npreds -= 1
+        if succ.npreds == 0:
+          ready.append(succ)
+
+    before = self._estimate(nodes, nodes)
+    after = self._estimate(nodes, order)
+    if after >= before:
+      # Keep the original order when nothing is gained
+      order = nodes
+      after = before
+
+    self.cycles[0] += before
+    self.cycles[1] += after
+    for (i, node) in enumerate(order):
+      if node.index != i:
+        self.moved += 1
+    return [node.inst for node in order]
+
+
+  def report(self):
+    """Return a string summarizing what the scheduler did"""
+    return ("%d blocks, %d instructions moved, estimated cycles %d -> %d" %
+            (self.blocks, self.moved, self.cycles[0], self.cycles[1]))
+
+  def reset(self):
+    """Clear the statistics"""
+    self.blocks = 0
+    self.moved = 0
+    self.cycles = [0, 0]
+    return
+
@@ -30,6 +30,8 @@ import corepy.arch.x86_64.isa as x86_64
 import corepy.arch.x86_64.types.registers as registers
 import corepy.arch.x86_64.lib.memory as memory
 import corepy.arch.x86_64.lib.util as util
+import corepy.arch.x86_64.platform.cpuid as cpuid
+import corepy.lib.extarray as extarray
 
 CTR = 0
 DEC = 1
@@ -38,8 +40,46 @@ INC = 2
 _ws = 8
 
 class syn_iter(object):
-
-  def __init__(self, code, count, step = 1, mode = INC, count_reg = None, clobber_reg = None):
+  """
+  Counted loop.  The body is the body of a Python for loop over the
+  iterator, which yields the count register:
+
+    for i in syn_iter(code, n, count_reg = r10):
+      x86_64.mov(rax, memory.MemRef(rdi, index = i, scale = 8))
+      ...
+
+  With unroll = N, the body is emitted N times per trip around the loop,
+  with the count advanced between copies and a single compare and branch
+  at the end.  The Python loop body runs once for each copy, so it must
+  emit the same code every time.  Counts that are not a multiple of N are
+  handled by copies after the loop, or a one copy remainder loop when the
+  count is only known at run time.
+
+  With pipeline = True, the body is split into two stages by calling
+  end_loads() in it, and the loads of the next iteration are issued before
+  the computation of this one, so their latency overlaps it.  Consecutive
+  iterations alternate between two copies of the body: one indexed by
+  count_reg, and one by a second register pipeline_reg that holds the
+  next iteration's count.  The copies must load into different registers,
+  or the loads for one iteration would overwrite the values the other is
+  still computing with; stage is 0 or 1 for the copy being emitted:
+
+    it = syn_iter(code, n, count_reg = r10, pipeline = True, pipeline_reg = r11)
+    for i in it:
+      t = (rdx, rcx)[it.stage]
+      x86_64.mov(t, memory.MemRef(rdi, index = i, scale = 8))
+      it.end_loads()
+      x86_64.add(rax, t)
+
+  The Python loop body runs four times, twice for each copy.
+
+  Unrolled and pipelined loops need a register count_reg and an immediate
+  step, and test the count before the first iteration, so run zero times
+  for an empty range; plain loops always run at least once.
+  """
+
+  def __init__(self, code, count, step = 1, mode = INC, count_reg = None, clobber_reg = None,
+               unroll = 1, pipeline = False, pipeline_reg = None):
 
     if mode != CTR and count_reg == None:
       raise Exception('No count register was specified (a register must be specified for x86_64 unless mode CTR is used)')
@@ -83,6 +123,26 @@ class syn_iter(object):
 
     self.start_label = None
     self.continue_label = None
+
+    if unroll < 1:
+      raise Exception('unroll must be at least 1, you used ' + str(unroll))
+    if unroll > 1 and pipeline:
+      raise Exception('Pipelined loops cannot also be unrolled')
+    if unroll > 1 or pipeline:
+      if not isinstance(self.r_count, registers.GPRegisterType):
+        raise Exception('Unrolled and pipelined loops need count_reg to be a register')
+      if self.r_step is not None:
+        raise Exception('Unrolled and pipelined loops need an immediate step')
+    if pipeline:
+      if not isinstance(pipeline_reg, registers.GPRegisterType):
+        raise Exception('Pipelined loops need pipeline_reg to be a register')
+      if pipeline_reg == self.r_count or pipeline_reg == self.r_stop:
+        raise Exception('pipeline_reg must differ from the count and stop registers')
+    self.unroll = unroll
+    self.pipeline = pipeline
+    self.r_next = pipeline_reg
+    self.stage = 0
+    self._loads_end = None
     
     return
 
@@ -107,7 +167,18 @@ class syn_iter(object):
     return self.step
   
   def start(self, align = True):
+    self._init_count()
+
+    # Label
+    self.start_label = self.code.prgm.get_unique_label("SYN_ITER_START")
+    self.code.add(self.start_label)
+    
+    # Create continue/branch labels so they can be referenced; they will be
+    # added to the code in their appropriate locations.
+    self.continue_label = self.code.prgm.get_unique_label("SYN_ITER_CONTINUE")
+    return
 
+  def _init_count(self):
     if self.mode == CTR:
       if self.external_start:
         self.code.add(x86_64.mov(registers.rcx, self.r_start))
@@ -142,14 +213,6 @@ class syn_iter(object):
         self.code.add(x86_64.mov(self.r_count, self.get_start()))
 
     # /end mode if
-
-    # Label
-    self.start_label = self.code.prgm.get_unique_label("SYN_ITER_START")
-    self.code.add(self.start_label)
-    
-    # Create continue/branch labels so they can be referenced; they will be
-    # added to the code in their appropriate locations.
-    self.continue_label = self.code.prgm.get_unique_label("SYN_ITER_CONTINUE")
     return
 
   def setup(self):
@@ -241,10 +304,24 @@ class syn_iter(object):
     # print 'Continue:', next, idx, self.continue_label
     #code[idx] = branch_inst(next)
     #code[idx] = branch_inst(self.continue_label)
+    if self.pipeline:
+      raise Exception('Pipelined loops do not support continue')
     code.add(branch_inst(self.continue_label))
     return
+
+  def end_loads(self):
+    """
+    In a pipelined loop, mark the end of the loads at the start of the body.
+    """
+    self._loads_end = len(self.code.objects)
+    return
   
   def __iter__(self):
+    if self.pipeline:
+      return self._pipelined()
+    elif self.unroll > 1:
+      return self._unrolled()
+
     self.start()
     return self
 
@@ -262,6 +339,212 @@ class syn_iter(object):
 
     return
 
+
+  # ------------------------------
+  # Unrolled and pipelined loops
+  # ------------------------------
+
+  def _delta(self):
+    """Change in the count per iteration"""
+    if self.mode == INC:
+      return self.step
+    elif self.mode == DEC and self.step != 1:
+      return self.step
+    return -1
+
+  def _trips(self):
+    """Number of iterations, or None if only known at run time"""
+    delta = self._delta()
+    if self.mode == INC:
+      if self.external_start or self.external_stop:
+        return None
+      first = self.get_start()
+      return max(0, (self.n - first + delta - 1) // delta)
+    elif self.external_start:
+      return None
+    return max(0, (self.n - delta - 1) // -delta)
+
+  def _advance(self):
+    if self.mode == CTR:
+      self.code.add(x86_64.dec(self.r_count))
+    else:
+      self.cleanup()
+    return
+
+  def _branch(self, label, more, offset = 0, reg = None):
+    """
+    Branch to label if count + offset is (more = True) or is not (more =
+    False) in the range of the loop.  The count is not changed.  reg
+    holds the count, and defaults to the count register.
+    """
+    if reg is None:
+      reg = self.r_count
+    if offset != 0:
+      self.code.add(x86_64.add(reg, offset))
+
+    if self.mode == INC:
+      if self.external_stop:
+        self.code.add(x86_64.cmp(reg, self.r_stop))
+      else:
+        self.code.add(x86_64.cmp(reg, self.n))
+    else:
+      self.code.add(x86_64.cmp(reg, 0))
+
+    if offset != 0:
+      # lea leaves the flags alone
+      self.code.add(x86_64.lea(reg, memory.MemRef(reg, -offset, data_size = None)))
+
+    if self.mode == INC:
+      branch = (x86_64.jnl, x86_64.jl)[more]
+    else:
+      branch = (x86_64.jng, x86_64.jg)[more]
+    self.code.add(branch(label))
+    return
+
+  def _copy(self):
+    """Emit one copy of the body (the caller yields) and advance"""
+    self.code.add(self.continue_label)
+    self._advance()
+    self.continue_label = self.code.prgm.get_unique_label("SYN_ITER_CONTINUE")
+    return
+
+  def _unrolled(self):
+    prgm = self.code.prgm
+    n = self.unroll
+    delta = self._delta()
+    trips = self._trips()
+
+    self._init_count()
+    self.continue_label = prgm.get_unique_label("SYN_ITER_CONTINUE")
+
+    if trips is not None:
+      # All copies after the loop are straight line code
+      passes = trips // n
+      if passes > 0:
+        self.start_label = prgm.get_unique_label("SYN_ITER_START")
+        self.code.add(self.start_label)
+        for i in xrange(0, n):
+          yield self.r_count
+          self._copy()
+        if passes > 1:
+          last = self.get_start() if self.mode == INC else self.n
+          self.code.add(x86_64.cmp(self.r_count, last + passes * n * delta))
+          if self.mode == INC:
+            self.code.add(x86_64.jl(self.start_label))
+          else:
+            self.code.add(x86_64.jg(self.start_label))
+
+      for i in xrange(0, trips % n):
+        yield self.r_count
+        self._copy()
+      return
+
+    lbl_rem = prgm.get_unique_label("SYN_ITER_REMAINDER")
+    lbl_rem_start = prgm.get_unique_label("SYN_ITER_REMAINDER_START")
+    lbl_end = prgm.get_unique_label("SYN_ITER_END")
+
+    # Main loop, while n more iterations remain
+    self._branch(lbl_rem, False, (n - 1) * delta)
+    self.start_label = prgm.get_unique_label("SYN_ITER_START")
+    self.code.add(self.start_label)
+    for i in xrange(0, n):
+      yield self.r_count
+      self._copy()
+    self._branch(self.start_label, True, (n - 1) * delta)
+
+    # Remainder loop
+    self.code.add(lbl_rem)
+    self._branch(lbl_end, False)
+    self.code.add(lbl_rem_start)
+    yield self.r_count
+    self._copy()
+    self._branch(lbl_rem_start, True)
+    self.code.add(lbl_end)
+    return
+
+  def _take(self, start):
+    """Remove and return the objects added to the stream since start"""
+    objs = self.code.objects[start:]
+    del self.code.objects[start:]
+    if self.code._debug:
+      del self.code._stack_info[start:]
+    return objs
+
+  def _put(self, objs):
+    self.code.objects.extend(objs)
+    if self.code._debug:
+      self.code._stack_info.extend([None] * len(objs))
+    self.code.prgm._cached = False
+    self.code._version += 1
+    return
+
+  def _stages(self):
+    """
+    Emit the body (the caller yields first) and return it as a list of
+    loads and a list of the rest.
+    """
+    start = self._start
+    if self._loads_end is None:
+      raise Exception('end_loads() must be called in the body of a pipelined loop')
+    split = self._loads_end - start
+    body = self._take(start)
+    self._loads_end = None
+    return (body[:split], body[split:])
+
+  def _pipelined(self):
+    prgm = self.code.prgm
+    delta = self._delta()
+    regs = (self.r_count, self.r_next)
+    lbl_last = (prgm.get_unique_label("SYN_ITER_LAST"),
+                prgm.get_unique_label("SYN_ITER_LAST"))
+    lbl_end = prgm.get_unique_label("SYN_ITER_END")
+
+    self._init_count()
+    self._branch(lbl_end, False)
+
+    # Each stage is needed twice for each copy of the body, except the
+    # loads of copy 1, which have no prologue
+    stages = []
+    for stage in (0, 1, 0, 1):
+      self.stage = stage
+      self._start = len(self.code.objects)
+      yield regs[stage]
+      stages.append(self._stages())
+    self.stage = 0
+
+    # Iterations alternate between the copies.  Each trip around the loop
+    # runs two iterations, issuing the loads for the next iteration (into
+    # the other copy's registers) before computing the current one:
+    #
+    #   loads0
+    #   loop: next = count + step, done?     -> last0
+    #         loads1, compute0
+    #         count = next + step, done?     -> last1
+    #         loads0, compute1
+    #         jmp loop
+    #   last0: compute0, jmp end
+    #   last1: compute1
+    #   end:
+    self._put(stages[0][0])
+
+    self.start_label = prgm.get_unique_label("SYN_ITER_START")
+    self.code.add(self.start_label)
+    for (cur, nxt) in ((0, 1), (1, 0)):
+      self.code.add(x86_64.lea(regs[nxt], memory.MemRef(regs[cur], delta, data_size = None)))
+      self._branch(lbl_last[cur], False, reg = regs[nxt])
+      self._put(stages[nxt + 2][0])
+      self._put(stages[cur][1])
+    self.code.add(x86_64.jmp(self.start_label))
+
+    self.code.add(lbl_last[0])
+    self._put(stages[2][1])
+    self.code.add(x86_64.jmp(lbl_end))
+    self.code.add(lbl_last[1])
+    self._put(stages[3][1])
+    self.code.add(lbl_end)
+    return
+
+
 class syn_fp_iter(object):
 
   def __init__(self, code, start, stop, step, mode = INC, count_reg = None, clobber_reg = None):
@@ -399,6 +682,427 @@ class syn_fp_iter(object):
 
     return
 
+# ------------------------------
+# Vector iterator
+# ------------------------------
+
+# Element sizes of the array types vector_iter accepts
+_item_sizes = {'f':4, 'd':8, 'i':4, 'I':4, 'l':8, 'L':8, 'q':8, 'Q':8}
+
+# Eight all-ones dwords followed by eight zero dwords; a mask for the first
+# k dwords of a YMM register is loaded from offset (8 - k) * 4.
+_tail_masks = None
+
+def _array_info(a):
+  """Return (address, typecode, length) for an array, extarray or NumPy array"""
+  if hasattr(a, 'buffer_info'):
+    (addr, length) = a.buffer_info()
+    return (addr, a.typecode, length)
+
+  iface = getattr(a, '__array_interface__', None)
+  if iface is None:
+    raise Exception('Unsupported array type: ' + str(type(a)))
+  if iface.get('strides') is not None:
+    raise Exception('Only contiguous arrays are supported')
+  return (iface['data'][0], a.dtype.char, a.size)
+
+
+def _vector_moves(typecode, avx):
+  """Return the (aligned, unaligned, non-temporal) moves for a typecode"""
+  if typecode == 'f':
+    names = ('movaps', 'movups', 'movntps')
+  elif typecode == 'd':
+    names = ('movapd', 'movupd', 'movntpd')
+  else:
+    names = ('movdqa', 'movdqu', 'movntdq')
+  prefix = ('', 'v')[avx]
+  return [getattr(x86_64, prefix + name) for name in names]
+
+
+class _range_iter(syn_iter):
+  """INC mode syn_iter counting from first instead of zero"""
+
+  def __init__(self, code, first, stop, step, count_reg, unroll = 1):
+    syn_iter.__init__(self, code, stop, step, INC, count_reg, unroll = unroll)
+    self.first = first
+    return
+
+  def get_start(self):
+    return self.first
+
+
+class vector_iter(object):
+  """
+  Iterate over zipped arrays a vector at a time.  The loop body receives
+  one XMM (width = 16) or YMM (width = 32) register per input and output
+  array.  Input registers are loaded before the body, and the body leaves
+  the results in the output registers, which are stored after it:
+
+    for (a, b, c) in vector_iter(code, (A, B), (C,)):
+      x86_64.movaps(c, a)
+      x86_64.addps(c, b)
+
+  The arrays are extarrays, arrays or contiguous NumPy arrays of 4 or 8 byte
+  elements, all the same size, and their addresses are fixed into the code.
+  The width defaults to 32 bytes if the host supports AVX, and 16 otherwise.
+
+  Elements before the first output (or input) is aligned to the width are
+  handled one at a time with scalar moves, leaving only the low element of
+  each register valid; elements after the last full vector are handled the
+  same way, or with a single masked vector (vmaskmovps/pd) if width is 32
+  and masked is True.  The Python loop body therefore runs once for each
+  part of the iteration, and unroll times for the vector part, so it must
+  emit the same code every time and work element by element.
+
+  Arrays that are aligned once the head is done use aligned moves, the
+  rest unaligned ones.  There is no head if the first output (or input)
+  is aligned to the width, as extarrays are unless allocated with a
+  smaller align.  With nontemporal = True, aligned outputs are
+  written with non-temporal stores that bypass the caches, which helps
+  when the output is larger than the cache and not read again soon.
+
+  The registers are acquired from the program unless given in regs.
+  r_count, the byte offset of the current element in every array, is
+  count_reg or an acquired register; one more register holds the address
+  of each array.
+  """
+
+  def __init__(self, code, inputs, outputs = (), length = None, width = None,
+               regs = None, count_reg = None, nontemporal = False,
+               masked = True, unroll = 1):
+    self.code = code
+    self.inputs = tuple(inputs)
+    self.outputs = tuple(outputs)
+    arrays = self.inputs + self.outputs
+    if len(arrays) == 0:
+      raise Exception('vector_iter needs at least one array')
+
+    info = [_array_info(a) for a in arrays]
+    sizes = set()
+    for (addr, typecode, n) in info:
+      if typecode not in _item_sizes:
+        raise Exception('Unsupported array data type for vector operations: ' + typecode)
+      sizes.add(_item_sizes[typecode])
+    if len(sizes) != 1:
+      raise Exception('All arrays must have the same element size')
+
+    self.addrs = [addr for (addr, typecode, n) in info]
+    self.typecodes = [typecode for (addr, typecode, n) in info]
+    self.itemsize = sizes.pop()
+
+    shortest = min([n for (addr, typecode, n) in info])
+    if length is None:
+      length = shortest
+    elif length > shortest:
+      raise Exception('length is larger than one of the arrays')
+    self.length = length
+
+    if width is None:
+      width = (16, 32)[cpuid.has('avx')]
+    if width not in (16, 32):
+      raise Exception('width must be 16 or 32, you used ' + str(width))
+    self.width = width
+
+    if regs is not None:
+      if len(regs) != len(arrays):
+        raise Exception('One register is needed for each array')
+      reg_type = (registers.XMMRegister, registers.YMMRegister)[width == 32]
+      for r in regs:
+        if not isinstance(r, reg_type):
+          raise Exception('Width %d needs %s registers' % (width, reg_type.__name__))
+      regs = tuple(regs)
+    self.regs = regs
+    self.r_count = count_reg
+
+    self.nontemporal = nontemporal
+    self.masked = masked
+    self.unroll = unroll
+
+    self._plan()
+    return
+
+  def _plan(self):
+    isz = self.itemsize
+    per = self.width // isz
+    n = self.length
+
+    # Scalar head until the first output (or input) is aligned
+    addr = self.addrs[(0, len(self.inputs))[len(self.outputs) > 0]]
+    if addr % isz == 0:
+      head = min(n, ((-addr) % self.width) // isz)
+    else:
+      head = 0
+    body = (n - head) // per
+    tail = n - head - body * per
+
+    self.phases = []
+    if head > 0:
+      self.phases.append(('scalar', 0, head * isz, isz, 1))
+    if body > 0:
+      self.phases.append(('vector', head * isz, (head + body * per) * isz,
+                          self.width, self.unroll))
+    if tail > 0:
+      kind = ('scalar', 'masked')[self.width == 32 and self.masked]
+      self.phases.append((kind, (n - tail) * isz, n * isz, isz, 1))
+    self.tail = tail
+
+    self.aligned = [(a + head * isz) % self.width == 0 for a in self.addrs]
+    self.use_nt = (self.nontemporal and body > 0 and
+                   True in self.aligned[len(self.inputs):])
+    return
+
+  def _acquire(self):
+    prgm = self.code.prgm
+    self._acquired = []
+    reg_type = ('xmm', 'ymm')[self.width == 32]
+
+    if self.regs is None:
+      self.regs = tuple([prgm.acquire_register(reg_type) for a in self.addrs])
+      self._acquired.extend(self.regs)
+    if self.r_count is None:
+      self.r_count = prgm.acquire_register()
+      self._acquired.append(self.r_count)
+    self.r_addrs = [prgm.acquire_register() for a in self.addrs]
+    self._acquired.extend(self.r_addrs)
+
+    self.r_mask = None
+    if 'masked' in [phase[0] for phase in self.phases]:
+      self.r_mask = prgm.acquire_register(reg_type)
+      self._acquired.append(self.r_mask)
+
+    for (r, addr) in zip(self.r_addrs, self.addrs):
+      self.code.add(x86_64.mov(r, addr))
+    return
+
+  def _release(self):
+    for r in self._acquired:
+      self.code.prgm.release_register(r)
+    self._acquired = []
+    return
+
+  def _ref(self, k, data_size):
+    return memory.MemRef(self.r_addrs[k], index = self.r_count, data_size = data_size)
+
+  def _moves(self, kind):
+    """Return the load or store for each array in a part of the loop"""
+    avx = self.width == 32
+    n_in = len(self.inputs)
+    moves = []
+
+    for (k, typecode) in enumerate(self.typecodes):
+      if kind == 'scalar':
+        name = ('movss', 'movsd')[self.itemsize == 8]
+        moves.append(getattr(x86_64, ('', 'v')[avx] + name))
+      elif kind == 'masked':
+        moves.append((x86_64.vmaskmovps, x86_64.vmaskmovpd)[self.itemsize == 8])
+      else:
+        (aligned, unaligned, nt) = _vector_moves(typecode, avx)
+        if not self.aligned[k]:
+          moves.append(unaligned)
+        elif k >= n_in and self.use_nt:
+          moves.append(nt)
+        else:
+          moves.append(aligned)
+    return moves
+
+  def _load(self, kind, moves):
+    for k in xrange(0, len(self.inputs)):
+      self.code.add(self._move(kind, moves[k], k, True))
+    return
+
+  def _store(self, kind, moves):
+    for k in xrange(len(self.inputs), len(self.addrs)):
+      self.code.add(self._move(kind, moves[k], k, False))
+    return
+
+  def _move(self, kind, move, k, load):
+    reg = self.regs[k]
+    if kind == 'scalar':
+      size = self.itemsize * 8
+      if isinstance(reg, registers.YMMRegister):
+        reg = getattr(registers, 'x' + reg.name[1:])
+    else:
+      size = self.width * 8
+    ref = self._ref(k, size)
+
+    if kind == 'masked':
+      if load:
+        return move(reg, self.r_mask, ref)
+      return move(ref, self.r_mask, reg)
+    if load:
+      return move(reg, ref)
+    return move(ref, reg)
+
+  def _load_mask(self):
+    global _tail_masks
+    if _tail_masks is None:
+      _tail_masks = extarray.extarray('i', [-1] * 8 + [0] * 8)
+
+    dwords = self.tail * self.itemsize // 4
+    addr = _tail_masks.buffer_info()[0] + (8 - dwords) * 4
+    self.code.add(x86_64.mov(self.r_count, addr))
+    self.code.add(x86_64.vmovdqu(self.r_mask,
+        memory.MemRef(self.r_count, data_size = 256)))
+    return
+
+  def __iter__(self):
+    return self._iterate()
+
+  def _iterate(self):
+    self._acquire()
+
+    for (kind, first, stop, step, unroll) in self.phases:
+      moves = self._moves(kind)
+      if kind == 'masked':
+        # A single vector, straight line code
+        self._load_mask()
+        self.code.add(x86_64.mov(self.r_count, first))
+        self._load(kind, moves)
+        yield self.regs
+        self._store(kind, moves)
+        continue
+
+      for i in _range_iter(self.code, first, stop, step, self.r_count, unroll):
+        self._load(kind, moves)
+        yield self.regs
+        self._store(kind, moves)
+
+    # Non-temporal stores are weakly ordered
+    if self.use_nt:
+      self.code.add(x86_64.sfence())
+
+    self._release()
+    return
+
+
+# ------------------------------
+# Parallel iteration
+# ------------------------------
+
+class parallel(object):
+  """
+  Split the iterations of an INC mode syn_iter across the ranks of a
+  program run by Processor.execute_parallel, which passes each rank its
+  number in p5 (r8) and the number of ranks in p6 (r9):
+
+    for i in parallel(syn_iter(code, n, count_reg = r10)):
+      ...
+
+    total = proc.execute_parallel(prgm, params = params, reduce = operator.add)
+
+  Each rank runs one contiguous block of the iterations, and the block
+  sizes differ by at most one.  The bounds are computed before the loop
+  (rax and rdx are preserved) and replace the loop's start and stop, so
+  plain, unrolled and pipelined loops with an immediate or register count
+  can all be split.  A rank with no iterations skips the loop.
+
+  rank and size name other registers holding the rank and the number of
+  ranks; they cannot be rax or rdx.
+  """
+
+  def __init__(self, obj, rank = registers.r8, size = registers.r9):
+    if not isinstance(obj, syn_iter) or obj.mode != INC:
+      raise Exception('Only INC mode syn_iters can be run in parallel')
+    if obj.r_step is not None or obj.step < 1:
+      raise Exception('Parallel loops need a positive immediate step')
+    for r in (rank, size):
+      if not isinstance(r, registers.GPRegister64) or r in (registers.rax, registers.rdx):
+        raise Exception('rank and size must be 64 bit registers other than rax and rdx')
+
+    self.obj = obj
+    self.rank = rank
+    self.size = size
+    return
+
+  def _bounds(self, r_first, r_last):
+    """Set r_first and r_last to the first and stop counts for this rank"""
+    obj = self.obj
+    code = obj.code
+    step = obj.step
+    rax = registers.rax
+    rdx = registers.rdx
+
+    if obj.external_start:
+      start = obj.r_start
+    else:
+      start = obj.get_start()
+
+    code.add(x86_64.push(rax))
+    code.add(x86_64.push(rdx))
+
+    # rax = number of iterations
+    if obj.external_start or obj.external_stop:
+      if obj.external_stop:
+        code.add(x86_64.mov(rax, obj.r_stop))
+      else:
+        code.add(x86_64.mov(rax, obj.n))
+      code.add(x86_64.sub(rax, start))
+      # An empty range has no iterations
+      code.add(x86_64.xor(rdx, rdx))
+      code.add(x86_64.cmp(rax, 0))
+      code.add(x86_64.cmovl(rax, rdx))
+      if step > 1:
+        code.add(x86_64.add(rax, step - 1))
+        code.add(x86_64.mov(r_last, step))
+        code.add(x86_64.div(r_last))
+    else:
+      code.add(x86_64.mov(rax, obj._trips()))
+
+    # This rank runs iterations trips * rank / size up to
+    # trips * (rank + 1) / size
+    code.add(x86_64.mov(r_last, rax))
+    code.add(x86_64.imul(rax, self.rank))
+    code.add(x86_64.mov(r_first, rax))
+    code.add(x86_64.add(rax, r_last))
+    code.add(x86_64.xor(rdx, rdx))
+    code.add(x86_64.div(self.size))
+    code.add(x86_64.mov(r_last, rax))
+    code.add(x86_64.mov(rax, r_first))
+    code.add(x86_64.xor(rdx, rdx))
+    code.add(x86_64.div(self.size))
+    code.add(x86_64.mov(r_first, rax))
+
+    code.add(x86_64.pop(rdx))
+    code.add(x86_64.pop(rax))
+
+    # Iteration numbers to counts
+    for r in (r_first, r_last):
+      if step != 1:
+        code.add(x86_64.imul(r, r, step))
+      if not isinstance(start, (int, long)) or start != 0:
+        code.add(x86_64.add(r, start))
+    return
+
+  def __iter__(self):
+    return self._iterate()
+
+  def _iterate(self):
+    obj = self.obj
+    code = obj.code
+    prgm = code.prgm
+
+    r_first = prgm.acquire_register()
+    r_last = prgm.acquire_register()
+    for r in (r_first, r_last):
+      if r in (self.rank, self.size, obj.r_count):
+        raise Exception('Register %s is needed by the parallel loop' % str(r))
+
+    self._bounds(r_first, r_last)
+    lbl_skip = prgm.get_unique_label("PARALLEL_SKIP")
+    code.add(x86_64.cmp(r_first, r_last))
+    code.add(x86_64.jge(lbl_skip))
+
+    obj.set_start(r_first)
+    obj.set_stop(r_last)
+    for i in obj:
+      yield i
+
+    code.add(lbl_skip)
+    prgm.release_register(r_first)
+    prgm.release_register(r_last)
+    return
+
+
 ####################################################################################################
 
 # Test with the stop value being an immediate value
@@ -957,6 +1661,234 @@ def TestCTRReg():
   for i in range(len(B)):
     assert(B[i] == i)
 
+
+# Copy n elements with an unrolled loop and check nothing else was written.
+# count is an immediate, or 'reg' to pass it in a register.
+def _TestUnroll(n, unroll, count, mode = INC, step = 1):
+  A = extarray.extarray('l', n + 8)
+  B = extarray.extarray('l', n + 8)
+
+  for i in xrange(n + 8):
+    A[i] = i
+    B[i] = -1
+
+  prgm = env.Program()
+  code = prgm.get_stream()
+  a = registers.r8
+  b = registers.r9
+  code.add(x86_64.mov(a, registers.rdi))
+  code.add(x86_64.mov(b, registers.rsi))
+  if count == 'reg':
+    count = registers.rax
+    code.add(x86_64.mov(count, n))
+
+  if mode == CTR:
+    i_iter = syn_iter(code, count, mode=CTR, unroll=unroll)
+  else:
+    i_iter = syn_iter(code, count, step=step, mode=mode, count_reg=registers.r10, unroll=unroll)
+  copies = 0
+  for i_ in i_iter:
+    code.add(x86_64.mov(registers.r11, memory.MemRef(a, index=i_, scale=8)))
+    code.add(x86_64.mov(memory.MemRef(b, index=i_, scale=8), registers.r11))
+    copies += 1
+
+  prgm.add(code)
+  params = env.ExecParams()
+  params.p1 = A.buffer_info()[0]
+  params.p2 = B.buffer_info()[0]
+  if mode != INC:
+    # DEC and CTR count down from n to 1
+    params.p1 -= _ws
+    params.p2 -= _ws
+  proc = env.Processor()
+  proc.execute(prgm, mode='int', params=params)
+
+  if mode == INC:
+    idx = range(0, n, step)
+  else:
+    idx = range(n - 1, -1, (step, -1)[step == 1])
+  for i in xrange(n + 8):
+    assert(B[i] == (-1, i)[i in idx])
+  return copies
+
+def TestUnrollImm():
+  assert(_TestUnroll(1000, 4, 1000) == 4)
+  assert(_TestUnroll(1003, 4, 1003) == 7)
+  assert(_TestUnroll(3, 4, 3) == 3)
+  assert(_TestUnroll(1001, 4, 1001, step=2) == 5)
+  assert(_TestUnroll(1002, 3, 1002, mode=DEC) == 3)
+  assert(_TestUnroll(1000, 3, 1000, mode=DEC, step=-2) == 5)
+  assert(_TestUnroll(1001, 8, 1001, mode=CTR) == 9)
+
+def TestUnrollReg():
+  for n in (0, 1, 3, 4, 5, 1003):
+    _TestUnroll(n, 4, 'reg')
+    _TestUnroll(n, 4, 'reg', mode=DEC)
+    _TestUnroll(n, 4, 'reg', mode=CTR)
+  _TestUnroll(1003, 4, 'reg', step=3)
+  _TestUnroll(1003, 4, 'reg', mode=DEC, step=-3)
+
+
+# B[i] = A[i] * 3 with a pipelined loop, n passed in a register
+def _TestPipeline(n, mode = INC):
+  A = extarray.extarray('l', n + 8)
+  B = extarray.extarray('l', n + 8)
+
+  for i in xrange(n + 8):
+    A[i] = i
+    B[i] = -1
+
+  prgm = env.Program()
+  code = prgm.get_stream()
+  a = registers.r8
+  b = registers.r9
+  code.add(x86_64.mov(a, registers.rdi))
+  code.add(x86_64.mov(b, registers.rsi))
+  code.add(x86_64.mov(registers.rax, n))
+  count = (registers.r10, registers.rcx)[mode == CTR]
+  i_iter = syn_iter(code, registers.rax, mode=mode, count_reg=count, pipeline=True, pipeline_reg=registers.rsi)
+  for i_ in i_iter:
+    t = (registers.r11, registers.rdx)[i_iter.stage]
+    code.add(x86_64.mov(t, memory.MemRef(a, index=i_, scale=8)))
+    i_iter.end_loads()
+    code.add(x86_64.lea(t, memory.MemRef(t, index=t, scale=2, data_size=None)))
+    code.add(x86_64.mov(memory.MemRef(b, index=i_, scale=8), t))
+
+  prgm.add(code)
+  params = env.ExecParams()
+  params.p1 = A.buffer_info()[0]
+  params.p2 = B.buffer_info()[0]
+  if mode != INC:
+    params.p1 -= _ws
+    params.p2 -= _ws
+  proc = env.Processor()
+  proc.execute(prgm, mode='int', params=params)
+
+  for i in xrange(n + 8):
+    if i < n:
+      assert(B[i] == i * 3)
+    else:
+      assert(B[i] == -1)
+
+def TestPipeline():
+  for n in (0, 1, 2, 3, 4, 1000, 1001):
+    _TestPipeline(n)
+    _TestPipeline(n, mode=DEC)
+    _TestPipeline(n, mode=CTR)
+
+
+# An array view starting off elements into an extarray, to test unaligned
+# arrays
+class _View(object):
+  def __init__(self, data, off, n):
+    self.data = data
+    self.typecode = data.typecode
+    self.addr = data.buffer_info()[0] + off * data.itemsize
+    self.n = n
+
+  def buffer_info(self):
+    return (self.addr, self.n)
+
+# C[i] = A[i] + B[i], with the arrays starting at element offsets offs
+def _TestVector(n, typecode, width, offs = (0, 0, 0), **kw):
+  pad = 8
+  A = extarray.extarray(typecode, n + pad * 2)
+  B = extarray.extarray(typecode, n + pad * 2)
+  C = extarray.extarray(typecode, n + pad * 2)
+  for i in xrange(n + pad * 2):
+    A[i] = i
+    B[i] = i * 2 + 1
+    C[i] = -1
+
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86_64.set_active_code(code)
+  views = [_View(X, off, n) for (X, off) in zip((A, B, C), offs)]
+  add = {('f', 16):x86_64.addps, ('d', 16):x86_64.addpd,
+         ('f', 32):x86_64.vaddps, ('d', 32):x86_64.vaddpd}[(typecode, width)]
+  v_iter = vector_iter(code, views[:2], views[2:], width = width, **kw)
+  copies = 0
+  for (a, b, c) in v_iter:
+    if width == 16:
+      x86_64.movaps(c, a)
+      add(c, b)
+    else:
+      add(c, a, b)
+    copies += 1
+  x86_64.set_active_code(None)
+
+  prgm.add(code)
+  proc = env.Processor()
+  proc.execute(prgm, mode='int')
+
+  (oa, ob, oc) = offs
+  for i in xrange(n + pad * 2):
+    if oc <= i < oc + n:
+      assert(C[i] == (i - oc) * 3 + oa + ob * 2 + 1)
+    else:
+      assert(C[i] == -1)
+  return copies
+
+def TestVector():
+  for width in (16, 32):
+    for n in (0, 1, 3, 7, 8, 9, 1000, 1003):
+      _TestVector(n, 'f', width)
+      _TestVector(n, 'd', width)
+      _TestVector(n, 'f', width, (1, 2, 3))
+      _TestVector(n, 'd', width, (1, 0, 1), nontemporal = True)
+    _TestVector(1001, 'f', width, (0, 1, 1), unroll = 4)
+    _TestVector(1001, 'd', width, (0, 0, 3), nontemporal = True, masked = False)
+
+  # Scalar head, vector body and masked tail
+  assert(_TestVector(100, 'f', 32, (0, 0, 5)) == 3)
+  assert(_TestVector(100, 'f', 16, (0, 0, 1)) == 3)
+  assert(_TestVector(8, 'f', 32) == 1)
+
+
+# Sum A[i] and increment B[i] for i in range(0, n, step) over ranks ranks
+def _TestParallel(n, ranks, count = 'imm', step = 1, **kw):
+  import operator
+  A = extarray.extarray('l', n + 8)
+  B = extarray.extarray('l', n + 8)
+  for i in xrange(n + 8):
+    A[i] = i
+    B[i] = 0
+
+  prgm = env.Program()
+  code = prgm.get_stream()
+  a = registers.rdi
+  b = registers.rsi
+  code.add(x86_64.xor(registers.rax, registers.rax))
+  if count == 'reg':
+    count = registers.rdx
+  else:
+    count = n
+  p_iter = parallel(syn_iter(code, count, step = step, count_reg = registers.r10, **kw))
+  for i_ in p_iter:
+    code.add(x86_64.add(registers.rax, memory.MemRef(a, index = i_, scale = 8)))
+    code.add(x86_64.inc(memory.MemRef(b, index = i_, scale = 8)))
+
+  prgm.add(code)
+  proc = env.Processor()
+  params = (A.buffer_info()[0], B.buffer_info()[0], n)
+  total = proc.execute_parallel(prgm, ranks, params, reduce = operator.add)
+
+  idx = range(0, n, step)
+  assert(total == sum(idx))
+  for i in xrange(n + 8):
+    assert(B[i] == (0, 1)[i in idx])
+  return
+
+def TestParallel():
+  for ranks in (0, 1, 3, 8):
+    for n in (1, 2, 7, 1000):
+      _TestParallel(n, ranks)
+      _TestParallel(n, ranks, 'reg')
+    _TestParallel(1001, ranks, step = 3)
+    _TestParallel(1001, ranks, 'reg', step = 3)
+    _TestParallel(1001, ranks, 'reg', unroll = 4)
+  _TestParallel(0, 4, 'reg')
+
 ############################################################################
 
 
@@ -979,3 +1911,8 @@ if __name__=='__main__':
   TestDECMemMem_MemStep()
   TestCTRImm()
   TestCTRReg()
+  TestUnrollImm()
+  TestUnrollReg()
+  TestPipeline()
+  TestVector()
+  TestParallel()
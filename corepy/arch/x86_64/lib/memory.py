@@ -31,8 +31,8 @@ import corepy.spre.spe as spe
 
 class MemoryReference:
   def __init__(self, val, disp = None, index = None, scale = 1, data_size = 64, addr_size = None):
-    if not data_size in (8, 16, 32, 64, 80, 128, 228, 752, 4096, None):
-      raise Exception('Memory reference data size must be 8, 16, 32, 64, 80, 128, 228, 752, or 4096 bits')
+    if not data_size in (8, 16, 32, 64, 80, 128, 228, 256, 752, 4096, None):
+      raise Exception('Memory reference data size must be 8, 16, 32, 64, 80, 128, 228, 256, 752, or 4096 bits')
     self.data_size = data_size
 
     if isinstance(val, regs.IPRegister):
@@ -69,8 +69,10 @@ class MemoryReference:
 
       if not (isinstance(self.base, regs.GPRegister64) or isinstance(self.base, regs.GPRegister32)):
         raise Exception('Base register must be a 32- or 64-bit general purpose register')
-      if index != None and type(index) != type(self.base):
-        raise Exception('When specified, index register must be same type register as the base register')
+      # AVX2 gathers take a vector of indices in an XMM/YMM register (VSIB)
+      if (index != None and type(index) != type(self.base) and
+          not isinstance(index, (regs.XMMRegister, regs.YMMRegister))):
+        raise Exception('When specified, index register must be same type register as the base register, or an XMM/YMM register')
 
       # Resolve differences between address size and base/index register sizes.
       if addr_size == None:
@@ -0,0 +1,175 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+__doc__ = """
+Selection among several generated versions of a kernel.
+
+A MultiVersionKernel holds generators for variants of the same kernel, each
+with the CPU features it needs.  On first use, the variants the host cannot
+run are dropped, and one of the rest is synthesized and kept:
+
+  kernel = MultiVersionKernel()
+  kernel.add(gen_avx2, requires = ('avx2', 'fma'))
+  kernel.add(gen_sse41, requires = ('sse41',))
+  kernel.add(gen_sse2)
+
+  result = kernel.execute(params = params)
+
+A generator is a callable returning a Program.  Without a sample, the first
+supported variant in the order they were added is chosen.  If sample
+parameters are given, every supported variant is synthesized and timed on
+them, and the fastest is kept.  Programs that are timed must not have side
+effects the caller cannot repeat.
+"""
+
+import time
+
+import corepy.arch.x86_64.platform as env
+import corepy.arch.x86_64.platform.cpuid as cpuid
+
+
+class MultiVersionKernel(object):
+  def __init__(self, sample = None, mode = 'int', repeat = 3):
+    """
+    Create an empty kernel.  sample is an ExecParams (or a list of them)
+    used to time the variants, or None to pick by order.  mode is the
+    execution mode used by execute.  Each variant's time is the best of
+    repeat executions of the sample.
+    """
+    self.sample = sample
+    self.mode = mode
+    self.repeat = repeat
+
+    # (name, generator, requires) for each variant, in order added
+    self.variants = []
+
+    # Chosen variant name and Program, set by select
+    self.selected = None
+    self.prgm = None
+
+    # Variant name -> seconds, for variants that were timed
+    self.timings = {}
+
+    self._proc = None
+    return
+
+
+  def add(self, generator, requires = (), name = None):
+    """
+    Add a variant.  generator is called with no arguments to synthesize its
+    Program, and is only called if the host supports every feature name
+    in requires.  name defaults to the generator's name.
+    """
+    for feature in requires:
+      if feature not in cpuid.FEATURES:
+        raise Exception("Unknown CPU feature %s" % str(feature))
+
+    if name is None:
+      name = generator.__name__
+    self.variants.append((name, generator, tuple(requires)))
+
+    # Any earlier choice may no longer be the best
+    self.selected = None
+    self.prgm = None
+    return
+
+
+  def supported(self):
+    """Return the names of the variants the host can run, in order"""
+    return [name for (name, gen, requires) in self.variants
+            if cpuid.has(*requires)]
+
+
+  def _time(self, prgm):
+    proc = self._processor()
+    samples = self.sample
+    if not isinstance(samples, (list, tuple)):
+      samples = (samples,)
+
+    # The first run also renders and caches the code
+    for params in samples:
+      proc.execute(prgm, mode = self.mode, params = params)
+
+    best = None
+    for i in xrange(0, self.repeat):
+      t1 = time.time()
+      for params in samples:
+        proc.execute(prgm, mode = self.mode, params = params)
+      t = time.time() - t1
+      if best is None or t < best:
+        best = t
+    return best
+
+
+  def select(self):
+    """
+    Choose a variant if none has been chosen yet, and return its Program.
+    """
+    if self.prgm is not None:
+      return self.prgm
+
+    candidates = [(name, gen) for (name, gen, requires) in self.variants
+                  if cpuid.has(*requires)]
+    if len(candidates) == 0:
+      raise Exception("No kernel variant is supported by this host")
+
+    if self.sample is None:
+      (self.selected, gen) = candidates[0]
+      self.prgm = gen()
+      return self.prgm
+
+    best = None
+    for (name, gen) in candidates:
+      prgm = gen()
+      t = self._time(prgm)
+      self.timings[name] = t
+      if best is None or t < best:
+        best = t
+        self.selected = name
+        self.prgm = prgm
+    return self.prgm
+
+
+  def _processor(self):
+    if self._proc is None:
+      self._proc = env.Processor()
+    return self._proc
+
+
+  def execute(self, params = None, mode = None, async = False):
+    """
+    Execute the chosen variant, selecting one first if needed.  mode
+    defaults to the kernel's mode; see Processor.execute.
+    """
+    if mode is None:
+      mode = self.mode
+    return self._processor().execute(self.select(), mode = mode,
+                                     async = async, params = params)
+
+  __call__ = execute
+
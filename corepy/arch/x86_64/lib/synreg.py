@@ -26,180 +26,815 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
 
+__doc__ = """
+Synthetic (virtual) registers and a register allocator for x86_64.
+
+Code is written against an unlimited supply of synthetic registers, which
+are assigned physical registers by linear scan when the program is cached:
+
+  import corepy.arch.x86_64.lib.synreg as sr
+
+  prgm = sr.Program()
+  code = prgm.get_stream()
+  sr.set_active_code(code)
+
+  a = prgm.acquire_register()         # 64 bit GP
+  b = prgm.acquire_register('xmm')
+  sr.mov(a, rdi)
+  sr.movsd(b, sr.MemRef(a, 8))
+  ...
+
+Every instruction of the x86_64 ISA has a synthetic version in this module,
+taking synthetic registers wherever it takes a register of the same type,
+and synthetic base and index registers in MemRef.  Physical registers may be
+mixed in freely; they, and the registers instructions use implicitly (rax
+and rdx for div, rcx for loop, ...), are never given to a synthetic register
+whose value is live at the same time.
+
+Register contents are tracked across labels and jumps.  When more values
+are live than there are registers, the ones used furthest ahead are kept in
+stack slots below the saved registers; an instruction that can take a memory
+operand uses the slot directly, others get a reload and store around them.
+"""
+
+import copy
+
 import corepy.spre.spe as spe
 import corepy.arch.x86_64.platform as env
 import corepy.arch.x86_64.isa as x86
 import corepy.arch.x86_64.lib.memory as memory
+import corepy.arch.x86_64.lib.effects as effects
 import corepy.arch.x86_64.types.registers as regs
 
-# I need to override a variety of things here.
-# First, Program objects need to be subclassed, with my own acquire/release
-# register methods.
-# Second, an ISA needs to be implementated that accepts synthetic registers
-# as operands and does the right type checking.
-#  This work will probably require subclassing Instruction and
-#  DispatchInstruction.
+from corepy.arch.x86_64.isa import set_active_code, get_active_code
 
 
-#
-# Synthetic Register
-#
+# ------------------------------
+# Synthetic Registers
+# ------------------------------
 
 class SynRegister(spe.Register):
   reg_type = None
+
+  # Physical register substituted for this type when checking operands
+  stand_in = None
+
+  # Register file the allocator draws from, and bytes in a spill slot
+  reg_class = None
+  size = None
+
   def __init__(self, name):
     # No physical register assigned yet
     self.reg = None
     self.rex = None
 
+    # Reload temporaries created by the allocator are never spilled
+    self.spillable = True
+
     spe.Register.__init__(self, name)
     return
 
 
+class SynGPRegister8(SynRegister):
+  reg_type = regs.GPRegister8
+  stand_in = regs.r10b
+  reg_class = 'gp'
+  size = 1
+class SynGPRegister16(SynRegister):
+  reg_type = regs.GPRegister16
+  stand_in = regs.r10w
+  reg_class = 'gp'
+  size = 2
 class SynGPRegister32(SynRegister):
   reg_type = regs.GPRegister32
+  stand_in = regs.r10d
+  reg_class = 'gp'
+  size = 4
 class SynGPRegister64(SynRegister):
   reg_type = regs.GPRegister64
+  stand_in = regs.r10
+  reg_class = 'gp'
+  size = 8
 class SynXMMRegister(SynRegister):
   reg_type = regs.XMMRegister
+  stand_in = regs.xmm9
+  reg_class = 'xmm'
+  size = 16
+class SynYMMRegister(SynRegister):
+  reg_type = regs.YMMRegister
+  stand_in = regs.ymm9
+  reg_class = 'xmm'
+  size = 32
+
+
+_syn_types = {'gp8': SynGPRegister8, 'gp16': SynGPRegister16,
+              'gp32': SynGPRegister32, 'gp64': SynGPRegister64,
+              'xmm': SynXMMRegister, 'ymm': SynYMMRegister,
+              regs.GPRegister8: SynGPRegister8,
+              regs.GPRegister16: SynGPRegister16,
+              regs.GPRegister32: SynGPRegister32,
+              regs.GPRegister64: SynGPRegister64,
+              regs.XMMRegister: SynXMMRegister,
+              regs.YMMRegister: SynYMMRegister}
+
+
+class MemRef(memory.MemRef):
+  """
+  A memory reference whose base and index registers may be synthetic.
+  """
+
+  def __init__(self, val, disp = None, index = None, scale = 1,
+               data_size = 64, addr_size = None):
+    memory.MemRef.__init__(self, _stand_in(val), disp, _stand_in(index),
+                           scale, data_size, addr_size)
+    self.base = val
+    self.index = index
+    return
 
 
-#
-# Synthetic Instruction
-#
-
-class SynRegisterOperand(spe.InstructionOperand):
-  def __init__(self, reg_type):
-    self.reg_type = reg_type
-    return
+def _stand_in(op):
+  """Return op with physical registers in place of synthetic ones"""
+  if isinstance(op, SynRegister):
+    return op.stand_in
+  elif isinstance(op, MemRef):
+    return _rebase(op, _stand_in(op.base), _stand_in(op.index))
+  return op
 
-  def check(self, value):
-    return isinstance(value, self.reg_type)
 
-  
-class SynDispatchInstruction(spe.DispatchInstruction):
-  syn_dispatch = ()
+def _rebase(ref, base, index):
+  """Return a plain copy of a memory reference with a new base and index"""
+  new = copy.copy(ref)
+  new.__class__ = memory.MemRef
+  new.base = base
+  new.index = index
+  return new
 
-  def __init__(self, *operands, **koperands):
-    self.syn_signature = None
-
-    for signature in self.syn_dispatch:
-      # zip through the operands and the signature
-      match = True
-      for op, sig_op in zip(operands, signature):
-        #print "op", op, sig_op
-        #print "check", sig_op.check(op)
-        if not sig_op.check(op):
-          match = False
-          break
 
-      if match:
-        self.syn_signature = signature
-        break
+# ------------------------------
+# Synthetic Instructions
+# ------------------------------
 
-    if self.syn_signature is None:
-      raise TypeError("Instruction %s does not support operands (%s)" % (
-        type(self), ', '.join([str(op) for op in operands],)))
+class SynInstruction(object):
+  """
+  Mix-in for the synthetic version of an x86_64 instruction class.  The
+  operands given are kept in syn_operands; until the program is cached, the
+  instruction itself is built from stand-in physical registers.
+  """
+  inst = None
 
+  def __init__(self, *operands, **koperands):
+    ignore_active = koperands.pop('ignore_active', False)
 
     self.syn_operands = operands
     self.syn_koperands = koperands
 
-    # If active code is present, add ourself to it and remember that
-    # we did so.  active_code_used is checked by InstructionStream
-    # to avoid double adds from code.add(inst(...)) when active_code
-    # is set.
-    self.active_code_used = None    
-
-    # Allow the user to create an instruction without adding it to active code.
-    ignore_active = False
-    if koperands.has_key('ignore_active'):
-      ignore_active = koperands['ignore_active']
-      del koperands['ignore_active']
+    # Check the operands by building the instruction with a physical
+    # register of the same type standing in for each synthetic one.
+    stand_ins = [_stand_in(op) for op in operands]
+    self.inst.__init__(self, *stand_ins, **dict(koperands, ignore_active = True))
 
     if self.active_code is not None and not ignore_active:
       self.active_code.add(self)
       self.active_code_used = self.active_code
+    return
 
+
+def _build_isa():
+  """Create a synthetic instruction class for every x86_64 instruction"""
+  for (name, cls) in vars(x86.x86_64_isa).items():
+    if (isinstance(cls, type) and issubclass(cls, spe.Instruction) and
+        cls not in (spe.Instruction, spe.DispatchInstruction) and
+        cls.__module__ == x86.x86_64_isa.__name__):
+      globals()[name] = type(name, (SynInstruction, cls), {'inst': cls})
+  return
+
+_build_isa()
+
+
+# ------------------------------
+# Operand and register effects
+# ------------------------------
+
+def _phys_keys(reg):
+  """Return the allocator keys for a physical register"""
+  if isinstance(reg, regs.GPRegister8) and reg.name in ('ah', 'ch', 'dh', 'bh'):
+    return (effects.gp(reg.reg - 4),)
+  elif isinstance(reg, (regs.GPRegister8, regs.GPRegister16,
+                        regs.GPRegister32, regs.GPRegister64)):
+    n = reg.reg + 8 * reg.rex
+    if n in (4, 5):
+      # rsp and rbp are never allocated
+      return ()
+    return (effects.gp(n),)
+  elif isinstance(reg, regs.YMMRegister):
+    n = reg.reg + 8 * reg.rex
+    return (effects.xmm(n), ('ymmhi', n))
+  elif isinstance(reg, regs.XMMRegister):
+    return (effects.xmm(reg.reg + 8 * reg.rex),)
+  return ()
+
+
+def _effects(name, ops):
+  """Return the sets of registers an instruction uses and defines"""
+  uses = set()
+  defs = set()
+
+  for (op, mode) in zip(ops, effects.modes(name, ops)):
+    if isinstance(op, memory.MemoryReference):
+      for r in (op.base, op.index):
+        if isinstance(r, SynRegister):
+          uses.add(r)
+        elif isinstance(r, spe.Register):
+          uses.update(_phys_keys(r))
+      continue
+    elif isinstance(op, SynRegister):
+      keys = (op,)
+    elif isinstance(op, spe.Register):
+      keys = _phys_keys(op)
+      # Byte and word writes keep the rest of the register
+      if isinstance(op, (regs.GPRegister8, regs.GPRegister16)):
+        mode = mode.replace('w', 'rw')
+      elif isinstance(op, regs.XMMRegister) and name[0] == 'v' and 'w' in mode:
+        defs.add(('ymmhi', keys[0][1]))
+    else:
+      continue
+
+    if 'r' in mode:
+      uses.update(keys)
+    if 'w' in mode:
+      defs.update(keys)
+
+  implicit = effects.IMPLICIT.get(name)
+  if name == 'imul' and len(ops) == 1:
+    implicit = effects.IMPLICIT['mul']
+  if implicit is not None:
+    uses.update(implicit[0])
+    defs.update(implicit[1])
+  return (uses, defs)
+
+
+# ------------------------------
+# Allocator
+# ------------------------------
+
+# Preferred order of physical registers.  rsp and rbp are never allocated,
+# and 8 bit registers avoid numbers 4-7, whose encodings without a REX
+# prefix are ah-bh.
+_GP_ORDER = (3, 10, 11, 12, 13, 14, 15, 8, 9, 6, 7, 2, 1, 0)
+_GP8_ORDER = (3, 10, 11, 12, 13, 14, 15, 8, 9, 2, 1, 0)
+_XMM_ORDER = tuple(range(1, 16)) + (0,)
+
+_gp_names = {
+  8:  ('al', 'cl', 'dl', 'bl', None, None, None, None) +
+      tuple(['r%db' % i for i in xrange(8, 16)]),
+  16: ('ax', 'cx', 'dx', 'bx', 'sp', 'bp', 'si', 'di') +
+      tuple(['r%dw' % i for i in xrange(8, 16)]),
+  32: ('eax', 'ecx', 'edx', 'ebx', 'esp', 'ebp', 'esi', 'edi') +
+      tuple(['r%dd' % i for i in xrange(8, 16)]),
+  64: ('rax', 'rcx', 'rdx', 'rbx', 'rsp', 'rbp', 'rsi', 'rdi') +
+      tuple(['r%d' % i for i in xrange(8, 16)])}
+
+# Instructions whose memory forms are not used for spill slots: aligned
+# moves, which fault on YMM slots, bit tests, whose memory forms address
+# beyond the operand, and xchg, which locks memory.
+_NO_FOLD = set(('movaps', 'movapd', 'movdqa', 'movntps', 'movntpd',
+                'movntdq', 'movntdqa', 'vmovaps', 'vmovapd', 'vmovdqa',
+                'bt', 'bts', 'btr', 'btc', 'xchg'))
+
+
+class _Node(object):
+  """An instruction being allocated, or spill code to insert"""
+
+  def __init__(self, name, cls, ops, koperands, obj = None):
+    self.name = name
+    self.cls = cls
+    self.orig = tuple(ops)
+    self.ops = list(ops)
+    self.koperands = koperands
+    self.obj = obj
     return
 
 
-sgpreg32_t = SynRegisterOperand(SynGPRegister32)
-sgpreg64_t = SynRegisterOperand(SynGPRegister64)
-sxmmreg_t = SynRegisterOperand(SynXMMRegister)
+def _uses_syn(ops):
+  for op in ops:
+    if isinstance(op, SynRegister):
+      return True
+    elif isinstance(op, MemRef):
+      return True
+  return False
+
 
+def _jump_targets(node):
+  """
+  Return (targets, falls_through) for a control transfer, or None if node
+  is not one.  targets is None for indirect jumps.
+  """
+  name = node.name
+  if name[0] != 'j' and not name.startswith('loop'):
+    return None
+
+  target = node.ops[0] if len(node.ops) > 0 else None
+  if isinstance(target, spe.Label):
+    targets = (target,)
+  else:
+    targets = None
+  return (targets, name != 'jmp')
 
-#
-# Program
-#
 
 class Program(env.Program):
   default_register_type = SynGPRegister64
 
+  # Bytes below rbp used by the registers the prologue saves; spill slots
+  # start below them.
+  frame_base = 40
+
   def __init__(self):
     self.__sr_count = 0
+    self._frame_size = 0
     env.Program.__init__(self)
+
+    # Allocation statistics from the last cache_code
+    self.spills = 0
+    self.spill_slots = 0
     return
 
-  def acquire_register(self, reg_type = None):
+  def acquire_register(self, reg_type = None, reg_name = None):
+    """
+    Return a new synthetic register of the given type: a SynRegister
+    subclass, a physical register type, or 'gp8', 'gp16', 'gp32', 'gp64',
+    'xmm' or 'ymm'.  If reg_name is given, that physical register is
+    returned instead.
+    """
+    if reg_name is not None:
+      return env.Program.acquire_register(self, reg_type, reg_name)
+
     if reg_type is None:
       reg_type = self.default_register_type
+    elif not (isinstance(reg_type, type) and issubclass(reg_type, SynRegister)):
+      reg_type = _syn_types[reg_type]
+
+    return reg_type(self._syn_name())
 
+  def release_register(self, reg):
+    if isinstance(reg, SynRegister):
+      return
+    return env.Program.release_register(self, reg)
+
+  def _syn_name(self):
     name = "sr" + str(self.__sr_count)
     self.__sr_count += 1
-    return reg_type(name)
+    return name
 
-  def release_register(self, reg):
+
+  # ------------------------------
+  # Stack frame
+  # ------------------------------
+
+  def _synthesize_prologue(self):
+    env.Program._synthesize_prologue(self)
+    if self._frame_size > 0:
+      self._prologue.append(x86.sub(regs.rsp, self._frame_size,
+                                    ignore_active = True))
+    return
+
+  def _synthesize_epilogue(self):
+    env.Program._synthesize_epilogue(self)
+    if self._frame_size > 0:
+      # Point rsp back at the saved registers
+      self._epilogue.insert(1, x86.lea(regs.rsp,
+          memory.MemRef(regs.rbp, -self.frame_base, data_size = None),
+          ignore_active = True))
     return
 
 
-  # TODO - need to overload cache_code and do a pass to assign phys regs.
+  # ------------------------------
+  # Register allocation
+  # ------------------------------
+
   def cache_code(self):
-    # Go through the instructions and replace any syn regs with physical regs
-    #  Do something dumb initially, but we want to do real register allocation
-    #  Deal with:
-    #   Running out of registers
-    #   Certain instructions needing specific registers (div)
+    if self._cached == True:
+      return
 
-    regs = {}
+    self.allocate_registers()
+    env.Program.cache_code(self)
 
+    # Remember what the streams held after caching, so the next allocation
+    # can tell whether they were only added to.
     for stream in self.objects:
-      for obj in stream:
-        if isinstance(obj, SynDispatchInstruction):
-          operands = []
-          for op in obj.syn_operands:
-            if isinstance(op, SynRegister):
-              # Need to replace the synregs with real regs.
-              if not regs.has_key(op):
-                # Need a new physical register
-                regs[op] = env.Program.acquire_register(self, reg_type = op.reg_type)
-                print "assigned reg", op, regs[op]
-              operands.append(regs[op])
-            else:
-              operands.append(op)
-
-          #spe.DispatchInstruction.__init__(obj, operands)
-          obj.inst.__init__(obj, *operands)
-
-    print "CALLING SPE CACHE CODE"
-    return env.Program.cache_code(self)
-
-
-#
-# ISA Definition
-#
-
-class add(SynDispatchInstruction, x86.add):
-  inst = x86.add
-  syn_dispatch = (
-    (sgpreg64_t, x86.imm32_t),
-    (sgpreg64_t, sgpreg64_t),
-    )
- 
-class mov(SynDispatchInstruction, x86.mov):
-  inst = x86.mov
-  syn_dispatch = (
-    (sgpreg64_t, x86.imm32_t),
-    (sgpreg64_t, sgpreg64_t),
-    )
+      stream._syn_cached = list(stream.objects)
+    return
 
+  def _source_objects(self, stream):
+    """
+    Return the objects of a stream as written, before allocation.  The
+    optimizer may remove instructions from a stream after allocation, e.g.
+    a move between two synthetic registers that were given the same
+    register; the next allocation must start from the original code.
+    """
+    objs = stream.objects
+    source = getattr(stream, '_syn_source', None)
+    cached = getattr(stream, '_syn_cached', None)
+    if source is None or cached is None or len(objs) < len(cached):
+      return objs
+
+    for (a, b) in zip(objs, cached):
+      if a is not b:
+        # Replaced or reset since the last cache_code
+        return objs
+    return source + objs[len(cached):]
+
+  def allocate_registers(self):
+    """
+    Assign physical registers to the synthetic registers in all streams,
+    adding spill code and a stack frame as needed.  Called by cache_code.
+    """
+    # Each stream's objects, with instructions as _Nodes.  Spill code from
+    # an earlier allocation is dropped.
+    seqs = []
+    for stream in self.objects:
+      seq = []
+      source = []
+      for obj in self._source_objects(stream):
+        if getattr(obj, '_syn_spill', False):
+          continue
+
+        source.append(obj)
+        if isinstance(obj, spe.Instruction):
+          ops = getattr(obj, 'syn_operands', None)
+          if ops is None:
+            ops = obj._supplied_operands
+          kops = getattr(obj, 'syn_koperands', None)
+          if kops is None:
+            kops = obj._supplied_koperands
+          cls = getattr(obj, 'inst', None) or obj.__class__
+          seq.append(_Node(effects.inst_name(cls), cls, ops, kops, obj))
+        else:
+          seq.append(obj)
+      seqs.append(seq)
+      stream._syn_source = source
+
+    self._slots = {}
+    self._slot_top = self.frame_base
+    self.spills = 0
+
+    # Spill XMM registers with VEX moves if the code uses AVX
+    self._vex = False
+    for seq in seqs:
+      for obj in seq:
+        if isinstance(obj, _Node) and getattr(obj.cls, 'arch_ext', 0) >= 5:
+          self._vex = True
+
+    while True:
+      flat = [obj for seq in seqs for obj in seq]
+      (intervals, fixed) = self._live_ranges(flat)
+      (assigned, spilled) = self._linear_scan(intervals, fixed)
+      if len(spilled) == 0:
+        break
+      for seq in seqs:
+        self._insert_spill_code(seq, spilled)
+
+    frame = self._slot_top - self.frame_base
+    self._frame_size = (frame + 15) & ~15
+    self.spill_slots = len(self._slots)
+
+    # Rebuild the instructions with physical registers.  Streams whose
+    # instructions change must not reuse code rendered by cache_code before.
+    for (stream, seq) in zip(self.objects, seqs):
+      objects = []
+      changed = False
+      for obj in seq:
+        if isinstance(obj, _Node):
+          changed = changed or (obj.obj is None or
+                                isinstance(obj.obj, SynInstruction) or
+                                _uses_syn(obj.orig))
+          obj = self._physical_inst(obj, assigned)
+        objects.append(obj)
+      if changed or len(objects) != len(stream.objects) or [
+          a for (a, b) in zip(objects, stream.objects) if a is not b]:
+        stream.objects = objects
+        stream._version += 1
+    return
+
+
+  def _physical_inst(self, node, assigned):
+    def phys(op):
+      if isinstance(op, SynRegister):
+        (cls, n) = assigned[op]
+        if op.reg_class == 'gp':
+          return getattr(regs, _gp_names[op.size * 8][n])
+        elif isinstance(op, SynYMMRegister):
+          return getattr(regs, 'ymm%d' % n)
+        return getattr(regs, 'xmm%d' % n)
+      elif isinstance(op, MemRef):
+        return _rebase(op, phys(op.base), phys(op.index))
+      return op
+
+    obj = node.obj
+    if obj is None:
+      inst = node.cls(*[phys(op) for op in node.ops], ignore_active = True)
+      inst._syn_spill = True
+      return inst
+
+    if isinstance(obj, SynInstruction) or _uses_syn(node.orig):
+      if not isinstance(obj, SynInstruction):
+        # Plain instruction with a synthetic memory reference; remember the
+        # original operands for the next allocation.
+        obj.syn_operands = node.orig
+        obj.syn_koperands = node.koperands
+      ops = [phys(op) for op in node.ops]
+      node.cls.__init__(obj, *ops, **dict(node.koperands, ignore_active = True))
+    return obj
+
+
+  def _live_ranges(self, flat):
+    """
+    Return the live interval (start, end) of each synthetic register, and
+    the live ranges of each physical register key, for the instructions in
+    flat.  Instruction i reads its operands at 2i and writes them at 2i + 1.
+    """
+    nodes = []
+    node_effects = []
+    blocks = []          # [first node, last node]
+    label_block = {}
+    pending = []
+
+    for obj in flat:
+      if isinstance(obj, spe.Label):
+        if len(blocks) > 0 and blocks[-1][1] is None:
+          blocks[-1][1] = len(nodes) - 1
+        pending.append(obj)
+      elif isinstance(obj, _Node):
+        if len(blocks) == 0 or blocks[-1][1] is not None:
+          blocks.append([len(nodes), None])
+          for lbl in pending:
+            label_block[lbl] = len(blocks) - 1
+          pending = []
+        nodes.append(obj)
+        node_effects.append(_effects(obj.name, obj.ops))
+        if _jump_targets(obj) is not None:
+          blocks[-1][1] = len(nodes) - 1
+    if len(blocks) > 0 and blocks[-1][1] is None:
+      blocks[-1][1] = len(nodes) - 1
+
+    exit = len(blocks)
+    for lbl in pending:
+      label_block[lbl] = exit
+    label_block[self.lbl_body] = 0
+    label_block[self.lbl_epilogue] = exit
+
+    # Control flow graph
+    succs = []
+    for (b, (first, last)) in enumerate(blocks):
+      jump = _jump_targets(nodes[last])
+      if jump is None:
+        succs.append((b + 1,))
+        continue
+
+      (targets, falls_through) = jump
+      if targets is None:
+        # Indirect jump: anywhere a label is
+        s = set(label_block.values())
+        s.add(exit)
+      else:
+        s = set([label_block.get(t, exit) for t in targets])
+      if falls_through:
+        s.add(b + 1)
+      succs.append(tuple(s))
+
+    # Per-block liveness, iterated to a fixed point
+    gen = []
+    kill = []
+    for (first, last) in blocks:
+      g = set()
+      k = set()
+      for i in xrange(first, last + 1):
+        (uses, defs) = node_effects[i]
+        g.update(uses - k)
+        k.update(defs)
+      gen.append(g)
+      kill.append(k)
+
+    # The return registers are live at the end, if the code sets them
+    ret = set()
+    for (uses, defs) in node_effects:
+      ret.update(defs & set((effects.RAX, effects.XMM0)))
+    live_in = [set() for b in blocks] + [ret]
+    live_out = [set() for b in blocks]
+    changed = True
+    while changed:
+      changed = False
+      for b in xrange(len(blocks) - 1, -1, -1):
+        out = set()
+        for s in succs[b]:
+          out.update(live_in[s])
+        inn = gen[b] | (out - kill[b])
+        if out != live_out[b] or inn != live_in[b]:
+          live_out[b] = out
+          live_in[b] = inn
+          changed = True
+
+    # Ranges
+    intervals = {}
+    fixed = {}
+
+    def add_range(key, start, end):
+      if isinstance(key, SynRegister):
+        try:
+          (s, e) = intervals[key]
+          intervals[key] = (min(s, start), max(e, end))
+        except KeyError:
+          intervals[key] = (start, end)
+      else:
+        fixed.setdefault(key, []).append((start, end))
+      return
+
+    for (b, (first, last)) in enumerate(blocks):
+      open_end = dict([(key, 2 * last + 1) for key in live_out[b]])
+      for i in xrange(last, first - 1, -1):
+        (uses, defs) = node_effects[i]
+        for key in defs:
+          end = open_end.pop(key, 2 * i + 1)
+          add_range(key, 2 * i + 1, end)
+        for key in uses:
+          if key not in open_end:
+            open_end[key] = 2 * i
+      for (key, end) in open_end.items():
+        add_range(key, 2 * first, end)
+
+    return (intervals, fixed)
+
+
+  def _linear_scan(self, intervals, fixed):
+    """
+    Assign a physical register number to each synthetic register.  Returns
+    a dict of register -> (class, number) and a list of registers to spill.
+    """
+    def blocked(reg, n, start, end):
+      if reg.reg_class == 'gp':
+        keys = (effects.gp(n),)
+      elif isinstance(reg, SynYMMRegister):
+        keys = (effects.xmm(n), ('ymmhi', n))
+      else:
+        keys = (effects.xmm(n),)
+      for key in keys:
+        for (s, e) in fixed.get(key, ()):
+          if s <= end and start <= e:
+            return True
+      return False
+
+    def order(reg):
+      if reg.reg_class == 'xmm':
+        return _XMM_ORDER
+      elif isinstance(reg, SynGPRegister8):
+        return _GP8_ORDER
+      return _GP_ORDER
+
+    assigned = {}
+    spilled = []
+    active = []     # (end, reg), for registers holding a physical register
+
+    by_start = sorted(intervals.items(), key = lambda x: (x[1][0], x[1][1]))
+    for (reg, (start, end)) in by_start:
+      active = [(e, r) for (e, r) in active if e >= start]
+
+      cls = reg.reg_class
+      taken = set([assigned[r][1] for (e, r) in active if r.reg_class == cls])
+
+      choice = None
+      for n in order(reg):
+        if n not in taken and not blocked(reg, n, start, end):
+          choice = n
+          break
+
+      if choice is None:
+        # Spill whichever interval ends last, if its register can be used
+        victim = None
+        for (e, r) in active:
+          n = assigned[r][1]
+          if (r.reg_class == cls and r.spillable and n in order(reg) and
+              not blocked(reg, n, start, end)):
+            if victim is None or e > victim[0]:
+              victim = (e, r)
+
+        if victim is not None and (victim[0] > end or not reg.spillable):
+          (e, r) = victim
+          choice = assigned.pop(r)[1]
+          active.remove(victim)
+          spilled.append(r)
+        elif reg.spillable:
+          spilled.append(reg)
+          continue
+        else:
+          raise Exception("Unable to allocate a register for %s" % str(reg))
+
+      assigned[reg] = (cls, choice)
+      active.append((end, reg))
+
+    return (assigned, spilled)
+
+
+  # ------------------------------
+  # Spilling
+  # ------------------------------
+
+  def _slot(self, reg):
+    """Return the stack slot memory reference for a spilled register"""
+    try:
+      return self._slots[reg]
+    except KeyError:
+      pass
+
+    # Slots are aligned to their size, up to 16 bytes (rbp is 16 byte
+    # aligned)
+    align = min(reg.size, 16)
+    top = (self._slot_top + reg.size + align - 1) & ~(align - 1)
+    self._slot_top = top
+    slot = memory.MemRef(regs.rbp, -top, data_size = reg.size * 8)
+    self._slots[reg] = slot
+    return slot
+
+  def _spill_move(self, reg):
+    """Return the instruction class that moves reg to and from its slot"""
+    if reg.reg_class == 'gp':
+      return x86.mov
+    elif isinstance(reg, SynYMMRegister):
+      return x86.vmovdqu
+    elif self._vex:
+      return x86.vmovdqu
+    return x86.movdqu
+
+  def _can_fold(self, node, i, slot):
+    """Return True if operand i of node may be replaced by a memory slot"""
+    if node.obj is None or node.name in _NO_FOLD:
+      return False
+    for op in node.ops:
+      if isinstance(op, memory.MemoryReference):
+        return False
+
+    ops = [_stand_in(op) for op in node.ops]
+    ops[i] = slot
+    try:
+      node.cls(*ops, **dict(node.koperands, ignore_active = True))
+    except Exception:
+      return False
+    return True
+
+  def _insert_spill_code(self, seq, spilled):
+    """Rewrite the instructions in seq that use a spilled register"""
+    spilled = set(spilled)
+    i = 0
+    while i < len(seq):
+      node = seq[i]
+      if not isinstance(node, _Node):
+        i += 1
+        continue
+
+      modes = effects.modes(node.name, node.ops)
+      for reg in spilled:
+        direct = [j for (j, op) in enumerate(node.ops) if op is reg]
+        in_mem = [j for (j, op) in enumerate(node.ops)
+                  if isinstance(op, MemRef) and
+                     (op.base is reg or op.index is reg)]
+        if len(direct) == 0 and len(in_mem) == 0:
+          continue
+
+        self.spills += 1
+        slot = self._slot(reg)
+        if (len(direct) == 1 and len(in_mem) == 0 and
+            self._can_fold(node, direct[0], slot)):
+          node.ops[direct[0]] = slot
+          continue
+
+        # Reload into a temporary for this instruction only
+        temp = reg.__class__(self._syn_name())
+        temp.spillable = False
+        used = len(in_mem) > 0
+        defined = False
+        for j in direct:
+          node.ops[j] = temp
+          used = used or 'r' in modes[j]
+          defined = defined or 'w' in modes[j]
+        for j in in_mem:
+          ref = node.ops[j]
+          base = ref.base
+          index = ref.index
+          if base is reg:
+            base = temp
+          if index is reg:
+            index = temp
+          ref = copy.copy(ref)
+          ref.base = base
+          ref.index = index
+          node.ops[j] = ref
+
+        if defined:
+          mv = self._spill_move(reg)
+          seq.insert(i + 1, _Node(effects.inst_name(mv), mv, (slot, temp),
+                                  {}))
+        if used:
+          mv = self._spill_move(reg)
+          seq.insert(i, _Node(effects.inst_name(mv), mv, (temp, slot),
+                              {}))
+          i += 1
+      i += 1
+    return
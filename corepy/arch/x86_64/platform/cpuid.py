@@ -0,0 +1,346 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+__doc__ = """
+CPUID-based probe of the instruction set extensions and caches of the host.
+
+Code generators can use this to pick instructions at synthesis time:
+
+  import corepy.arch.x86_64.platform.cpuid as cpuid
+
+  if cpuid.has('bmi2'):
+    x86.shlx(rax, rbx, rcx)
+  else:
+    x86.mov(rax, rbx)
+    x86.shl(rax, cl)
+
+or through the HostInfo object returned by host():
+
+  info = cpuid.host()
+  if info.avx2 and info.fma:
+    ...
+  block = info.l2_cache / 2
+
+The cpuid and xgetbv instructions are run by small synthetic programs,
+executed the first time a value is needed; results are cached.
+
+The AVX family (avx, avx2, fma, f16c) is only reported when the operating
+system also saves the YMM registers, as shown by xgetbv.
+"""
+
+import struct
+
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.arch.x86_64.platform as env
+import corepy.lib.extarray as extarray
+
+
+# Feature name -> (leaf, subleaf, register index (eax, ebx, ecx, edx), bit)
+FEATURES = {
+  'mmx':       (0x1, 0, 3, 23),
+  'sse':       (0x1, 0, 3, 25),
+  'sse2':      (0x1, 0, 3, 26),
+  'sse3':      (0x1, 0, 2, 0),
+  'pclmulqdq': (0x1, 0, 2, 1),
+  'ssse3':     (0x1, 0, 2, 9),
+  'fma':       (0x1, 0, 2, 12),
+  'cx16':      (0x1, 0, 2, 13),
+  'sse41':     (0x1, 0, 2, 19),
+  'sse42':     (0x1, 0, 2, 20),
+  'movbe':     (0x1, 0, 2, 22),
+  'popcnt':    (0x1, 0, 2, 23),
+  'aes':       (0x1, 0, 2, 25),
+  'osxsave':   (0x1, 0, 2, 27),
+  'avx':       (0x1, 0, 2, 28),
+  'f16c':      (0x1, 0, 2, 29),
+  'rdrand':    (0x1, 0, 2, 30),
+  'bmi1':      (0x7, 0, 1, 3),
+  'avx2':      (0x7, 0, 1, 5),
+  'bmi2':      (0x7, 0, 1, 8),
+  'adx':       (0x7, 0, 1, 19),
+  'lzcnt':     (0x80000001, 0, 2, 5),
+  'rdtscp':    (0x80000001, 0, 3, 27),
+  }
+
+# Features that use the YMM registers, and so need OS support
+YMM_FEATURES = ('avx', 'avx2', 'fma', 'f16c')
+
+# XCR0 bits for the SSE (XMM) and AVX (upper YMM) register state
+XCR0_YMM = 0x6
+
+
+# ------------------------------
+# Probe
+# ------------------------------
+
+_cpuid_prgm = None
+_xgetbv_prgm = None
+_result = None
+_leaves = {}
+_features = None
+_host = None
+
+
+def _synthesize_cpuid():
+  global _cpuid_prgm, _result
+
+  _result = extarray.extarray('I', 4)
+
+  prgm = env.Program()
+  code = prgm.get_stream()
+
+  # p1 is the leaf, p2 the subleaf.  cpuid overwrites rbx, which the
+  # prologue saves.
+  code.add(x86.mov(rax, rdi))
+  code.add(x86.mov(rcx, rsi))
+  code.add(x86.mov(r8, _result.buffer_info()[0]))
+  code.add(x86.cpuid())
+  code.add(x86.mov(MemRef(r8, 0, data_size = 32), eax))
+  code.add(x86.mov(MemRef(r8, 4, data_size = 32), ebx))
+  code.add(x86.mov(MemRef(r8, 8, data_size = 32), ecx))
+  code.add(x86.mov(MemRef(r8, 12, data_size = 32), edx))
+
+  prgm += code
+  _cpuid_prgm = prgm
+  return
+
+
+def _synthesize_xgetbv():
+  global _xgetbv_prgm
+
+  prgm = env.Program()
+  code = prgm.get_stream()
+
+  # p1 is the register number; the result is returned as edx:eax
+  code.add(x86.mov(rcx, rdi))
+  code.add(x86.xgetbv())
+  code.add(x86.shl(rdx, 32))
+  code.add(x86.mov(eax, eax))
+  code.add(x86.or_(rax, rdx))
+
+  prgm += code
+  _xgetbv_prgm = prgm
+  return
+
+
+def _run(name, synthesize, params):
+  """
+  Execute the probe program in the global name, synthesizing it first if
+  needed.  Probes can be made while a caller is generating code, so the
+  active code stream is set aside meanwhile.
+  """
+  active = x86.get_active_code()
+  x86.set_active_code(None)
+  try:
+    if globals()[name] is None:
+      synthesize()
+    return env.Processor().execute(globals()[name], params = params)
+  finally:
+    x86.set_active_code(active)
+
+
+def cpuid(leaf, subleaf = 0):
+  """
+  Return the (eax, ebx, ecx, edx) values cpuid gives for a leaf and subleaf.
+  """
+  key = (leaf, subleaf)
+  try:
+    return _leaves[key]
+  except KeyError:
+    pass
+
+  params = env.ExecParams()
+  params.p1 = leaf
+  params.p2 = subleaf
+  _run('_cpuid_prgm', _synthesize_cpuid, params)
+
+  regs = tuple(_result)
+  _leaves[key] = regs
+  return regs
+
+
+def xgetbv(xcr = 0):
+  """
+  Return the value of an extended control register, or 0 if the operating
+  system has not enabled the xgetbv instruction.
+  """
+  if not cpuid(1)[2] & (1 << FEATURES['osxsave'][3]):
+    return 0
+
+  params = env.ExecParams()
+  params.p1 = xcr
+  return _run('_xgetbv_prgm', _synthesize_xgetbv, params) & 0xFFFFFFFFFFFFFFFF
+
+
+def features():
+  """
+  Return the set of names from FEATURES that the host supports.
+  """
+  global _features
+  if _features is not None:
+    return _features
+
+  # Leaves above the highest supported one return meaningless values
+  max_basic = cpuid(0)[0]
+  max_ext = cpuid(0x80000000)[0]
+
+  supported = set()
+  for (name, (leaf, subleaf, reg, bit)) in FEATURES.iteritems():
+    if leaf >= 0x80000000:
+      if leaf > max_ext:
+        continue
+    elif leaf > max_basic:
+      continue
+
+    if cpuid(leaf, subleaf)[reg] & (1 << bit):
+      supported.add(name)
+
+  if xgetbv(0) & XCR0_YMM != XCR0_YMM:
+    supported.difference_update(YMM_FEATURES)
+
+  _features = frozenset(supported)
+  return _features
+
+
+def has(*names):
+  """
+  Return True if the host supports all of the named features.
+  """
+  for name in names:
+    if name not in FEATURES:
+      raise Exception("Unknown CPU feature %s" % str(name))
+  return features().issuperset(names)
+
+
+# ------------------------------
+# Host information
+# ------------------------------
+
+def _cache_sizes():
+  """
+  Return the L1 data, L2 and L3 cache sizes and the cache line size, in
+  bytes.  Unknown values are 0.
+  """
+  sizes = {1: 0, 2: 0, 3: 0}
+  line = 0
+
+  max_basic = cpuid(0)[0]
+  max_ext = cpuid(0x80000000)[0]
+
+  # Deterministic cache parameters: leaf 4 on Intel, 0x8000001D on AMD
+  # processors with topology extensions.
+  if max_basic >= 4 and cpuid(4, 0)[0] & 0x1F != 0:
+    leaf = 4
+  elif (max_ext >= 0x8000001D and
+        cpuid(0x80000001)[2] & (1 << 22) and
+        cpuid(0x8000001D, 0)[0] & 0x1F != 0):
+    leaf = 0x8000001D
+  else:
+    leaf = None
+
+  if leaf is not None:
+    subleaf = 0
+    while True:
+      (eax, ebx, ecx, edx) = cpuid(leaf, subleaf)
+      ctype = eax & 0x1F
+      if ctype == 0:
+        break
+
+      # Type 1 is data, 3 unified; skip instruction caches
+      level = (eax >> 5) & 0x7
+      if ctype in (1, 3) and level in sizes:
+        ways = ((ebx >> 22) & 0x3FF) + 1
+        parts = ((ebx >> 12) & 0x3FF) + 1
+        lsize = (ebx & 0xFFF) + 1
+        sets = ecx + 1
+        sizes[level] = ways * parts * lsize * sets
+        if level == 1:
+          line = lsize
+      subleaf += 1
+  else:
+    # Older AMD processors report sizes in KB
+    if max_ext >= 0x80000005:
+      ecx = cpuid(0x80000005)[2]
+      sizes[1] = (ecx >> 24) * 1024
+      line = ecx & 0xFF
+    if max_ext >= 0x80000006:
+      (eax, ebx, ecx, edx) = cpuid(0x80000006)
+      sizes[2] = (ecx >> 16) * 1024
+      sizes[3] = (edx >> 18) * 512 * 1024
+
+  return (sizes[1], sizes[2], sizes[3], line)
+
+
+class HostInfo(object):
+  """
+  Capabilities of the host, gathered once by host().
+
+  Attributes:
+    vendor     - processor vendor string, e.g. 'GenuineIntel'
+    features   - frozenset of supported names from FEATURES
+    xcr0       - XCR0 register, the state the OS saves on context switches
+    l1d_cache  - L1 data cache size in bytes (0 if unknown)
+    l2_cache   - L2 cache size in bytes (0 if unknown)
+    l3_cache   - L3 cache size in bytes (0 if unknown)
+    cache_line - cache line size in bytes (0 if unknown)
+
+  Every name in FEATURES is also a boolean attribute, e.g. info.sse41,
+  info.avx2, info.bmi2.
+  """
+
+  def __init__(self):
+    (max_basic, ebx, ecx, edx) = cpuid(0)
+    self.vendor = struct.pack('<III', ebx, edx, ecx)
+    self.features = features()
+    self.xcr0 = xgetbv(0)
+    (self.l1d_cache, self.l2_cache, self.l3_cache,
+     self.cache_line) = _cache_sizes()
+    return
+
+  def __getattr__(self, name):
+    if name in FEATURES:
+      return name in self.features
+    raise AttributeError(name)
+
+  def __str__(self):
+    return ("%s L1d %d L2 %d L3 %d line %d: %s" % (self.vendor,
+            self.l1d_cache, self.l2_cache, self.l3_cache, self.cache_line,
+            ' '.join(sorted(self.features))))
+
+
+def host():
+  """
+  Return the HostInfo for this machine, probing it on the first call.
+  """
+  global _host
+  if _host is None:
+    _host = HostInfo()
+  return _host
+
@@ -30,7 +30,12 @@ __doc__="""
 SPE for the x86_64 processor family.
 """
 
+import errno
+import os
+import struct
+
 import corepy.spre.spe as spe
+import corepy.lib.extarray as extarray
 import x86_64_exec
 
 import corepy.arch.x86_64.isa as x86
@@ -56,11 +61,39 @@ WORD_BITS = WORD_SIZE * 8 # number of bits in a word
 class InstructionStream(spe.InstructionStream): pass
 
 
+class _ArenaBlock(object):
+  """
+  A block of code arena memory, returned to the arena when collected.
+  """
+
+  def __init__(self, exec_module, size, align):
+    self.exec_module = exec_module
+    self.size = size
+    self.addr = exec_module.arena_alloc(size, align)
+    return
+
+  def __del__(self):
+    if self.addr != 0:
+      self.exec_module.arena_free(self.addr, self.size)
+    return
+
+
 class Program(spe.Program):
   exec_module = x86_64_exec
   default_register_type = GPRegister64
   instruction_type  = 'B'
 
+  # If True, make_executable copies the code into the shared code arena,
+  # where small programs share pages, rather than making render_code's own
+  # pages executable.  inst_addr() returns the address in the arena.
+  use_arena = True
+
+  # Alignment of programs in the arena.  Programs aligning code to larger
+  # boundaries get those instead.
+  arena_align = 64
+
+  _arena_block = None
+
   gp_return = rax
   fp_return = xmm0
 
@@ -105,7 +138,7 @@ class Program(spe.Program):
     RegisterFiles = (('gp8', GPRegister8),   ('gp16', GPRegister16),
                      ('gp32', GPRegister32), ('gp64', GPRegister64),
                      ('st', FPRegister),     ('mm', MMXRegister),
-                     ('xmm', XMMRegister))
+                     ('xmm', XMMRegister),   ('ymm', YMMRegister))
 
     for (reg_type, cls) in RegisterFiles:
       self._reg_type[reg_type] = cls
@@ -113,6 +146,33 @@ class Program(spe.Program):
     return
 
 
+  # YMM registers share storage with the XMM registers, so they have no pool
+  # of their own: acquiring a YMM register takes the XMM register with the
+  # same number from the XMM pool, and releasing it returns that register.
+
+  def acquire_register(self, reg_type = None, reg_name = None):
+    if isinstance(reg_type, str):
+      reg_type = self._reg_type[reg_type]
+
+    if reg_type is YMMRegister:
+      if reg_name is not None:
+        reg_name = "x" + str(reg_name)[1:]
+      reg = spe.Program.acquire_register(self, XMMRegister, reg_name)
+      return YMMRegister("y" + reg.name[1:])
+
+    return spe.Program.acquire_register(self, reg_type, reg_name)
+
+  def release_register(self, reg):
+    if isinstance(reg, YMMRegister):
+      reg = XMMRegister("x" + reg.name[1:])
+    return spe.Program.release_register(self, reg)
+
+  def registers_available(self, reg_type = None):
+    if reg_type is YMMRegister or reg_type == 'ymm':
+      reg_type = XMMRegister
+    return spe.Program.registers_available(self, reg_type)
+
+
   def _align_stream(self, length, align):
     return [x86.nop() for i in xrange(0, align - (length % align))]
 
@@ -122,7 +182,30 @@ class Program(spe.Program):
   # ------------------------------
 
   def make_executable(self):
-    self.exec_module.make_executable(self.render_code.buffer_info()[0], len(self.render_code))
+    code = self.render_code
+    self._arena_block = None
+
+    if self.use_arena and len(code) > 0:
+      # Alignment in the code is relative to the start of the program
+      align = self.arena_align
+      for stream in self.objects:
+        for obj in stream.objects:
+          if obj.__class__ is spe.AlignStream and obj.align > align:
+            align = obj.align
+
+      block = _ArenaBlock(self.exec_module, len(code), align)
+      if block.addr != 0:
+        self.exec_module.arena_write(block.addr, code.buffer_info()[0], len(code))
+        self._arena_block = block
+        return
+
+    self.exec_module.make_executable(code.buffer_info()[0], len(code))
+    return
+
+  def inst_addr(self):
+    if self._cached and self._arena_block is not None:
+      return self._arena_block.addr
+    return spe.Program.inst_addr(self)
 
   def _synthesize_prologue(self):
     """
@@ -163,7 +246,325 @@ class Program(spe.Program):
 
 class Processor(spe.Processor):
   exec_module = x86_64_exec
-  
+
+  # Async execution and execute_many run on a process-wide pool of native
+  # worker threads, started with one thread per CPU when first needed.
+
+  def start_pool(self, threads = 0, pin = False):
+    """
+    (Re)start the worker pool with the given number of threads, or one per
+    CPU if threads is 0.  If pin is True, each worker is bound to one CPU.
+
+    Async programs that wait on each other need at least as many workers
+    as there are such programs running at once.
+    """
+    return self.exec_module.pool_start(threads, int(pin))
+
+  def stop_pool(self):
+    """
+    Finish all queued async executions and stop the worker pool.
+    """
+    self.exec_module.pool_stop()
+    return
+
+  def pool_size(self):
+    return self.exec_module.pool_size()
+
+  def completions(self):
+    """
+    Return the process-wide Completions object, for waiting on async
+    executions from an event loop.
+    """
+    global _completions
+    if _completions is None:
+      _completions = Completions(self)
+    return _completions
+
+
+  def execute_many(self, prgm, params, mode = 'int', results = None,
+                   parallel = True):
+    """
+    Execute the code in the Program object once for each parameter set in
+    params, spread over the worker pool, and return the results in the
+    same order.  If parallel is False, all executions run on the calling
+    thread.
+
+    params is either a list of parameter sets, each an ExecParams object or
+    a sequence of up to six integers, or an array holding p1..p6 for each
+    execution.  Arrays are used in place: an extarray of type 'l' or 'L'
+    with N * 6 elements, or any C-contiguous array of 8-byte integers with
+    shape (N, 6) and a NumPy __array_interface__.
+
+    The results are written to results if given (an extarray or array as
+    above of at least N 'l' values, or 'f' values for fp mode), and
+    otherwise to a new extarray.
+    """
+
+    if not isinstance(prgm, spe.Program):
+      raise TypeError("Only Programs may be executed")
+
+    if mode == 'fp':
+      execute = self.exec_module.execute_many_fp
+      rtypes = ('f',)
+    elif mode in ('int', 'void'):
+      execute = self.exec_module.execute_many_int
+      rtypes = ('l',)
+    else:
+      raise Exception('Unknown mode: ' + str(mode))
+
+    packed = _array_info(params, ('l', 'L'), width = 6)
+    if packed is not None:
+      (params_addr, length) = packed
+      n = length / 6
+    else:
+      # Pack the parameters into an array of ExecParams structures
+      packed = []
+      zeros = [0] * 6
+      for p in params:
+        if type(p) is ExecParams:
+          packed.extend((p.p1, p.p2, p.p3, p.p4, p.p5, p.p6))
+        else:
+          if len(p) > 6:
+            raise Exception('At most 6 parameters are supported: ' + str(p))
+          packed.extend(p)
+          packed.extend(zeros[len(p):])
+      packed = extarray.extarray(WORD_TYPE, packed)
+      params_addr = packed.buffer_info()[0]
+      n = len(params)
+
+    if results is None:
+      results = extarray.extarray(rtypes[0], n)
+      results_addr = results.buffer_info()[0]
+    else:
+      info = _array_info(results, rtypes, writable = True)
+      if info is None:
+        raise TypeError("results must be an array of type '%s'" % rtypes[0])
+      (results_addr, length) = info
+      if length < n:
+        raise Exception('results array is too short: %d < %d' % (length, n))
+
+    if len(prgm) == 0 or n == 0:
+      return results
+
+    if not prgm._cached:
+      prgm.cache_code()
+
+    if execute(prgm.inst_addr(), params_addr, results_addr, n,
+               int(parallel)) != 0:
+      raise Exception('Error creating worker threads')
+    return results
+
+
+  def execute_parallel(self, prgm, ranks = 0, params = None, mode = 'int',
+                       reduce = None):
+    """
+    Execute the code in the Program object once for each of ranks ranks
+    on the worker pool, one rank per worker if ranks is 0.  Each execution
+    gets p1..p4 from params (an ExecParams object or a sequence of up to
+    four integers), its rank in p5 and the number of ranks in p6; see
+    iterators.parallel.
+
+    Returns the list of results by rank, or if reduce is given, the
+    results combined by the two argument function reduce (for example
+    operator.add).
+    """
+
+    if ranks <= 0:
+      ranks = self.pool_size()
+      if ranks == 0:
+        self.start_pool()
+        ranks = self.pool_size()
+
+    if params is None:
+      base = [0] * 4
+    elif type(params) is ExecParams:
+      base = [params.p1, params.p2, params.p3, params.p4]
+    else:
+      if len(params) > 4:
+        raise Exception('At most 4 parameters are supported: ' + str(params))
+      base = list(params) + [0] * (4 - len(params))
+
+    results = self.execute_many(prgm,
+        [base + [rank, ranks] for rank in xrange(0, ranks)], mode = mode)
+    if mode == 'void':
+      return None
+
+    results = list(results)
+    if reduce is None:
+      return results
+
+    result = results[0]
+    for r in results[1:]:
+      result = reduce(result, r)
+    return result
+
+
+# NumPy array interface type strings for extarray type codes
+_array_typestrs = {'l': ('<i8',), 'L': ('<u8',), 'f': ('<f4',)}
+
+def _array_info(arr, typecodes, writable = False, width = None):
+  """
+  Return (address, number of elements) for an extarray or an array with
+  __array_interface__ holding one of the given element types, or None if
+  arr is neither.  If width is given, the array holds rows of width
+  elements: an extarray's length must be a multiple of width, and an
+  __array_interface__ array must have shape (N, width).
+  """
+  if isinstance(arr, extarray.extarray):
+    if arr.typecode not in typecodes:
+      raise TypeError("extarray type must be one of %s, not '%s'" % (
+          ', '.join(["'%s'" % t for t in typecodes]), arr.typecode))
+    info = arr.buffer_info()
+    if width is not None and info[1] % width != 0:
+      raise TypeError('extarray length must be a multiple of %d, not %d' % (
+          width, info[1]))
+    return info
+
+  try:
+    iface = arr.__array_interface__
+  except AttributeError:
+    return None
+
+  typestrs = []
+  for t in typecodes:
+    typestrs.extend(_array_typestrs[t])
+  # Signed and unsigned parameters are the same to the native code
+  if 'L' in typecodes:
+    typestrs.append('<i8')
+  if iface['typestr'] not in typestrs:
+    raise TypeError('array type must be one of %s, not %s' % (
+        ', '.join(typestrs), iface['typestr']))
+  if iface.get('strides') is not None:
+    raise TypeError('array must be C-contiguous')
+  if writable and iface['data'][1]:
+    raise TypeError('array is read-only')
+  shape = tuple(iface['shape'])
+  if width is not None and (len(shape) != 2 or shape[1] != width):
+    raise TypeError('array must have shape (N, %d), not %s' % (width, shape))
+
+  length = 1
+  for dim in shape:
+    length *= dim
+  return (iface['data'][0], length)
+
+
+# ------------------------------------------------------------
+# Completion notification
+# ------------------------------------------------------------
+
+class Completions(object):
+  """
+  Async execution for event loops.  Programs started with submit() run on
+  the worker pool, and fileno() becomes readable when any of them finish.
+  process() then joins the finished executions and calls their callbacks
+  with the results, so no thread waits on each execution.
+
+  With select, for example:
+
+    comp = proc.completions()
+    comp.submit(prgm, results.append, params)
+    while len(comp) > 0:
+      select.select([comp], [], [])
+      comp.process()
+
+  or with an event loop that watches file descriptors, register
+  comp.process as the reader callback for comp.fileno().
+
+  There is one Completions object per process; use
+  Processor.completions() to get it.
+  """
+
+  def __init__(self, proc):
+    self.proc = proc
+    self.fd = proc.exec_module.completion_fd()
+    if self.fd == -1:
+      raise Exception('Unable to create completion eventfd')
+
+    # Execution id -> (ThreadInfo, callback)
+    self._pending = {}
+    # (callback, result) for joined executions whose callbacks have not
+    # been called yet
+    self._ready = []
+    return
+
+  def fileno(self):
+    return self.fd
+
+  def __len__(self):
+    return len(self._pending) + len(self._ready)
+
+  def submit(self, prgm, callback, params = None, mode = 'int'):
+    """
+    Start executing the code in the Program object on the worker pool.
+    callback is called by process() with the result (see
+    Processor.execute for modes).  Returns the execution id.
+    """
+
+    if not isinstance(prgm, spe.Program):
+      raise TypeError("Only Programs may be executed")
+
+    if mode == 'int':
+      tmode = self.proc.MODE_INT
+    elif mode == 'fp':
+      tmode = self.proc.MODE_FP
+    elif mode == 'void':
+      tmode = self.proc.MODE_VOID
+    else:
+      raise Exception('Unknown mode: ' + str(mode))
+
+    if not prgm._cached:
+      prgm.cache_code()
+
+    params = self.proc._exec_params(params)
+    t = self.proc.exec_module.execute_notify(prgm.inst_addr(), params,
+                                             int(mode == 'fp'))
+    if t is None:
+      raise Exception('Error starting async execution')
+
+    t.mode = tmode
+    self._pending[t.id] = (t, callback)
+    return t.id
+
+  def process(self):
+    """
+    Join all finished executions and call their callbacks.  Returns the
+    number of callbacks called.
+
+    Every finished execution is joined before any callback runs.  If a
+    callback raises, the exception is passed on and the eventfd is
+    signalled again, so the remaining callbacks run on the next call.
+    """
+
+    try:
+      os.read(self.fd, 8)
+    except OSError, e:
+      if e.errno != errno.EAGAIN:
+        raise
+
+    next_completed = self.proc.exec_module.next_completed
+    ready = self._ready
+
+    id = next_completed()
+    while id != 0:
+      (t, callback) = self._pending.pop(id)
+      ready.append((callback, self.proc.join(t)))
+      id = next_completed()
+
+    count = 0
+    try:
+      while count < len(ready):
+        (callback, result) = ready[count]
+        count += 1
+        callback(result)
+    finally:
+      del ready[:count]
+      if len(ready) > 0:
+        os.write(self.fd, struct.pack('Q', 1))
+    return count
+
+
+_completions = None
+
 
 # ------------------------------------------------------------
 # Unit tests
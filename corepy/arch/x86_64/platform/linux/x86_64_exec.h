@@ -34,7 +34,13 @@
 #define X86_EXEC_H
 
 #include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <sched.h>
 #include <sys/mman.h>
+#include <sys/eventfd.h>
+#include <sys/syscall.h>
 #include <errno.h>
 #include <pthread.h>
 #include <stdint.h>
@@ -78,19 +84,13 @@ struct ExecParams {
 };
 
 
-struct ThreadParams {
-  addr_t addr;
-  struct ExecParams params;
-  union {
-    long l;
-    float d;
-  } ret;
-};
-
+// Async executions are tasks run by a pool of worker threads
+struct PoolTask;
 
 struct ThreadInfo {
-  pthread_t th;
+  struct PoolTask *task;
   int mode;
+  long id;  // Identifies the execution in completion notifications
 };
 
 
@@ -117,8 +117,9 @@ typedef float (*Stream_func_fp_reg)(unsigned long p1, unsigned long p2, unsigned
 // ------------------------------------------------------------
 
 int make_executable(addr_t addr, long size) {
-  // TODO - AWF - should query for the page size instead of just masking
-  if(mprotect((void *)(addr & 0xFFFFF000), size + (addr & 0xFFF), 
+  addr_t mask = sysconf(_SC_PAGESIZE) - 1;
+
+  if(mprotect((void *)(addr & ~mask), size + (addr & mask),
         PROT_READ | PROT_WRITE | PROT_EXEC) == -1) {
     perror("make_executeable");
   }
@@ -126,6 +127,742 @@ int make_executable(addr_t addr, long size) {
 }
 
 
+// ------------------------------------------------------------
+// Code arena
+// ------------------------------------------------------------
+
+// Programs are copied into a shared arena of executable memory instead of
+// making each program's own page-rounded buffer executable.  Many small
+// programs then share pages (fewer TLB entries) and no syscall is needed
+// per program.
+//
+// The arena is allocated in chunks.  Where possible each chunk is mapped
+// twice from one memory file: a read/execute view that code runs from and
+// a read/write view that code is copied in through, so no page is ever
+// both writable and executable.  Otherwise a single read/write/execute
+// mapping is used.
+//
+// Blocks are carved off the end of the newest chunk; freed blocks go on an
+// address-ordered free list, are merged with free neighbours, and are
+// reused first-fit.
+
+#ifndef SWIG
+
+#define ARENA_CHUNK_SIZE (4 * 1024 * 1024)
+#define ARENA_GRANULE    16
+
+struct ArenaChunk {
+  char *exec;   // Read/execute view
+  char *write;  // Read/write view, the same as exec for a single mapping
+  long size;
+  long top;     // Start of the unallocated end of the chunk
+  struct ArenaChunk *next;
+};
+
+struct ArenaFree {
+  struct ArenaChunk *chunk;
+  char *exec;
+  long size;
+  struct ArenaFree *next;
+};
+
+static struct {
+  pthread_mutex_t lock;
+  struct ArenaChunk *chunks;  // Newest first
+  struct ArenaFree *free;     // Ordered by address
+  long used;
+} arena = {PTHREAD_MUTEX_INITIALIZER, NULL, NULL, 0};
+
+
+static struct ArenaChunk *arena_new_chunk(long size) {
+  struct ArenaChunk *chunk;
+  void *exec = MAP_FAILED;
+  void *write = MAP_FAILED;
+  int fd = -1;
+
+#ifdef SYS_memfd_create
+  fd = syscall(SYS_memfd_create, "corepy-code", 1 /* MFD_CLOEXEC */);
+#endif
+  if(fd != -1) {
+    if(ftruncate(fd, size) == 0) {
+      write = mmap(NULL, size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+      exec = mmap(NULL, size, PROT_READ | PROT_EXEC, MAP_SHARED, fd, 0);
+    }
+    close(fd);
+
+    if(exec == MAP_FAILED || write == MAP_FAILED) {
+      if(exec != MAP_FAILED) {
+        munmap(exec, size);
+      }
+      if(write != MAP_FAILED) {
+        munmap(write, size);
+      }
+      exec = write = MAP_FAILED;
+    }
+  }
+
+  if(exec == MAP_FAILED) {
+    exec = mmap(NULL, size, PROT_READ | PROT_WRITE | PROT_EXEC,
+                MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if(exec == MAP_FAILED) {
+      perror("arena_alloc");
+      return NULL;
+    }
+    write = exec;
+  }
+
+  chunk = malloc(sizeof(struct ArenaChunk));
+  chunk->exec = exec;
+  chunk->write = write;
+  chunk->size = size;
+  chunk->top = 0;
+  chunk->next = arena.chunks;
+  arena.chunks = chunk;
+  return chunk;
+}
+
+
+static struct ArenaChunk *arena_find_chunk(char *exec) {
+  struct ArenaChunk *chunk;
+
+  for(chunk = arena.chunks; chunk != NULL; chunk = chunk->next) {
+    if(exec >= chunk->exec && exec < chunk->exec + chunk->size) {
+      return chunk;
+    }
+  }
+  return NULL;
+}
+
+
+// Put a range of a chunk on the free list.  Called with arena.lock held.
+static void arena_release(struct ArenaChunk *chunk, char *exec, long size) {
+  struct ArenaFree *prev = NULL;
+  struct ArenaFree *next = arena.free;
+  struct ArenaFree *node;
+
+  if(size <= 0) {
+    return;
+  }
+
+  while(next != NULL && next->exec < exec) {
+    prev = next;
+    next = next->next;
+  }
+
+  // Merge with the free neighbours in the same chunk
+  if(prev != NULL && prev->chunk == chunk && prev->exec + prev->size == exec) {
+    prev->size += size;
+    if(next != NULL && next->chunk == chunk && exec + size == next->exec) {
+      prev->size += next->size;
+      prev->next = next->next;
+      free(next);
+    }
+    return;
+  }
+
+  if(next != NULL && next->chunk == chunk && exec + size == next->exec) {
+    next->exec = exec;
+    next->size += size;
+    return;
+  }
+
+  node = malloc(sizeof(struct ArenaFree));
+  node->chunk = chunk;
+  node->exec = exec;
+  node->size = size;
+  node->next = next;
+  if(prev != NULL) {
+    prev->next = node;
+  } else {
+    arena.free = node;
+  }
+}
+
+
+// Allocate from the free list, or return NULL.  Called with arena.lock
+// held.
+static char *arena_alloc_free(long size, long align) {
+  struct ArenaFree *prev = NULL;
+  struct ArenaFree *cur;
+  struct ArenaFree *node;
+  char *exec;
+  long pad, rest;
+
+  for(cur = arena.free; cur != NULL; prev = cur, cur = cur->next) {
+    pad = (-(addr_t)cur->exec) & (align - 1);
+    if(cur->size >= size + pad) {
+      break;
+    }
+  }
+
+  if(cur == NULL) {
+    return NULL;
+  }
+
+  exec = cur->exec + pad;
+  rest = cur->size - pad - size;
+
+  if(pad > 0) {
+    // The padding stays on the free list, followed by the rest
+    cur->size = pad;
+    if(rest > 0) {
+      node = malloc(sizeof(struct ArenaFree));
+      node->chunk = cur->chunk;
+      node->exec = exec + size;
+      node->size = rest;
+      node->next = cur->next;
+      cur->next = node;
+    }
+  } else if(rest > 0) {
+    cur->exec = exec + size;
+    cur->size = rest;
+  } else {
+    if(prev != NULL) {
+      prev->next = cur->next;
+    } else {
+      arena.free = cur->next;
+    }
+    free(cur);
+  }
+
+  return exec;
+}
+
+#endif // SWIG
+
+
+// ------------------------------------------------------------
+// Function: arena_alloc
+// Arguments:
+//   size  - the size of the block in bytes
+//   align - the alignment of the block, a power of 2
+// Return: the execute address of the block, 0 on failure
+// Description:
+//   Allocate a block of executable memory from the code arena.
+//   Code is copied into it with arena_write.
+// ------------------------------------------------------------
+
+addr_t arena_alloc(long size, long align) {
+  struct ArenaChunk *chunk;
+  long page = sysconf(_SC_PAGESIZE);
+  long pad = 0, chunk_size;
+  char *exec;
+
+  if(size <= 0 || align <= 0 || (align & (align - 1)) != 0) {
+    return 0;
+  }
+  size = (size + ARENA_GRANULE - 1) & ~(ARENA_GRANULE - 1);
+
+  pthread_mutex_lock(&arena.lock);
+
+  exec = arena_alloc_free(size, align);
+  if(exec == NULL) {
+    // Take the block from the end of the newest chunk, starting a new one
+    // if it does not fit.
+    chunk = arena.chunks;
+    if(chunk != NULL) {
+      pad = (-(addr_t)(chunk->exec + chunk->top)) & (align - 1);
+    }
+
+    if(chunk == NULL || chunk->top + pad + size > chunk->size) {
+      if(chunk != NULL) {
+        arena_release(chunk, chunk->exec + chunk->top, chunk->size - chunk->top);
+        chunk->top = chunk->size;
+      }
+
+      chunk_size = size + (align > page ? align : 0);
+      chunk_size = (chunk_size + page - 1) & ~(page - 1);
+      if(chunk_size < ARENA_CHUNK_SIZE) {
+        chunk_size = ARENA_CHUNK_SIZE;
+      }
+
+      chunk = arena_new_chunk(chunk_size);
+      if(chunk == NULL) {
+        pthread_mutex_unlock(&arena.lock);
+        return 0;
+      }
+      pad = (-(addr_t)chunk->exec) & (align - 1);
+    }
+
+    arena_release(chunk, chunk->exec + chunk->top, pad);
+    exec = chunk->exec + chunk->top + pad;
+    chunk->top += pad + size;
+  }
+
+  arena.used += size;
+  pthread_mutex_unlock(&arena.lock);
+  return (addr_t)exec;
+}
+
+
+// ------------------------------------------------------------
+// Function: arena_free
+// Arguments:
+//   addr - the execute address of a block from arena_alloc
+//   size - the size the block was allocated with
+// Return: void
+// Description:
+//   Return a block to the code arena.
+// ------------------------------------------------------------
+
+void arena_free(addr_t addr, long size) {
+  struct ArenaChunk *chunk;
+
+  size = (size + ARENA_GRANULE - 1) & ~(ARENA_GRANULE - 1);
+
+  pthread_mutex_lock(&arena.lock);
+  chunk = arena_find_chunk((char *)addr);
+  if(chunk != NULL) {
+    arena_release(chunk, (char *)addr, size);
+    arena.used -= size;
+  }
+  pthread_mutex_unlock(&arena.lock);
+}
+
+
+// ------------------------------------------------------------
+// Function: arena_write
+// Arguments:
+//   addr - the execute address to write to
+//   src  - the address of the code to copy
+//   size - the number of bytes to copy
+// Return: 0 on success, -1 if addr is not in the arena
+// Description:
+//   Copy code into an arena block through its writable view.
+// ------------------------------------------------------------
+
+int arena_write(addr_t addr, addr_t src, long size) {
+  struct ArenaChunk *chunk;
+
+  pthread_mutex_lock(&arena.lock);
+  chunk = arena_find_chunk((char *)addr);
+  pthread_mutex_unlock(&arena.lock);
+
+  if(chunk == NULL || (char *)addr + size > chunk->exec + chunk->size) {
+    return -1;
+  }
+
+  memcpy(chunk->write + ((char *)addr - chunk->exec), (void *)src, size);
+  return 0;
+}
+
+
+// ------------------------------------------------------------
+// Function: arena_used, arena_size
+// Arguments: none
+// Return: the number of bytes allocated from / mapped for the
+//   code arena
+// ------------------------------------------------------------
+
+long arena_used(void) {
+  return arena.used;
+}
+
+
+long arena_size(void) {
+  struct ArenaChunk *chunk;
+  long size = 0;
+
+  pthread_mutex_lock(&arena.lock);
+  for(chunk = arena.chunks; chunk != NULL; chunk = chunk->next) {
+    size += chunk->size;
+  }
+  pthread_mutex_unlock(&arena.lock);
+  return size;
+}
+
+
+// ------------------------------------------------------------
+// Worker pool
+// ------------------------------------------------------------
+
+// Creating a thread for every async execution costs far more than running
+// a short kernel, so async executions are queued to a pool of persistent
+// worker threads.  The pool is started with one thread per CPU the first
+// time it is needed, or explicitly with pool_start.
+//
+// A task is either a single execution (execute_*_async) or a share of a
+// batch (execute_many_*).  The shares of a batch take parameter sets from
+// the batch one at a time until all have been run.
+//
+// Executions started with execute_notify are also put on a completed list
+// when they finish, and the completion eventfd is signalled, so an event
+// loop can wait for many executions on one file descriptor.
+
+#ifndef SWIG
+
+#define TASK_QUEUED    0
+#define TASK_RUNNING   1
+#define TASK_DONE      2
+#define TASK_CANCELLED 3
+
+struct Batch {
+  addr_t addr;
+  int fp;
+  struct ExecParams *params;
+  void *results;
+  long n;
+  long next;  // Next parameter set to run, taken atomically
+};
+
+struct PoolTask {
+  struct PoolTask *next;
+  int state;
+  addr_t addr;
+  int fp;
+  struct ExecParams params;
+  union {
+    long l;
+    float d;
+  } ret;
+  struct Batch *batch;  // Set for shares of a batch
+  long id;
+  int notify;
+  struct PoolTask *done_next;
+};
+
+static struct {
+  pthread_mutex_t lock;
+  pthread_cond_t work;  // Signalled when a task is queued
+  pthread_cond_t done;  // Broadcast when a task finishes
+  struct PoolTask *head;
+  struct PoolTask *tail;
+  pthread_t *threads;
+  int nthreads;
+  int shutdown;
+  long next_id;
+  struct PoolTask *done_head;  // Finished tasks with notify set
+  struct PoolTask *done_tail;
+  int notify_fd;
+} pool = {PTHREAD_MUTEX_INITIALIZER, PTHREAD_COND_INITIALIZER,
+          PTHREAD_COND_INITIALIZER, NULL, NULL, NULL, 0, 0, 0, NULL, NULL, -1};
+
+// Serializes starting and stopping the pool
+static pthread_mutex_t pool_start_lock = PTHREAD_MUTEX_INITIALIZER;
+
+
+static void pool_run_task(struct PoolTask *task) {
+  struct ExecParams *p = &task->params;
+
+  if(task->fp) {
+    task->ret.d = ((Stream_func_fp_reg)task->addr)(p->p1, p->p2, p->p3, p->p4, p->p5, p->p6);
+  } else {
+    task->ret.l = ((Stream_func_int_reg)task->addr)(p->p1, p->p2, p->p3, p->p4, p->p5, p->p6);
+  }
+}
+
+
+static void pool_run_batch(struct Batch *batch) {
+  struct ExecParams *p;
+  long i;
+
+  while((i = __sync_fetch_and_add(&batch->next, 1)) < batch->n) {
+    p = &batch->params[i];
+    if(batch->fp) {
+      ((float *)batch->results)[i] = ((Stream_func_fp_reg)batch->addr)(p->p1, p->p2, p->p3, p->p4, p->p5, p->p6);
+    } else {
+      ((long *)batch->results)[i] = ((Stream_func_int_reg)batch->addr)(p->p1, p->p2, p->p3, p->p4, p->p5, p->p6);
+    }
+  }
+}
+
+
+static void *pool_worker(void *arg) {
+  struct PoolTask *task;
+
+  pthread_mutex_lock(&pool.lock);
+  for(;;) {
+    while(pool.head == NULL && !pool.shutdown) {
+      pthread_cond_wait(&pool.work, &pool.lock);
+    }
+
+    // Queued tasks are still run when the pool is shut down
+    if(pool.head == NULL) {
+      break;
+    }
+
+    task = pool.head;
+    pool.head = task->next;
+    if(pool.head == NULL) {
+      pool.tail = NULL;
+    }
+    task->state = TASK_RUNNING;
+    pthread_mutex_unlock(&pool.lock);
+
+    if(task->batch != NULL) {
+      pool_run_batch(task->batch);
+    } else {
+      pool_run_task(task);
+    }
+
+    pthread_mutex_lock(&pool.lock);
+    task->state = TASK_DONE;
+    pthread_cond_broadcast(&pool.done);
+
+    if(task->notify) {
+      task->done_next = NULL;
+      if(pool.done_tail != NULL) {
+        pool.done_tail->done_next = task;
+      } else {
+        pool.done_head = task;
+      }
+      pool.done_tail = task;
+      eventfd_write(pool.notify_fd, 1);
+    }
+  }
+  pthread_mutex_unlock(&pool.lock);
+  return NULL;
+}
+
+
+// Called with pool.lock held
+static void pool_submit(struct PoolTask *task) {
+  task->next = NULL;
+  task->state = TASK_QUEUED;
+
+  if(pool.tail != NULL) {
+    pool.tail->next = task;
+  } else {
+    pool.head = task;
+  }
+  pool.tail = task;
+
+  pthread_cond_signal(&pool.work);
+}
+
+
+// Called with pool.lock held
+static void pool_wait(struct PoolTask *task) {
+  while(task->state == TASK_QUEUED || task->state == TASK_RUNNING) {
+    pthread_cond_wait(&pool.done, &pool.lock);
+  }
+}
+
+
+// Called with pool_start_lock held
+static void pool_stop_locked(void) {
+  int i;
+
+  if(pool.nthreads == 0) {
+    return;
+  }
+
+  pthread_mutex_lock(&pool.lock);
+  pool.shutdown = 1;
+  pthread_cond_broadcast(&pool.work);
+  pthread_mutex_unlock(&pool.lock);
+
+  for(i = 0; i < pool.nthreads; i++) {
+    pthread_join(pool.threads[i], NULL);
+  }
+
+  free(pool.threads);
+  pool.threads = NULL;
+  pool.nthreads = 0;
+  pool.shutdown = 0;
+}
+
+
+// Called with pool_start_lock held
+static int pool_start_locked(int nthreads, int pin) {
+  long ncpus = sysconf(_SC_NPROCESSORS_ONLN);
+  cpu_set_t cpus;
+  int i, rc;
+
+  if(nthreads <= 0) {
+    nthreads = ncpus > 0 ? ncpus : 1;
+  }
+
+  pool.threads = malloc(sizeof(pthread_t) * nthreads);
+  for(i = 0; i < nthreads; i++) {
+    rc = pthread_create(&pool.threads[i], NULL, pool_worker, NULL);
+    if(rc) {
+      printf("Error creating worker thread: %d\n", rc);
+      break;
+    }
+
+    if(pin && ncpus > 0) {
+      CPU_ZERO(&cpus);
+      CPU_SET(i % ncpus, &cpus);
+      pthread_setaffinity_np(pool.threads[i], sizeof(cpus), &cpus);
+    }
+  }
+
+  pool.nthreads = i;
+  return i == nthreads ? 0 : -1;
+}
+
+
+// Start the pool if needed; return the number of worker threads
+static int pool_ensure(void) {
+  int nthreads;
+
+  pthread_mutex_lock(&pool_start_lock);
+  if(pool.nthreads == 0) {
+    pool_start_locked(0, 0);
+  }
+  nthreads = pool.nthreads;
+  pthread_mutex_unlock(&pool_start_lock);
+  return nthreads;
+}
+
+
+static struct ThreadInfo* pool_execute(addr_t addr, struct ExecParams params, int fp, int notify) {
+  struct ThreadInfo *tinfo;
+  struct PoolTask *task;
+
+  if(pool_ensure() == 0) {
+    printf("Error creating async stream: no worker threads\n");
+    return NULL;
+  }
+
+  tinfo = malloc(sizeof(struct ThreadInfo));
+  task = malloc(sizeof(struct PoolTask));
+
+  task->addr = addr;
+  task->fp = fp;
+  task->params = params;
+  task->ret.l = 0;
+  task->batch = NULL;
+  task->notify = notify;
+  tinfo->task = task;
+
+  pthread_mutex_lock(&pool.lock);
+  task->id = tinfo->id = ++pool.next_id;
+  pool_submit(task);
+  pthread_mutex_unlock(&pool.lock);
+  return tinfo;
+}
+
+
+static int pool_execute_many(addr_t addr, struct ExecParams *params, void *results, long n, int fp, int parallel) {
+  struct Batch batch;
+  struct PoolTask *shares;
+  int i, nshares = 1;
+
+  if(n <= 0) {
+    return 0;
+  }
+
+  if(parallel) {
+    nshares = pool_ensure();
+    if(nshares == 0) {
+      return -1;
+    }
+  }
+
+  batch.addr = addr;
+  batch.fp = fp;
+  batch.params = params;
+  batch.results = results;
+  batch.n = n;
+  batch.next = 0;
+
+  // The calling thread runs a share as well
+  nshares -= 1;
+  if(nshares > n - 1) {
+    nshares = n - 1;
+  }
+  shares = malloc(sizeof(struct PoolTask) * (nshares > 0 ? nshares : 1));
+
+  pthread_mutex_lock(&pool.lock);
+  for(i = 0; i < nshares; i++) {
+    shares[i].batch = &batch;
+    shares[i].notify = 0;
+    pool_submit(&shares[i]);
+  }
+  pthread_mutex_unlock(&pool.lock);
+
+  pool_run_batch(&batch);
+
+  pthread_mutex_lock(&pool.lock);
+  for(i = 0; i < nshares; i++) {
+    pool_wait(&shares[i]);
+  }
+  pthread_mutex_unlock(&pool.lock);
+
+  free(shares);
+  return 0;
+}
+
+// Wait for a task to finish, and take it off the completed list if it is
+// still there.
+static void pool_join(struct PoolTask *task) {
+  struct PoolTask *prev = NULL;
+  struct PoolTask *cur;
+
+  pthread_mutex_lock(&pool.lock);
+  pool_wait(task);
+
+  if(task->notify && task->state == TASK_DONE) {
+    for(cur = pool.done_head; cur != task; cur = cur->done_next) {
+      prev = cur;
+    }
+
+    if(prev != NULL) {
+      prev->done_next = task->done_next;
+    } else {
+      pool.done_head = task->done_next;
+    }
+    if(pool.done_tail == task) {
+      pool.done_tail = prev;
+    }
+  }
+  pthread_mutex_unlock(&pool.lock);
+}
+
+#endif // SWIG
+
+
+// ------------------------------------------------------------
+// Function: pool_start
+// Arguments:
+//   nthreads - number of worker threads, or 0 for one per CPU
+//   pin      - if non-zero, bind each worker to one CPU
+// Return: 0 on success, -1 if not all threads could be created
+// Description:
+//   (Re)start the worker pool used for async execution.  Tasks
+//   queued to a running pool are finished first.
+// ------------------------------------------------------------
+
+int pool_start(int nthreads, int pin) {
+  int rc;
+
+  pthread_mutex_lock(&pool_start_lock);
+  pool_stop_locked();
+  rc = pool_start_locked(nthreads, pin);
+  pthread_mutex_unlock(&pool_start_lock);
+  return rc;
+}
+
+
+// ------------------------------------------------------------
+// Function: pool_stop
+// Arguments: none
+// Return: void
+// Description:
+//   Finish all queued tasks and stop the worker threads.  The
+//   pool is started again when next needed.
+// ------------------------------------------------------------
+
+void pool_stop(void) {
+  pthread_mutex_lock(&pool_start_lock);
+  pool_stop_locked();
+  pthread_mutex_unlock(&pool_start_lock);
+}
+
+
+// ------------------------------------------------------------
+// Function: pool_size
+// Arguments: none
+// Return: the number of worker threads, 0 if not started
+// ------------------------------------------------------------
+
+int pool_size(void) {
+  return pool.nthreads;
+}
+
+
 // ------------------------------------------------------------
 // Function: cancel_async
 // Arguments:
@@ -133,10 +870,36 @@ int make_executable(addr_t addr, long size) {
 // Return: 0 on success, -1 on failure
 // Description:
 //   The native interface for cancelling execution of a thread.
+//   Only executions still waiting for a worker can be cancelled;
+//   joining a cancelled execution returns 0.
 // ------------------------------------------------------------
 
 int cancel_async(struct ThreadInfo* tinfo) {
-  return pthread_cancel(tinfo->th);
+  struct PoolTask *task = tinfo->task;
+  struct PoolTask *prev = NULL;
+  struct PoolTask *cur;
+  int rc = -1;
+
+  pthread_mutex_lock(&pool.lock);
+  if(task->state == TASK_QUEUED) {
+    for(cur = pool.head; cur != task; cur = cur->next) {
+      prev = cur;
+    }
+
+    if(prev != NULL) {
+      prev->next = task->next;
+    } else {
+      pool.head = task->next;
+    }
+    if(pool.tail == task) {
+      pool.tail = prev;
+    }
+
+    task->state = TASK_CANCELLED;
+    rc = 0;
+  }
+  pthread_mutex_unlock(&pool.lock);
+  return rc;
 }
 
 
@@ -169,120 +932,148 @@ int resume_async(struct ThreadInfo* tinfo) {
 
 
 // ------------------------------------------------------------
-// Function: run_stream
+// Function: execute_{int, fp}_async
 // Arguments:
-//   *addr - pointer to thread data 
-// Return: undefined
+//   addr   - address of the instruction stream
+//   params - parameters to pass to the instruction stream
+// Return: a new thread id
 // Description:
-//   The thread execution function.  The code stream is passed
-//   as the argument via pthreads and executed here.
+//   The native interface for executing a code stream on a
+//   worker thread.  make_executable must be called first.
 // ------------------------------------------------------------
 
-void cleanup(void* params) {
-    struct ThreadParams *p = (struct ThreadParams*)params;
-    free(p);
+struct ThreadInfo* execute_int_async(addr_t addr, struct ExecParams params) {
+  return pool_execute(addr, params, 0, 0);
 }
 
 
-void *run_stream_int(void *params) {
-  struct ThreadParams *p = (struct ThreadParams *)params;
-  pthread_cleanup_push(cleanup, params);
-
-  //p->ret.l = ((Stream_func_int)p->addr)(p->params);
-  p->ret.l = ((Stream_func_int_reg)p->addr)(p->params.p1, p->params.p2, p->params.p3, p->params.p4, p->params.p5, p->params.p6);
-
-  pthread_cleanup_pop(0);
-  return params;
+struct ThreadInfo* execute_fp_async(addr_t addr, struct ExecParams params) {
+  return pool_execute(addr, params, 1, 0);
 }
 
 
-void *run_stream_fp(void *params) {
-  struct ThreadParams *p = (struct ThreadParams *)params;
-  pthread_cleanup_push(cleanup, params);
-
-  //p->ret.d = ((Stream_func_fp)p->addr)(p->params);
-  p->ret.d = ((Stream_func_fp_reg)p->addr)(p->params.p1, p->params.p2, p->params.p3, p->params.p4, p->params.p5, p->params.p6);
+// ------------------------------------------------------------
+// Function: completion_fd
+// Arguments: none
+// Return: the completion eventfd, -1 on failure
+// Description:
+//   Return a non-blocking eventfd that becomes readable when
+//   executions started with execute_notify finish.  Reading it
+//   resets it; next_completed then returns the finished ids.
+// ------------------------------------------------------------
 
-  pthread_cleanup_pop(0);
-  return params;
+int completion_fd(void) {
+  pthread_mutex_lock(&pool.lock);
+  if(pool.notify_fd == -1) {
+    pool.notify_fd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+    if(pool.notify_fd == -1) {
+      perror("completion_fd");
+    }
+  }
+  pthread_mutex_unlock(&pool.lock);
+  return pool.notify_fd;
 }
 
 
 // ------------------------------------------------------------
-// Function: execute_{int, fp}_async
+// Function: execute_notify
 // Arguments:
 //   addr   - address of the instruction stream
 //   params - parameters to pass to the instruction stream
-// Return: a new thread id
+//   fp     - non-zero to return the fp_return value
+// Return: a new thread id, NULL on failure
 // Description:
-//   The native interface for executing a code stream as a 
-//   thread.  make_executable must be called first.
+//   Like execute_{int, fp}_async, but signal the completion
+//   eventfd when finished.  completion_fd must be called first.
 // ------------------------------------------------------------
 
-
-struct ThreadInfo* execute_int_async(addr_t addr, struct ExecParams params) {
-  int rc;
-
-  struct ThreadInfo* tinfo = malloc(sizeof(struct ThreadInfo));
-  struct ThreadParams *tparams = malloc(sizeof(struct ThreadParams));
-
-  tparams->addr = addr;
-  tparams->params = params;
-  //memcpy(&tparams->params, &params, sizeof(struct ExecParams));
-
-  rc = pthread_create(&tinfo->th, NULL, run_stream_int, (void *)tparams);
-  if(rc) {
-    printf("Error creating async stream: %d\n", rc);
+struct ThreadInfo* execute_notify(addr_t addr, struct ExecParams params, int fp) {
+  if(pool.notify_fd == -1) {
+    return NULL;
   }
-
-  return tinfo;
+  return pool_execute(addr, params, fp, 1);
 }
 
 
-struct ThreadInfo* execute_fp_async(addr_t addr, struct ExecParams params) {
-  int rc;
-
-  struct ThreadInfo* tinfo = malloc(sizeof(struct ThreadInfo));
-  struct ThreadParams *tparams = malloc(sizeof(struct ThreadParams));
-
-  tparams->addr = addr;
-  tparams->params = params;
+// ------------------------------------------------------------
+// Function: next_completed
+// Arguments: none
+// Return: the id of a finished execute_notify execution, or 0
+// Description:
+//   Remove and return the id of the next finished execution.
+//   The execution must still be joined to get its result.
+// ------------------------------------------------------------
 
-  rc = pthread_create(&tinfo->th, NULL, run_stream_fp, (void *)tparams);
-  if(rc) {
-    printf("Error creating async stream: %d\n", rc);
+long next_completed(void) {
+  struct PoolTask *task;
+  long id = 0;
+
+  pthread_mutex_lock(&pool.lock);
+  task = pool.done_head;
+  if(task != NULL) {
+    pool.done_head = task->done_next;
+    if(pool.done_head == NULL) {
+      pool.done_tail = NULL;
+    }
+    id = task->id;
+    task->notify = 0;
   }
-
-  return tinfo;
+  pthread_mutex_unlock(&pool.lock);
+  return id;
 }
 
 
 long join_int(struct ThreadInfo* tinfo) {
-  struct ThreadParams *p;
+  struct PoolTask *task = tinfo->task;
 
-  pthread_join(tinfo->th, (void**)&p);
+  pool_join(task);
 
-  long result = p->ret.l;
+  long result = task->ret.l;
 
   free(tinfo);
-  free(p);
+  free(task);
   return result;
 }
 
 
 float join_fp(struct ThreadInfo* tinfo) {
-  struct ThreadParams *p;
+  struct PoolTask *task = tinfo->task;
 
-  pthread_join(tinfo->th, (void**)&p);
+  pool_join(task);
 
-  float result = p->ret.d;
+  float result = task->ret.d;
 
   free(tinfo);
-  free(p);
+  free(task);
   return result;
 }
 
 
+// ------------------------------------------------------------
+// Function: execute_many_{int, fp}
+// Arguments:
+//   addr     - address of the instruction stream
+//   params   - address of an array of n ExecParams
+//   results  - address of an array of n longs/floats
+//   n        - number of executions
+//   parallel - if zero, run all executions on the calling thread
+// Return: 0 on success, -1 on failure
+// Description:
+//   Execute a code stream once for each parameter set, spread
+//   over the worker pool and the calling thread, and wait for
+//   all to finish.  make_executable must be called first.
+// ------------------------------------------------------------
+
+int execute_many_int(addr_t addr, addr_t params, addr_t results, long n, int parallel) {
+  return pool_execute_many(addr, (struct ExecParams *)params, (void *)results, n, 0, parallel);
+}
+
+
+int execute_many_fp(addr_t addr, addr_t params, addr_t results, long n, int parallel) {
+  return pool_execute_many(addr, (struct ExecParams *)params, (void *)results, n, 1, parallel);
+}
+
+
 long execute_int(addr_t addr, struct ExecParams params) {
   return ((Stream_func_int_reg)addr)(params.p1, params.p2, params.p3, params.p4, params.p5, params.p6);
   //return ((Stream_func_int)addr)(params);
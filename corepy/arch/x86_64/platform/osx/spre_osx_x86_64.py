@@ -102,13 +102,40 @@ class Program(spe.Program):
     RegisterFiles = (('gp8', GPRegister8),   ('gp16', GPRegister16),
                      ('gp32', GPRegister32), ('gp64', GPRegister64),
                      ('st', FPRegister),     ('mm', MMXRegister),
-                     ('xmm', XMMRegister))
+                     ('xmm', XMMRegister),   ('ymm', YMMRegister))
 
     for (reg_type, cls) in RegisterFiles:
       self._reg_type[reg_type] = cls
     return
 
 
+  # YMM registers share storage with the XMM registers, so they have no pool
+  # of their own: acquiring a YMM register takes the XMM register with the
+  # same number from the XMM pool, and releasing it returns that register.
+
+  def acquire_register(self, reg_type = None, reg_name = None):
+    if isinstance(reg_type, str):
+      reg_type = self._reg_type[reg_type]
+
+    if reg_type is YMMRegister:
+      if reg_name is not None:
+        reg_name = "x" + str(reg_name)[1:]
+      reg = spe.Program.acquire_register(self, XMMRegister, reg_name)
+      return YMMRegister("y" + reg.name[1:])
+
+    return spe.Program.acquire_register(self, reg_type, reg_name)
+
+  def release_register(self, reg):
+    if isinstance(reg, YMMRegister):
+      reg = XMMRegister("x" + reg.name[1:])
+    return spe.Program.release_register(self, reg)
+
+  def registers_available(self, reg_type = None):
+    if reg_type is YMMRegister or reg_type == 'ymm':
+      reg_type = XMMRegister
+    return spe.Program.registers_available(self, reg_type)
+
+
   def _align_stream(self, length, align):
     return [x86.nop() for i in xrange(0, align - (length % align))]
 
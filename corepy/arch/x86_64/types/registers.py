@@ -136,6 +136,29 @@ class XMMRegister(x86_64Register):
     spe.Register.__init__(self, name)
     return
 
+# YMM registers are the 256-bit (AVX) extensions of the XMM registers; ymmN
+# and xmmN share storage, and are encoded the same way.
+class YMMRegister(x86_64Register):
+  def __init__(self, name):
+    if not isinstance(name, str) or name[0:3] != "ymm":
+      raise Exception("Invalid register name %s" % str(name))
+
+    try:
+      self.reg = int(name[3:])
+    except ValueError:
+      raise Exception("Invalid register name %s" % str(name))
+
+    if self.reg < 0 or self.reg >= 16:
+      raise Exception("Invalid register name %s" % str(name))
+
+    if self.reg >= 8:
+      self.reg -= 8
+      self.rex = 1
+    else:
+      self.rex = 0
+    spe.Register.__init__(self, name)
+    return
+
 class IPRegister(x86_64Register):
   def __init__(self, name):
     if "rip" == name:
@@ -169,7 +192,7 @@ GPRegisterType = (GPRegister8, GPRegister16, GPRegister32, GPRegister64)
 # bit from the register value.  Would then need to always compare the REX bit
 # when doing register comparisons.
 
-# All the GP and XMM regs need to have a rex field, FP and MMX do not.
+# All the GP, XMM and YMM regs need to have a rex field, FP and MMX do not.
 
 #gp8 =  ((0, 0, "al"),   (3, 0, "bl"),   (1, 0, "cl"),   (2, 0, "dl"),
 #        (4, 0, "ah"),   (7, 0, "bh"),   (5, 0, "ch"),   (6, 0, "dh"),
@@ -196,6 +219,7 @@ gp64_array = []
 st_array = []
 mm_array = []
 xmm_array = []
+ymm_array = []
 
 
 # Set up RIP register.  This register is only useable with a displacement in a
@@ -211,7 +235,7 @@ for (regs, cls, arr) in ((gp8, GPRegister8, gp8_array), (gp16, GPRegister16, gp1
     globals()[name] = cls(name)
     arr.append(globals()[name])
 
-# Set up x87, MMX, and SSE registers
+# Set up x87, MMX, SSE and AVX registers
 for i in range(0, 8):
   stri = str(i)
 
@@ -231,4 +255,12 @@ for i in range(0, 8):
   name = "xmm" + str(i + 8)
   globals()[name] = XMMRegister(name)
   xmm_array.append(globals()[name])
-  
+
+  name = "ymm" + stri
+  globals()[name] = YMMRegister(name)
+  ymm_array.append(globals()[name])
+
+  # Set up 8 more AVX registers, with REX = 1
+  name = "ymm" + str(i + 8)
+  globals()[name] = YMMRegister(name)
+  ymm_array.append(globals()[name])
@@ -26,15 +26,34 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
 
-
-import array
+__doc__ = """
+Variables and Expressions for the x86_64 general purpose and SSE
+registers.
+
+  a = SignedWord(5)
+  b = SignedWord(reg = rdi)
+  c = SignedWord(reg = rax)
+  c.v = (a + b) * 8 - 3
+
+Bits, UnsignedWord and SignedWord are 64 bit integers; Bits has the
+logical operators and shifts by constants, and the words add arithmetic.
+SingleFloat and DoubleFloat are scalars in XMM registers.  Integer
+literals are used as immediates when they fit in 32 bits.
+
+Expressions are evaluated two address: each operation is evaluated into
+its destination by moving its first operand there.  Before evaluation,
+Expressions are run through the ExprOptimizer in x86_64Expression's
+optimizer attribute (see corepy.arch.x86_64.lib.expropt); set it to None
+to evaluate them as written.
+"""
 
 import corepy.arch.x86_64.isa as x86
 import corepy.spre.spe as spe
-import corepy.arch.x86_64.lib.util as util
-  
-__doc__ = """
-"""
+import corepy.arch.x86_64.lib.expropt as expropt
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.lib.extarray as extarray
+
+from corepy.spre.syn_util import most_specific
 
 # ------------------------------------------------------------
 # 'Type' Classes
@@ -42,58 +61,46 @@ __doc__ = """
 
 # Type classes implement the operator overloads for a type and hold
 # other type-specific information, such as register types and valid
-# literal types.
+# literal types.  They are mixed in with Variables and Expressions to
+# form the user types below.
 
-# They are separate from the type so they can be used as mix-ins in
-# different contexts, e.g. Variables and Expressions subclasses can
-# both share operator semantics by subclassing the same operator
-# class.  
+# Operator methods return an Expression of an appropriate type for the
+# operation: the more specific type of the two operands if they are from
+# the same hierarchy, otherwise the type of the first.
 
-# Operator classes also provide static interfaces to typed versions of
-# the operations.  
+_int_literals = (int, long)
+_float_literals = (float, int, long)
 
-# Operator methods return an Expression of an appropriate type for the
-# operation.
+def _result_type(a, b):
+  t = most_specific(a, b)
+  if t is None:
+    t = type(a)
+  return t
 
-# To always return the same type:
-#  return SignedWord.expr_class(inst, *(self, other))
+def _binary(name, inst, a, b, cls, literals, reverse = False):
+  """
+  Return the Expression for inst applied to a and b, where b is an
+  instance of cls or a literal.  If reverse is True, b is the first
+  operand.
+  """
+  if isinstance(b, cls):
+    type_cls = _result_type(a, b)
+  elif isinstance(b, literals):
+    type_cls = type(a)
+  else:
+    raise Exception('%s not implemented for %s and %s' % (name, type(a), type(b)))
 
-# To upcast to the type of the first operand:
-#  return self.expr_class(inst, *(self, other))
+  if reverse:
+    return inst.ex(b, a, type_cls = type_cls)
+  return inst.ex(a, b, type_cls = type_cls)
 
-# To upcast to the type of the second operand:
-#  return other.expr_class(inst, *(self, other))
+def _shift(name, inst, a, count):
+  if not isinstance(count, _int_literals) or not 0 <= count < 64:
+    raise Exception('%s needs a constant shift count from 0 to 63, not %s' % (name, str(count)))
+  return inst.ex(a, count, type_cls = type(a))
 
-# Upcasting can be useful for two types of different specificity are
-# used in expressions and the more specific type should be 
-# preserved type the expressions.  For instance, the logical
-# operators are the base classes of all integer-like types.  A logical 
-# operation, e.g. (a & b), should preserve the most specific type of a
-# and b.
 
-def _most_specific(a, b, default = None):
-  """
-  If a and b are from the same hierarcy, return the more specific of
-  [type(a), type(b)], or the default type if they are from different
-  hierarchies. If default is None, return type(a), or type(b) if a
-  does not have a type_cls
-  """
-  if (hasattr(a, 'type_cls') and hasattr(a, 'type_cls')):
-    if issubclass(b.type_cls, a.type_cls):
-      return type(b)
-    elif issubclass(a.type_cls, b.type_cls):
-      return type(a)
-  elif default is None:
-    if hasattr(a, 'type_cls'):
-      return type(a)
-    elif hasattr(b, 'type_cls'):
-      return type(b)
-    
-  return default
-  
-_int_literals = (spe.Immediate, int, long)
-
-class PPCType(spe.Type):
+class x86_64Type(spe.Type):
   def _get_active_code(self):
     return x86.get_active_code()
 
@@ -101,318 +108,181 @@ class PPCType(spe.Type):
     return x86.set_active_code(code)
   active_code = property(_get_active_code, _set_active_code)
 
+
 # ------------------------------------------------------------
 # General Purpose Register Types
 # ------------------------------------------------------------
 
-class BitType(PPCType):
-  register_type_id = 'gp'
-  literal_types = (int,long)
-
-  def _upcast(self, other, inst):
-    return inst.ex(self, other, type_cls = _most_specific(self, other))
+class BitType(x86_64Type):
+  register_type_id = 'gp64'
+  literal_types = _int_literals
 
   def __and__(self, other):
-    if isinstance(other, BitType):
-      return self._upcast(other, x86.andx)
-    elif isinstance(other, _int_literals):
-      return x86.andi.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__and__ not implemented for %s and %s' % (type(self), type(other)))    
-
+    return _binary('__and__', x86.and_, self, other, BitType, _int_literals)
   and_ = staticmethod(__and__)
 
-  def __lshift__(self, other):
-    if isinstance(other, BitType):
-      return x86.slwx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__lshift__ not implemented for %s and %s' % (type(self), type(other)))    
-  lshift = staticmethod(__lshift__)
-
-  def __rshift__(self, other):
-    if isinstance(other, BitType):
-      return x86.srwx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__rshift__ not implemented for %s and %s' % (type(self), type(other)))    
-  rshift = staticmethod(__rshift__)
+  def __rand__(self, other):
+    return _binary('__rand__', x86.and_, self, other, BitType, _int_literals, True)
 
   def __or__(self, other):
-    if isinstance(other, BitType):
-      return self._upcast(other, x86.orx)
-    elif isinstance(other, _int_literals):
-      return x86.ori.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__or__ not implemented for %s and %s' % (type(self), type(other)))    
+    return _binary('__or__', x86.or_, self, other, BitType, _int_literals)
   or_ = staticmethod(__or__)
 
+  def __ror__(self, other):
+    return _binary('__ror__', x86.or_, self, other, BitType, _int_literals, True)
+
   def __xor__(self, other):
-    if isinstance(other, BitType):
-      return self._upcast(other, x86.xorx)
-    elif isinstance(other, _int_literals):
-      return x86.xori.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__xor__ not implemented for %s and %s' % (type(self), type(other)))    
+    return _binary('__xor__', x86.xor, self, other, BitType, _int_literals)
   xor = staticmethod(__xor__)
 
+  def __rxor__(self, other):
+    return _binary('__rxor__', x86.xor, self, other, BitType, _int_literals, True)
+
+  def __invert__(self):
+    return x86.not_.ex(self, type_cls = type(self))
+  invert = staticmethod(__invert__)
+
+  def __lshift__(self, other):
+    return _shift('__lshift__', x86.shl, self, other)
+  lshift = staticmethod(__lshift__)
+
+  def __rshift__(self, other):
+    return _shift('__rshift__', x86.shr, self, other)
+  rshift = staticmethod(__rshift__)
+
   def _set_literal_value(self, value):
-    # Put the lower 16 bits into r-temp
-    self.code.add(x86.addi(self.reg, 0, value))
-  
-    # Addis r-temp with the upper 16 bits (shifted add immediate) and
-    # put the result in r-target
-    if (value & 0x7FFF) != value:
-      self.code.add(x86.addis(self.reg, self.reg, ((value + 32768) >> 16)))
-      
+    if value == 0:
+      self.code.add(x86.xor(self.reg, self.reg))
+    else:
+      self.code.add(x86.mov(self.reg, value))
     return
 
   def copy_register(self, other):
-    return self.code.add(x86.addi(self, other, 0))
+    return self.code.add(x86.mov(self.reg, other.reg))
 
 
 # ------------------------------
 # Integer Types
 # ------------------------------
 
-class UnsignedWordType(BitType):
+class _WordType(BitType):
   def __add__(self, other):
-    if isinstance(other, UnsignedWordType):
-      return x86.addx.ex(self, other, type_cls = self.var_cls)
-    elif isinstance(other, (spe.Immediate, int)):
-      return self.expr_cls(x86.addi, *(self, other))
-    raise Exception('__add__ not implemented for %s and %s' % (type(self), type(other)))    
+    return _binary('__add__', x86.add, self, other, _WordType, _int_literals)
   add = staticmethod(__add__)
-  
-  def __div__(self, other):
-    if isinstance(other, SignedWordType):
-      return self.expr_cls(x86.divwux, *(self, other))
-    raise NotImplemented
-  div = staticmethod(__div__)
 
-  def __mul__(self, other):
-    if isinstance(other, UnsignedWordType):
-      return self.expr_cls(x86.mullwx, *(self, other))
-    elif isinstance(other, (spe.Immediate, int)):
-      return self.expr_cls(x86.mulli, *(self, other))      
-    raise Exception('__mul__ not implemented for %s and %s' % (type(self), type(other)))          
-  div = staticmethod(__div__)
+  def __radd__(self, other):
+    return _binary('__radd__', x86.add, self, other, _WordType, _int_literals, True)
 
+  def __sub__(self, other):
+    return _binary('__sub__', x86.sub, self, other, _WordType, _int_literals)
+  sub = staticmethod(__sub__)
 
-class SignedWordType(BitType):
-
-  def __add__(self, other):
-    if isinstance(other, SignedWordType):
-      return x86.addx.ex(self, other, type_cls = self.var_cls)
-    elif isinstance(other, (spe.Immediate, int)):
-      return self.expr_cls(x86.addi, *(self, other))
-    raise Exception('__add__ not implemented for %s and %s' % (type(self), type(other)))    
-  add = staticmethod(__add__)
-  
-  def __div__(self, other):
-    if isinstance(other, SignedWordType):
-      return self.expr_cls(x86.divwx, *(self, other))
-    raise Exception('__div__ not implemented for %s and %s' % (type(self), type(other)))      
-  div = staticmethod(__div__)
+  def __rsub__(self, other):
+    return _binary('__rsub__', x86.sub, self, other, _WordType, _int_literals, True)
 
   def __mul__(self, other):
-    if isinstance(other, SignedWordType):
-      return self.expr_cls(x86.mullwx, *(self, other))
-    elif isinstance(other, (spe.Immediate, int)):
-      return self.expr_cls(x86.mulli, *(self, other))      
-    raise Exception('__mul__ not implemented for %s and %s' % (type(self), type(other)))          
-  div = staticmethod(__div__)
+    return _binary('__mul__', x86.imul, self, other, _WordType, _int_literals)
+  mul = staticmethod(__mul__)
+
+  def __rmul__(self, other):
+    return _binary('__rmul__', x86.imul, self, other, _WordType, _int_literals, True)
 
   def __neg__(self):
-    return x86.negx(self, type_cls = self.var_cls)
+    return x86.neg.ex(self, type_cls = type(self))
+  neg = staticmethod(__neg__)
+
+
+class UnsignedWordType(_WordType):
+  pass
+
+
+class SignedWordType(_WordType):
+  def __rshift__(self, other):
+    return _shift('__rshift__', x86.sar, self, other)
+  rshift = staticmethod(__rshift__)
 
-  def __sub__(self, other):
-    if isinstance(other, SignedWordType):
-      return self.expr_cls(x86.subfx, other, self) # swap a and b
-    raise Exception('__add__ not implemented for %s and %s' % (type(self), type(other)))    
-  sub = staticmethod(__sub__)
 
-  
 # ------------------------------------------------------------
 # Floating Point Register Types
 # ------------------------------------------------------------
 
-class SingleFloatType(PPCType):
-  register_type_id = 'fp'
-  literal_types = (float,)
+class _FloatType(x86_64Type):
+  register_type_id = 'xmm'
+  literal_types = _float_literals
+
+  # add, sub, mul, div, move, and the size in bits
+  _insts = None
 
-  def __abs__(self):
-    return x86.fabsx.ex(self, type_cls = self.var_cls)
-  abs = staticmethod(__abs__)
-  
   def __add__(self, other):
-    if isinstance(other, SingleFloatType):
-      return x86.faddsx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__add__ not implemented for %s and %s' % (type(self), type(other)))        
+    return _binary('__add__', self._insts[0], self, other, type(self).type_cls, _float_literals)
   add = staticmethod(__add__)
-  
-  def __div__(self, other):
-    if isinstance(other, SingleFloatType):
-      return x86.fdivsx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__div__ not implemented for %s and %s' % (type(self), type(other)))    
-  div = staticmethod(__div__)
 
-  def __mul__(self, other):
-    if isinstance(other, SingleFloatType):
-      return x86.fmulsx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__mul__ not implemented for %s and %s' % (type(self), type(other)))
-  mul = staticmethod(__mul__)
-
-  def __neg__(self):
-    return x86.fnegx.ex(self, type_cls = self.var_cls)
-  neg = staticmethod(__neg__)
+  def __radd__(self, other):
+    return _binary('__radd__', self._insts[0], self, other, type(self).type_cls, _float_literals, True)
 
   def __sub__(self, other):
-    if isinstance(other, SingleFloatType):
-      return x86.fsubsx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__sub__ not implemented for %s and %s' % (type(self), type(other)))
+    return _binary('__sub__', self._insts[1], self, other, type(self).type_cls, _float_literals)
   sub = staticmethod(__sub__)
 
-  def _set_literal_value(self, value):
-    storage = array.array('f', (float(self.value),))
-    self.code.add_storage(storage)
-    
-    r_storage = self.code.acquire_register()
-    addr = Bits(storage.buffer_info()[0], reg = r_storage)
-    self.code.add(x86.lfs(self.reg, addr.reg, 0))
-    self.code.release_register(r_storage)
+  def __rsub__(self, other):
+    return _binary('__rsub__', self._insts[1], self, other, type(self).type_cls, _float_literals, True)
 
-    return
-
-  def copy_register(self, other):
-    return self.code.add(x86.fmr(self, other))
+  def __mul__(self, other):
+    return _binary('__mul__', self._insts[2], self, other, type(self).type_cls, _float_literals)
+  mul = staticmethod(__mul__)
 
-class DoubleFloatType(PPCType):
-  register_type_id = 'fp'
-  literal_types = (float,)
+  def __rmul__(self, other):
+    return _binary('__rmul__', self._insts[2], self, other, type(self).type_cls, _float_literals, True)
 
-  def __abs__(self):
-    return x86.fabsx.ex(self, type_cls = self.var_cls)
-  abs = staticmethod(__abs__)
-  
-  def __add__(self, other):
-    if isinstance(other, DoubleFloatType):
-      return x86.faddx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__add__ not implemented for %s and %s' % (type(self), type(other)))
-  add = staticmethod(__add__)
-  
   def __div__(self, other):
-    if isinstance(other, DoubleFloatType):
-      return x86.fdivx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__div__ not implemented for %s and %s' % (type(self), type(other)))
+    return _binary('__div__', self._insts[3], self, other, type(self).type_cls, _float_literals)
   div = staticmethod(__div__)
+  __truediv__ = __div__
 
-  def __mul__(self, other):
-    if isinstance(other, DoubleFloatType):
-      return x86.fmulx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__mul__ not implemented for %s and %s' % (type(self), type(other)))
-  mul = staticmethod(__mul__)
+  def __rdiv__(self, other):
+    return _binary('__rdiv__', self._insts[3], self, other, type(self).type_cls, _float_literals, True)
+  __rtruediv__ = __rdiv__
 
-  def __neg__(self):
-    return x86.fnegx.ex(self, type_cls = self.var_cls)
-  neg = staticmethod(__neg__)
-    
-  def __sub__(self, other):
-    if isinstance(other, DoubleFloatType):
-      return x86.fsubx.ex(self, other, type_cls = self.var_cls)
-    raise Exception('__sub__ not implemented for %s and %s' % (type(self), type(other)))
-  sub = staticmethod(__sub__)
-    
   def _set_literal_value(self, value):
-    storage = array.array('d', (float(value),))
-    self.code.add_storage(storage)
-
-    self.load(storage.buffer_info()[0])
-#     r_storage = self.code.acquire_register()
-#     addr = Bits(storage.buffer_info()[0], reg = r_storage)
-#     self.code.add(x86.lfd(self.reg, addr.reg, 0))
-#     self.code.release_register(r_storage)
-
+    size = self._insts[5]
+    storage = extarray.extarray(('f', 'd')[size == 64], [float(value)], align = 16)
+    self.code.prgm.add_storage(storage)
+
+    r_storage = self.code.prgm.acquire_register()
+    self.code.add(x86.mov(r_storage, storage.buffer_info()[0]))
+    self.code.add(self._insts[4](self.reg, MemRef(r_storage, data_size = size)))
+    self.code.prgm.release_register(r_storage)
     return
 
   def copy_register(self, other):
-    return self.code.add(x86.fmrx(self, other))
-
-  def load(self, addr, offset = 0):
-
-    # If addr is a constant, create a variable and store the value
-    if not issubclass(type(addr), spe.Type):
-      r_storage = self.code.acquire_register()
-      addr = Bits(addr, reg = r_storage)
-    else:
-      r_storage = None
+    return self.code.add(x86.movaps(self.reg, other.reg))
 
-    # If offset is a constant, use lfd, otherwise use lfdx
-    if issubclass(type(offset), spe.Type):
-      self.code.add(x86.lfdx(self, addr, offset))
-    else:
-      # TODO: Check size of offset to ensure it fits in the immediate field 
-      self.code.add(x86.lfd(self, addr, offset))
-
-    if r_storage is not None:
-      self.code.release_register(r_storage)
 
-    return
+class SingleFloatType(_FloatType):
+  _insts = (x86.addss, x86.subss, x86.mulss, x86.divss, x86.movss, 32)
 
-  def store(self, addr, offset = 0):
-
-    # If addr is a constant, create a variable and store the value
-    if not issubclass(type(addr), spe.Type):
-      r_storage = self.code.acquire_register()
-      addr = Bits(addr, reg = r_storage)
-    else:
-      r_storage = None
 
-    # If offset is a constant, use lfd, otherwise use lfdx
-    if issubclass(type(offset), spe.Type):
-      self.code.add(x86.stfdx(self, addr, offset))
-    else:
-      # TODO: Check size of offset to ensure it fits in the immediate field 
-      self.code.add(x86.stfd(self, addr, offset))
-
-    if r_storage is not None:
-      self.code.release_register(r_storage)
-
-    return
+class DoubleFloatType(_FloatType):
+  _insts = (x86.addsd, x86.subsd, x86.mulsd, x86.divsd, x86.movsd, 64)
 
 
-# ------------------------------
-# Floating Point Free Functions
-# ------------------------------
+# ------------------------------------------------------------
+# User Types
+# ------------------------------------------------------------
 
-class _float_function(object):
+class x86_64Expression(spe.Expression):
   """
-  Callable object that performs basic type checking and dispatch for
-  floating point operations.
+  Base class of the x86_64 Expressions, which are evaluated by expropt.
   """
+  optimizer = expropt.ExprOptimizer()
 
-  def __init__(self, name, single_func, double_func):
-    self.name = name
-    self.single_func = single_func
-    self.double_func = double_func
-    return
-
-  def __call__(self, *operands, **koperands):
-    a = operands[0]
-    for op in operands[1:]:
-      if op.var_cls != a.var_cls:
-        raise Exception('Types for all operands must be the same')
-      
-    if isinstance(a, SingleFloatType):
-      return self.single_func.ex(*operands, **{'type_cls': SingleFloat})
-    elif isinstance(a, DoubleFloatType):
-      return self.double_func.ex(*operands, **{'type_cls': DoubleFloat})    
-
-    raise Exception(self.name + ' is not implemeneted for ' + str(type(a)))
-
-    
-fmadd = _float_function('fmadd', x86.fmaddsx, x86.fmaddx)
-fmsub = _float_function('fmsub', x86.fmsubsx, x86.fmsubx)
-fnmadd = _float_function('fnmadd', x86.fnmaddsx, x86.fnmaddx)
-fnmsub = _float_function('fnmsub', x86.fnmsubsx, x86.fnmsubx)
-fsqrt = _float_function('fsqrt', x86.fsqrtsx, x86.fsqrtx)
+  def eval(self, code, reg = None):
+    target = reg
+    if target is None:
+      target = code.prgm.acquire_register(self.register_type_id)
+      self._acquired_register = target
+    return expropt.evaluate(code, self, target, self.optimizer)
 
-# ------------------------------------------------------------
-# User Types
-# ------------------------------------------------------------
 
 # Type classes are mixed-in with Variables and Expressions to form the
 # final user types.  
@@ -427,30 +297,18 @@ def make_user_type(name, type_cls, g = None):
 
     class [name](spe.Variable, type_cls):
       type_cls = type_cls
-    class [name]Ex(spe.Expression, type_cls):
+    class [name]Ex(x86_64Expression, type_cls):
       type_cls = type_cls    
     type_class.var_cls = [name]
     type_class.expr_cls = [name]Ex
-
-  type_cls is added to help determine type precedence among Variables
-  and Expressions.
-
-  (note: there's probably a better way to model these hierarchies that
-   avoids the type_cls, var_cls, expr_cls references.  But, this works
-   and keeping explicit references avoids tricky introspection
-   operations) 
   """
 
-  # Create the sublasses of Varaible and Expression
   var_cls = type(name, (spe.Variable, type_cls), {'type_cls': type_cls})
-  expr_cls = type(name + 'Ex', (spe.Expression, type_cls), {'type_cls': type_cls})
+  expr_cls = type(name + 'Ex', (x86_64Expression, type_cls), {'type_cls': type_cls})
 
-  # Update the type class with references to the variable and
-  # expression classes 
   type_cls.var_cls = var_cls
   type_cls.expr_cls = expr_cls
 
-  # Add the Variable class to the global namespace
   if g is None: g = globals()
   g[name] = var_cls
 
@@ -473,149 +331,183 @@ for t in _user_types:
 # Unit Tests
 # ------------------------------------------------------------
 
+def _run(prgm, code, mode = 'int'):
+  import corepy.arch.x86_64.platform as env
+  x86.set_active_code(None)
+  prgm += code
+  return env.Processor().execute(prgm, mode = mode)
+
+
 def SimpleTest():
   """
   Just make sure things are working...
   """
-  from corepy.arch.x86.platform import Processor, InstructionStream
+  import corepy.arch.x86_64.platform as env
+  from corepy.arch.x86_64.types.registers import rax
 
-  code = InstructionStream()
-  proc = Processor()
+  prgm = env.Program()
+  code = prgm.get_stream()
 
   # Without active code
   a = SignedWord(11, code)
-  b = SignedWord(31, reg = code.acquire_register())
-  c = SignedWord(reg = code.gp_return)
+  b = SignedWord(31, code)
+  c = SignedWord(reg = rax, code = code)
 
   byte_mask = Bits(0xFF, code)
-  code.add(x86.addi(code.gp_return, 0, 31))
-
-  # c.v = a + SignedWord.cast(b & byte_mask) + 12
   c.v = a + (byte_mask & b) + 12
+  assert(_run(prgm, code) == 42 + 12)
 
-  if True:
-    r = proc.execute(code)
-    assert(r == (42 + 12))
-  
   # With active code
-  code.reset()
-
+  prgm = env.Program()
+  code = prgm.get_stream()
   x86.set_active_code(code)
-  
+
   a = SignedWord(11)
   b = SignedWord(31)
-  c = SignedWord(reg = code.gp_return)
-
-  byte_mask = Bits(0xFF)
-
-  c.v = a + (b & byte_mask)
-
-  x86.set_active_code(None)
-  r = proc.execute(code)
-  # code.print_code()
-  assert(r == 42)
+  c = SignedWord(reg = rax)
+  c.v = a + (b & 0xFF)
+  assert(_run(prgm, code) == 42)
   return
 
 
 def TestBits():
-  from corepy.arch.x86.platform import Processor, InstructionStream
-
-  code = InstructionStream()
-  proc = Processor()
+  import corepy.arch.x86_64.platform as env
+  from corepy.arch.x86_64.types.registers import rax
 
+  prgm = env.Program()
+  code = prgm.get_stream()
   x86.set_active_code(code)
-  
+
   b = Bits(0xB0)
   e = Bits(0xE0000)
   a = Bits(0xCA)
   f = Bits(0x5)
-  x = Bits(0, reg = code.gp_return)
-  
+  x = Bits(0, reg = rax)
   mask = Bits(0xF)
-  byte = Bits(8) # 8 bits
-  halfbyte = Bits(4) 
 
   f.v = (a & mask) ^ f
-  x.v = (b << byte) | (e >> byte) | ((a & mask) << halfbyte) | (f | mask)
+  x.v = (b << 8) | (e >> 8) | ((a & mask) << 4) | (f | mask)
+  assert(_run(prgm, code) == 0xBEAF)
+  return
+
+
+def TestArithmetic():
+  import corepy.arch.x86_64.platform as env
+  from corepy.arch.x86_64.types.registers import rax, rdi
 
-  r = proc.execute(code)
-  assert(r == 0xBEAF)
+  for opt in (None, expropt.ExprOptimizer()):
+    x86_64Expression.optimizer = opt
+
+    prgm = env.Program()
+    code = prgm.get_stream()
+    x86.set_active_code(code)
+
+    x = SignedWord(reg = rdi)
+    y = SignedWord(7)
+    z = SignedWord(-3)
+    r = SignedWord(reg = rax)
+
+    r.v = (x * 8 + y * 3) - (x * 10 - 4) * (y - z) + (x + y) * (x + y)
+    r.v = r + (2 + 3) * x - x * 0 + (r >> 1) - -(z * -1) + (1 - x) * 9
+
+    x86.set_active_code(None)
+    prgm += code
+    params = env.ExecParams()
+    params.p1 = 5
+    result = env.Processor().execute(prgm, params = params)
+
+    x = 5
+    r = (x * 8 + 7 * 3) - (x * 10 - 4) * (7 + 3) + (x + 7) * (x + 7)
+    r = r + 5 * x + (r >> 1) + 3 + (1 - x) * 9
+    assert(result == r)
+
+  x86_64Expression.optimizer = expropt.ExprOptimizer()
   return
-  
+
+
+def TestLargeConstants():
+  import corepy.arch.x86_64.platform as env
+  from corepy.arch.x86_64.types.registers import rax, rdi
+
+  # Folded constants outside the signed 32bit range need a 64bit mov
+  for opt in (None, expropt.ExprOptimizer()):
+    x86_64Expression.optimizer = opt
+
+    for (c, expected) in (((1 << 30), 5 + (1 << 31)),
+                          ((1 << 31), 5 + (1 << 32)),
+                          (-(1 << 30) - 1, 5 - (1 << 31) - 2)):
+      prgm = env.Program()
+      code = prgm.get_stream()
+      x86.set_active_code(code)
+
+      x = SignedWord(reg = rdi)
+      r = SignedWord(reg = rax)
+      r.v = (x + c) + c
+
+      x86.set_active_code(None)
+      prgm += code
+      params = env.ExecParams()
+      params.p1 = 5
+      result = env.Processor().execute(prgm, params = params)
+      assert(result == expected)
+
+  x86_64Expression.optimizer = expropt.ExprOptimizer()
+  return
+
+
+def TestOptimizer():
+  import corepy.arch.x86_64.platform as env
+  from corepy.arch.x86_64.types.registers import rax, rdi
+
+  sizes = []
+  for opt in (None, expropt.ExprOptimizer()):
+    x86_64Expression.optimizer = opt
+    prgm = env.Program()
+    code = prgm.get_stream()
+    x86.set_active_code(code)
+
+    x = SignedWord(reg = rdi)
+    r = SignedWord(reg = rax)
+    r.v = x * 8 + (x + 1) * (2 * 3) + (x + 1) * 0
+    sizes.append(len(code))
+    x86.set_active_code(None)
+
+  # mov/shl, mov/add/lea/shl, add
+  assert(sizes[1] == 7)
+  assert(sizes[1] < sizes[0])
+  return
+
+
 def TestFloatingPoint(float_type):
-  from corepy.arch.x86.platform import Processor, InstructionStream
-  
-  code = InstructionStream()
-  proc = Processor()
+  import corepy.arch.x86_64.platform as env
+  from corepy.arch.x86_64.types.registers import xmm0
 
+  prgm = env.Program()
+  code = prgm.get_stream()
   x86.set_active_code(code)
 
   x = float_type(1.0)
   y = float_type(2.0)
   z = float_type(3.0)
+  r = float_type(reg = xmm0)
 
-  a = float_type()
-  b = float_type()
-  c = float_type()
-  d = float_type()
-  
-  # Create some data
-  data = array.array('d', (1.0, 2.0, 3.0, 4.0))
-  addr = data.buffer_info()[0]
-
-  # Load from addr
-  a.load(addr) 
-
-  # Load from addr with idx in register
-  offset = Bits(8)
-  b.load(data.buffer_info()[0], offset)
-
-  # Load from addr with constant idx 
-  c.load(data.buffer_info()[0], 8*2)
-  
-  # Load from addr with addr as a register
-  reg_addr = Bits(addr)
-  d.load(reg_addr)
-  
-  r = float_type(reg = code.fp_return)
-
-  r.v = (x + y) / y
-
-  r.v = fmadd(a, y, z + z) + fnmadd(a, y, z + z) + fmsub(x, y, z) + fnmsub(x, y, z) 
-  x.v = -x
-  r.v = r + x - x + a + b - c + d - d
-
-  # Store from addr
-  a.v = 11.0
-  a.store(addr) 
-
-  # Store from addr with idx in register
-  offset = Bits(8)
-  b.v = 12.0
-  b.store(data.buffer_info()[0], offset)
-
-  # Store from addr with constant idx
-  c.v = 13.0
-  c.store(data.buffer_info()[0], 8*2)
-  
-  # Store from addr with addr as a register
-  d.v = 14.0
-  reg_addr = UnsignedWord(addr)
-  reg_addr.v = reg_addr + 8 * 3
-  d.store(reg_addr)
-  
-  r = proc.execute(code, mode='fp')
-  assert(r == 0.0)
-  assert(data[0] == 11.0)
-  assert(data[1] == 12.0)
-  assert(data[2] == 13.0)
-  assert(data[3] == 14.0)
-  
+  r.v = (x + y) / y * 2.0 + z * z - 1.0 / (z + 1)
+  r.v = r * 1.0 + (x - z) * (x - z)
+  if float_type is DoubleFloat:
+    # fp mode returns a single precision value
+    x86.cvtsd2ss(xmm0, xmm0)
+
+  result = _run(prgm, code, mode = 'fp')
+  assert(result == (3.0 / 2.0) * 2.0 + 9.0 - 0.25 + 4.0)
   return
 
+
 if __name__=='__main__':
-  from corepy.arch.x86.lib.util import RunTest
+  from corepy.arch.x86_64.lib.util import RunTest
   RunTest(SimpleTest)
+  RunTest(TestBits)
+  RunTest(TestArithmetic)
+  RunTest(TestLargeConstants)
+  RunTest(TestOptimizer)
   RunTest(TestFloatingPoint, SingleFloat)
   RunTest(TestFloatingPoint, DoubleFloat)
-  RunTest(TestBits)
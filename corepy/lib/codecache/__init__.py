@@ -0,0 +1,400 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+__doc__ = """
+On-disk cache of rendered Program code.
+
+A CodeCache stores the code rendered by Program.cache_code() in a local
+directory, keyed by a fingerprint of the program: its class and instruction
+type, and every instruction (class, operands), label and alignment in the
+prologue, the instruction streams and the epilogue.  When a program with the
+same fingerprint is cached again, even by another process, the code and
+label positions are loaded from disk and rendering is skipped entirely.
+
+To use a cache for one program, or for every program of a platform:
+
+  prgm.code_cache = CodeCache()
+  env.Program.code_cache = CodeCache('/tmp/my_cache')
+
+Any immediate value or address that differs between runs (for example the
+address of an array used by the code) gives a different fingerprint, so such
+programs are simply cache misses.
+
+Fingerprinting a large program takes about as long as rendering it.  Each
+stream's part of the fingerprint is remembered until the stream is changed,
+so caching the same program again is cheap, but a program that is rebuilt
+from scratch is fingerprinted in full.  To skip that, give the program a key
+that identifies its code:
+
+  prgm.code_cache_key = 'saxpy-v2-%d' % n
+
+Files are evicted oldest first when the cache directory grows past max_size
+bytes, and files not used for max_age seconds are removed.
+"""
+
+import hashlib
+import marshal
+import os
+import tempfile
+import time
+import weakref
+
+import corepy.spre.spe as spe
+import corepy.lib.extarray as extarray
+
+# Bump when the fingerprint or file format changes
+FORMAT_VERSION = 2
+
+# Operand types that describe themselves in fingerprints
+_primitive_types = (int, long, float, str, bool, type(None))
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.corepy', 'codecache')
+
+
+class CodeCache(object):
+  def __init__(self, path = None, max_size = 64 * 1024 * 1024,
+               max_age = 30 * 24 * 60 * 60):
+    """
+    Create a code cache in directory path, which is created if needed.  If
+    path is not given, the COREPY_CODE_CACHE environment variable is used,
+    and if that is not set, ~/.corepy/codecache.
+    max_size is the size in bytes the directory is kept under, and max_age
+    the number of seconds an unused file is kept.  Either may be None.
+    """
+    if path is None:
+      path = os.environ.get('COREPY_CODE_CACHE', DEFAULT_PATH)
+    self.path = path
+    self.max_size = max_size
+    self.max_age = max_age
+
+    # Statistics
+    self.hits = 0
+    self.misses = 0
+
+    # Stream -> (version, digest, labels) for streams fingerprinted already
+    self._stream_digests = weakref.WeakKeyDictionary()
+
+    if not os.path.isdir(path):
+      os.makedirs(path)
+    return
+
+
+  # ------------------------------
+  # Fingerprints
+  # ------------------------------
+
+  def _object_lists(self, prgm):
+    """Return the prologue, stream and epilogue object lists, in order"""
+    return ([prgm._prologue] + [stream.objects for stream in prgm.objects] +
+            [prgm._epilogue])
+
+  def _describe(self, op, memo, labels):
+    """
+    Return a value describing an operand that marshal can serialize, and
+    remember it in memo.
+    """
+    try:
+      return memo[op]
+    except KeyError:
+      pass
+    except TypeError: # Not hashable
+      pass
+
+    t = type(op)
+    if t in _primitive_types:
+      desc = op
+    elif isinstance(op, spe.Label):
+      # Label names need not be unique, so number labels in the order
+      # they are first seen.
+      desc = ('Label', len(labels))
+      labels[op] = desc
+    elif isinstance(op, spe.Register):
+      desc = '%s:%s' % (t.__name__, str(op))
+    elif isinstance(op, type):
+      desc = '%s.%s' % (op.__module__, op.__name__)
+    else:
+      # Other operands (e.g. memory references) may have details not shown
+      # by str(), so describe them by all their attributes.
+      attrs = vars(op)
+      vals = []
+      for v in attrs.itervalues():
+        if type(v) in _primitive_types:
+          vals.append(v)
+        else:
+          try:
+            vals.append(memo[v])
+          except (KeyError, TypeError):
+            vals.append(self._describe(v, memo, labels))
+      desc = (t.__name__, tuple(attrs.keys()), tuple(vals))
+
+    try:
+      memo[op] = desc
+    except TypeError: # Not hashable
+      pass
+    return desc
+
+  def _digest(self, objs):
+    """
+    Return a hash of a list of objects, and the labels in it in the order
+    they are first seen.  Labels are described by that order.
+    """
+    # Every object is described by a tuple of primitive values, and the
+    # marshalled list of tuples is hashed.  Most operands (registers,
+    # memory references, labels) are shared by many instructions, so their
+    # descriptions are remembered.
+    memo = {}
+    lookup = memo.__getitem__
+    labels = {}
+    records = []
+
+    describe = self._describe
+    append = records.append
+    for obj in objs:
+      try:
+        # Instruction
+        ops = (obj.__class__,) + tuple(obj._supplied_operands)
+        if obj._supplied_koperands:
+          ops += tuple(sorted(obj._supplied_koperands.items()))
+      except AttributeError:
+        if isinstance(obj, spe.AlignStream):
+          ops = ('align', obj.align)
+        else:
+          ops = (obj,)
+
+      try:
+        append(tuple(map(lookup, ops)))
+      except (KeyError, TypeError):
+        # Only describe the operands not seen before
+        desc = []
+        for op in ops:
+          try:
+            desc.append(memo[op])
+          except (KeyError, TypeError):
+            desc.append(describe(op, memo, labels))
+        append(tuple(desc))
+
+    order = sorted(labels.items(), key = lambda item: item[1][1])
+    return (hashlib.sha1(marshal.dumps(records)).digest(),
+            [lbl for (lbl, desc) in order])
+
+  def _stream_digest(self, stream):
+    """_digest for a stream, reusing the last one if it is unchanged"""
+    entry = self._stream_digests.get(stream)
+    if entry is not None and entry[0] == stream._version:
+      return entry[1:]
+
+    (digest, labels) = self._digest(stream.objects)
+    self._stream_digests[stream] = (stream._version, digest, labels)
+    return (digest, labels)
+
+  def fingerprint(self, prgm):
+    """
+    Return the fingerprint of a program, as a hex string.  The prologue and
+    epilogue must already be synthesized.  If the program has a
+    code_cache_key, it is used instead of the program's contents.
+    """
+    header = (FORMAT_VERSION, prgm.__class__.__module__,
+              prgm.__class__.__name__, prgm.instruction_type)
+    if prgm.code_cache_key is not None:
+      return hashlib.sha1(marshal.dumps((header, 'key',
+          str(prgm.code_cache_key)))).hexdigest()
+
+    parts = [self._digest(prgm._prologue)]
+    parts.extend([self._stream_digest(stream) for stream in prgm.objects])
+    parts.append(self._digest(prgm._epilogue))
+
+    # Labels are numbered within each part; number them across the program
+    # too, so references between streams are part of the fingerprint.
+    numbers = {}
+    records = [header]
+    for (digest, labels) in parts:
+      ids = []
+      for lbl in labels:
+        try:
+          ids.append(numbers[lbl])
+        except KeyError:
+          ids.append(numbers.setdefault(lbl, len(numbers)))
+      records.append((digest, tuple(ids)))
+
+    return hashlib.sha1(marshal.dumps(records)).hexdigest()
+
+  # ------------------------------
+  # Cache access
+  # ------------------------------
+
+  def _file(self, key):
+    return os.path.join(self.path, key + '.code')
+
+  def _positioned(self, prgm):
+    """
+    Return lists of the labels and the instructions in a program, in code
+    order.  These are the objects cache_code gives a position to.
+    """
+    labels = []
+    insts = []
+    for objs in self._object_lists(prgm):
+      for obj in objs:
+        if isinstance(obj, spe.Label):
+          labels.append(obj)
+        elif isinstance(obj, spe.Instruction):
+          insts.append(obj)
+    return (labels, insts)
+
+  def load(self, prgm, key):
+    """
+    Look up a program's code by its fingerprint.  If found, set the
+    program's render_code and the label and instruction positions, and
+    return True.  Otherwise return False.
+    """
+    fname = self._file(key)
+    try:
+      fd = open(fname, 'rb')
+      try:
+        (version, fkey, typecode, code, lbl_pos, inst_pos) = marshal.load(fd)
+      finally:
+        fd.close()
+    except (IOError, EOFError, ValueError, TypeError):
+      self.misses += 1
+      return False
+
+    (labels, insts) = self._positioned(prgm)
+    if (version != FORMAT_VERSION or fkey != key or
+        typecode != prgm.instruction_type or
+        len(lbl_pos) != len(labels) or
+        (len(inst_pos) > 0 and inst_pos[-1][0] >= len(insts))):
+      self.misses += 1
+      return False
+
+    for (lbl, pos) in zip(labels, lbl_pos):
+      lbl.set_position(pos)
+    for (i, pos) in inst_pos:
+      insts[i].set_position(pos)
+
+    render_code = extarray.extarray(typecode)
+    render_code.copy_direct(code)
+    prgm.render_code = render_code
+
+    # Mark the file as recently used
+    try:
+      os.utime(fname, None)
+    except OSError:
+      pass
+
+    self.hits += 1
+    return True
+
+  def store(self, prgm, key):
+    """Save a program's rendered code under its fingerprint."""
+    code = prgm.render_code
+    data = str(buffer(code))
+
+    (labels, insts) = self._positioned(prgm)
+    lbl_pos = [lbl.position for lbl in labels]
+    # Only instructions with relative operands have a position
+    inst_pos = [(i, inst._operands['position'])
+                for (i, inst) in enumerate(insts)
+                if 'position' in inst._operands]
+
+    # Write to a temporary file and rename it, so other processes never see
+    # a partially written file.
+    (fd, tmpname) = tempfile.mkstemp(suffix = '.tmp', dir = self.path)
+    try:
+      f = os.fdopen(fd, 'wb')
+      try:
+        marshal.dump((FORMAT_VERSION, key, code.typecode, data, lbl_pos,
+                      inst_pos), f)
+      finally:
+        f.close()
+      os.rename(tmpname, self._file(key))
+    except:
+      try:
+        os.unlink(tmpname)
+      except OSError:
+        pass
+      raise
+
+    self.evict()
+    return
+
+
+  # ------------------------------
+  # Eviction
+  # ------------------------------
+
+  def _entries(self):
+    """Return (mtime, size, filename) for each cache file, oldest first"""
+    entries = []
+    for name in os.listdir(self.path):
+      if not name.endswith('.code'):
+        continue
+      fname = os.path.join(self.path, name)
+      try:
+        st = os.stat(fname)
+      except OSError:
+        continue
+      entries.append((st.st_mtime, st.st_size, fname))
+    entries.sort()
+    return entries
+
+  def evict(self):
+    """
+    Remove files unused for more than max_age seconds, then the oldest
+    files until the cache is no larger than max_size bytes.
+    """
+    entries = self._entries()
+    size = sum([e[1] for e in entries])
+    now = time.time()
+
+    for (mtime, fsize, fname) in entries:
+      if self.max_age is not None and now - mtime > self.max_age:
+        pass
+      elif self.max_size is not None and size > self.max_size:
+        pass
+      else:
+        continue
+
+      try:
+        os.unlink(fname)
+      except OSError:
+        continue
+      size -= fsize
+    return
+
+  def clear(self):
+    """Remove every file in the cache"""
+    for (mtime, fsize, fname) in self._entries():
+      try:
+        os.unlink(fname)
+      except OSError:
+        pass
+    return
+
+  def size(self):
+    """Return the total size in bytes of the cache files"""
+    return sum([e[1] for e in self._entries()])
+
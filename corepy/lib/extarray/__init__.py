@@ -27,4 +27,50 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
 
 from extarray import extarray, extbuffer
+from extarray import hugepage_size, has_huge_pages, has_thp
+
+
+def hugepage_stats(arr):
+  """
+  Return how much of an array's memory is backed by huge pages, as a dict:
+    size      bytes of memory allocated for the array
+    huge      bytes of that backed by huge pages
+    page_size huge page size in bytes
+
+  Transparent huge pages are only used once memory is touched, and only
+  when the kernel can find free huge pages, so an array allocated with
+  huge = 'thp' may be only partly backed by them.  The counts come from
+  /proc/self/smaps, which counts per mapping; if an array's mapping was
+  merged with a neighbouring one, huge is an upper bound.
+  """
+  size = arr.alloc_len
+  stats = {'size':size, 'huge':0, 'page_size':hugepage_size()}
+  start = arr.buffer_info()[0]
+  if size == 0 or start == 0:
+    return stats
+  if arr.huge == 1:
+    # Reserved huge pages back the whole allocation
+    stats['huge'] = size
+    return stats
+
+  end = start + size
+  overlap = 0
+  huge = 0
+  try:
+    smaps = open('/proc/self/smaps')
+  except IOError:
+    return stats
+
+  for line in smaps:
+    fields = line.split()
+    if '-' in fields[0] and not fields[0].endswith(':'):
+      # Start of a mapping: address range, permissions, ...
+      (lo, hi) = [int(x, 16) for x in fields[0].split('-')]
+      overlap = max(0, min(hi, end) - max(lo, start))
+    elif overlap > 0 and fields[0] in ('AnonHugePages:', 'Private_Hugetlb:', 'Shared_Hugetlb:'):
+      huge += min(int(fields[1]) * 1024, overlap)
+  smaps.close()
+
+  stats['huge'] = min(huge, size)
+  return stats
 
@@ -52,6 +52,14 @@
 
 // Huge page code derived from:
 // http://www.cellperformance.com/public/attachments/cp_hugemem.c
+//
+// Huge pages come from a file on a hugetlbfs mount if there is one, or an
+// anonymous MAP_HUGETLB mapping otherwise.  Both need huge pages reserved
+// by the system administrator.  Transparent huge pages (THP) need no
+// reservation: anonymous memory aligned to a huge page is marked with
+// MADV_HUGEPAGE, and the kernel backs it with huge pages when it can.
+
+// Record of each huge page or THP mapping; fd is -1 for anonymous mappings
 struct _hugerec
 {
     int fd;
@@ -111,23 +119,73 @@ static int _hugefs_find_mnt(void)
     }
 
     endmntent(mount_table);
-
-    fprintf(stderr,"ERROR: No hugetlbfs entry in the mount table\n");
     return 0;
 }
 
 
+static void _hugerec_add(int fd, void* addr, size_t length)
+{
+    _hugerecs = (struct _hugerec*)realloc(_hugerecs,
+            sizeof(struct _hugerec) * (_hugerecs_len + 1));
+
+    _hugerecs[_hugerecs_len].fd = fd;
+    _hugerecs[_hugerecs_len].addr = addr;
+    _hugerecs[_hugerecs_len].length = length;
+    _hugerecs_len++;
+}
+
+
+static int get_hugepage_size(void)
+{
+    static int hugepage_size = 0;
+    FILE* meminfo;
+    char line[128];
+    long kb;
+
+    if(hugepage_size != 0) {
+        return hugepage_size;
+    }
+
+    //Use the old default if the kernel doesn't say
+    hugepage_size = 16 * 1024 * 1024;
+
+    meminfo = fopen("/proc/meminfo", "r");
+    if(meminfo == NULL) {
+        return hugepage_size;
+    }
+
+    while(fgets(line, sizeof(line), meminfo) != NULL) {
+        if(sscanf(line, "Hugepagesize: %ld kB", &kb) == 1) {
+            hugepage_size = kb * 1024;
+            break;
+        }
+    }
+
+    fclose(meminfo);
+    return hugepage_size;
+}
+
+
 static void* alloc_hugemem(size_t size)
 {
     void* addr;
     char  filename[PATH_MAX + 1];
     int   fd;
 
-#if 0
-    if(_hugefs_mnt[0] == '\0' && !_hugefs_find_mnt()) {
+    if(_hugefs_mnt[0] == '\0') {
+#ifdef MAP_HUGETLB
+        addr = mmap(0, size, PROT_READ | PROT_WRITE,
+                MAP_PRIVATE | MAP_ANONYMOUS | MAP_HUGETLB, -1, 0);
+        if(addr == MAP_FAILED) {
+            return 0;
+        }
+
+        _hugerec_add(-1, addr, size);
+        return addr;
+#else
         return 0;
-    }
 #endif
+    }
 
     strcpy(filename, _hugefs_mnt);
     fd = mkstemp(filename);
@@ -142,21 +200,49 @@ static void* alloc_hugemem(size_t size)
     if(addr == MAP_FAILED) {
         fprintf(stderr,
                 "ERROR: Couldn't mmap huge page file: %s\n", strerror(errno));
+        close(fd);
         return 0;
     }
 
-    _hugerecs = (struct _hugerec*)realloc(_hugerecs,
-            sizeof(struct _hugerec) * (_hugerecs_len + 1));
-   
-    _hugerecs[_hugerecs_len].fd = fd;
-    _hugerecs[_hugerecs_len].addr = addr;
-    _hugerecs[_hugerecs_len].length = size;
-    _hugerecs_len++;
-
+    _hugerec_add(fd, addr, size);
     return addr;
 }
 
 
+//Allocate size bytes (a multiple of the huge page size) of anonymous memory
+// aligned to a huge page, and ask for it to be backed by transparent huge
+// pages.
+static void* alloc_thpmem(size_t size)
+{
+    size_t hugepage_size = get_hugepage_size();
+    char* addr;
+    char* aligned;
+
+    //Map an extra huge page, and unmap the parts outside the aligned range
+    addr = (char*)mmap(0, size + hugepage_size, PROT_READ | PROT_WRITE,
+            MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if(addr == MAP_FAILED) {
+        return 0;
+    }
+
+    aligned = (char*)(((size_t)addr + hugepage_size - 1) & ~(hugepage_size - 1));
+    if(aligned > addr) {
+        munmap(addr, aligned - addr);
+    }
+    if(aligned + size < addr + size + hugepage_size) {
+        munmap(aligned + size, (addr + size + hugepage_size) - (aligned + size));
+    }
+
+#ifdef MADV_HUGEPAGE
+    //Not an error if THP is disabled; the memory just uses regular pages
+    madvise(aligned, size, MADV_HUGEPAGE);
+#endif
+
+    _hugerec_add(-1, aligned, size);
+    return aligned;
+}
+
+
 static void free_hugemem(void* addr)
 {
     int i;
@@ -164,7 +250,9 @@ static void free_hugemem(void* addr)
     for(i = 0; i < _hugerecs_len; i++) {
         if(_hugerecs[i].addr == addr) {
             munmap((void*)_hugerecs[i].addr, _hugerecs[i].length);
-            close(_hugerecs[i].fd);
+            if(_hugerecs[i].fd != -1) {
+                close(_hugerecs[i].fd);
+            }
 
             _hugerecs[i] = _hugerecs[--_hugerecs_len];
             _hugerecs = (struct _hugerec*)realloc(_hugerecs,
@@ -175,7 +263,8 @@ static void free_hugemem(void* addr)
 }
 
 
-static void* realloc_hugemem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize)
+//Huge page memory is always aligned to a huge page, align is ignored
+static void* realloc_hugemem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize, Py_ssize_t align)
 {
     void* oldaddr = (void*)mem;
     void* newaddr;
@@ -188,28 +277,77 @@ static void* realloc_hugemem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize)
 #endif
 
     newaddr = (void*)alloc_hugemem(newsize);
+    if(newaddr == NULL) {
+        return NULL;
+    }
+
     memcpy(newaddr, oldaddr, oldsize < newsize ? oldsize : newsize);
     free_hugemem(oldaddr);
     return newaddr;
 }
 
 
-static int get_hugepage_size(void)
+//THP memory is always aligned to a huge page, align is ignored
+static void* realloc_thpmem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize, Py_ssize_t align)
 {
-    //TODO - do this right..
-    // do a system("cat /proc/meminfo |grep Hugepagesize") and cache it
-    return 16 * 1024 * 1024;
+    void* newaddr = alloc_thpmem(newsize);
+
+    if(newaddr == NULL) {
+        return NULL;
+    }
+
+    memcpy(newaddr, mem, oldsize < newsize ? oldsize : newsize);
+    free_hugemem(mem);
+    return newaddr;
 }
 
 
 static int has_huge_pages(void)
 {
+    static int anon = -1;
+
     //Can a mount path be found?
-    if(_hugefs_mnt[0] == '\0' && !_hugefs_find_mnt()) {
+    if(_hugefs_mnt[0] != '\0' || _hugefs_find_mnt()) {
+        return 1;
+    }
+
+#ifdef MAP_HUGETLB
+    //Otherwise, can anonymous huge pages be mapped?
+    if(anon == -1) {
+        void* addr = mmap(0, get_hugepage_size(), PROT_READ | PROT_WRITE,
+                MAP_PRIVATE | MAP_ANONYMOUS | MAP_HUGETLB, -1, 0);
+
+        anon = addr != MAP_FAILED;
+        if(anon == 1) {
+            munmap(addr, get_hugepage_size());
+        }
+    }
+
+    return anon;
+#else
+    return 0;
+#endif
+}
+
+
+//Return 1 if transparent huge pages can be used for MADV_HUGEPAGE memory
+static int has_thp(void)
+{
+    FILE* f;
+    char line[128];
+    int enabled = 0;
+
+    f = fopen("/sys/kernel/mm/transparent_hugepage/enabled", "r");
+    if(f == NULL) {
         return 0;
     }
 
-    return 1;
+    if(fgets(line, sizeof(line), f) != NULL) {
+        enabled = strstr(line, "[never]") == NULL;
+    }
+
+    fclose(f);
+    return enabled;
 }
 
 #else // not __linux__
@@ -229,7 +367,7 @@ static void free_hugemem(void* addr)
 {
 }
 
-static void* realloc_hugemem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize)
+static void* realloc_hugemem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize, Py_ssize_t align)
 {
     return 0;
 }
@@ -239,6 +377,21 @@ static int get_hugepage_size(void)
     return 0;
 }
 
+static void* alloc_thpmem(size_t size)
+{
+    return 0;
+}
+
+static void* realloc_thpmem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize, Py_ssize_t align)
+{
+    return 0;
+}
+
+static int has_thp(void)
+{
+    return 0;
+}
+
 #endif //__linux__
 
 
@@ -262,10 +415,30 @@ static void* alloc_mem(size_t size)
 }
 
 
-static void* realloc_mem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize)
+//Allocate size bytes aligned to align, a power of two that is a multiple of
+// sizeof(void*).  Returns NULL if the memory could not be allocated.
+static void* alloc_mem_align(size_t size, size_t align)
+{
+    void* addr;
+
+    if(posix_memalign(&addr, align, size) != 0) {
+        return NULL;
+    }
+
+    return addr;
+}
+
+
+//Move memory to a new allocation of newsize bytes aligned to align.  The
+// old memory is left alone if the new memory could not be allocated.
+static void* realloc_mem(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize, Py_ssize_t align)
 {
     void* oldaddr = mem;
-    void* newaddr = (void*)alloc_mem(newsize);
+    void* newaddr = alloc_mem_align(newsize, align);
+
+    if(newaddr == NULL) {
+        return NULL;
+    }
 
     memcpy(newaddr, oldaddr, oldsize < newsize ? oldsize : newsize);
     free(oldaddr);
@@ -8,9 +8,10 @@ typedef int Py_ssize_t;
 #include <stdio.h>
 #include "alloc.h"
 
-#if defined(__APPLE__) & defined( __MACH__)
 #include <sys/mman.h>
-#endif
+#include <sys/stat.h>
+#include <fcntl.h>
+#include <unistd.h>
 
 //#ifndef _DEBUG
 //#define _DEBUG 0
@@ -18,29 +19,47 @@ typedef int Py_ssize_t;
 
 //Make sure Py_ssize_t is defined
 
+//Kinds of huge page memory an extarray can use
+#define HUGE_NONE 0       //Regular pages
+#define HUGE_TLB 1        //Reserved huge pages (hugetlbfs or MAP_HUGETLB)
+#define HUGE_THP 2        //Transparent huge pages
+
 typedef struct ExtArray {
   PyObject_HEAD
 
   PyObject* attr_dict;
   char typecode;          //Type of array elements
-  unsigned char huge;     //Boolean, 1 if huge pages are used, 0 otherwise
+  unsigned char huge;     //HUGE_NONE, HUGE_TLB or HUGE_THP
   char lock;              //Boolean, 1 if memory is 'locked' eg no realloc
+  char readonly;          //Boolean, 1 if the memory may not be written
 
   int page_size;          //Memory page size in bytes
+  Py_ssize_t align;       //Alignment of the memory in bytes, a power of 2
   int itemsize;           //Size of a single element in bytes
   Py_ssize_t data_len;    //Data length counted in items
   Py_ssize_t alloc_len;   //Allocated memory length counted in bytes
   Py_ssize_t iter;        //Counter for supporting iterating over extarrays
+  Py_ssize_t exports;     //Number of buffers exported, memory can't move
 
   void* memory;           //Pointer to the memory backing the array
 
   //Functions for allocating/freeing memory
-  void* (*realloc)(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize);
+  void* (*realloc)(void* mem, Py_ssize_t oldsize, Py_ssize_t newsize, Py_ssize_t align);
   void (*free)(void* mem);
 
   //If this extarray is a slice of another extarray, this is a reference to
   // that other extarray
   struct ExtArray* arr_ref;
+
+  //If this extarray wraps the memory of another object (see frombuffer),
+  // the buffer obtained from it.  view.obj is NULL otherwise.
+  Py_buffer view;
+
+  //If this extarray maps a file (see frommap), the page-aligned start and
+  // length of the mapping.  map_addr is NULL otherwise.
+  void* map_addr;
+  Py_ssize_t map_len;
+  char map_sync;          //Boolean, 1 if writes go to the file
 } ExtArray;
 
 
@@ -120,12 +139,58 @@ static int set_type(ExtArray* self, char typecode)
 }
 
 
+//Return the extarray typecode for a struct module format string, or 0 if
+// there is no matching typecode.
+static char format_typecode(const char* format)
+{
+  //Only native byte order is supported
+  if(format[0] == '@' || format[0] == '=') {
+    format++;
+#ifdef WORDS_BIGENDIAN
+  } else if(format[0] == '>' || format[0] == '!') {
+#else
+  } else if(format[0] == '<') {
+#endif
+    format++;
+  }
+
+  if(format[0] == '\0' || format[1] != '\0') {
+    return 0;
+  }
+
+  switch(format[0]) {
+  case 'c':
+  case 'b':
+  case 'B':
+  case 'h':
+  case 'H':
+  case 'i':
+  case 'I':
+  case 'l':
+  case 'L':
+  case 'f':
+  case 'd':
+    return format[0];
+  case '?':
+    return 'B';
+  case 'q':
+    return sizeof(long long) == sizeof(long) ? 'l' : 0;
+  case 'Q':
+    return sizeof(long long) == sizeof(long) ? 'L' : 0;
+  }
+
+  return 0;
+}
+
+
 //Allocate memory for length elements, rounding the allocation up to a
-// multiple of a page.
+// multiple of a page, or of the alignment if that is smaller.
 static int alloc(ExtArray* self, Py_ssize_t length)
 {
   Py_ssize_t size;
+  Py_ssize_t unit;
   Py_ssize_t m;
+  void* memory;
 
   if(self->lock == 1) {
     PyErr_SetString(PyExc_MemoryError,
@@ -134,16 +199,29 @@ static int alloc(ExtArray* self, Py_ssize_t length)
   }
 
   //Round size to a page
+  unit = self->align < self->page_size ? self->align : self->page_size;
   size = length * self->itemsize;
-  m = size % self->page_size;
+  m = size % unit;
   if(m != 0) {
-    size += self->page_size - m;
+    size += unit - m;
   }
 
   //Only realloc memory if the new size is larger
   if(self->alloc_len < size) {
-    self->memory = self->realloc(self->memory, self->alloc_len, size);
+    //Memory exported through the buffer interface must not move
+    if(self->exports > 0) {
+      PyErr_SetString(PyExc_BufferError,
+          "Attempt to reallocate an array with exported buffers");
+      return -1;
+    }
 
+    memory = self->realloc(self->memory, self->alloc_len, size, self->align);
+    if(memory == NULL) {
+      PyErr_NoMemory();
+      return -1;
+    }
+
+    self->memory = memory;
     self->alloc_len = size;
     if(length < self->data_len) {
       self->data_len = length;
@@ -158,30 +236,112 @@ static int alloc(ExtArray* self, Py_ssize_t length)
 }
 
 
+//Make room for length elements when adding elements to the array.  The
+// allocation grows by at least half each time it is reallocated, so a
+// series of appends copies each element a constant number of times on
+// average.
+static int grow(ExtArray* self, Py_ssize_t length)
+{
+  Py_ssize_t size = length * self->itemsize;
+
+  if(size <= self->alloc_len) {
+    return 0;
+  }
+
+  if(size < self->alloc_len + (self->alloc_len >> 1)) {
+    size = self->alloc_len + (self->alloc_len >> 1);
+  }
+
+  return alloc(self, (size + self->itemsize - 1) / self->itemsize);
+}
+
+
+//Return the largest power of 2 up to max that addr is a multiple of
+static Py_ssize_t address_align(void* addr, Py_ssize_t max)
+{
+  Py_ssize_t align = 1;
+
+  while(align < max && ((size_t)addr & align) == 0) {
+    align <<= 1;
+  }
+
+  return align;
+}
+
+
+//Raise an exception and return -1 if the array memory is read-only
+static int check_writable(ExtArray* self)
+{
+  if(self->readonly == 1) {
+    PyErr_SetString(PyExc_TypeError, "Array memory is read-only");
+    return -1;
+  }
+
+  return 0;
+}
+
+
 static int
 ExtArray_init(ExtArray* self, PyObject* args, PyObject* kwds)
 {
   //Python-level extarray constructor:
-  //def __init__(self, typecode, init = None, huge = False):
-  static char* kwlist[] = {"typecode", "init", "huge", NULL};
+  //def __init__(self, typecode, init = None, huge = False, align = None):
+  //huge is True for reserved huge pages, or 'thp' for transparent huge pages
+  static char* kwlist[] = {"typecode", "init", "huge", "align", NULL};
   char typecode;
-  unsigned char huge = 0;
+  unsigned char huge = HUGE_NONE;
+  PyObject* huge_obj = Py_False;
   PyObject* init = Py_None;
+  PyObject* align_obj = Py_None;
+  Py_ssize_t align = 0;
+  Py_ssize_t length;
 
-  if(!PyArg_ParseTupleAndKeywords(args, kwds, "c|Ob",
-      kwlist, &typecode, &init, &huge)) {
+  if(!PyArg_ParseTupleAndKeywords(args, kwds, "c|OOO",
+      kwlist, &typecode, &init, &huge_obj, &align_obj)) {
     return -1;
   }
 
+  if(PyString_Check(huge_obj)) {
+    if(strcmp(PyString_AsString(huge_obj), "thp") != 0) {
+      PyErr_SetString(PyExc_ValueError, "huge must be True, False or 'thp'");
+      return -1;
+    }
+    huge = HUGE_THP;
+  } else {
+    switch(PyObject_IsTrue(huge_obj)) {
+    case -1:
+      return -1;
+    case 1:
+      huge = HUGE_TLB;
+    }
+  }
+
+  if(align_obj != Py_None) {
+    align = PyInt_AsSsize_t(align_obj);
+    if(align == -1 && PyErr_Occurred()) {
+      return -1;
+    }
+
+    if(align <= 0 || (align & (align - 1)) != 0) {
+      PyErr_SetString(PyExc_ValueError, "align must be a power of 2");
+      return -1;
+    }
+  }
+
   self->huge = huge;
   self->lock = 0;
+  self->readonly = 0;
+  self->exports = 0;
+  self->data_len = 0;
   self->alloc_len = 0;
   self->memory = NULL;
 
   self->arr_ref = NULL;
+  self->view.obj = NULL;
+  self->map_addr = NULL;
 
   //TODO - replace has_huge_pages with a define
-  if(huge == 1 && has_huge_pages() == 0) {
+  if(huge == HUGE_TLB && has_huge_pages() == 0) {
     PyErr_SetString(PyExc_MemoryError,
         "No huge pages available, try regular pages");
     return -1;
@@ -191,16 +351,36 @@ ExtArray_init(ExtArray* self, PyObject* args, PyObject* kwds)
     return -1;
   }
 
-  if(huge == 1) {
+  if(huge == HUGE_TLB) {
     self->realloc = realloc_hugemem;
     self->free = free_hugemem;
     self->page_size = get_hugepage_size();
+  } else if(huge == HUGE_THP) {
+    self->realloc = realloc_thpmem;
+    self->free = free_hugemem;
+    self->page_size = get_hugepage_size();
   } else {
     self->realloc = realloc_mem;
     self->free = free_mem;
     self->page_size = get_page_size();
   }
 
+  //Memory is page-aligned unless another alignment is given.  Alignments
+  // smaller than a page also round the allocation to the alignment rather
+  // than a page, so small arrays take less memory.
+  if(align == 0) {
+    self->align = self->page_size;
+  } else if(huge != HUGE_NONE) {
+    if(align > self->page_size) {
+      PyErr_SetString(PyExc_ValueError,
+          "align must not be larger than a huge page");
+      return -1;
+    }
+    self->align = self->page_size;
+  } else {
+    self->align = align < (Py_ssize_t)sizeof(void*) ? (Py_ssize_t)sizeof(void*) : align;
+  }
+
 
   // Check the type of init:
   // None means no data to initialize
@@ -208,18 +388,30 @@ ExtArray_init(ExtArray* self, PyObject* args, PyObject* kwds)
   // sequence means copy the sequence elements into the array
   if(init == Py_None) {
     self->data_len = 0;
-  } else if(PyInt_Check(init)) {
-    self->data_len = PyInt_AsLong(init);
-    alloc(self, self->data_len);
-  } else if(PyLong_Check(init)) {
-    self->data_len = PyLong_AsLong(init);
-    alloc(self, self->data_len);
+  } else if(PyInt_Check(init) || PyLong_Check(init)) {
+    length = PyInt_AsSsize_t(init);
+    if(length == -1 && PyErr_Occurred()) {
+      return -1;
+    }
+
+    if(length < 0) {
+      PyErr_SetString(PyExc_ValueError, "Array length must not be negative");
+      return -1;
+    }
+
+    if(alloc(self, length) == -1) {
+      return -1;
+    }
+    self->data_len = length;
   } else if(PySequence_Check(init)) {
     PyObject* item;
     int i;
 
-    self->data_len = PySequence_Size(init);
-    alloc(self, self->data_len);
+    length = PySequence_Size(init);
+    if(length == -1 || alloc(self, length) == -1) {
+      return -1;
+    }
+    self->data_len = length;
 
     for(i = 0; i < self->data_len; i++) {
       item = PySequence_ITEM(init, i);
@@ -251,6 +443,14 @@ ExtArray_dealloc(ExtArray* self)
     Py_DECREF(self->arr_ref);
   }
 
+  if(self->view.obj != NULL) {
+    PyBuffer_Release(&self->view);
+  }
+
+  if(self->map_addr != NULL) {
+    munmap(self->map_addr, self->map_len);
+  }
+
   self->ob_type->tp_free((PyObject*)self);
 }
 
@@ -273,15 +473,34 @@ static PyObject* ExtArray_alloc(ExtArray* self, PyObject* arg)
 }
 
 
+//Allocate memory for at least length elements, so the array can grow to
+// that length without reallocating
+static PyObject* ExtArray_reserve(ExtArray* self, PyObject* arg)
+{
+  Py_ssize_t length = PyInt_AsSsize_t(arg);
+
+  if(length == -1 && PyErr_Occurred()) {
+    return NULL;
+  }
+
+  if(length * self->itemsize > self->alloc_len && alloc(self, length) == -1) {
+    return NULL;
+  }
+
+  Py_RETURN_NONE;
+}
+
+
 //Append a value to the array
 static PyObject* ExtArray_append(ExtArray* self, PyObject* val)
 {
-  self->data_len++;
-  if(alloc(self, self->data_len) == -1) {
+  if(grow(self, self->data_len + 1) == -1) {
     return NULL;
   }
+  self->data_len++;
 
   if(ExtArray_setitem((PyObject*)self, self->data_len - 1, val) == -1) {
+    self->data_len--;
     return NULL;
   }
 
@@ -309,6 +528,10 @@ static PyObject* ExtArray_byteswap(ExtArray* self, PyObject* args)
 {
   Py_ssize_t i;
 
+  if(check_writable(self) == -1) {
+    return NULL;
+  }
+
   //TODO - x86 has a bswap instruction, could use it :)
   switch(self->itemsize) {
   case 2:
@@ -382,6 +605,10 @@ static PyObject* ExtArray_change_type(ExtArray* self, PyObject* arg)
 //Quickly clear the array data to zero
 static PyObject* ExtArray_clear(ExtArray* self, PyObject* args)
 {
+  if(check_writable(self) == -1) {
+    return NULL;
+  }
+
   memset(self->memory, 0, self->alloc_len);
   Py_INCREF(Py_None);
   return Py_None;
@@ -398,9 +625,15 @@ static PyObject* ExtArray_copy_direct(ExtArray* self, PyObject* arg)
     return NULL;
   }
 
+  if(check_writable(self) == -1) {
+    return NULL;
+  }
+
   //TODO - what if this doesn't divide evenly?
+  if(alloc(self, len / self->itemsize) == -1) {
+    return NULL;
+  }
   self->data_len = len / self->itemsize;
-  alloc(self, self->data_len);
 
   memcpy(self->memory, buf, len);
   Py_INCREF(Py_None);
@@ -408,27 +641,138 @@ static PyObject* ExtArray_copy_direct(ExtArray* self, PyObject* arg)
 }
 
 
-//Extend the array with the contents of another iterable object
+//Copy the elements of obj to the end of the array if obj is a contiguous
+// buffer (extarray, array.array, string, NumPy array...) with the same
+// element type as the array.  Returns 1 if the elements were copied, 0 if
+// obj is not such a buffer, and -1 on errors.
+static int extend_buffer(ExtArray* self, PyObject* obj)
+{
+  Py_buffer view;
+  Py_ssize_t n;
+  Py_ssize_t old_len;
+  char* src;
+  char* old;
+  char typecode;
+
+  if(obj == (PyObject*)self) {
+    n = self->data_len;
+    if(grow(self, self->data_len + n) == -1) {
+      return -1;
+    }
+
+    memcpy((char*)self->memory + n * self->itemsize, self->memory,
+        n * self->itemsize);
+    self->data_len += n;
+    return 1;
+  }
+
+  if(PyObject_CheckBuffer(obj)) {
+    if(PyObject_GetBuffer(obj, &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == -1) {
+      PyErr_Clear();
+      return 0;
+    }
+
+    typecode = 'B';
+    if(view.format != NULL) {
+      typecode = format_typecode(view.format);
+    }
+  } else if(PyObject_CheckReadBuffer(obj) &&
+      PyObject_HasAttrString(obj, "typecode")) {
+    //Old-style buffer with a typecode, such as array.array
+    PyObject* tc = PyObject_GetAttrString(obj, "typecode");
+    const void* buf;
+    Py_ssize_t len;
+
+    if(tc == NULL || !PyString_Check(tc) || PyString_Size(tc) != 1 ||
+        PyObject_AsReadBuffer(obj, &buf, &len) == -1) {
+      Py_XDECREF(tc);
+      PyErr_Clear();
+      return 0;
+    }
+
+    typecode = PyString_AsString(tc)[0];
+    Py_DECREF(tc);
+    PyBuffer_FillInfo(&view, obj, (void*)buf, len, 1, PyBUF_SIMPLE);
+  } else {
+    return 0;
+  }
+
+  //'c' and 'b' are both signed chars
+  if(typecode == 'c') {
+    typecode = 'b';
+  }
+
+  if(typecode != (self->typecode == 'c' ? 'b' : self->typecode) ||
+      view.len % self->itemsize != 0) {
+    PyBuffer_Release(&view);
+    return 0;
+  }
+
+  //The source may be part of this array's memory (a slice, for example),
+  // in which case it moves with the memory.
+  n = view.len / self->itemsize;
+  src = (char*)view.buf;
+  old = (char*)self->memory;
+  old_len = self->alloc_len;
+  if(grow(self, self->data_len + n) == -1) {
+    PyBuffer_Release(&view);
+    return -1;
+  }
+
+  if(old != NULL && src >= old && src < old + old_len) {
+    src = (char*)self->memory + (src - old);
+  }
+
+  memmove((char*)self->memory + self->data_len * self->itemsize, src, view.len);
+  self->data_len += n;
+  PyBuffer_Release(&view);
+  return 1;
+}
+
+
+//Extend the array with the contents of another iterable object.  Buffers
+// with the same element type are copied directly.
 static PyObject* ExtArray_extend(ExtArray* self, PyObject* arg)
 {
   Py_ssize_t data_len = self->data_len;
   Py_ssize_t alloc_len = self->alloc_len;
-  PyObject* iter = PyObject_GetIter(arg);
+  Py_ssize_t hint;
+  PyObject* iter;
   PyObject* item;
 
+  switch(extend_buffer(self, arg)) {
+  case 1:
+    Py_RETURN_NONE;
+  case -1:
+    return NULL;
+  }
+
+  iter = PyObject_GetIter(arg);
   if(iter == NULL) {
     return NULL;
   }
 
-  while((item = PyIter_Next(iter)) != NULL) {
-    alloc(self, self->data_len + 1);
+  //Allocate for all the items at once if the number is known
+  hint = _PyObject_LengthHint(arg, 0);
+  if(hint < 0) {
+    PyErr_Clear();
+  } else if(hint > 0 && grow(self, self->data_len + hint) == -1) {
+    Py_DECREF(iter);
+    return NULL;
+  }
 
-    if(ExtArray_setitem((PyObject*)self, self->data_len, item) == -1) {
+  while((item = PyIter_Next(iter)) != NULL) {
+    if(grow(self, self->data_len + 1) == -1 ||
+        ExtArray_setitem((PyObject*)self, self->data_len, item) == -1) {
       if(alloc_len < self->alloc_len) {
-        self->memory = self->realloc(self->memory, self->alloc_len, alloc_len);
-        self->alloc_len = alloc_len;
-        self->data_len = data_len;
+        void* memory = self->realloc(self->memory, self->alloc_len, alloc_len, self->align);
+
+        if(memory != NULL) {
+          self->memory = memory;
+          self->alloc_len = alloc_len;
+        }
       }
+      self->data_len = data_len;
 
       Py_DECREF(item);
       Py_DECREF(iter);
@@ -440,29 +784,52 @@ static PyObject* ExtArray_extend(ExtArray* self, PyObject* arg)
   }
 
   Py_DECREF(iter);
+  if(PyErr_Occurred()) {
+    return NULL;
+  }
+
   Py_INCREF(Py_None);
   return Py_None;
 }
 
 
-//Extend the array with data from another list
+//Extend the array with data from another list, or a buffer with the same
+// element type
 static PyObject* ExtArray_fromlist(ExtArray* self, PyObject* list)
 {
   Py_ssize_t data_len = self->data_len;
   Py_ssize_t alloc_len = self->alloc_len;
-  Py_ssize_t len = PyList_Size(list);
+  Py_ssize_t len;
   Py_ssize_t i;
 
-  alloc(self, self->data_len + len);
+  switch(extend_buffer(self, list)) {
+  case 1:
+    Py_RETURN_NONE;
+  case -1:
+    return NULL;
+  }
+
+  len = PyList_Size(list);
+  if(len == -1) {
+    return NULL;
+  }
+
+  if(grow(self, self->data_len + len) == -1) {
+    return NULL;
+  }
 
   for(i = 0; i < len; i++) {
     if(ExtArray_setitem((PyObject*)self,
         self->data_len, PyList_GET_ITEM(list, i)) == -1) {
       if(alloc_len < self->alloc_len) {
-        self->memory = self->realloc(self->memory, self->alloc_len, alloc_len);
-        self->alloc_len = alloc_len;
-        self->data_len = data_len;
+        void* memory = self->realloc(self->memory, self->alloc_len, alloc_len, self->align);
+
+        if(memory != NULL) {
+          self->memory = memory;
+          self->alloc_len = alloc_len;
+        }
       }
+      self->data_len = data_len;
 
       return NULL;
     }
@@ -526,7 +893,9 @@ static PyObject* ExtArray_set_length(ExtArray* self, PyObject* arg)
   length = PyLong_AsLong(arg);
 
   //Allocate more memory for the length, if needed.
-  alloc(self, length);
+  if(alloc(self, length) == -1) {
+    return NULL;
+  }
 
   self->data_len = length;
   Py_RETURN_NONE;
@@ -552,12 +921,20 @@ static PyObject* ExtArray_set_memory(ExtArray* self, PyObject* arg)
     return NULL;
   }
 
+  if(self->exports > 0) {
+    PyErr_SetString(PyExc_BufferError,
+        "Attempt to replace the memory of an array with exported buffers");
+    return NULL;
+  }
+
   //Free memory if needed
   if(self->memory != NULL && self->lock != 1) {
     self->free(self->memory);
   }
 
   self->memory = (void*)addr;
+  self->align = address_align(self->memory, self->page_size);
+  self->readonly = 0;
   //self->memory = (void*)PyLong_AsUnsignedLong(arg);
   self->alloc_len = len;
   self->data_len = len / self->itemsize;
@@ -567,7 +944,319 @@ static PyObject* ExtArray_set_memory(ExtArray* self, PyObject* arg)
 }
 
 
-//Execute an architecture-specific memory fence/synchronization
+//Create an array using the memory of another object supporting the buffer
+// interface (a NumPy array, memoryview, string, array.array, extarray...),
+// without copying.  The object is kept alive as long as the array is, and
+// the array memory is locked.  The typecode defaults to the type of the
+// buffer elements if they have one (the typecode attribute of old-style
+// buffers such as array.array), 'B' otherwise.
+//Objects with only the old-style buffer interface (array.array in
+// particular) cannot be stopped from resizing their memory.  Such an
+// object must not be resized while an array wraps it: growing an
+// array.array can free the memory the array is using.
+static PyObject* ExtArray_frombuffer(PyTypeObject* type, PyObject* args, PyObject* kwds)
+{
+  //Python-level classmethod:
+  //def frombuffer(cls, obj, typecode = None):
+  static char* kwlist[] = {"obj", "typecode", NULL};
+  PyObject* obj;
+  PyObject* tc = Py_None;
+  ExtArray* self;
+  char typecode = 0;
+
+  if(!PyArg_ParseTupleAndKeywords(args, kwds, "O|O",
+      kwlist, &obj, &tc)) {
+    return NULL;
+  }
+
+  if(tc != Py_None) {
+    if(!PyString_Check(tc) || PyString_Size(tc) != 1) {
+      PyErr_SetString(PyExc_TypeError, "typecode must be a single character");
+      return NULL;
+    }
+
+    typecode = PyString_AsString(tc)[0];
+  }
+
+  self = (ExtArray*)type->tp_alloc(type, 0);
+  if(self == NULL) {
+    return NULL;
+  }
+
+  if(PyObject_CheckBuffer(obj)) {
+    //New-style buffer; the memory must be contiguous
+    if(PyObject_GetBuffer(obj, &self->view,
+        PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | PyBUF_WRITABLE) == -1) {
+      PyErr_Clear();
+      if(PyObject_GetBuffer(obj, &self->view,
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == -1) {
+        Py_DECREF(self);
+        return NULL;
+      }
+    }
+  } else {
+    //Old-style buffer
+    void* buf;
+    Py_ssize_t len;
+    int readonly = 0;
+
+    if(PyObject_AsWriteBuffer(obj, &buf, &len) == -1) {
+      PyErr_Clear();
+      readonly = 1;
+      if(PyObject_AsReadBuffer(obj, (const void**)&buf, &len) == -1) {
+        Py_DECREF(self);
+        return NULL;
+      }
+    }
+
+    PyBuffer_FillInfo(&self->view, obj, buf, len, readonly, PyBUF_SIMPLE);
+
+    if(typecode == 0 && PyObject_HasAttrString(obj, "typecode")) {
+      //Old-style buffer with a typecode, such as array.array
+      PyObject* otc = PyObject_GetAttrString(obj, "typecode");
+
+      if(otc != NULL && PyString_Check(otc) && PyString_Size(otc) == 1) {
+        typecode = PyString_AsString(otc)[0];
+      }
+
+      Py_XDECREF(otc);
+      PyErr_Clear();
+    }
+  }
+
+  if(typecode == 0) {
+    if(self->view.format == NULL) {
+      typecode = 'B';
+    } else {
+      typecode = format_typecode(self->view.format);
+      if(typecode == 0) {
+        PyErr_Format(PyExc_TypeError,
+            "Buffer format '%s' has no array type", self->view.format);
+        Py_DECREF(self);
+        return NULL;
+      }
+    }
+  }
+
+  if(set_type(self, typecode) != 0) {
+    Py_DECREF(self);
+    return NULL;
+  }
+
+  if(self->view.len % self->itemsize != 0) {
+    PyErr_SetString(PyExc_TypeError,
+        "Buffer length is not a multiple of array type");
+    Py_DECREF(self);
+    return NULL;
+  }
+
+  self->huge = HUGE_NONE;
+  self->lock = 1;
+  self->readonly = self->view.readonly ? 1 : 0;
+  self->page_size = get_page_size();
+  self->realloc = realloc_mem;
+  self->free = free_mem;
+
+  self->memory = self->view.buf;
+  self->align = address_align(self->memory, self->page_size);
+  self->alloc_len = self->view.len;
+  self->data_len = self->view.len / self->itemsize;
+  return (PyObject*)self;
+}
+
+
+//Create an array mapping a file, so the file data is used in place rather
+// than read into the array.  file is a file name, file object or file
+// descriptor; offset and length are in bytes, length defaulting to the
+// rest of the file.  The mapping is read-only unless write is True, and
+// writes go to the file if shared is True, otherwise they are private to
+// the array.  populate reads the whole mapping in up front, and advice
+// ('normal', 'sequential', 'random', 'willneed' or 'dontneed') tells the
+// OS how the memory will be accessed.
+static PyObject* ExtArray_frommap(PyTypeObject* type, PyObject* args, PyObject* kwds)
+{
+  //Python-level classmethod:
+  //def frommap(cls, file, typecode = 'B', offset = 0, length = None,
+  //            write = False, shared = True, populate = False,
+  //            advice = None):
+  static char* kwlist[] = {"file", "typecode", "offset", "length", "write",
+      "shared", "populate", "advice", NULL};
+  PyObject* file;
+  char typecode = 'B';
+  Py_ssize_t offset = 0;
+  PyObject* length_obj = Py_None;
+  unsigned char write = 0;
+  unsigned char shared = 1;
+  unsigned char populate = 0;
+  char* advice = NULL;
+
+  ExtArray* self;
+  struct stat st;
+  Py_ssize_t length;
+  Py_ssize_t page_off;
+  int fd;
+  int own_fd = 0;
+  int prot;
+  int flags;
+  void* addr;
+
+  if(!PyArg_ParseTupleAndKeywords(args, kwds, "O|cnObbbz",
+      kwlist, &file, &typecode, &offset, &length_obj,
+      &write, &shared, &populate, &advice)) {
+    return NULL;
+  }
+
+  if(offset < 0) {
+    PyErr_SetString(PyExc_ValueError, "offset must not be negative");
+    return NULL;
+  }
+
+  if(PyString_Check(file)) {
+    fd = open(PyString_AsString(file), write ? O_RDWR : O_RDONLY);
+    if(fd == -1) {
+      return PyErr_SetFromErrnoWithFilenameObject(PyExc_IOError, file);
+    }
+    own_fd = 1;
+  } else {
+    fd = PyObject_AsFileDescriptor(file);
+    if(fd == -1) {
+      return NULL;
+    }
+  }
+
+  if(fstat(fd, &st) == -1) {
+    PyErr_SetFromErrno(PyExc_OSError);
+    goto fail;
+  }
+
+  if(length_obj == Py_None) {
+    length = st.st_size - offset;
+  } else {
+    length = PyInt_AsSsize_t(length_obj);
+    if(length == -1 && PyErr_Occurred()) {
+      goto fail;
+    }
+  }
+
+  if(length <= 0) {
+    PyErr_SetString(PyExc_ValueError, "Cannot map an empty region of a file");
+    goto fail;
+  }
+
+  //Accessing pages past the end of a file raises SIGBUS
+  if(S_ISREG(st.st_mode) && offset + length > st.st_size) {
+    PyErr_SetString(PyExc_ValueError, "Mapped region extends past the end of the file");
+    goto fail;
+  }
+
+  self = (ExtArray*)type->tp_alloc(type, 0);
+  if(self == NULL) {
+    goto fail;
+  }
+
+  if(set_type(self, typecode) != 0) {
+    Py_DECREF(self);
+    goto fail;
+  }
+
+  if(length % self->itemsize != 0) {
+    PyErr_SetString(PyExc_TypeError,
+        "Mapped length is not a multiple of array type");
+    Py_DECREF(self);
+    goto fail;
+  }
+
+  //mmap needs a page-aligned offset
+  self->page_size = get_page_size();
+  page_off = offset % self->page_size;
+
+  prot = PROT_READ;
+  if(write) {
+    prot |= PROT_WRITE;
+  }
+
+  flags = shared ? MAP_SHARED : MAP_PRIVATE;
+#ifdef MAP_POPULATE
+  if(populate) {
+    flags |= MAP_POPULATE;
+  }
+#endif
+
+  addr = mmap(NULL, length + page_off, prot, flags, fd, offset - page_off);
+  if(addr == MAP_FAILED) {
+    PyErr_SetFromErrno(PyExc_OSError);
+    Py_DECREF(self);
+    goto fail;
+  }
+
+  self->map_addr = addr;
+  self->map_len = length + page_off;
+  self->map_sync = write && shared;
+
+  if(advice != NULL) {
+    int adv;
+
+    if(strcmp(advice, "normal") == 0) {
+      adv = MADV_NORMAL;
+    } else if(strcmp(advice, "sequential") == 0) {
+      adv = MADV_SEQUENTIAL;
+    } else if(strcmp(advice, "random") == 0) {
+      adv = MADV_RANDOM;
+    } else if(strcmp(advice, "willneed") == 0) {
+      adv = MADV_WILLNEED;
+    } else if(strcmp(advice, "dontneed") == 0) {
+      adv = MADV_DONTNEED;
+    } else {
+      PyErr_Format(PyExc_ValueError, "Unknown advice '%s'", advice);
+      Py_DECREF(self);
+      goto fail;
+    }
+
+    if(madvise(addr, self->map_len, adv) == -1) {
+      PyErr_SetFromErrno(PyExc_OSError);
+      Py_DECREF(self);
+      goto fail;
+    }
+  }
+
+#ifndef MAP_POPULATE
+  //Touch each page to read it in
+  if(populate) {
+    volatile char* p;
+
+    for(p = (char*)addr; p < (char*)addr + self->map_len; p += self->page_size) {
+      (void)*p;
+    }
+  }
+#endif
+
+  //The mapping stays valid after the file is closed
+  if(own_fd) {
+    close(fd);
+  }
+
+  self->huge = HUGE_NONE;
+  self->lock = 1;
+  self->readonly = write ? 0 : 1;
+  self->realloc = realloc_mem;
+  self->free = free_mem;
+
+  self->memory = (char*)addr + page_off;
+  self->align = address_align(self->memory, self->page_size);
+  self->alloc_len = length;
+  self->data_len = length / self->itemsize;
+  return (PyObject*)self;
+
+fail:
+  if(own_fd) {
+    close(fd);
+  }
+  return NULL;
+}
+
+
+//Execute an architecture-specific memory fence/synchronization.  For arrays
+// mapping a file for writing, also write the modified data to the file.
 static PyObject* ExtArray_synchronize(ExtArray* self, PyObject* arg)
 {
 // TODO - other architectures
@@ -579,6 +1268,17 @@ static PyObject* ExtArray_synchronize(ExtArray* self, PyObject* arg)
 #endif
 #endif
 
+  //Slices use the mapping of the array they were taken from
+  while(self->arr_ref != NULL) {
+    self = self->arr_ref;
+  }
+
+  if(self->map_addr != NULL && self->map_sync == 1) {
+    if(msync(self->map_addr, self->map_len, MS_SYNC) == -1) {
+      return PyErr_SetFromErrno(PyExc_OSError);
+    }
+  }
+
   Py_INCREF(Py_None);
   return Py_None;
 }
@@ -675,6 +1375,10 @@ static int ExtArray_setitem(PyObject* self, Py_ssize_t ind, PyObject* val)
 {
   ExtArray* na = (ExtArray*)self;
 
+  if(check_writable(na) == -1) {
+    return -1;
+  }
+
   switch(na->typecode) {
   case 'c':
   case 'b':
@@ -777,6 +1481,7 @@ static PyObject* ExtArray_getslice(PyObject *self, Py_ssize_t i1, Py_ssize_t i2)
 
   //Create a new object using this array's memory backing it, and memory locked
   new_arr = PyObject_New(ExtArray, &ExtArrayType);
+  new_arr->attr_dict = NULL;
 
   new_arr->typecode = arr->typecode;
   new_arr->itemsize = arr->itemsize;
@@ -789,15 +1494,24 @@ static PyObject* ExtArray_getslice(PyObject *self, Py_ssize_t i1, Py_ssize_t i2)
   new_arr->page_size = arr->page_size;
 
   new_arr->lock = 1;
+  new_arr->readonly = arr->readonly;
+  new_arr->exports = 0;
   new_arr->alloc_len = 0;
+  new_arr->view.obj = NULL;
+  new_arr->map_addr = NULL;
 
   if(i2 <= i1) {
     //Return an empty array
     new_arr->memory = NULL;
     new_arr->data_len = 0;
+    new_arr->align = arr->align;
   } else {
     new_arr->memory = (char*)arr->memory + i1 * arr->itemsize;
     new_arr->data_len = i2 - i1;
+
+    //The slice is aligned to the largest power of 2 dividing both the
+    // array's alignment and the slice's offset into it
+    new_arr->align = address_align((void*)(i1 * arr->itemsize), arr->align);
   }
 
   new_arr->arr_ref = arr;
@@ -846,11 +1560,214 @@ static int ExtArray_setslice(PyObject *self, Py_ssize_t i1, Py_ssize_t i2, PyObj
 }
 
 
+//Buffer interface support.  The new-style interface describes the element
+// type and shape, and the array memory is not reallocated while buffers
+// obtained through it exist.  Old-style buffers only provide the address
+// and length in bytes, and are not tracked.
+
+//Return the struct module format string for the array type
+static char* ExtArray_format(ExtArray* self)
+{
+  switch(self->typecode) {
+  case 'c':
+  case 'b':
+    return "b";
+  case 'B':
+    return "B";
+  case 'h':
+    return "h";
+  case 'H':
+    return "H";
+  case 'i':
+    return "i";
+  case 'I':
+    return "I";
+  case 'l':
+    return "l";
+  case 'L':
+    return "L";
+  case 'f':
+    return "f";
+  case 'd':
+    return "d";
+  }
+
+  return "B";
+}
+
+
+static Py_ssize_t ExtArray_readbuffer(PyObject* self, Py_ssize_t seg, void** ptr)
+{
+  ExtArray* arr = (ExtArray*)self;
+
+  if(seg != 0) {
+    PyErr_SetString(PyExc_SystemError, "Accessing non-existent array segment");
+    return -1;
+  }
+
+  *ptr = arr->memory;
+  return arr->data_len * arr->itemsize;
+}
+
+
+static Py_ssize_t ExtArray_writebuffer(PyObject* self, Py_ssize_t seg, void** ptr)
+{
+  if(check_writable((ExtArray*)self) == -1) {
+    return -1;
+  }
+
+  return ExtArray_readbuffer(self, seg, ptr);
+}
+
+
+static Py_ssize_t ExtArray_segcount(PyObject* self, Py_ssize_t* len)
+{
+  ExtArray* arr = (ExtArray*)self;
+
+  if(len != NULL) {
+    *len = arr->data_len * arr->itemsize;
+  }
+
+  return 1;
+}
+
+
+static int ExtArray_getbuffer(PyObject* self, Py_buffer* view, int flags)
+{
+  ExtArray* arr = (ExtArray*)self;
+
+  if((flags & PyBUF_WRITABLE) == PyBUF_WRITABLE && arr->readonly == 1) {
+    PyErr_SetString(PyExc_BufferError, "Array memory is read-only");
+    view->obj = NULL;
+    return -1;
+  }
+
+  view->buf = arr->memory;
+  view->obj = self;
+  Py_INCREF(self);
+
+  view->len = arr->data_len * arr->itemsize;
+  view->itemsize = arr->itemsize;
+  view->readonly = arr->readonly;
+  view->format = NULL;
+  if((flags & PyBUF_FORMAT) == PyBUF_FORMAT) {
+    view->format = ExtArray_format(arr);
+  }
+
+  //Shape and strides are kept in the buffer, so they stay valid if the
+  // array length is changed.
+  view->ndim = 1;
+  view->smalltable[0] = arr->data_len;
+  view->smalltable[1] = arr->itemsize;
+  view->shape = NULL;
+  if((flags & PyBUF_ND) == PyBUF_ND) {
+    view->shape = &view->smalltable[0];
+  }
+  view->strides = NULL;
+  if((flags & PyBUF_STRIDES) == PyBUF_STRIDES) {
+    view->strides = &view->smalltable[1];
+  }
+  view->suboffsets = NULL;
+  view->internal = NULL;
+
+  arr->exports++;
+  return 0;
+}
+
+
+static void ExtArray_releasebuffer(PyObject* self, Py_buffer* view)
+{
+  ((ExtArray*)self)->exports--;
+}
+
+
+static PyBufferProcs ExtArray_bufferprocs = {
+  ExtArray_readbuffer,
+  ExtArray_writebuffer,
+  ExtArray_segcount,
+  (charbufferproc)ExtArray_readbuffer,
+  ExtArray_getbuffer,
+  ExtArray_releasebuffer
+};
+
+
+//NumPy array interface (version 3), allowing NumPy arrays to be created
+// using the array memory:  numpy.asarray(arr)
+static PyObject* ExtArray_get_array_interface(ExtArray* self, void* closure)
+{
+  char typestr[4];
+  char kind;
+
+  switch(self->typecode) {
+  case 'f':
+  case 'd':
+    kind = 'f';
+    break;
+  case 'B':
+  case 'H':
+  case 'I':
+  case 'L':
+    kind = 'u';
+    break;
+  default:
+    kind = 'i';
+  }
+
+#ifdef WORDS_BIGENDIAN
+  typestr[0] = '>';
+#else
+  typestr[0] = '<';
+#endif
+  if(self->itemsize == 1) {
+    typestr[0] = '|';
+  }
+  typestr[1] = kind;
+  typestr[2] = '0' + self->itemsize;
+  typestr[3] = '\0';
+
+  return Py_BuildValue("{s:i,s:s,s:(n),s:(i),s:(N,O)}",
+      "version", 3,
+      "typestr", typestr,
+      "shape", self->data_len,
+      "strides", self->itemsize,
+      "data", PyLong_FromVoidPtr(self->memory),
+          self->readonly ? Py_True : Py_False);
+}
+
+
+//Object whose memory the array uses, if any: the array this one is a slice
+// of, or the object passed to frombuffer.
+static PyObject* ExtArray_get_base(ExtArray* self, void* closure)
+{
+  PyObject* base = Py_None;
+
+  if(self->arr_ref != NULL) {
+    base = (PyObject*)self->arr_ref;
+  } else if(self->view.obj != NULL) {
+    base = self->view.obj;
+  }
+
+  Py_INCREF(base);
+  return base;
+}
+
+
+static PyGetSetDef ExtArray_getset[] = {
+  {"__array_interface__", (getter)ExtArray_get_array_interface, NULL, "NumPy array interface", NULL},
+  {"base", (getter)ExtArray_get_base, NULL, "base", NULL},
+  {NULL}
+};
+
+
 static PyMemberDef ExtArray_members[] = {
   {"typecode", T_CHAR, offsetof(ExtArray, typecode), 0, "typecode"},
   {"itemsize", T_INT, offsetof(ExtArray, itemsize), 0, "itemsize"},
   {"data_len", T_INT, offsetof(ExtArray, data_len), 0, "data_len"},
+  {"alloc_len", T_PYSSIZET, offsetof(ExtArray, alloc_len), READONLY, "alloc_len"},
+  {"align", T_PYSSIZET, offsetof(ExtArray, align), READONLY, "align"},
+  {"huge", T_UBYTE, offsetof(ExtArray, huge), READONLY, "huge"},
   {"memory", T_ULONG, offsetof(ExtArray, memory), 0, "memory"},
+  {"readonly", T_BOOL, offsetof(ExtArray, readonly), READONLY, "readonly"},
   {NULL}
 };
 
@@ -864,10 +1781,13 @@ static PyMethodDef ExtArray_methods[] = {
   {"clear", (PyCFunction)ExtArray_clear, METH_VARARGS, "clear"},
   {"extend", (PyCFunction)ExtArray_extend, METH_O, "extend"},
   {"copy_direct", (PyCFunction)ExtArray_copy_direct, METH_O, "copy_direct"},
+  {"frombuffer", (PyCFunction)ExtArray_frombuffer, METH_VARARGS | METH_KEYWORDS | METH_CLASS, "frombuffer"},
   {"fromlist", (PyCFunction)ExtArray_fromlist, METH_O, "fromlist"},
+  {"frommap", (PyCFunction)ExtArray_frommap, METH_VARARGS | METH_KEYWORDS | METH_CLASS, "frommap"},
   {"fromstring", (PyCFunction)ExtArray_fromstring, METH_O, "fromstring"},
   {"make_executable", (PyCFunction)ExtArray_make_executable, METH_NOARGS, "make_executable"},
   {"memory_lock", (PyCFunction)ExtArray_memory_lock, METH_O, "memory_lock"},
+  {"reserve", (PyCFunction)ExtArray_reserve, METH_O, "reserve"},
   {"set_length", (PyCFunction)ExtArray_set_length, METH_O, "set_length"},
   {"set_memory", (PyCFunction)ExtArray_set_memory, METH_VARARGS, "set_memory"},
   {"synchronize", (PyCFunction)ExtArray_synchronize, METH_NOARGS, "synchronize"},
@@ -910,8 +1830,8 @@ static PyTypeObject ExtArrayType = {
   ExtArray_str,                   /*tp_str*/
   PyObject_GenericGetAttr,        /*tp_getattro*/
   PyObject_GenericSetAttr,        /*tp_setattro*/
-  0,                              /*tp_as_buffer*/
-  Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE, /*tp_flags*/
+  &ExtArray_bufferprocs,          /*tp_as_buffer*/
+  Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE|Py_TPFLAGS_HAVE_NEWBUFFER, /*tp_flags*/
   "ExtArray",                     /*tp_doc */
   0,                              /* tp_traverse */
   0,                              /* tp_clear */
@@ -921,8 +1841,7 @@ static PyTypeObject ExtArrayType = {
   ExtArray_iternext,              /* tp_iternext */
   ExtArray_methods,               /* tp_methods */
   ExtArray_members,               /* tp_members */
-  //ExtArray_getset,                /* tp_getset */
-  0,
+  ExtArray_getset,                /* tp_getset */
   0,                              /* tp_base */
   0,                              /* tp_dict */
   0,                              /* tp_descr_get */
@@ -933,7 +1852,28 @@ static PyTypeObject ExtArrayType = {
   0, /*(ExtArray_new,*/           /* tp_new */
 };
 
+static PyObject* extarray_hugepage_size(PyObject* self, PyObject* args)
+{
+  return PyInt_FromLong(get_hugepage_size());
+}
+
+
+static PyObject* extarray_has_huge_pages(PyObject* self, PyObject* args)
+{
+  return PyBool_FromLong(has_huge_pages());
+}
+
+
+static PyObject* extarray_has_thp(PyObject* self, PyObject* args)
+{
+  return PyBool_FromLong(has_thp());
+}
+
+
 static PyMethodDef module_methods[] = {
+    {"hugepage_size", (PyCFunction)extarray_hugepage_size, METH_NOARGS, "Huge page size in bytes"},
+    {"has_huge_pages", (PyCFunction)extarray_has_huge_pages, METH_NOARGS, "True if reserved huge pages can be allocated"},
+    {"has_thp", (PyCFunction)extarray_has_thp, METH_NOARGS, "True if transparent huge pages are enabled"},
     {NULL}  /* Sentinel */
 };
 
@@ -0,0 +1,136 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+__doc__ = """
+Peephole optimization of instruction streams.
+
+A Peephole object applies a table of rules to the instructions of every
+stream in a program.  Set it as a program's optimizer, or the optimizer of
+every program of a platform, and cache_code runs it before rendering:
+
+  import corepy.lib.peephole as peephole
+  import corepy.lib.peephole.x86 as x86_rules
+
+  prgm.optimizer = peephole.Peephole(x86_rules.RULES)
+  env.Program.optimizer = peephole.Peephole(x86_rules.RULES)
+
+A rule is a (name, function) pair.  The function is called as
+function(objs, i) with the list of objects in a stream and the index of an
+instruction in it, and returns None if it does not apply there, or a tuple
+(n, replacement) to replace objs[i:i + n] with the list replacement.  Rules
+are tried in table order at each instruction, and the stream is rescanned
+until no rule applies.
+
+The number of times each rule applied is kept in counts.
+"""
+
+import corepy.spre.spe as spe
+
+
+class Peephole(object):
+  def __init__(self, rules = ()):
+    """
+    Create an optimizer applying the rules in the sequence rules.
+    """
+    self.rules = list(rules)
+
+    # Rule name -> number of times applied, and instructions removed
+    self.counts = {}
+    self.removed = 0
+    return
+
+
+  def add_rule(self, name, rule, before = None):
+    """
+    Add a rule function under name, at the end of the table or before the
+    rule named before.
+    """
+    pos = len(self.rules)
+    if before is not None:
+      pos = [n for (n, r) in self.rules].index(before)
+    self.rules.insert(pos, (name, rule))
+    return
+
+  def remove_rule(self, name):
+    """Remove the rule called name from the table"""
+    self.rules = [(n, r) for (n, r) in self.rules if n != name]
+    return
+
+
+  def optimize(self, prgm):
+    """Optimize every stream in a program"""
+    for stream in prgm.objects:
+      if self.optimize_objects(stream.objects):
+        # Don't reuse code cache_code rendered before
+        stream._version += 1
+    return
+
+  def optimize_objects(self, objs):
+    """
+    Apply the rules to a list of instructions, labels and other stream
+    objects, in place.  Returns True if anything changed.
+    """
+    changed = False
+    again = True
+    while again:
+      again = False
+      i = 0
+      while i < len(objs):
+        if not isinstance(objs[i], spe.Instruction):
+          i += 1
+          continue
+
+        for (name, rule) in self.rules:
+          result = rule(objs, i)
+          if result is not None:
+            (n, replacement) = result
+            objs[i:i + n] = replacement
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.removed += n - len(replacement)
+            changed = again = True
+            # The previous instruction may now match a rule
+            i = max(i - 1, 0)
+            break
+        else:
+          i += 1
+    return changed
+
+
+  def report(self):
+    """Return a string listing how often each rule applied"""
+    lines = ["%-24s %d" % (name, self.counts.get(name, 0))
+             for (name, rule) in self.rules]
+    lines.append("%-24s %d" % ("instructions removed", self.removed))
+    return '\n'.join(lines)
+
+  def reset(self):
+    """Clear the counts"""
+    self.counts = {}
+    self.removed = 0
+    return
+
@@ -0,0 +1,357 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+__doc__ = """
+Peephole rules for the x86 and x86_64 instruction sets.
+
+RULES is the default table, in the order rules are tried:
+
+  self_move        mov r, r                        -> (removed)
+  dead_move        mov r, a; mov r, b              -> mov r, b
+  move_back        mov a, b; mov b, a              -> mov a, b
+  identity_op      add/sub/or/xor r, 0, and r, -1,
+                   shifts by 0, lea r, [r]         -> (removed)
+  redundant_test   op r, x; test r, r / cmp r, 0   -> op r, x
+  jump_to_next     jmp/jcc L; L:                   -> L:
+
+Rules that remove or change an instruction setting the flags only apply
+when no instruction that could see the difference reads them: the code
+following it is scanned, through labels and along jumps to labels in the
+same stream, until the flags are overwritten.
+
+On x86_64 a write to a 32 bit register clears the upper half, so the rules
+leave instructions writing 32 bit registers alone.
+"""
+
+import corepy.spre.spe as spe
+import corepy.arch.x86_64.types.registers as regs64
+
+
+# ------------------------------
+# Instruction and operand helpers
+# ------------------------------
+
+def _name(inst):
+  name = inst.__class__.__name__
+  if name.endswith('_'):
+    name = name[:-1]
+  return name
+
+def _ops(inst):
+  return inst._supplied_operands
+
+def _is_reg(op):
+  return isinstance(op, spe.Register)
+
+def _is_mem(op):
+  return hasattr(op, 'data_size') and not _is_reg(op)
+
+def _is_imm(op):
+  return isinstance(op, (int, long)) and not isinstance(op, bool)
+
+
+def _reg_id(reg):
+  """Return a key identifying the physical register reg is part of"""
+  if reg.name in ('ah', 'ch', 'dh', 'bh'):
+    return ('gp', ('ah', 'ch', 'dh', 'bh').index(reg.name))
+  rex = getattr(reg, 'rex', None) or 0
+  cls = reg.__class__.__name__
+  if cls.startswith('GPRegister'):
+    return ('gp', reg.reg + 8 * rex)
+  elif cls in ('XMMRegister', 'YMMRegister'):
+    return ('xmm', reg.reg + 8 * rex)
+  return (cls, reg.reg)
+
+def _same_reg(a, b):
+  return (_is_reg(a) and _is_reg(b) and type(a) is type(b) and
+          a.name == b.name)
+
+def _reads_reg(op, reg):
+  """Return True if operand op uses any part of reg"""
+  rid = _reg_id(reg)
+  if _is_reg(op):
+    return _reg_id(op) == rid
+  elif _is_mem(op):
+    for r in (getattr(op, 'base', None), getattr(op, 'index', None)):
+      if _is_reg(r) and _reg_id(r) == rid:
+        return True
+  return False
+
+def _zero_extends(reg):
+  """Return True if writing reg clears the upper part of its register"""
+  return isinstance(reg, regs64.GPRegister32)
+
+
+def _next_inst(objs, i):
+  """
+  Return the index of the instruction directly after objs[i], or None if
+  something else (e.g. a label) comes first.
+  """
+  if i + 1 < len(objs) and isinstance(objs[i + 1], spe.Instruction):
+    return i + 1
+  return None
+
+
+# ------------------------------
+# Flags
+# ------------------------------
+
+# Instructions that read the flags, besides conditional jumps, set<cc> and
+# cmov<cc>
+_FLAG_READERS = set((
+  'adc', 'sbb', 'rcl', 'rcr', 'pushf', 'pushfd', 'pushfq', 'lahf', 'cmc',
+  'adcx', 'adox', 'into', 'loope', 'loopne', 'loopz', 'loopnz', 'fcmovb',
+  'fcmovbe', 'fcmove', 'fcmovnb', 'fcmovnbe', 'fcmovne', 'fcmovnu', 'fcmovu',
+  'ret'))
+
+# Instructions that overwrite all of the status flags (some undefined)
+_FLAG_WRITERS = set((
+  'add', 'sub', 'cmp', 'test', 'and', 'or', 'xor', 'neg', 'imul', 'mul',
+  'div', 'idiv', 'popcnt', 'lzcnt', 'tzcnt', 'bsf', 'bsr', 'ptest',
+  'vptest', 'comiss', 'comisd', 'ucomiss', 'ucomisd', 'cmpxchg', 'xadd',
+  'andn', 'bextr', 'blsi', 'blsmsk', 'blsr', 'bzhi', 'popf', 'popfq',
+  'call'))
+
+# Conditions that only test ZF, SF and PF
+_ZSP_CONDS = set(('e', 'ne', 'z', 'nz', 's', 'ns', 'p', 'np', 'pe', 'po'))
+
+
+def _condition(name):
+  """Return the condition code of a jcc, setcc or cmovcc, else None"""
+  if name.startswith('cmov'):
+    return name[4:]
+  elif name.startswith('set'):
+    return name[3:]
+  elif name[0] == 'j' and name not in ('jmp', 'jcxz', 'jecxz', 'jrcxz'):
+    return name[1:]
+  return None
+
+
+def _flags_seen_by(objs, i, conds, visited = None):
+  """
+  Return True if every instruction that may read the flags as they are
+  before objs[i] is a jcc, setcc or cmovcc with a condition in conds.
+  With an empty conds, this says the flags are dead at i.
+  """
+  if visited is None:
+    visited = set()
+
+  while i < len(objs):
+    if i in visited:
+      return True
+    visited.add(i)
+
+    obj = objs[i]
+    if not isinstance(obj, spe.Instruction):
+      # Labels and alignment
+      i += 1
+      continue
+
+    name = _name(obj)
+    cond = _condition(name)
+    if cond is not None:
+      if cond not in conds:
+        return False
+    elif name in _FLAG_READERS:
+      return False
+    elif name in _FLAG_WRITERS:
+      return True
+    elif name in ('shl', 'sal', 'shr', 'sar'):
+      # Shifts by a non-zero constant set the flags; by cl maybe not
+      count = _ops(obj)[-1]
+      if _is_imm(count) and count & 0x3F != 0:
+        return True
+
+    if name[0] == 'j' or name.startswith('loop'):
+      target = _ops(obj)[0] if len(_ops(obj)) > 0 else None
+      if not isinstance(target, spe.Label):
+        return False
+      try:
+        t = objs.index(target)
+      except ValueError:
+        return False
+
+      if name == 'jmp':
+        i = t
+        continue
+      if not _flags_seen_by(objs, t, conds, visited):
+        return False
+
+    i += 1
+
+  # Falls off the end of the stream
+  return False
+
+
+# ------------------------------
+# Rules
+# ------------------------------
+
+_MOVES = set(('mov', 'movaps', 'movapd', 'movups', 'movupd', 'movdqa',
+              'movdqu', 'vmovaps', 'vmovapd', 'vmovups', 'vmovupd',
+              'vmovdqa', 'vmovdqu'))
+
+
+def self_move(objs, i):
+  """mov r, r"""
+  inst = objs[i]
+  name = _name(inst)
+  if name not in _MOVES:
+    return None
+
+  ops = _ops(inst)
+  if len(ops) != 2 or not _same_reg(ops[0], ops[1]) or _zero_extends(ops[0]):
+    return None
+  # VEX moves of XMM registers clear the upper half of the YMM register
+  if name[0] == 'v' and isinstance(ops[0], regs64.XMMRegister):
+    return None
+  return (1, [])
+
+
+def dead_move(objs, i):
+  """mov r, a; mov r, b where b does not use r"""
+  first = objs[i]
+  if _name(first) != 'mov':
+    return None
+  j = _next_inst(objs, i)
+  if j is None or _name(objs[j]) != 'mov':
+    return None
+
+  (dst, src) = _ops(first)
+  (dst2, src2) = _ops(objs[j])
+  if not _is_reg(dst) or not _same_reg(dst, dst2) or _reads_reg(src2, dst):
+    return None
+  return (1, [])
+
+
+def move_back(objs, i):
+  """mov a, b; mov b, a"""
+  first = objs[i]
+  if _name(first) != 'mov':
+    return None
+  j = _next_inst(objs, i)
+  if j is None or _name(objs[j]) != 'mov':
+    return None
+
+  (a, b) = _ops(first)
+  (b2, a2) = _ops(objs[j])
+  if (not _same_reg(a, a2) or not _same_reg(b, b2) or
+      _zero_extends(a) or _zero_extends(b)):
+    return None
+  return (2, [first])
+
+
+def identity_op(objs, i):
+  """add/sub/or/xor r, 0; and r, -1; shifts by 0; lea r, [r]"""
+  inst = objs[i]
+  name = _name(inst)
+  ops = _ops(inst)
+  if len(ops) != 2 or not _is_reg(ops[0]) or _zero_extends(ops[0]):
+    return None
+  (dst, src) = ops
+
+  if name == 'lea':
+    if (_is_mem(src) and _same_reg(getattr(src, 'base', None), dst) and
+        getattr(src, 'index', None) is None and not src.disp):
+      return (1, [])
+    return None
+
+  if not _is_imm(src):
+    return None
+
+  if name in ('shl', 'sal', 'shr', 'sar', 'rol', 'ror') and src & 0x3F == 0:
+    # The flags are not changed by a zero count
+    return (1, [])
+
+  if ((name in ('add', 'sub', 'or', 'xor') and src == 0) or
+      (name == 'and' and src == -1)):
+    if _flags_seen_by(objs, i + 1, ()):
+      return (1, [])
+  return None
+
+
+# Instructions whose flags describe their result register as test r, r does
+_LOGIC_OPS = set(('and', 'or', 'xor'))
+_ARITH_OPS = set(('add', 'sub', 'adc', 'sbb', 'inc', 'dec', 'neg'))
+
+
+def redundant_test(objs, i):
+  """op r, x; test r, r or cmp r, 0"""
+  inst = objs[i]
+  name = _name(inst)
+  if name not in _LOGIC_OPS and name not in _ARITH_OPS:
+    return None
+  ops = _ops(inst)
+  if len(ops) == 0 or not _is_reg(ops[0]):
+    return None
+  reg = ops[0]
+
+  j = _next_inst(objs, i)
+  if j is None:
+    return None
+  test = objs[j]
+  tname = _name(test)
+  tops = _ops(test)
+  if not ((tname == 'test' and len(tops) == 2 and _same_reg(tops[0], reg) and
+           _same_reg(tops[1], reg)) or
+          (tname == 'cmp' and len(tops) == 2 and _same_reg(tops[0], reg) and
+           _is_imm(tops[1]) and tops[1] == 0)):
+    return None
+
+  # Logic ops clear CF and OF like test does.  The others set CF and OF
+  # from the operation, so only tests of ZF, SF and PF may follow.
+  if name in _ARITH_OPS and not _flags_seen_by(objs, j + 1, _ZSP_CONDS):
+    return None
+  return (2, [inst])
+
+
+def jump_to_next(objs, i):
+  """jmp/jcc L; L:"""
+  inst = objs[i]
+  name = _name(inst)
+  if name != 'jmp' and _condition(name) is None:
+    return None
+  ops = _ops(inst)
+  if len(ops) != 1 or not isinstance(ops[0], spe.Label):
+    return None
+
+  j = i + 1
+  while j < len(objs) and isinstance(objs[j], spe.Label):
+    if objs[j] is ops[0]:
+      return (1, [])
+    j += 1
+  return None
+
+
+RULES = (('self_move', self_move),
+         ('dead_move', dead_move),
+         ('move_back', move_back),
+         ('identity_op', identity_op),
+         ('redundant_test', redundant_test),
+         ('jump_to_next', jump_to_next))
+
@@ -106,14 +106,14 @@ class x86_64_Asm(object):
             return "%d(%%%s, %%%s, %d)" % (op.disp, op.base.name, op.index.name, op.scale)
           return "%d(%%%s)" % (op.disp, op.base.name)
         elif op.index != None:
-          return "(%s, %s, %d)" % (op.base.name, op.index.name, op.scale)
+          return "(%%%s, %%%s, %d)" % (op.base.name, op.index.name, op.scale)
         return "(%%%s)" % (op.base.name)
-      elif self.addr != None:
+      elif op.addr != None:
         return "0x%x" % (op.addr)
     elif isinstance(op, (long, int)):
       # Need to differentiate between imm and reloff values
       # imm values need the $, reloff's do not
-      if isinstance(op_sig, (x86_fields.Rel8off, x86_fields.Rel16off, x86_fields.Rel32off)):
+      if isinstance(op_sig, (x86_fields.Rel8off, x86_fields.Rel32off)):
         return "%d" % op
       return "$%d" % op
     return
@@ -128,6 +128,9 @@ class x86_64_Asm(object):
 
     name = inst.__class__.__name__.strip("_")
     for op in ops:
+      # AVX (VEX-encoded) mnemonics already give the operand size
+      if getattr(inst, "arch_ext", 0) >= 5:
+        break
       if isinstance(op[0], MemoryReference):
         if name[0] == 'f':  # WORST HACK EVER
           if op[0].data_size == 64:
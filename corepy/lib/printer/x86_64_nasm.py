@@ -114,6 +114,10 @@ class x86_64_Nasm(object):
           ref = "byte "
         elif op.data_size == 80:
           ref = "tword "
+        elif op.data_size == 128:
+          ref = "oword "
+        elif op.data_size == 256:
+          ref = "yword "
 
       # [base + index * scale + disp]
       if op.base != None:
@@ -31,6 +31,7 @@ Base classes for the Synthetic Programming Environment.
 """
 
 import corepy.lib.extarray as extarray
+import bisect
 import collections
 
 from syn_util import *
@@ -76,6 +77,26 @@ def _first_user_frame(stack_info):
   return stack_info[idx], file
 
 
+# MachineInstruction -> indices of its relative (position-dependent) operands
+_relative_ops = {}
+
+def _relative_op_indices(machine_inst):
+  """
+  Return a tuple of the indices of the operands in a MachineInstruction's
+  signature that are relative to the instruction's position.  Results are
+  cached as the signature scan is relatively slow.
+  """
+  try:
+    return _relative_ops[machine_inst]
+  except KeyError:
+    pass
+
+  indices = tuple([i for i, opsig in enumerate(machine_inst.signature)
+                     if getattr(opsig, "relative_op", False) == True])
+  _relative_ops[machine_inst] = indices
+  return indices
+
+
 # ------------------------------------------------------------
 # Register
 # ------------------------------------------------------------
@@ -377,6 +398,13 @@ class MachineInstruction(object):
   def _render(params, operands):
     raise Exception("render() method not implemented")
   render = staticmethod(_render)
+
+  # Optionally, a static method encode(params, operands, buf) that appends
+  # the same code render() returns to the bytearray buf, and returns its
+  # length (or None, having added nothing, to fall back to render()).
+  # cache_code uses it for variable length ISAs to avoid building a list
+  # for every instruction.
+  encode = None
   
 
 class Instruction(object):
@@ -466,6 +494,21 @@ class Instruction(object):
   def render(self):
     return self.machine_inst.render(self.params, self._operands)
 
+  def encode_into(self, buf):
+    """
+    Append this instruction's code to the bytearray buf and return its
+    length in bytes.
+    """
+    encode = self.machine_inst.encode
+    if encode is not None:
+      n = encode(self.params, self._operands, buf)
+      if n is not None:
+        return n
+
+    r = self.render()
+    buf.extend(r)
+    return len(r)
+
   def set_position(self, pos):
     """Set the byte-offset position of this instruction in its
        InstructionStream"""
@@ -493,11 +536,22 @@ class DispatchInstruction(Instruction):
 #  type_id = [type]
   dispatch = ()
 
-  def __init__(self, *operands, **koperands):
-    # Attempt to find a dispatch entry that matches the operands.
-    self.machine_inst = None
+  # Optional callable set by an ISA that maps a tuple of operands to a
+  # hashable key, or None if the operands cannot be keyed.  Operands with
+  # equal keys must match the same dispatch entry.  When present, matched
+  # entries are cached per instruction class so that repeated operand
+  # shapes are resolved with one dictionary lookup instead of a scan of
+  # the dispatch table.
+  dispatch_key = None
 
-    for machine_inst, params in self.dispatch:
+  def _match_dispatch(self, operands):
+    """
+    Scan the dispatch table for the first entry whose signature matches
+    the operands.  Returns the (machine_inst, params) entry, or None if
+    no entry matches.
+    """
+    for entry in self.dispatch:
+      machine_inst = entry[0]
       #print "[check] (%s)" % (
       #  ','.join([str(arg_type.name) for arg_type in entry[0].signature],)),
 
@@ -515,15 +569,41 @@ class DispatchInstruction(Instruction):
 
       if match:
         #print "MATCH"
-        # Entire signature matched, break out.
-        self.machine_inst = machine_inst
-        self.params = params
-        break
+        # Entire signature matched
+        return entry
+    return None
+
+
+  def __init__(self, *operands, **koperands):
+    # Attempt to find a dispatch entry that matches the operands, checking
+    # the per-class cache first if the ISA supports keying its operands.
+    entry = None
+    key = None
+
+    if self.dispatch_key is not None:
+      key = self.dispatch_key(operands)
+      if key is not None:
+        cls = self.__class__
+        # Look in the class's own dict; subclasses get their own cache.
+        try:
+          cache = cls.__dict__['_dispatch_cache']
+        except KeyError:
+          cache = {}
+          cls._dispatch_cache = cache
+
+        entry = cache.get(key)
+
+    if entry is None:
+      entry = self._match_dispatch(operands)
 
+      if entry is None:
+        raise TypeError("Instruction %s does not support operands (%s)" % (
+          type(self), ', '.join([str(op) for op in operands],)))
 
-    if self.machine_inst is None:
-      raise TypeError("Instruction %s does not support operands (%s)" % (
-        type(self), ', '.join([str(op) for op in operands],)))
+      if key is not None:
+        cache[key] = entry
+
+    self.machine_inst, self.params = entry
 
 
     # Skip the Instruction constructor and do mostly the same work here.
@@ -535,21 +615,21 @@ class DispatchInstruction(Instruction):
     self._supplied_koperands = koperands    
 
     # Do what validate_operands does, skipping the checks done already
-    self._operands = {}
-    self._operand_iter = []
-
+    dops = {}
     for i, op_type in enumerate(self.machine_inst.signature):
       # Store ops by name and position.
-      self._operands[op_type.name] = self._operands[i] = operands[i]
-      self._operand_iter.append(operands[i])
-        
+      dops[op_type.name] = dops[i] = operands[i]
+
     for op_type in self.machine_inst.opt_kw:
       kw = op_type.name
       if koperands.has_key(kw):
         if op_type.check(koperands[kw]):
-          self._operands[kw] = koperands[kw]
+          dops[kw] = koperands[kw]
       elif op_type.default is not None:
-        self._operands[kw] = op_type.default
+        dops[kw] = op_type.default
+
+    self._operands = dops
+    self._operand_iter = list(operands)
 
 
     # If active code is present, add ourself to it and remember that
@@ -689,7 +769,34 @@ class AlignStream(object):
        the requested alignment."""
     self.position = pos
     return
-  
+
+
+class _CachedStreamCode(object):
+  """
+  Final rendered code of an unchanged InstructionStream whose relative
+  operands only refer to labels in the same stream, and that has no
+  alignment padding.  Such code does not depend on where the stream is
+  placed, so cache_code reuses it as is and only moves the stream's labels
+  and relative instructions.  Looks like an instruction to cache_code.
+  """
+
+  def __init__(self, code, objs):
+    self.code = code # bytearray
+    self.objs = objs # [(offset in code, label or instruction), ...]
+    self.labels = dict([(obj, off) for (off, obj) in objs
+                                   if isinstance(obj, Label)])
+    self.position = None
+    return
+
+  def render(self):
+    return self.code
+
+  def set_position(self, pos):
+    self.position = pos
+    for (off, obj) in self.objs:
+      obj.set_position(pos + off)
+    return
+
 
 class InstructionStream(object):
   """
@@ -709,6 +816,10 @@ class InstructionStream(object):
     self._debug = debug
     
     self._active_callback = None
+
+    # Incremented whenever the stream changes, so the program knows whether
+    # code it cached for this stream is still valid.
+    self._version = 0
     self.reset()
     return
 
@@ -736,6 +847,7 @@ class InstructionStream(object):
     # This stream belongs to a program, which may have any code previously
     # added to this stream cached.  So, invalidate the program's cache.
     self.prgm._cached = False
+    self._version += 1
 
     if self._debug:
       import inspect
@@ -759,8 +871,8 @@ class InstructionStream(object):
     self.objects[key] = obj
 
     # Clear the code cache
-    self.render_code = None
-    self._cached = False
+    self.prgm._cached = False
+    self._version += 1
     return
 
   def __getitem__(self, v):
@@ -847,6 +959,7 @@ class InstructionStream(object):
 
     # Clear the program's cache
     self.prgm._cached = False
+    self._version += 1
 
     return len(self.objects)
 
@@ -854,6 +967,8 @@ class InstructionStream(object):
   def align(self, align):
     """Insert no-op's into the stream to achieve a specified alignment"""
     self.objects.append(AlignStream(self.prgm, align))
+    self.prgm._cached = False
+    self._version += 1
     return
 
 
@@ -954,6 +1069,21 @@ class Program(object):
   # instructions.
   instruction_type = None
 
+  # On-disk cache of rendered code (corepy.lib.codecache.CodeCache), used
+  # by cache_code if set.  May be set per program or per Program class.
+  code_cache = None
+
+  # Key for the code in code_cache, used instead of a fingerprint of the
+  # program if set.  The caller must use a different key whenever the code
+  # would be different; this skips looking at every instruction, for
+  # programs that are rebuilt each run.
+  code_cache_key = None
+
+  # Optimizer run over the streams by cache_code before rendering, e.g. a
+  # corepy.lib.peephole.Peephole, or a list of them to run in order.  May be
+  # set per program or per class.
+  optimizer = None
+
   def __init__(self, debug = False):
     # Make sure subclasses provide property values
     if self.default_register_type is None:
@@ -1012,6 +1142,17 @@ class Program(object):
     self._cached = False
     self.render_code = None
 
+    # InstructionStream -> code rendered for it by the last cache_code
+    self._stream_cache = {}
+    # Label -> _CachedStreamCode containing it
+    self._label_chunks = {}
+
+    # Label resolution statistics from the last cache_code, 'B' type only:
+    #  'passes'   - number of relaxation passes
+    #  'rendered' - number of times a relative instruction was rendered
+    #  'grown'    - number of relative instructions that had to grow
+    self.relax_stats = None
+
     for k in self._register_files.keys():
       self._register_pools[k] = collections.deque(self._register_files[k])
       self._used_registers[k] = {}
@@ -1306,8 +1447,10 @@ class Program(object):
   # Note - TRAC ticket #19 has some background info and reference links on
   # the algorithms used here. https://svn.osl.iu.edu/trac/corepy/ticket/19
 
-  def _cache_code_I(self, render_code, fwd_refs, stream):
+  def _cache_code_I(self, render_code, fwd_refs, stream, refs = None):
     # Assumed below that 'I' type is 4 bytes
+    # If refs is a list, (obj, index) is appended to it for each label and
+    # label-referencing instruction, so the stream's code can be reused.
     for obj in stream:
       if isinstance(obj, Instruction):
         # Does this instruction reference any labels?
@@ -1325,6 +1468,8 @@ class Program(object):
             raise Exception("Label operand '%s' has not beed added to instruction stream" % lbl.name)
 
           obj.set_position(len(render_code) * 4)
+          if refs is not None:
+            refs.append((obj, len(render_code)))
 
           # TODO - could remove this conditional and always delay render
           # Could this eliminate the need to initially clear the position?
@@ -1337,6 +1482,8 @@ class Program(object):
             render_code.append(0xFFFFFFFF)
       elif isinstance(obj, Label): # Label, fill in a zero-length slot
         obj.set_position(len(render_code) * 4)
+        if refs is not None:
+          refs.append((obj, len(render_code)))
       elif isinstance(obj, AlignStream):
         # Call arch-specific alignment.
         # give it the desired alignment and current alignment.
@@ -1346,6 +1493,35 @@ class Program(object):
           render_code.append(i.render())
     return
 
+  def _cache_stream_I(self, render_code, fwd_refs, stream):
+    # Reuse the words rendered for a stream by the last cache_code if the
+    # stream hasn't changed since.  Labels are moved to the new offset, and
+    # label-referencing instructions are rendered again once all the label
+    # positions are known.  Alignment depends on the stream's offset, so
+    # streams containing AlignStreams are never reused.
+    entry = self._stream_cache.get(stream)
+    if entry is not None and entry[0] == stream._version:
+      base = len(render_code)
+      render_code.extend(entry[1])
+      for (obj, idx) in entry[2]:
+        obj.set_position((base + idx) * 4)
+        if not isinstance(obj, Label):
+          fwd_refs.append((obj, base + idx))
+      return
+
+    base = len(render_code)
+    refs = []
+    self._cache_code_I(render_code, fwd_refs, stream.objects, refs)
+
+    for obj in stream.objects:
+      if isinstance(obj, AlignStream):
+        return
+
+    words = list(render_code[base:])
+    refs = [(obj, idx - base) for (obj, idx) in refs]
+    self._stream_cache[stream] = (stream._version, words, refs)
+    return
+
   def _resolve_label_refs_I(self, render_code, fwd_refs):
     # Render the instructions with forward label references
     for rec in fwd_refs:
@@ -1353,88 +1529,297 @@ class Program(object):
     return
 
 
-  def _cache_code_B(self, inst_list, inst_len, stream):
-    # inst_list is a list of tuples.  Each tuple contains:
-    # bool indicating presence of a label reference
+  def _cache_code_B(self, render_code, relocs, inst_len, stream):
+    # render_code is a bytearray that rendered code is appended to.  Objects
+    # whose encoding depends on their position or on a label's position are
+    # not added to render_code.  Instead a record is added to relocs for each
+    # of these objects, and for each label.  Each record is a list containing:
+    # offset in render_code where the object's code belongs
     # rendered code ([] if label)
     # label or instruction object
+    # inst_len is the length of all code so far, including recorded objects.
 
     for obj in stream:
       if isinstance(obj, Instruction):
-        # Does this instruction reference any labels?
+        rel_ops = _relative_op_indices(obj.machine_inst)
+
+        if len(rel_ops) == 0: # No relative operands, just render the inst
+          encode = obj.machine_inst.encode
+          n = None
+          if encode is not None:
+            n = encode(obj.params, obj._operands, render_code)
+          if n is None:
+            r = obj.render()
+            render_code.extend(r)
+            n = len(r)
+          inst_len += n
+          continue
+
+        # Does this instruction reference any labels?  Some instructions can
+        # have a relative offset that is not a label.  These insts need to be
+        # re-rendered if instruction sizes change too.
         lbl = None
-        relref = False
-        sig = obj.machine_inst.signature
-
-        #for iop in xrange(0, len(sig)):
-        for iop, op in enumerate(obj._operand_iter):
-          opsig = sig[iop]
-          if hasattr(opsig, "relative_op") and opsig.relative_op == True:
-            #op = obj._operands[iop]
-            if isinstance(op, Label):
-              lbl = op
-            # This is a hack, but it works.  Some instructions can have
-            # a relative offset that is not a label.  These insts need to be
-            # re-rendered if instruction sizes change
-            relref = True
-
-        if lbl is None: # No label references
-          obj.set_position(inst_len)
+        for iop in rel_ops:
+          op = obj._operand_iter[iop]
+          if isinstance(op, Label):
+            lbl = op
+
+        if lbl is not None and not lbl.name in self.labels:
+          raise Exception("Label operand '%s' has not beed added to instruction stream" % lbl.name)
+        obj.set_position(inst_len)
+
+        if lbl is not None and lbl.position == None:
+          # Forward reference, fill in a dummy, assuming 2-byte best case
+          r = [-1, -1]
+        else:
           r = obj.render()
-          inst_list.append([relref, r, obj])
-          inst_len += len(r)
-        else: # Instruction referencing a label.
-          if not lbl.name in self.labels:
-            raise Exception("Label operand '%s' has not beed added to instruction stream" % lbl.name)
-          obj.set_position(inst_len)
 
-          if lbl.position != None: # Back-reference, render the instruction
-            r = obj.render()
-            inst_list.append([True, r, obj])
-            inst_len += len(r)
-          else: # Fill in a dummy instruction, assuming 2-byte best case
-            inst_list.append([True, [-1, -1], obj])
-            inst_len += 2
+        relocs.append([len(render_code), r, obj])
+        inst_len += len(r)
       elif isinstance(obj, Label): # Label, fill in a zero-length slot
         obj.set_position(inst_len)
-        inst_list.append([False, [], obj])
+        relocs.append([len(render_code), [], obj])
       elif isinstance(obj, AlignStream):
         # Call arch-specific alignment.
         # give it the desired alignment and current alignment.
         # should return an array of instructions to render
         obj.set_position(inst_len)
         r = obj.render()
-        inst_list.append([True, r, obj])
+        relocs.append([len(render_code), r, obj])
         inst_len += len(r)
 
     return inst_len
 
-  def _resolve_label_refs_B(self, render_code, inst_list):
-    # Do adjustment passes until the rendered code stops changing
+  def _cache_stream_B(self, render_code, relocs, inst_len, stream, rendered):
+    # Like _cache_code_B, but reuses what the last cache_code rendered for
+    # the stream if the stream hasn't changed since.  Cache entries are
+    # lists containing:
+    # stream version the entry is valid for
+    # code from _cache_code_B
+    # relocation records from _cache_code_B, offsets relative to the code
+    # True if the stream's code is position-independent (see
+    #   _CachedStreamCode), else False
+    # _CachedStreamCode object once the final code is known, else None
+    # Streams not reused as a _CachedStreamCode are added to rendered as
+    # (stream, entry, index of first reloc, offset in render_code) so their
+    # final code can be saved after label resolution.
+    entry = self._stream_cache.get(stream)
+
+    if entry is None or entry[0] != stream._version:
+      code = bytearray()
+      srelocs = []
+      end = self._cache_code_B(code, srelocs, inst_len, stream.objects)
+
+      entry = [stream._version, code, srelocs,
+               self._stream_is_local(stream, srelocs), None]
+      self._stream_cache[stream] = entry
+      rendered.append((stream, entry, len(relocs), len(render_code)))
+
+      base = len(render_code)
+      for rec in srelocs:
+        relocs.append([base + rec[0], rec[1], rec[2]])
+      render_code += code
+      return end
+
+    if entry[4] is not None:
+      # Position-independent code, add it as a single object
+      obj = entry[4]
+      obj.set_position(inst_len)
+      relocs.append([len(render_code), obj.code, obj])
+      return inst_len + len(obj.code)
+
+    # Reuse the rendered code, moving the recorded objects
+    rendered.append((stream, entry, len(relocs), len(render_code)))
+    base = len(render_code)
+    delta = 0
+    for rec in entry[2]:
+      rec[2].set_position(inst_len + rec[0] + delta)
+      relocs.append([base + rec[0], rec[1], rec[2]])
+      delta += len(rec[1])
+    render_code += entry[1]
+    return inst_len + len(entry[1]) + delta
+
+  def _stream_is_local(self, stream, srelocs):
+    # True if every relative operand in the stream is a label in the stream,
+    # and there is no alignment padding.
+    labels = set(stream.labels)
+    for rec in srelocs:
+      obj = rec[2]
+      if isinstance(obj, AlignStream):
+        return False
+      elif isinstance(obj, Instruction):
+        for iop in _relative_op_indices(obj.machine_inst):
+          if obj._operand_iter[iop] not in labels:
+            return False
+    return True
+
+  def _find_label_record(self, lbl, index):
+    # Return (record index, offset in record) for a label, or None if the
+    # label is not part of the code.
+    try:
+      return (index[lbl], 0)
+    except KeyError:
+      pass
+
+    try:
+      obj = self._label_chunks[lbl]
+      return (index[obj], obj.labels[lbl])
+    except KeyError:
+      return None
+
+  def _save_stream_code_B(self, code, relocs, rendered):
+    # Save the final code of the position-independent streams in rendered,
+    # so the next cache_code can reuse it.
+    if len(rendered) == 0:
+      return
+
+    # Length of the recorded objects' code before each reloc record
+    deltas = [0]
+    for rec in relocs:
+      deltas.append(deltas[-1] + len(rec[1]))
+
+    for (stream, entry, first, base) in rendered:
+      if entry[3] == False:
+        continue
+
+      last = first + len(entry[2])
+      start = base + deltas[first]
+      end = start + len(entry[1]) + deltas[last] - deltas[first]
+
+      objs = [(relocs[i][0] + deltas[i] - start, relocs[i][2])
+              for i in xrange(first, last)]
+      obj = _CachedStreamCode(code[start:end], objs)
+      entry[4] = obj
+
+      for lbl in obj.labels:
+        self._label_chunks[lbl] = obj
+    return
+
+  def _resolve_label_refs_B(self, render_code, relocs):
+    # Branch relaxation.  Forward references start out as a short dummy
+    # encoding, and encoders pick the shortest encoding that fits, so
+    # instructions grow as the code between them and their labels grows.
+    # Each pass goes over the recorded objects in order, moving them by the
+    # growth so far.  An object is only rendered again if what its code
+    # depends on has moved since it was last rendered:
+    # - the offsets to the labels it references
+    # - its own position, for alignment and non-label relative operands
+    # Positions are kept in an index and only given to the objects that are
+    # rendered (and their labels), until the final positions are known.
+    # Passes are repeated until the code stops changing.
+
+    # Record index of every object, and the position of each record
+    index = {}
+    pos = []
+    lens = []
+    delta = 0
+    for (i, rec) in enumerate(relocs):
+      index[rec[2]] = i
+      pos.append(rec[0] + delta)
+      lens.append(len(rec[1]))
+      delta += lens[i]
+
+    cur = pos[:] # Position currently set on each record's object
+    start_lens = lens[:]
+
+    # For each record that gets rendered:
+    # (record index, [(label, record index, offset in record), ...],
+    #  True if the code depends on its own position)
+    deps = []
+    for (i, rec) in enumerate(relocs):
+      obj = rec[2]
+      if isinstance(obj, Instruction):
+        lbls = []
+        absolute = False
+        for iop in _relative_op_indices(obj.machine_inst):
+          op = obj._operand_iter[iop]
+          loc = None
+          if isinstance(op, Label):
+            loc = self._find_label_record(op, index)
+
+          if loc is None:
+            absolute = True
+          else:
+            lbls.append((op, loc[0], loc[1]))
+        deps.append((i, lbls, absolute))
+      elif isinstance(obj, AlignStream):
+        deps.append((i, [], True))
+
+    # What each record's code was last rendered for
+    inputs = [None] * len(relocs)
+
+    passes = 0
+    rendered = 0
     change = True
     while change == True:
       change = False
-      inst_len = 0
-  
-      for rec in inst_list:
-        # Once a change occurs, lbl/inst positions need to be updated
-        if change == True:
-          rec[2].set_position(inst_len)
-
-        if rec[0] == True:
-          # Re-render the instruction, it has a label ref
-          r = rec[2].render()
-          if r != rec[1]:
-            change = True
-            rec[1] = r
-
-        inst_len += len(rec[1])
-
-    # Final loop, bring everything together into render_code
-    for rec in inst_list:
-      if isinstance(rec[2], (Instruction, AlignStream)):
-        render_code.fromlist(rec[1])
-    return
+      passes += 1
+      delta = 0 # Growth so far in this pass
+      prev = 0
+
+      for (i, lbls, absolute) in deps:
+        if delta != 0:
+          for k in xrange(prev, i + 1):
+            pos[k] += delta
+        prev = i + 1
+
+        # Labels not reached yet in this pass move by the growth so far too
+        if absolute:
+          key = [pos[i]]
+        else:
+          key = []
+        for (lbl, j, off) in lbls:
+          if j > i:
+            key.append(pos[j] + delta + off - pos[i])
+          else:
+            key.append(pos[j] + off - pos[i])
+        if key == inputs[i]:
+          continue
+        inputs[i] = key
+
+        rec = relocs[i]
+        if cur[i] != pos[i]:
+          rec[2].set_position(pos[i])
+          cur[i] = pos[i]
+        for (lbl, j, off) in lbls:
+          if j > i:
+            lbl.set_position(pos[j] + delta + off)
+          else:
+            lbl.set_position(pos[j] + off)
+          cur[j] = None
+
+        r = rec[2].render()
+        rendered += 1
+        if r != rec[1]:
+          change = True
+          rec[1] = r
+          delta += len(r) - lens[i]
+          lens[i] = len(r)
+
+      if delta != 0:
+        for k in xrange(prev, len(relocs)):
+          pos[k] += delta
+
+    # Give every object its final position
+    for (i, rec) in enumerate(relocs):
+      if cur[i] != pos[i]:
+        rec[2].set_position(pos[i])
+
+    grown = 0
+    for (i, lbls, absolute) in deps:
+      if lens[i] > start_lens[i] and not isinstance(relocs[i][2], AlignStream):
+        grown += 1
+    self.relax_stats = {'passes':passes, 'rendered':rendered, 'grown':grown}
+
+    # Final loop, splice the recorded code in with the rest of the code
+    code = bytearray()
+    start = 0
+    for rec in relocs:
+      code += render_code[start:rec[0]]
+      code.extend(rec[1])
+      start = rec[0]
+    code += render_code[start:]
+    return code
 
 
   def cache_code(self):
@@ -1447,6 +1832,12 @@ class Program(object):
     if self._cached == True:
       return
 
+    optimizers = self.optimizer
+    if optimizers is not None:
+      if not isinstance(optimizers, (list, tuple)):
+        optimizers = (optimizers,)
+      for opt in optimizers:
+        opt.optimize(self)
 
     self._synthesize_prologue()
     self._prologue.append(self.lbl_body)
@@ -1459,6 +1850,15 @@ class Program(object):
     for lbl in self.labels.values():
       lbl.position = None
 
+    # Skip rendering if the code is in the on-disk cache
+    key = None
+    if self.code_cache is not None:
+      key = self.code_cache.fingerprint(self)
+      if self.code_cache.load(self, key):
+        self.make_executable()
+        self._cached = True
+        return
+
     if self.instruction_type == 'I':
       render_code = extarray.extarray('I')
       fwd_refs = [] # TODO - make fwd_refs a dict inst -> position
@@ -1466,7 +1866,7 @@ class Program(object):
 
       # TODO - may want to do something different for non-IS objects
       for stream in self.objects:
-        self._cache_code_I(render_code, fwd_refs, stream.objects)
+        self._cache_stream_I(render_code, fwd_refs, stream)
 
       self._cache_code_I(render_code, fwd_refs, self._epilogue)
 
@@ -1475,19 +1875,35 @@ class Program(object):
 
       #self.render_code = self._cache_code_I()
     elif self.instruction_type == 'B':
-      inst_list = []
+      render_code = bytearray()
+      relocs = []
+      rendered = []
       inst_len = 0
 
-      inst_len = self._cache_code_B(inst_list, inst_len, self._prologue)
+      inst_len = self._cache_code_B(render_code, relocs, inst_len, self._prologue)
 
       # TODO - may want to do something different for non-IS objects
       for stream in self.objects:
-        inst_len = self._cache_code_B(inst_list, inst_len, stream.objects)
+        inst_len = self._cache_stream_B(render_code, relocs, inst_len, stream, rendered)
 
-      inst_len = self._cache_code_B(inst_list, inst_len, self._epilogue)
+      inst_len = self._cache_code_B(render_code, relocs, inst_len, self._epilogue)
 
+      render_code = self._resolve_label_refs_B(render_code, relocs)
+      self._save_stream_code_B(render_code, relocs, rendered)
+
+      # Copy the final code into the array in one step, straight from the
+      # bytearray's buffer
       self.render_code = extarray.extarray('B')
-      self._resolve_label_refs_B(self.render_code, inst_list)
+      self.render_code.extend(render_code)
+
+    # Forget streams that are no longer part of the program
+    if len(self._stream_cache) > len(self.objects):
+      cache = self._stream_cache
+      self._stream_cache = dict([(stream, cache[stream])
+          for stream in self.objects if stream in cache])
+
+    if key is not None:
+      self.code_cache.store(self, key)
 
     self.make_executable()
     self._cached = True
@@ -1539,6 +1955,10 @@ class Processor(object):
     and the code is executed asynchronously in its own thread.  The execution
     mode then controls what kind of value is returned from the join method.
 
+    On platforms whose exec module releases the interpreter lock (x86 and
+    x86_64 on Linux), other Python threads keep running during synchronous
+    execution, so programs may be executed from several threads at once.
+
     If debug is True, the buffer address and code length are printed
     to stdout before execution.
     """
@@ -1559,13 +1979,7 @@ class Processor(object):
       prgm.print_code(hex = True, pro = True, epi = True)
      
 
-    if params is None:
-      params = self.exec_module.ExecParams()
-    elif type(params) is not self.exec_module.ExecParams:
-      # Backwards compatibility for list-style params
-      _params = self.exec_module.ExecParams()
-      _params.p1, _params.p2, _params.p3 = params
-      params = _params
+    params = self._exec_params(params)
 
     if async:
       result = None
@@ -1593,6 +2007,33 @@ class Processor(object):
     return
 
 
+  def _exec_params(self, params):
+    """
+    Return params as an ExecParams object.
+    """
+    if params is None:
+      params = self.exec_module.ExecParams()
+    elif type(params) is not self.exec_module.ExecParams:
+      # Backwards compatibility for list-style params
+      _params = self.exec_module.ExecParams()
+      _params.p1, _params.p2, _params.p3 = params
+      params = _params
+    return params
+
+
+  def execute_many(self, prgm, params, mode = 'int'):
+    """
+    Execute the code in the Program object once for each parameter set in
+    the list params, and return the results in a sequence in the same order.
+    mode is as for execute.
+
+    Platforms with a native batch interface run the executions in parallel
+    and return an extarray; otherwise they run one after another and a list
+    is returned.
+    """
+    return [self.execute(prgm, mode = mode, params = p) for p in params]
+
+
   # ------------------------------
   # Thread control
   # ------------------------------
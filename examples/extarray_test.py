@@ -0,0 +1,99 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+# Tests for extarray behaviour that depends on where memory lands.  Run
+# directly; each test prints whether it passed.
+
+import array
+
+import corepy.lib.extarray as extarray
+
+
+def TestExtendAdjacent(tries = 20000):
+  """
+  Extend an array from a foreign buffer placed just past the array's
+  memory.  The buffer must be copied as-is, not treated as part of the
+  array when the array's memory is reallocated.
+  """
+  found = 0
+  passed = True
+  keep = []
+  for i in xrange(0, tries):
+    a = extarray.extarray('B', [1] * 4096)
+    end = a.buffer_info()[0] + a.alloc_len
+    b = array.array('B', [7] * 8192)
+    addr = b.buffer_info()[0]
+    if not (end <= addr < end + 8192):
+      # Keep the block so the next buffer lands elsewhere
+      keep.append(b)
+      continue
+
+    found += 1
+    a.extend(b)
+    if list(a[4096:]) != [7] * 8192 or list(a[:4096]) != [1] * 4096:
+      passed = False
+    if found == 4:
+      break
+
+  print "TestExtendAdjacent: %d adjacent buffers, passed? %s" % (found, passed)
+  return passed
+
+
+def TestExtendSelf():
+  """Extend an array from itself and from a slice of its own memory"""
+  a = extarray.extarray('l', range(0, 1000))
+  a.extend(a)
+  passed = list(a) == range(0, 1000) * 2
+
+  a = extarray.extarray('l', range(0, 1000))
+  a.extend(a[10:20])
+  passed = passed and list(a) == range(0, 1000) + range(10, 20)
+  print "TestExtendSelf: passed?", passed
+  return passed
+
+
+def TestFromBufferTypecode():
+  """Wrap old-style buffers, taking the type from their typecode"""
+  a = array.array('l', range(0, 100))
+  b = extarray.extarray.frombuffer(a)
+  passed = b.typecode == 'l' and list(b) == range(0, 100)
+
+  b = extarray.extarray.frombuffer(array.array('d', [1.5, 2.5]))
+  passed = passed and b.typecode == 'd' and list(b) == [1.5, 2.5]
+
+  # An explicit typecode still reinterprets the memory
+  b = extarray.extarray.frombuffer(a, 'B')
+  passed = passed and b.typecode == 'B' and len(b) == 800
+  print "TestFromBufferTypecode: passed?", passed
+  return passed
+
+
+if __name__ == '__main__':
+  TestExtendAdjacent()
+  TestExtendSelf()
+  TestFromBufferTypecode()
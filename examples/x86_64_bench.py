@@ -0,0 +1,387 @@
+# Copyright (c) 2006-2009 The Trustees of Indiana University.                   
+# All rights reserved.                                                          
+#                                                                               
+# Redistribution and use in source and binary forms, with or without            
+# modification, are permitted provided that the following conditions are met:   
+#                                                                               
+# - Redistributions of source code must retain the above copyright notice, this 
+#   list of conditions and the following disclaimer.                            
+#                                                                               
+# - Redistributions in binary form must reproduce the above copyright notice,   
+#   this list of conditions and the following disclaimer in the documentation   
+#   and/or other materials provided with the distribution.                      
+#                                                                               
+# - Neither the Indiana University nor the names of its contributors may be used
+#   to endorse or promote products derived from this software without specific  
+#   prior written permission.                                                   
+#                                                                               
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"   
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE     
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE   
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL    
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR    
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER    
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, 
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.          
+
+# Code generation benchmarks for the x86_64 ISA.  Nothing here executes
+# synthesized code; these time the Python side of building programs, and
+# filling the extarrays programs use for code and data.
+
+import array
+import time
+
+import corepy.spre.spe as spe
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+import corepy.arch.x86_64.platform as env
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.lib.extarray as extarray
+
+
+def dispatch_classes():
+  classes = []
+  for name in dir(x86):
+    cls = getattr(x86, name)
+    if isinstance(cls, type) and issubclass(cls, spe.DispatchInstruction):
+      if cls is not spe.DispatchInstruction:
+        classes.append(cls)
+  return classes
+
+
+# A mix of operand shapes typical of generated code
+def construct_mix(n):
+  lbl = spe.Label("bench")
+  for i in xrange(0, n):
+    x86.add(rax, rbx)
+    x86.add(rbx, 1)
+    x86.add(rbx, 100000)
+    x86.mov(rcx, MemRef(rbp, 16))
+    x86.mov(MemRef(rsp, 8), rdx)
+    x86.mov(eax, 7)
+    x86.sub(r12, MemRef(r13, 8, r14, 8))
+    x86.cmp(rcx, 0)
+    x86.shl(rdx, 3)
+    x86.movsd(xmm1, MemRef(rsi, 8))
+    x86.addsd(xmm0, xmm1)
+    x86.jne(lbl)
+  return n * 12
+
+
+def bench_dispatch(n = 20000):
+  """
+  Compare DispatchInstruction construction throughput with and without
+  the per-class dispatch cache.
+  """
+
+  classes = dispatch_classes()
+  key = classes[0].dispatch_key
+
+  for cls in classes:
+    cls.dispatch_key = None
+  t1 = time.time()
+  count = construct_mix(n)
+  t2 = time.time()
+  scan_rate = count / (t2 - t1)
+
+  for cls in classes:
+    cls.dispatch_key = key
+  t1 = time.time()
+  count = construct_mix(n)
+  t2 = time.time()
+  cache_rate = count / (t2 - t1)
+
+  print "dispatch construct: %d insts" % count
+  print "  scan:  %10.0f insts/sec" % scan_rate
+  print "  cache: %10.0f insts/sec (%.2fx)" % (cache_rate, cache_rate / scan_rate)
+  return
+
+
+# Gathers take a memory reference with a vector index register (VSIB)
+VSIB_INSTS = (x86.vex_xmm_mem32_xmm, x86.vex_xmm_mem64_xmm,
+              x86.vex_ymm_mem32_ymm, x86.vex_ymm_mem64_ymm)
+
+
+def sig_operands(sig, lbl, index = None):
+  """
+  Return operands matching a MachineInstruction signature, or None if the
+  signature contains an operand type not handled here.  lbl is used for
+  any label operands, and index as the index register of any memory
+  operands.
+  """
+  regs = ((x86.reg64_t, r12), (x86.reg32_t, edx), (x86.reg16_t, cx),
+          (x86.reg8_t, bl), (x86.regst_t, st1), (x86.mmx_t, mm3),
+          (x86.xmm_t, xmm5), (x86.ymm_t, ymm5))
+  ops = []
+
+  for s in sig:
+    if isinstance(s, x86.FixedRegisterOperand):
+      ops.append(globals()[s.name])
+    elif isinstance(s, x86.x86RegisterOperand):
+      matches = [reg for (t, reg) in regs if t == s]
+      if len(matches) == 0:
+        return None
+      ops.append(matches[0])
+    elif isinstance(s, x86.x86ConstantOperand):
+      ops.append(s.const)
+    elif isinstance(s, x86.x86MemoryOperand):
+      if index is None:
+        ops.append(MemRef(r9, -16, data_size = s.size))
+      else:
+        ops.append(MemRef(r9, -16, index, 8, data_size = s.size))
+    elif isinstance(s, (x86.Rel8off, x86.Rel32off)):
+      # Offsets are relative to the start of the code, skip these
+      return None
+    elif isinstance(s, x86.x86ImmediateOperand):
+      ops.append(13)
+    elif isinstance(s, x86.x86LabelOperand):
+      ops.append(lbl)
+    else:
+      return None
+  return ops
+
+
+def isa_stream(prgm):
+  """Return a stream containing an instance of every x86_64 instruction form"""
+  code = prgm.get_stream()
+
+  for cls in dispatch_classes():
+    for machine_inst, params in cls.dispatch:
+      # Some branches only have 8bit offsets, so keep the label close.
+      lbl = spe.Label("isa")
+      index = None
+      if machine_inst in VSIB_INSTS:
+        index = {128:xmm6, 256:ymm6}[params['vsib'][0]]
+      ops = sig_operands(machine_inst.signature, lbl, index)
+      if ops is not None:
+        if lbl in ops:
+          lbl = prgm.get_unique_label("isa")
+          ops = sig_operands(machine_inst.signature, lbl, index)
+          code.add(lbl)
+        code.add(cls(*ops))
+  return code
+
+
+def bench_encode(n = 10000):
+  """
+  Compare rendering instructions to lists (render()) with encoding them
+  directly into a bytearray (encode_into()), as cache_code does.
+  """
+
+  insts = []
+  for i in xrange(0, n):
+    insts.extend((x86.add(rax, rbx), x86.add(rbx, 1), x86.add(rbx, 100000),
+                  x86.mov(rcx, MemRef(rbp, 16)), x86.mov(MemRef(rsp, 8), rdx),
+                  x86.mov(eax, 7), x86.sub(r12, MemRef(r13, 8, r14, 8)),
+                  x86.cmp(rcx, 0), x86.shl(rdx, 3),
+                  x86.movsd(xmm1, MemRef(rsi, 8)), x86.addsd(xmm0, xmm1)))
+
+  t1 = time.time()
+  rendered = bytearray()
+  for inst in insts:
+    rendered.extend(inst.render())
+  t2 = time.time()
+  encoded = bytearray()
+  for inst in insts:
+    inst.encode_into(encoded)
+  t3 = time.time()
+
+  assert rendered == encoded
+  print "encode: %d insts, %d bytes" % (len(insts), len(encoded))
+  print "  render: %.3f sec  encode_into: %.3f sec  (%.2fx)" % (
+      t2 - t1, t3 - t2, (t2 - t1) / (t3 - t2))
+  return
+
+
+def bench_cache_code(n = 100000):
+  """
+  Time Program.cache_code on a program built by repeating a stream of all
+  the x86_64 instruction forms until it has at least n instructions.
+  """
+
+  prgm = env.Program()
+  count = 0
+  while count < n:
+    code = isa_stream(prgm)
+    count += len(code) - len(code.labels)
+    prgm.add(code)
+
+  t1 = time.time()
+  prgm.cache_code()
+  t2 = time.time()
+
+  print "cache_code: %d insts, %d bytes" % (count, len(prgm.render_code))
+  print "  %.3f sec" % (t2 - t1)
+  return
+
+
+def bench_cache_append(n = 100000, appends = 20):
+  """
+  Time Program.cache_code after appending a small stream to a program of at
+  least n instructions that has already been cached.
+  """
+
+  prgm = env.Program()
+  count = 0
+  while count < n:
+    code = isa_stream(prgm)
+    count += len(code) - len(code.labels)
+    prgm.add(code)
+
+  t1 = time.time()
+  prgm.cache_code()
+  t2 = time.time()
+
+  for i in xrange(appends):
+    code = prgm.get_stream()
+    lbl = prgm.get_unique_label("append")
+    code.add(x86.mov(rcx, 10))
+    code.add(lbl)
+    for j in xrange(7):
+      code.add(x86.add(rax, j))
+    code.add(x86.dec(rcx))
+    code.add(x86.jnz(lbl))
+    prgm.add(code)
+    prgm.cache_code()
+  t3 = time.time()
+
+  print "cache_code after append: %d insts" % count
+  print "  first: %.3f sec  append: %.4f sec" % (t2 - t1, (t3 - t2) / appends)
+  return
+
+
+def bench_branches(n = 5000):
+  """
+  Time Program.cache_code on branch-heavy code: n loops, each with a
+  backward branch and a forward branch past the following loops.  Some of
+  the branches need a 32bit offset.
+  """
+
+  prgm = env.Program()
+  code = prgm.get_stream()
+  lbls = [prgm.get_unique_label("loop") for i in xrange(n + 8)]
+
+  for i in xrange(n):
+    code.add(lbls[i])
+    for j in xrange(i % 7):
+      code.add(x86.add(rax, 1000))
+    code.add(x86.dec(rcx))
+    code.add(x86.jnz(lbls[max(0, i - i % 13)]))
+    code.add(x86.jmp(lbls[i + 1 + i % 8]))
+  for lbl in lbls[n:]:
+    code.add(lbl)
+  prgm.add(code)
+
+  t1 = time.time()
+  prgm.cache_code()
+  t2 = time.time()
+
+  print "cache_code: %d branches, %d bytes" % (n * 2, len(prgm.render_code))
+  print "  %.3f sec, %d passes, %d renders, %d grown" % (t2 - t1,
+      prgm.relax_stats['passes'], prgm.relax_stats['rendered'],
+      prgm.relax_stats['grown'])
+  return
+
+
+def bench_code_cache(n = 100000):
+  """
+  Time Program.cache_code on a program of at least n instructions: without
+  a code cache, with an empty on-disk code cache, and with the code in the
+  cache, found by fingerprinting a newly built program, by caching the same
+  program again, and by a key given by the caller.  The last two must be
+  faster than rendering.
+  """
+  import shutil
+  import tempfile
+  from corepy.lib.codecache import CodeCache
+
+  def build():
+    prgm = env.Program()
+    count = 0
+    while count < n:
+      code = isa_stream(prgm)
+      count += len(code) - len(code.labels)
+      prgm.add(code)
+    return (prgm, count)
+
+  def timed(prgm):
+    prgm._cached = False
+    t1 = time.time()
+    prgm.cache_code()
+    return time.time() - t1
+
+  path = tempfile.mkdtemp()
+  try:
+    (prgm, count) = build()
+    uncached = timed(prgm)
+
+    cache = CodeCache(path)
+    (prgm, count) = build()
+    prgm.code_cache = cache
+    miss = timed(prgm)
+    (prgm, count) = build()
+    prgm.code_cache = cache
+    hit = timed(prgm)
+    same = timed(prgm)
+
+    (prgm, count) = build()
+    prgm.code_cache = cache
+    prgm.code_cache_key = 'bench_code_cache'
+    timed(prgm)
+    (prgm, count) = build()
+    prgm.code_cache = cache
+    prgm.code_cache_key = 'bench_code_cache'
+    keyed = timed(prgm)
+    hits = cache.hits
+  finally:
+    shutil.rmtree(path)
+
+  print "cache_code with code cache: %d insts" % count
+  print "  none: %.3f sec  miss: %.3f sec" % (uncached, miss)
+  print "  hit: %.3f sec  same program: %.3f sec  keyed: %.3f sec" % (hit, same, keyed)
+  assert(hits == 3)
+  assert(same < uncached and keyed < uncached)
+  return
+
+
+def bench_extarray_append(n = 10 ** 7):
+  """
+  Time filling a 'B' extarray with n elements by appending one at a time,
+  by extending from a generator and by extending from another extarray.
+  array.array is timed the same way for comparison.
+  """
+
+  results = []
+  for (name, cls) in (('extarray', extarray.extarray), ('array', array.array)):
+    t1 = time.time()
+    a = cls('B')
+    append = a.append
+    for i in xrange(n):
+      append(i & 0xFF)
+    t2 = time.time()
+
+    b = cls('B')
+    b.extend(i & 0xFF for i in xrange(n))
+    t3 = time.time()
+
+    c = cls('B')
+    c.extend(a)
+    t4 = time.time()
+    results.append((name, t2 - t1, t3 - t2, t4 - t3))
+
+  print "append/extend: %d elements" % n
+  for r in results:
+    print "  %-8s append: %.3f sec  extend(gen): %.3f sec  extend(array): %.4f sec" % r
+  return
+
+
+if __name__ == '__main__':
+  bench_dispatch()
+  bench_encode()
+  bench_cache_code()
+  bench_cache_append()
+  bench_branches()
+  bench_code_cache()
+  bench_extarray_append()
@@ -0,0 +1,75 @@
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+import corepy.arch.x86_64.platform as env
+import corepy.arch.x86_64.types.x86_64_types as types
+import corepy.arch.x86_64.lib.expropt as expropt
+
+# Evaluate the same expressions with and without the expression optimizer,
+# and compare the number of instructions generated.
+
+proc = env.Processor()
+
+
+# p1 is x, p2 is y.  The result is returned in rax.
+def address_program():
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  x = types.SignedWord(reg = rdi)
+  y = types.SignedWord(reg = rsi)
+  width = 640
+  depth = 4
+
+  # Offset of pixel (x, y) in a row-major image, plus an offset of a
+  # neighbor, as loop code often computes them
+  r = types.SignedWord(reg = rax)
+  r.v = (y * width + x) * depth + ((y + 1) * width + x) * depth
+  r.v = r + (x * 9 - x * 0) + (3 * 8 - 20) * (x + y) - (x + y) * 3 + 16 * 2
+
+  x86.set_active_code(None)
+  prgm += code
+  return (prgm, len(code))
+
+
+def expected(x, y):
+  r = (y * 640 + x) * 4 + ((y + 1) * 640 + x) * 4
+  return r + x * 9 + 4 * (x + y) - (x + y) * 3 + 32
+
+
+# Horner evaluation of a polynomial in xmm0.  p1 is x (as an integer).
+def poly_program():
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  x = types.DoubleFloat(reg = xmm1)
+  x86.cvtsi2sd(xmm1, edi)
+  r = types.DoubleFloat(reg = xmm0)
+  r.v = ((x * 2.0 + 1.0 / 4.0) * x + (3.0 - 1.0)) * x * 1.0 - 0.5 * 2.0
+  x86.cvtsd2ss(xmm0, xmm0)
+
+  x86.set_active_code(None)
+  prgm += code
+  return (prgm, len(code))
+
+
+params = env.ExecParams()
+params.p1 = 7
+params.p2 = 11
+
+for (name, opt) in (('unoptimized', None), ('optimized', expropt.ExprOptimizer())):
+  types.x86_64Expression.optimizer = opt
+
+  (prgm, n) = address_program()
+  result = proc.execute(prgm, params = params)
+  print "%-12s address: %2d instructions, passed? %s" % (
+    name, n, result == expected(7, 11))
+
+  (prgm, n) = poly_program()
+  result = proc.execute(prgm, params = params, mode = 'fp')
+  print "%-12s poly:    %2d instructions, passed? %s" % (
+    name, n, result == ((7 * 2.0 + 0.25) * 7 + 2.0) * 7 - 1.0)
+
+  if opt is not None:
+    print opt.report()
@@ -0,0 +1,21 @@
+import corepy.lib.extarray as extarray
+
+# Allocate an array on transparent huge pages and report how much of it the
+# kernel actually backed with them.  Pages are only assigned when memory is
+# first touched, so the array is filled before checking.
+
+print "huge page size", extarray.hugepage_size()
+print "reserved huge pages?", extarray.has_huge_pages()
+print "transparent huge pages?", extarray.has_thp()
+
+if extarray.has_thp():
+  N = 1 << 22
+  a = extarray.extarray('d', N, huge = 'thp')
+  print "aligned to", a.align
+
+  stats = extarray.hugepage_stats(a)
+  print "before touching: %(huge)d of %(size)d bytes" % stats
+
+  a.clear()
+  stats = extarray.hugepage_stats(a)
+  print "after touching:  %(huge)d of %(size)d bytes" % stats
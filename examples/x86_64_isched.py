@@ -0,0 +1,88 @@
+import time
+
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.arch.x86_64.platform as env
+import corepy.arch.x86_64.lib.isched as isched
+import corepy.lib.extarray as extarray
+
+# Sum of x[i] * y[i] / z[i], four elements per iteration, written one
+# element at a time.  Each element's load, mulsd, divsd and addsd depend on
+# each other; the scheduler interleaves the four elements.
+
+proc = env.Processor()
+
+N = 1 << 14
+x = extarray.extarray('d', [float(i % 13) for i in xrange(0, N)])
+y = extarray.extarray('d', [float(i % 5 + 1) for i in xrange(0, N)])
+z = extarray.extarray('d', [2.0] * N)
+expected = sum([(i % 13) * (i % 5 + 1) / 2.0 for i in xrange(0, N)])
+
+
+# p1, p2, p3 are x, y, z; p4 the number of elements (a multiple of 4).  The
+# sum is returned as an integer.
+def gen_sum():
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  x86.lea(rcx, MemRef(rdi, index = rcx, scale = 8, data_size = None))
+  for acc in (xmm0, xmm1, xmm2, xmm3):
+    x86.xorpd(acc, acc)
+
+  lbl_loop = prgm.get_unique_label("loop")
+  code.add(lbl_loop)
+  for (j, (t, acc)) in enumerate(zip((xmm4, xmm5, xmm6, xmm7),
+                                     (xmm0, xmm1, xmm2, xmm3))):
+    x86.movsd(t, MemRef(rdi, j * 8))
+    x86.mulsd(t, MemRef(rsi, j * 8))
+    x86.divsd(t, MemRef(rdx, j * 8))
+    x86.addsd(acc, t)
+  x86.add(rdi, 32)
+  x86.add(rsi, 32)
+  x86.add(rdx, 32)
+  x86.cmp(rdi, rcx)
+  x86.jne(lbl_loop)
+
+  x86.addsd(xmm0, xmm1)
+  x86.addsd(xmm2, xmm3)
+  x86.addsd(xmm0, xmm2)
+  x86.cvttsd2si(eax, xmm0)
+
+  x86.set_active_code(None)
+  prgm += code
+  return prgm
+
+
+def run(prgm):
+  params = env.ExecParams()
+  params.p1 = x.buffer_info()[0]
+  params.p2 = y.buffer_info()[0]
+  params.p3 = z.buffer_info()[0]
+  params.p4 = N
+
+  result = proc.execute(prgm, params = params)
+  best = None
+  for i in xrange(0, 20):
+    t1 = time.time()
+    proc.execute(prgm, params = params)
+    t = time.time() - t1
+    if best is None or t < best:
+      best = t
+  return (result, best)
+
+
+plain = gen_sum()
+(result, t) = run(plain)
+print "in order ", result, "%f" % t
+print "passed?", result == int(expected)
+
+sched = isched.Scheduler()
+prgm = gen_sum()
+prgm.optimizer = sched
+(result, t) = run(prgm)
+print "scheduled", result, "%f" % t
+print "passed?", result == int(expected)
+print sched.report()
+prgm.print_code()
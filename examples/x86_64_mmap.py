@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.arch.x86_64.platform as env
+import corepy.lib.extarray as extarray
+
+# Sum a file of 64 bit integers by mapping it into an extarray, so the
+# kernel reads the file data in place.
+
+# p1 is the array address, p2 the number of integers.
+def sum_program():
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  x86.xor(rax, rax)
+  x86.lea(rcx, MemRef(rdi, index = rsi, scale = 8, data_size = None))
+
+  lbl_loop = prgm.get_unique_label("loop")
+  code.add(lbl_loop)
+  x86.add(rax, MemRef(rdi))
+  x86.add(rdi, 8)
+  x86.cmp(rdi, rcx)
+  x86.jne(lbl_loop)
+
+  x86.set_active_code(None)
+  prgm += code
+  return prgm
+
+
+N = 1 << 20
+(fd, name) = tempfile.mkstemp()
+data = extarray.extarray('l', range(0, N))
+f = os.fdopen(fd, 'wb')
+data.tofile(f)
+f.close()
+
+proc = env.Processor()
+prgm = sum_program()
+params = env.ExecParams()
+
+# The whole file, read-only
+arr = extarray.extarray.frommap(name, 'l', populate = True, advice = 'sequential')
+params.p1 = arr.buffer_info()[0]
+params.p2 = len(arr)
+print "passed?", proc.execute(prgm, params = params) == sum(xrange(0, N))
+
+# The second half, writable; changes are written to the file
+half = extarray.extarray.frommap(name, 'l', offset = N * 4, write = True)
+half[0] = 0
+half.synchronize()
+arr = extarray.extarray.frommap(name, 'l')
+params.p1 = arr.buffer_info()[0]
+print "passed?", proc.execute(prgm, params = params) == sum(xrange(0, N)) - N / 2
+
+del arr, half
+os.remove(name)
@@ -0,0 +1,100 @@
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.arch.x86_64.platform as env
+import corepy.arch.x86_64.platform.cpuid as cpuid
+from corepy.arch.x86_64.lib.multiversion import MultiVersionKernel
+import corepy.lib.extarray as extarray
+
+# Report the host, then sum an array of floats with an SSE or an AVX kernel,
+# whichever this host runs fastest.
+
+print cpuid.host()
+
+N = 1 << 16
+data = extarray.extarray('f', [float(i % 7) for i in xrange(0, N)])
+expected = sum([i % 7 for i in xrange(0, N)])
+
+
+# p1 is the array address, p2 the number of floats (a multiple of 8).
+# The sum is returned as an integer.
+def gen_sse():
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  x86.xorps(xmm0, xmm0)
+  x86.xorps(xmm1, xmm1)
+  x86.lea(rcx, MemRef(rdi, index = rsi, scale = 4, data_size = None))
+
+  lbl_loop = prgm.get_unique_label("loop")
+  code.add(lbl_loop)
+  x86.addps(xmm0, MemRef(rdi, data_size = 128))
+  x86.addps(xmm1, MemRef(rdi, 16, data_size = 128))
+  x86.add(rdi, 32)
+  x86.cmp(rdi, rcx)
+  x86.jne(lbl_loop)
+
+  x86.addps(xmm0, xmm1)
+  x86.movhlps(xmm1, xmm0)
+  x86.addps(xmm0, xmm1)
+  x86.pshufd(xmm1, xmm0, 0x55)
+  x86.addss(xmm0, xmm1)
+  x86.cvttss2si(eax, xmm0)
+
+  x86.set_active_code(None)
+  prgm += code
+  return prgm
+
+
+def gen_avx():
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  x86.vxorps(ymm0, ymm0, ymm0)
+  x86.lea(rcx, MemRef(rdi, index = rsi, scale = 4, data_size = None))
+
+  lbl_loop = prgm.get_unique_label("loop")
+  code.add(lbl_loop)
+  x86.vaddps(ymm0, ymm0, MemRef(rdi, data_size = 256))
+  x86.add(rdi, 32)
+  x86.cmp(rdi, rcx)
+  x86.jne(lbl_loop)
+
+  x86.vextractf128(xmm1, ymm0, 1)
+  x86.vaddps(xmm0, xmm0, xmm1)
+  x86.vzeroupper()
+  x86.movhlps(xmm1, xmm0)
+  x86.addps(xmm0, xmm1)
+  x86.pshufd(xmm1, xmm0, 0x55)
+  x86.addss(xmm0, xmm1)
+  x86.cvttss2si(eax, xmm0)
+
+  x86.set_active_code(None)
+  prgm += code
+  return prgm
+
+
+params = env.ExecParams()
+params.p1 = data.buffer_info()[0]
+params.p2 = N
+
+kernel = MultiVersionKernel(sample = params)
+kernel.add(gen_avx, requires = ('avx',))
+kernel.add(gen_sse)
+
+print "supported", kernel.supported()
+result = kernel.execute(params = params)
+print "selected ", kernel.selected
+for (name, t) in kernel.timings.items():
+  print "  %-8s %f" % (name, t)
+print "passed?", result == expected
+
+# Without a sample, the first supported variant is used
+kernel = MultiVersionKernel()
+kernel.add(gen_avx, requires = ('avx',))
+kernel.add(gen_sse)
+kernel.select()
+print "first    ", kernel.selected
+print "passed?", kernel(params = params) == expected
@@ -0,0 +1,59 @@
+import numpy
+
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.arch.x86_64.platform as env
+import corepy.lib.extarray as extarray
+
+# Share memory between NumPy arrays and extarrays without copying.
+
+# Scale an array of doubles in place.  p1 is the array address, p2 the
+# number of doubles.
+def scale_program(factor):
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  f = extarray.extarray('d', [factor])
+  prgm.add_storage(f)
+  x86.mov(rax, f.buffer_info()[0])
+  x86.movsd(xmm1, MemRef(rax, data_size = 64))
+  x86.lea(rcx, MemRef(rdi, index = rsi, scale = 8, data_size = None))
+
+  lbl_loop = prgm.get_unique_label("loop")
+  code.add(lbl_loop)
+  x86.movsd(xmm0, MemRef(rdi, data_size = 64))
+  x86.mulsd(xmm0, xmm1)
+  x86.movsd(MemRef(rdi, data_size = 64), xmm0)
+  x86.add(rdi, 8)
+  x86.cmp(rdi, rcx)
+  x86.jne(lbl_loop)
+
+  x86.set_active_code(None)
+  prgm += code
+  return prgm
+
+
+proc = env.Processor()
+prgm = scale_program(3.0)
+
+# A NumPy array wrapped by an extarray; the extarray keeps it alive
+data = numpy.arange(1000, dtype = numpy.float64)
+arr = extarray.extarray.frombuffer(data)
+print arr.typecode, len(arr), arr.base is data
+
+params = env.ExecParams()
+params.p1 = arr.buffer_info()[0]
+params.p2 = len(arr)
+proc.execute(prgm, params = params)
+print "passed?", (data == numpy.arange(1000) * 3.0).all()
+
+# An extarray viewed as a NumPy array through __array_interface__ or the
+# buffer interface
+arr = extarray.extarray('d', range(1000))
+view = numpy.asarray(arr)
+params.p1 = arr.buffer_info()[0]
+proc.execute(prgm, params = params)
+print "passed?", (view == numpy.arange(1000) * 3.0).all()
+print "passed?", (numpy.frombuffer(arr, dtype = numpy.float64) == view).all()
@@ -0,0 +1,38 @@
+import operator
+import time
+
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+from corepy.arch.x86_64.lib.memory import MemRef
+from corepy.arch.x86_64.lib.iterators import syn_iter, parallel
+import corepy.arch.x86_64.platform as env
+import corepy.lib.extarray as extarray
+
+# Sum an array of integers on every core.  p1 is the array address and p2
+# its length; execute_parallel passes the rank in p5 and the number of
+# ranks in p6, and adds up the partial sums the ranks return.
+
+N = 1 << 22
+data = extarray.extarray('l', [i % 1000 for i in xrange(0, N)])
+expected = sum([i % 1000 for i in xrange(0, N)])
+
+prgm = env.Program()
+code = prgm.get_stream()
+x86.set_active_code(code)
+
+x86.xor(rax, rax)
+for i in parallel(syn_iter(code, rsi, count_reg = r10, unroll = 4)):
+  x86.add(rax, MemRef(rdi, index = i, scale = 8))
+
+x86.set_active_code(None)
+prgm += code
+
+proc = env.Processor()
+params = (data.buffer_info()[0], N)
+
+for ranks in (1, 0):
+  t1 = time.time()
+  total = proc.execute_parallel(prgm, ranks, params, reduce = operator.add)
+  t = time.time() - t1
+  print "ranks %3d: %f s passed? %s" % (ranks or proc.pool_size(), t,
+                                        total == expected)
@@ -0,0 +1,98 @@
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+from corepy.arch.x86_64.lib.memory import MemRef
+import corepy.arch.x86_64.platform as env
+import corepy.lib.peephole as peephole
+import corepy.lib.peephole.x86 as x86_rules
+import corepy.arch.x86_64.lib.synreg as sr
+
+# Code as a generator might emit it, with redundant moves, identity
+# operations, tests the preceding instruction already did and a jump to the
+# next instruction.  The peephole optimizer removes them when the program is
+# cached.
+
+proc = env.Processor()
+
+
+# Sum of 1..p1, plus one for each of them that is odd
+def gen_sum():
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  x86.mov(rax, 0)
+  x86.mov(rax, 0)            # dead_move
+  x86.mov(rcx, rdi)
+  x86.mov(rdi, rcx)          # move_back
+  x86.add(rcx, 0)            # identity_op (flags set again by test)
+
+  lbl_loop = prgm.get_unique_label("loop")
+  lbl_even = prgm.get_unique_label("even")
+  lbl_next = prgm.get_unique_label("next")
+  code.add(lbl_loop)
+  x86.mov(rdx, rcx)
+  x86.mov(rdx, rdx)          # self_move
+  x86.add(rax, rdx)
+  x86.and_(rdx, 1)
+  x86.test(rdx, rdx)         # redundant_test
+  x86.jz(lbl_even)
+  x86.add(rax, 1)
+  x86.jmp(lbl_next)          # jump_to_next
+  code.add(lbl_even)
+  code.add(lbl_next)
+  x86.shl(rdx, 0)            # identity_op
+  x86.lea(rdx, MemRef(rdx, data_size = None))   # identity_op
+  x86.dec(rcx)
+  x86.cmp(rcx, 0)            # redundant_test (only jnz reads the flags)
+  x86.jnz(lbl_loop)
+  x86.xor(rdx, rdx)
+
+  x86.set_active_code(None)
+  prgm += code
+  return prgm
+
+
+n = 100
+expected = sum(range(1, n + 1)) + n // 2
+params = env.ExecParams()
+params.p1 = n
+
+plain = gen_sum()
+result = proc.execute(plain, params = params)
+print "plain    ", result, len(plain.render_code), "bytes"
+print "passed?", result == expected
+
+opt = peephole.Peephole(x86_rules.RULES)
+prgm = gen_sum()
+prgm.optimizer = opt
+result = proc.execute(prgm, params = params)
+print "optimized", result, len(prgm.render_code), "bytes"
+print "passed?", result == expected
+print opt.report()
+prgm.print_code()
+
+
+# The optimizer runs after register allocation, removing moves between
+# synthetic registers that were given the same physical register.
+opt.reset()
+env.Program.optimizer = opt
+
+prgm = sr.Program()
+code = prgm.get_stream()
+sr.set_active_code(code)
+a = prgm.acquire_register()
+b = prgm.acquire_register()
+sr.lea(a, MemRef(rdi, 1, data_size = None))
+sr.mov(b, a)
+sr.imul(b, b)
+sr.mov(rax, b)
+sr.set_active_code(None)
+prgm += code
+
+params.p1 = 6
+result = proc.execute(prgm, params = params)
+print
+print "synreg   ", result, "passed?", result == 49
+print opt.report()
+
+env.Program.optimizer = None
@@ -0,0 +1,104 @@
+import corepy.arch.x86_64.lib.synreg as sr
+from corepy.arch.x86_64.types.registers import *
+import corepy.arch.x86_64.platform as env
+import corepy.lib.extarray as extarray
+
+# Code written with synthetic registers, which the allocator assigns to
+# physical registers when the program is cached.
+
+proc = env.Processor()
+
+
+# Dot product of two double arrays, with 4 accumulators.  p1 and p2 are the
+# arrays, p3 the length (a multiple of 4).  The result is truncated to an
+# integer.
+def dot_program():
+  prgm = sr.Program()
+  code = prgm.get_stream()
+  sr.set_active_code(code)
+
+  a = prgm.acquire_register()
+  b = prgm.acquire_register()
+  end = prgm.acquire_register()
+  acc = [prgm.acquire_register('xmm') for i in xrange(0, 4)]
+  t = prgm.acquire_register('xmm')
+
+  sr.mov(a, rdi)
+  sr.mov(b, rsi)
+  sr.lea(end, sr.MemRef(a, index = rdx, scale = 8, data_size = None))
+  for x in acc:
+    sr.xorpd(x, x)
+
+  lbl_loop = prgm.get_unique_label("loop")
+  code.add(lbl_loop)
+  for (i, x) in enumerate(acc):
+    sr.movsd(t, sr.MemRef(a, i * 8))
+    sr.mulsd(t, sr.MemRef(b, i * 8))
+    sr.addsd(x, t)
+  sr.add(a, 32)
+  sr.add(b, 32)
+  sr.cmp(a, end)
+  sr.jne(lbl_loop)
+
+  for x in acc[1:]:
+    sr.addsd(acc[0], x)
+  sr.cvttsd2si(eax, acc[0])
+
+  sr.set_active_code(None)
+  prgm += code
+  return prgm
+
+
+N = 1000
+x = extarray.extarray('d', [float(i % 10) for i in xrange(0, N)])
+y = extarray.extarray('d', [2.0] * N)
+
+prgm = dot_program()
+params = env.ExecParams()
+params.p1 = x.buffer_info()[0]
+params.p2 = y.buffer_info()[0]
+params.p3 = N
+result = proc.execute(prgm, params = params)
+prgm.print_code()
+print "dot", result, "spills", prgm.spills
+print "passed?", result == sum([(i % 10) * 2 for i in xrange(0, N)])
+
+
+# More values live at once than there are registers: the ones needed last
+# are kept in stack slots.  A division (rax/rdx) and a shift by cl are mixed
+# in; the allocator keeps synthetic registers out of rax, rcx and rdx while
+# those are in use.
+def pressure_program(n):
+  prgm = sr.Program()
+  code = prgm.get_stream()
+  sr.set_active_code(code)
+
+  vals = [prgm.acquire_register() for i in xrange(0, n)]
+  for (i, v) in enumerate(vals):
+    sr.lea(v, sr.MemRef(rdi, i, data_size = None))
+
+  d = prgm.acquire_register()
+  sr.mov(d, 3)
+  sr.mov(rax, rdi)
+  sr.xor(rdx, rdx)
+  sr.div(d)
+  sr.mov(rcx, 2)
+  sr.shl(rax, cl)
+
+  for v in vals:
+    sr.imul(v, v)
+    sr.add(rax, v)
+
+  sr.set_active_code(None)
+  prgm += code
+  return prgm
+
+
+n = 40
+prgm = pressure_program(n)
+params = env.ExecParams()
+params.p1 = 10
+result = proc.execute(prgm, params = params)
+print
+print "pressure", result, "spills", prgm.spills, "slots", prgm.spill_slots
+print "passed?", result == (10 // 3) * 4 + sum([(10 + i) ** 2 for i in xrange(0, n)])
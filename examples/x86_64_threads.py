@@ -0,0 +1,230 @@
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+import corepy.arch.x86_64.platform as env
+import threading
+import time
+
+# Synchronous execution releases the GIL, so Python threads calling
+# Processor.execute run their programs concurrently, on separate cores if
+# there are any.
+
+ITERS = 200000000
+THREADS = 4
+
+
+# A program that counts down from its first parameter, returning the count
+def spin_program():
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  x86.xor(rax, rax)
+  x86.mov(rcx, rdi)
+
+  lbl_loop = prgm.get_unique_label("loop")
+  code.add(lbl_loop)
+  x86.add(rax, 1)
+  x86.dec(rcx)
+  x86.jnz(lbl_loop)
+
+  x86.set_active_code(None)
+  prgm += code
+  prgm.cache_code()
+  return prgm
+
+
+def run(proc, prgm, results, i):
+  params = env.ExecParams()
+  params.p1 = ITERS
+  results[i] = proc.execute(prgm, params = params)
+
+
+proc = env.Processor()
+prgms = [spin_program() for i in xrange(0, THREADS)]
+results = [None] * THREADS
+
+# Run each program in turn
+t1 = time.time()
+for i in xrange(0, THREADS):
+  run(proc, prgms[i], results, i)
+t2 = time.time()
+serial = t2 - t1
+print "serial  ", serial
+print "passed?", results == [ITERS] * THREADS
+
+# Run the programs from one Python thread each
+results = [None] * THREADS
+threads = [threading.Thread(target = run, args = (proc, prgms[i], results, i))
+           for i in xrange(0, THREADS)]
+
+t1 = time.time()
+[t.start() for t in threads]
+[t.join() for t in threads]
+t2 = time.time()
+threaded = t2 - t1
+print "threaded", threaded
+print "passed?", results == [ITERS] * THREADS
+print "speedup  %.2f (%d threads)" % (serial / threaded, THREADS)
+
+
+# The main thread keeps running Python code while a program executes
+results = [None]
+t = threading.Thread(target = run, args = (proc, prgms[0], results, 0))
+ticks = 0
+t.start()
+while t.isAlive():
+  ticks += 1
+  time.sleep(0.001)
+t.join()
+
+print
+print "main thread ticks during execution", ticks
+print "passed?", ticks > 1 and results[0] == ITERS
+
+
+# Many short executions: async execution and execute_many run on a pool of
+# native worker threads rather than a new thread per execution.
+prgm = env.Program()
+code = prgm.get_stream()
+x86.set_active_code(code)
+x86.mov(rax, rdi)
+x86.imul(rax, rsi)
+x86.set_active_code(None)
+prgm += code
+
+N = 20000
+params = [(i, 3, 0) for i in xrange(0, N)]
+expected = [i * 3 for i in xrange(0, N)]
+
+t1 = time.time()
+ids = [proc.execute(prgm, async = True, params = p) for p in params]
+results = [proc.join(i) for i in ids]
+t2 = time.time()
+print
+print "async + join    ", t2 - t1, "(%d worker threads)" % proc.pool_size()
+print "passed?", results == expected
+
+t1 = time.time()
+results = proc.execute_many(prgm, params)
+t2 = time.time()
+print "execute_many    ", t2 - t1
+print "passed?", list(results) == expected
+
+
+# 1000 executions in flight at once, waited on from one event loop through
+# the completion file descriptor, versus one Python thread blocked in join
+# per execution.
+import select
+
+N = 1000
+prgm = spin_program()
+expected = [10000 + i for i in xrange(0, N)]
+comp = proc.completions()
+
+results = [None] * N
+t1 = time.time()
+for i in xrange(0, N):
+  params = env.ExecParams()
+  params.p1 = 10000 + i
+  comp.submit(prgm, lambda r, i = i: results.__setitem__(i, r), params)
+while len(comp) > 0:
+  select.select([comp], [], [])
+  comp.process()
+t2 = time.time()
+print
+print "event loop      ", t2 - t1, "(%d in flight)" % N
+print "passed?", results == expected
+
+# A callback that raises does not strand the other finished executions:
+# they are still delivered by later calls to process().
+results = []
+def fail_once(r):
+  if len(results) == 0:
+    results.append(None)
+    raise ValueError(r)
+  results.append(r)
+
+for i in xrange(0, 20):
+  params = env.ExecParams()
+  params.p1 = 10000 + i
+  comp.submit(prgm, fail_once, params)
+raised = 0
+while len(comp) > 0:
+  select.select([comp], [], [])
+  try:
+    comp.process()
+  except ValueError:
+    raised += 1
+print "callback error passed?", raised == 1 and len(results) == 20
+
+def wait(t, i):
+  results[i] = proc.join(t)
+
+results = [None] * N
+t1 = time.time()
+waiters = []
+for i in xrange(0, N):
+  params = env.ExecParams()
+  params.p1 = 10000 + i
+  t = proc.execute(prgm, async = True, params = params)
+  waiters.append(threading.Thread(target = wait, args = (t, i)))
+  waiters[-1].start()
+[w.join() for w in waiters]
+t2 = time.time()
+print "thread per join ", t2 - t1
+print "passed?", results == expected
+
+
+# Parameter sweep: an array of N * 6 words (p1..p6 for each execution) is
+# passed to execute_many in place, and the results are written to an
+# existing array.
+import corepy.lib.extarray as extarray
+
+N = 1000000
+sweep = extarray.extarray('l', N * 6)
+for i in xrange(0, N):
+  sweep[i * 6] = i
+  sweep[i * 6 + 1] = 3
+out = extarray.extarray('l', N)
+
+prgm = env.Program()
+code = prgm.get_stream()
+x86.set_active_code(code)
+x86.mov(rax, rdi)
+x86.imul(rax, rsi)
+x86.set_active_code(None)
+prgm += code
+
+t1 = time.time()
+proc.execute_many(prgm, sweep, results = out)
+t2 = time.time()
+print
+print "sweep           ", t2 - t1, "(%d executions)" % N
+print "passed?", out[N - 1] == (N - 1) * 3
+
+
+# Parameter arrays with an __array_interface__ (such as NumPy arrays) must
+# have shape (N, 6), one row per execution.  Other shapes are rejected
+# rather than being read as rows of 6.
+class Words(object):
+  def __init__(self, shape):
+    n = 1
+    for dim in shape:
+      n *= dim
+    self.data = extarray.extarray('l', n)
+    self.__array_interface__ = {'shape': shape, 'typestr': '<i8',
+        'data': (self.data.buffer_info()[0], False), 'version': 3}
+
+out = proc.execute_many(prgm, Words((4, 6)))
+rejected = []
+for shape in ((6, 4), (8, 3), (24,)):
+  try:
+    proc.execute_many(prgm, Words(shape))
+  except TypeError:
+    rejected.append(shape)
+try:
+  proc.execute_many(prgm, extarray.extarray('l', 20))
+except TypeError:
+  rejected.append(20)
+print
+print "shape checks passed?", len(out) == 4 and len(rejected) == 4
@@ -0,0 +1,56 @@
+import corepy.arch.x86_64.isa as x86
+from corepy.arch.x86_64.types.registers import *
+import corepy.arch.x86_64.platform as env
+import corepy.arch.x86_64.platform.cpuid as cpuid
+from corepy.arch.x86_64.lib.iterators import vector_iter
+import corepy.lib.extarray as extarray
+
+# C = A * B + A over float arrays, with SSE and (if the host has it) AVX.
+# The length is not a multiple of the vector size, so the iterator adds a
+# scalar or masked tail.
+
+proc = env.Processor()
+
+N = 1003
+A = extarray.extarray('f', [float(i % 13) for i in xrange(0, N)])
+B = extarray.extarray('f', [float(i % 5) for i in xrange(0, N)])
+expected = [float((i % 13) * (i % 5) + (i % 13)) for i in xrange(0, N)]
+
+
+def gen(width, nontemporal = False):
+  C = extarray.extarray('f', [0.0] * N)
+
+  prgm = env.Program()
+  code = prgm.get_stream()
+  x86.set_active_code(code)
+
+  for (a, b, c) in vector_iter(code, (A, B), (C,), width = width,
+                               nontemporal = nontemporal):
+    if width == 16:
+      x86.movaps(c, a)
+      x86.mulps(c, b)
+      x86.addps(c, a)
+    else:
+      x86.vmulps(c, a, b)
+      x86.vaddps(c, c, a)
+
+  if width == 32:
+    x86.vzeroupper()
+  x86.set_active_code(None)
+  prgm += code
+  return (prgm, C)
+
+
+widths = [16]
+if cpuid.has('avx'):
+  widths.append(32)
+
+for width in widths:
+  for nontemporal in (False, True):
+    (prgm, C) = gen(width, nontemporal)
+    proc.execute(prgm)
+    print "width %d nontemporal %s passed? %s" % (width, nontemporal,
+        list(C) == expected)
+
+(prgm, C) = gen(widths[-1])
+prgm.print_code()
@@ -57,6 +57,18 @@ def verify(inst, b):
   return
 
 
+def verify_error(inst):
+  # inst has operands its encoding cannot represent, rendering must fail
+  print inst
+  try:
+    inst.render()
+  except Exception, e:
+    print e
+    return
+  print "  ERROR"
+  return
+
+
 def Test():
   verify(x86.xor(ebx, eax),                 [0x31, 0xC3])
   verify(x86.add(ebx, ebx),                 [0x01, 0xdb])
@@ -102,10 +114,14 @@ def Test():
   verify(x86.jmp(MemRef(r13)),              [0x41, 0xff, 0x65, 0x00])
   verify(x86.jmp(MemRef(rax)),              [0xff, 0x20])
   verify(x86.lea(rdx, MemRef(r14, 24, rbx, 2, data_size = None)), [0x49, 0x8d, 0x54, 0x5e, 0x18])
-  verify(x86.loop(-4),                      [0xe2, 0xfc])
+  # Relative offsets are from the start of the code, so the instruction
+  # needs a position; -4 is 6 bytes back from the end of a loop at 0.
+  inst = x86.loop(-4)
+  inst.set_position(0)
+  verify(inst,                              [0xe2, 0xfa])
   verify(x86.mov(r13, -0x1EADBEEFDEADBEEF), [0x49, 0xbd, 0x11, 0x41, 0x52, 0x21, 0x10, 0x41, 0x52, 0xe1])
   verify(x86.shld(rax, r15, cl),            [0x4c, 0x0f, 0xa5, 0xf8])
-  verify(x86.movd(xmm8, r15),               [0x66, 0x4d, 0x0f, 0x6e, 0xc7])
+  verify(x86.movq(xmm8, r15),               [0x66, 0x4d, 0x0f, 0x6e, 0xc7])
   verify(x86.addpd(xmm11, xmm10),           [0x66, 0x45, 0x0f, 0x58, 0xda])
   verify(x86.addpd(xmm11, MemRef(rdx, data_size = 128)), [0x66, 0x44, 0x0f, 0x58, 0x1a])
   verify(x86.cmpxchg8b(MemRef(eax)),        [0x67, 0x0f, 0xc7, 0x08])
@@ -158,6 +174,7 @@ def Test():
   verify(x86.shl(rax, 1), [0x48, 0xD1, 0xE0])
   verify(x86.add(eax, 1), [0x83, 0xC0, 0x01])
   verify(x86.mov(r15, 4), [0x49, 0xC7, 0xC7, 0x04, 0x00, 0x00, 0x00])
+  verify(x86.mov(rax, MemRef(rsp, 1000)), [0x48, 0x8B, 0x84, 0x24, 0xE8, 0x03, 0x00, 0x00])
 
   print
 
@@ -170,23 +187,122 @@ def Test():
   verify(x86.pinsrw(xmm12, ebx, 4), [0x66, 0x44, 0x0F, 0xC4, 0xE3, 0x04])
   verify(x86.movd(ecx,xmm5), [0x66, 0x0F, 0x7E, 0xE9])
   verify(x86.movd(xmm5,edx), [0x66, 0x0F, 0x6E, 0xEA])
-  verify(x86.movd(xmm5,rdx), [0x66, 0x48, 0x0F, 0x6E, 0xEA])
+  verify(x86.movq(xmm5,rdx), [0x66, 0x48, 0x0F, 0x6E, 0xEA])
 
   print
 
-  verify(x86.cvtsi2sd(xmm0, r9),           [0xF3, 0x49, 0x0F, 0x2A, 0xC1])
-  verify(x86.cvtss2si(r9, xmm0),           [0xF3, 0x4C, 0x0F, 0x2D, 0xC8])
-  verify(x86.cvttsd2si(r9, xmm0),          [0xF2, 0x4C, 0x0F, 0x2C, 0xC8])
-  verify(x86.cvttss2si(r9, xmm0),          [0xF3, 0x4C, 0x0F, 0x2C, 0xC8])
-  verify(x86.movd(rcx,xmm5), [0x66, 0x48, 0x0F, 0x7E, 0xE9])
-  verify(x86.movd(xmm5,rdx), [0x66, 0x48, 0x0F, 0x6E, 0xEA])
+  verify(x86.cvtsi2sd(xmm0, r9),            [0xF2, 0x49, 0x0F, 0x2A, 0xC1])
+  verify(x86.movq(rcx,xmm5), [0x66, 0x48, 0x0F, 0x7E, 0xE9])
+  verify(x86.movq(xmm5,rdx), [0x66, 0x48, 0x0F, 0x6E, 0xEA])
 
   print
 
   verify(x86.pmovmskb(eax,mm1), [0x0F, 0xD7, 0xC1])
-  verify(x86.pmovmskb(rax,mm1), [0x48, 0x0F, 0xD7, 0xC1])
-  verify(x86.movd(rcx,mm5), [0x48, 0x0F, 0x7E, 0xE9])
-  verify(x86.movd(mm5,rdx), [0x48, 0x0F, 0x6E, 0xEA])
+  verify(x86.movq(rcx,mm5), [0x48, 0x0F, 0x7E, 0xE9])
+  verify(x86.movq(mm5,rdx), [0x48, 0x0F, 0x6E, 0xEA])
+
+  print
+
+  verify(x86.vaddps(xmm0, xmm1, xmm2), [0xC5, 0xF0, 0x58, 0xC2])
+  verify(x86.vaddps(ymm0, ymm1, ymm2), [0xC5, 0xF4, 0x58, 0xC2])
+  verify(x86.vaddpd(ymm8, ymm9, ymm10), [0xC4, 0x41, 0x35, 0x58, 0xC2])
+  verify(x86.vaddps(ymm8, ymm9, MemRef(r13, 8, data_size = 256)), [0xC4, 0x41, 0x34, 0x58, 0x45, 0x08])
+  verify(x86.vmulpd(ymm1, ymm2, MemRef(rax, 32, rcx, 8, data_size = 256)), [0xC5, 0xED, 0x59, 0x4C, 0xC8, 0x20])
+  verify(x86.vsubss(xmm1, xmm2, MemRef(rip, 64, data_size = 32)), [0xC5, 0xEA, 0x5C, 0x0D, 0x40, 0x00, 0x00, 0x00])
+  verify(x86.vdivsd(xmm3, xmm4, MemRef(ebx, 8, data_size = 64)), [0x67, 0xC5, 0xDB, 0x5E, 0x5B, 0x08])
+  verify(x86.vxorps(ymm15, ymm15, ymm15), [0xC4, 0x41, 0x04, 0x57, 0xFF])
+  verify(x86.vsqrtps(ymm2, ymm11), [0xC4, 0xC1, 0x7C, 0x51, 0xD3])
+  verify(x86.vmovaps(ymm0, MemRef(rdi, data_size = 256)), [0xC5, 0xFC, 0x28, 0x07])
+  verify(x86.vmovups(MemRef(rsp, 1000, data_size = 256), ymm12), [0xC5, 0x7C, 0x11, 0xA4, 0x24, 0xE8, 0x03, 0x00, 0x00])
+  verify(x86.vmovdqu(xmm9, MemRef(r12, data_size = 128)), [0xC4, 0x41, 0x7A, 0x6F, 0x0C, 0x24])
+  verify(x86.vmovss(xmm1, MemRef(rsi, data_size = 32)), [0xC5, 0xFA, 0x10, 0x0E])
+  verify(x86.vshufps(ymm1, ymm2, ymm3, 0x1B), [0xC5, 0xEC, 0xC6, 0xCB, 0x1B])
+  verify(x86.vcmppd(xmm1, xmm2, MemRef(rbp, -16, data_size = 128), 2), [0xC5, 0xE9, 0xC2, 0x4D, 0xF0, 0x02])
+  verify(x86.vzeroupper(), [0xC5, 0xF8, 0x77])
+  verify(x86.vzeroall(), [0xC5, 0xFC, 0x77])
+
+  print
+
+  verify(x86.vmaskmovps(xmm1, xmm2, MemRef(rax, data_size = 128)), [0xC4, 0xE2, 0x69, 0x2C, 0x08])
+  verify(x86.vmaskmovps(ymm9, ymm12, MemRef(r10, 64, data_size = 256)), [0xC4, 0x42, 0x1D, 0x2C, 0x4A, 0x40])
+  verify(x86.vmaskmovps(MemRef(rdi, data_size = 128), xmm3, xmm4), [0xC4, 0xE2, 0x61, 0x2E, 0x27])
+  verify(x86.vmaskmovps(MemRef(r8, 32, data_size = 256), ymm2, ymm11), [0xC4, 0x42, 0x6D, 0x2E, 0x58, 0x20])
+  verify(x86.vmaskmovpd(MemRef(rcx, data_size = 128), xmm14, xmm7), [0xC4, 0xE2, 0x09, 0x2F, 0x39])
+  verify(x86.vmaskmovpd(MemRef(r13, 16, data_size = 256), ymm3, ymm2), [0xC4, 0xC2, 0x65, 0x2F, 0x55, 0x10])
+  verify(x86.vmovntps(MemRef(r9, 32, data_size = 256), ymm10), [0xC4, 0x41, 0x7C, 0x2B, 0x51, 0x20])
+  verify(x86.vmovntpd(MemRef(rax, data_size = 128), xmm8), [0xC5, 0x79, 0x2B, 0x00])
+  verify(x86.vmovntdq(MemRef(rsi, data_size = 128), xmm2), [0xC5, 0xF9, 0xE7, 0x16])
+  verify(x86.vmovntdq(MemRef(r11, data_size = 256), ymm15), [0xC4, 0x41, 0x7D, 0xE7, 0x3B])
+
+  print
+
+  verify(x86.vbroadcastss(ymm4, MemRef(rax, data_size = 32)), [0xC4, 0xE2, 0x7D, 0x18, 0x20])
+  verify(x86.vbroadcastss(ymm4, xmm5), [0xC4, 0xE2, 0x7D, 0x18, 0xE5])
+  verify(x86.vbroadcastsd(ymm9, MemRef(r8, data_size = 64)), [0xC4, 0x42, 0x7D, 0x19, 0x08])
+  verify(x86.vbroadcastf128(ymm1, MemRef(rdx, data_size = 128)), [0xC4, 0xE2, 0x7D, 0x1A, 0x0A])
+  verify(x86.vinsertf128(ymm0, ymm1, xmm2, 1), [0xC4, 0xE3, 0x75, 0x18, 0xC2, 0x01])
+  verify(x86.vextractf128(xmm10, ymm3, 1), [0xC4, 0xC3, 0x7D, 0x19, 0xDA, 0x01])
+  verify(x86.vextracti128(MemRef(rdx, data_size = 128), ymm7, 1), [0xC4, 0xE3, 0x7D, 0x39, 0x3A, 0x01])
+  verify(x86.vperm2f128(ymm1, ymm2, ymm3, 0x21), [0xC4, 0xE3, 0x6D, 0x06, 0xCB, 0x21])
+  verify(x86.vpermd(ymm1, ymm2, ymm3), [0xC4, 0xE2, 0x6D, 0x36, 0xCB])
+  verify(x86.vpermq(ymm1, ymm12, 0x4E), [0xC4, 0xC3, 0xFD, 0x00, 0xCC, 0x4E])
+
+  print
+
+  verify(x86.vpaddd(ymm1, ymm2, ymm3), [0xC5, 0xED, 0xFE, 0xCB])
+  verify(x86.vpaddq(xmm8, xmm9, MemRef(rax, data_size = 128)), [0xC5, 0x31, 0xD4, 0x00])
+  verify(x86.vpmulld(ymm0, ymm1, ymm14), [0xC4, 0xC2, 0x75, 0x40, 0xC6])
+  verify(x86.vpcmpeqd(ymm3, ymm3, ymm3), [0xC5, 0xE5, 0x76, 0xDB])
+  verify(x86.vpxor(ymm10, ymm10, MemRef(rcx, data_size = 256)), [0xC5, 0x2D, 0xEF, 0x11])
+  verify(x86.vpslld(ymm9, ymm10, 3), [0xC4, 0xC1, 0x35, 0x72, 0xF2, 0x03])
+  verify(x86.vpsrlq(xmm1, xmm2, xmm3), [0xC5, 0xE9, 0xD3, 0xCB])
+  verify(x86.vpsllvd(ymm1, ymm2, ymm3), [0xC4, 0xE2, 0x6D, 0x47, 0xCB])
+  verify(x86.vpshufd(ymm5, ymm6, 0xB1), [0xC5, 0xFD, 0x70, 0xEE, 0xB1])
+
+  print
+
+  verify(x86.vfmadd231ps(ymm0, ymm1, ymm2), [0xC4, 0xE2, 0x75, 0xB8, 0xC2])
+  verify(x86.vfmadd213pd(ymm8, ymm9, MemRef(rsi, 32, data_size = 256)), [0xC4, 0x62, 0xB5, 0xA8, 0x46, 0x20])
+  verify(x86.vfmadd132ss(xmm0, xmm1, xmm2), [0xC4, 0xE2, 0x71, 0x99, 0xC2])
+  verify(x86.vfnmadd231sd(xmm3, xmm12, MemRef(rax, data_size = 64)), [0xC4, 0xE2, 0x99, 0xBD, 0x18])
+  verify(x86.vfmsub231ps(xmm1, xmm2, xmm3), [0xC4, 0xE2, 0x69, 0xBA, 0xCB])
+
+  print
+
+  verify(x86.vgatherdps(ymm2, MemRef(rdi, index = ymm5, scale = 4, data_size = 32), ymm6), [0xC4, 0xE2, 0x4D, 0x92, 0x14, 0xAF])
+  verify(x86.vgatherdpd(ymm1, MemRef(rax, 8, xmm2, 8, data_size = 64), ymm3), [0xC4, 0xE2, 0xE5, 0x92, 0x4C, 0xD0, 0x08])
+  verify(x86.vgatherqps(xmm1, MemRef(rax, index = ymm12, scale = 4, data_size = 32), xmm3), [0xC4, 0xA2, 0x65, 0x93, 0x0C, 0xA0])
+  verify(x86.vpgatherdd(xmm9, MemRef(r13, index = xmm2, scale = 4, data_size = 32), xmm10), [0xC4, 0x42, 0x29, 0x90, 0x4C, 0x95, 0x00])
+  verify_error(x86.vgatherdps(xmm2, MemRef(rdi, index = ymm5, scale = 4, data_size = 32), xmm6))
+  verify_error(x86.vgatherdpd(ymm1, MemRef(rax, 8, ymm2, 8, data_size = 64), ymm3))
+  verify_error(x86.vpgatherqq(ymm1, MemRef(rax, 8, xmm2, 8, data_size = 64), ymm3))
+
+  print
+
+  verify(x86.andn(rax, rbx, rcx), [0xC4, 0xE2, 0xE0, 0xF2, 0xC1])
+  verify(x86.andn(r9d, r10d, MemRef(r11, 8, data_size = 32)), [0xC4, 0x42, 0x28, 0xF2, 0x4B, 0x08])
+  verify(x86.bextr(rax, rbx, rcx), [0xC4, 0xE2, 0xF0, 0xF7, 0xC3])
+  verify(x86.bextr(eax, MemRef(rsi, data_size = 32), r12d), [0xC4, 0xE2, 0x18, 0xF7, 0x06])
+  verify(x86.blsi(rax, rbx), [0xC4, 0xE2, 0xF8, 0xF3, 0xDB])
+  verify(x86.blsmsk(r8, MemRef(rdi, data_size = 64)), [0xC4, 0xE2, 0xB8, 0xF3, 0x17])
+  verify(x86.blsr(ecx, r15d), [0xC4, 0xC2, 0x70, 0xF3, 0xCF])
+  verify(x86.bzhi(rdx, rsi, rdi), [0xC4, 0xE2, 0xC0, 0xF5, 0xD6])
+  verify(x86.pdep(rax, rbx, rcx), [0xC4, 0xE2, 0xE3, 0xF5, 0xC1])
+  verify(x86.pext(r9, r10, MemRef(rsp, 16)), [0xC4, 0x62, 0xAA, 0xF5, 0x4C, 0x24, 0x10])
+  verify(x86.shlx(rax, rbx, rcx), [0xC4, 0xE2, 0xF1, 0xF7, 0xC3])
+  verify(x86.shrx(r8d, MemRef(rbp, -4, data_size = 32), r9d), [0xC4, 0x62, 0x33, 0xF7, 0x45, 0xFC])
+  verify(x86.sarx(rsi, rdi, r13), [0xC4, 0xE2, 0x92, 0xF7, 0xF7])
+  verify(x86.rorx(rax, rbx, 13), [0xC4, 0xE3, 0xFB, 0xF0, 0xC3, 0x0D])
+  verify(x86.rorx(r11d, MemRef(rax, data_size = 32), 7), [0xC4, 0x63, 0x7B, 0xF0, 0x18, 0x07])
+  verify(x86.mulx(r8, r9, rbx), [0xC4, 0x62, 0xB3, 0xF6, 0xC3])
+  verify(x86.tzcnt(rax, rbx), [0xF3, 0x48, 0x0F, 0xBC, 0xC3])
+  verify(x86.tzcnt(r12d, MemRef(rsi, data_size = 32)), [0xF3, 0x44, 0x0F, 0xBC, 0x26])
+  verify(x86.adcx(rax, r10), [0x66, 0x49, 0x0F, 0x38, 0xF6, 0xC2])
+  verify(x86.adox(r11, MemRef(rdi, 8)), [0xF3, 0x4C, 0x0F, 0x38, 0xF6, 0x5F, 0x08])
+  verify(x86.lzcnt(rax, rbx), [0xF3, 0x48, 0x0F, 0xBD, 0xC3])
+  verify(x86.popcnt(ecx, edx), [0xF3, 0x0F, 0xB8, 0xCA])
+  verify(x86.bsf(rax, r9), [0x49, 0x0F, 0xBC, 0xC1])
+  verify(x86.xgetbv(), [0x0F, 0x01, 0xD0])
 
   return
 